@@ -10,6 +10,8 @@ from proxmox_nli.core.security.auth_manager import AuthManager
 from proxmox_nli.core.user_preferences import UserManager, UserPreferencesManager
 from proxmox_nli.core.profile_sync import ProfileSyncManager
 from proxmox_nli.core.dashboard_manager import DashboardManager
+from proxmox_nli.utils.query_profiler import profiling_requested, trace_query
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from functools import wraps
 from dotenv import load_dotenv
 import logging
@@ -291,6 +293,54 @@ def token_required(required_roles=['user']):
         return decorated_function
     return decorator
 
+@socketio.on('query_stream')
+def handle_query_stream(data):
+    """Process a chat query and emit the response to the client as it is generated"""
+    data = data or {}
+    request_id = data.get('request_id') or str(uuid.uuid4())
+    query = (data.get('query') or '').strip()
+
+    payload = auth_manager.verify_token(data.get('token', ''))
+    if not payload or not set(payload.get('roles', [])) & {'user', 'admin'}:
+        emit('response_error', {'request_id': request_id, 'error': 'Unauthorized access'})
+        return
+    if not query:
+        emit('response_error', {'request_id': request_id, 'error': 'Query is required'})
+        return
+    if proxmox_nli is None:
+        emit('response_error', {'request_id': request_id, 'error': 'Proxmox NLI is not initialized'})
+        return
+
+    user = payload.get('user_id')
+    # Profiling is opt-in per query via the X-Profile-Query header (or a 'profile'
+    # flag in the event) and limited to admins, since it slows the query down
+    profile = ('admin' in payload.get('roles', [])
+               and (profiling_requested(request.headers) or bool(data.get('profile'))))
+    chunks = []
+    try:
+        with trace_query('web', profile) as trace:
+            for chunk in proxmox_nli.process_query_stream(query, user=user, source='web',
+                                                          ip_address=request.remote_addr):
+                chunks.append(chunk)
+                emit('response_chunk', {'request_id': request_id, 'token': chunk})
+                # Yield to the async server so each chunk is flushed immediately
+                socketio.sleep(0)
+    except Exception as e:
+        logger.error(f"Error streaming query response: {str(e)}")
+        emit('response_error', {'request_id': request_id, 'error': str(e)})
+        return
+
+    response = {'request_id': request_id, 'response': ''.join(chunks).strip()}
+    if profile:
+        response['timings'] = trace.summary()
+    emit('response_complete', response)
+
+@app.route('/metrics', methods=['GET'])
+@token_required(required_roles=['admin'])
+def prometheus_metrics():
+    """Expose Prometheus metrics, including the query stage histograms (scrape with an admin bearer token)"""
+    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
 # Import the new modules
 from proxmox_nli.core.security.resource_manager import ResourceManager
 from proxmox_nli.core.security.family_manager import FamilyManager
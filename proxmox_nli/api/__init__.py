@@ -5,5 +5,7 @@ This module provides the necessary classes and functions to interact with the Pr
 """
 
 from .proxmox_api import ProxmoxAPI
+from .async_proxmox_api import AsyncProxmoxAPI
+from .response_cache import ResponseCache
 
-__all__ = ['ProxmoxAPI']
\ No newline at end of file
+__all__ = ['ProxmoxAPI', 'AsyncProxmoxAPI', 'ResponseCache']
\ No newline at end of file
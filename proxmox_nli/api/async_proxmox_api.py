@@ -0,0 +1,191 @@
+"""
+Asynchronous Proxmox API interface module.
+
+Provides an aiohttp-based counterpart to ProxmoxAPI that returns the same
+{success, data} result shape and can fan out many requests over one event loop.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Iterable, List, Optional, Sequence
+
+import aiohttp
+
+from .proxmox_api import TICKET_LIFETIME, TICKET_RENEW_MARGIN
+
+logger = logging.getLogger(__name__)
+
+# A request spec is (method, endpoint) or (method, endpoint, data)
+RequestSpec = Sequence[Any]
+
+class AsyncProxmoxAPI:
+    SUPPORTED_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
+    def __init__(self, host, user, password, realm='pam', verify_ssl=False,
+                 pool_size=50, timeout=30, max_concurrency=20,
+                 ticket_lifetime=TICKET_LIFETIME, renew_margin=TICKET_RENEW_MARGIN):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.realm = realm
+        self.verify_ssl = verify_ssl
+        self.base_url = f"https://{host}:8006/api2/json"
+        self.ticket = None
+        self.csrf_token = None
+        self.ticket_issued_at = None
+        self.ticket_lifetime = ticket_lifetime
+        self.renew_margin = renew_margin
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._auth_lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the pooled client session on first use inside the running loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ssl=None if self.verify_ssl else False)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    def _get_auth_lock(self) -> asyncio.Lock:
+        if self._auth_lock is None:
+            self._auth_lock = asyncio.Lock()
+        return self._auth_lock
+
+    async def authenticate(self):
+        """Authenticate with Proxmox API and get ticket and CSRF token"""
+        auth_url = f"{self.base_url}/access/ticket"
+        data = {
+            'username': f"{self.user}@{self.realm}",
+            'password': self.password
+        }
+
+        try:
+            async with self._get_session().post(auth_url, data=data) as response:
+                if response.status == 200:
+                    result = (await response.json())['data']
+                    self.ticket = result['ticket']
+                    self.csrf_token = result['CSRFPreventionToken']
+                    self.ticket_issued_at = time.monotonic()
+                    return True
+                logger.error(f"Authentication failed: {await response.text()}")
+                return False
+        except Exception as e:
+            logger.error(f"Authentication error: {str(e)}")
+            return False
+
+    def ticket_expiring(self):
+        """Check whether the current ticket is missing or close to expiry"""
+        if not self.ticket or self.ticket_issued_at is None:
+            return True
+        age = time.monotonic() - self.ticket_issued_at
+        return age >= self.ticket_lifetime - self.renew_margin
+
+    async def ensure_authenticated(self, force=False):
+        """Authenticate if needed; concurrent callers share a single renewal"""
+        stale_ticket = self.ticket
+        if not force and not self.ticket_expiring():
+            return True
+        async with self._get_auth_lock():
+            renewed_meanwhile = self.ticket != stale_ticket
+            if (renewed_meanwhile or not force) and not self.ticket_expiring():
+                return True
+            return await self.authenticate()
+
+    async def _send(self, method, url, data, timeout):
+        headers = {'Cookie': f"PVEAuthCookie={self.ticket}"}
+        if method in ['POST', 'PUT', 'DELETE']:
+            headers['CSRFPreventionToken'] = self.csrf_token
+        kwargs = {'headers': headers, 'data': data}
+        if timeout is not None:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        async with self._get_session().request(method, url, **kwargs) as response:
+            body = await response.json() if response.status in [200, 201, 202] else await response.text()
+            return response.status, body
+
+    async def api_request(self, method, endpoint, data=None, timeout=None):
+        """Make a request to the Proxmox API
+
+        Args:
+            method: HTTP method (GET, POST, PUT or DELETE)
+            endpoint: API path relative to /api2/json
+            data: Optional form data for POST/PUT requests
+            timeout: Per-request timeout in seconds, defaults to the client timeout
+        """
+        if method not in self.SUPPORTED_METHODS:
+            return {"success": False, "message": f"Unsupported method: {method}"}
+
+        if not await self.ensure_authenticated():
+            return {"success": False, "message": "Authentication failed"}
+
+        url = f"{self.base_url}/{endpoint}"
+
+        try:
+            status, body = await self._send(method, url, data, timeout)
+
+            if status == 401:
+                if not await self.ensure_authenticated(force=True):
+                    return {"success": False, "message": "Authentication failed"}
+                status, body = await self._send(method, url, data, timeout)
+
+            if status in [200, 201, 202]:
+                return {"success": True, "data": body['data']}
+            return {"success": False, "message": body}
+        except asyncio.TimeoutError:
+            return {"success": False, "message": f"Request to {endpoint} timed out"}
+        except Exception as e:
+            return {"success": False, "message": str(e)}
+
+    async def gather(self, requests: Iterable[RequestSpec], max_concurrency: int = None) -> List[Dict[str, Any]]:
+        """Run many requests concurrently with at most max_concurrency in flight
+
+        Args:
+            requests: Iterable of (method, endpoint) or (method, endpoint, data) tuples
+
+        Returns:
+            Results in the same order as the requests
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def bounded(spec):
+            async with semaphore:
+                return await self.api_request(*spec)
+
+        # Authenticate once up front so the fan-out does not queue on the auth lock
+        await self.ensure_authenticated()
+        return await asyncio.gather(*(bounded(spec) for spec in requests))
+
+    async def get_many(self, endpoints: Iterable[str], max_concurrency: int = None) -> Dict[str, Dict[str, Any]]:
+        """GET several endpoints concurrently, keyed by endpoint"""
+        endpoints = list(endpoints)
+        results = await self.gather([('GET', endpoint) for endpoint in endpoints], max_concurrency)
+        return dict(zip(endpoints, results))
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        # Both are bound to the loop they were created on
+        self._auth_lock = None
+
+
+def run_concurrently(api: AsyncProxmoxAPI, requests: Iterable[RequestSpec],
+                     max_concurrency: int = None) -> List[Dict[str, Any]]:
+    """Run a batch of requests from synchronous code on a private event loop"""
+    async def _run():
+        try:
+            return await api.gather(requests, max_concurrency)
+        finally:
+            await api.close()
+    return asyncio.run(_run())
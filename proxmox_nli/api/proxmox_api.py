@@ -5,14 +5,30 @@ import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import logging
+import threading
+import time
 from typing import Dict, Any, Optional
 
+from .response_cache import ResponseCache
+from ..utils.query_profiler import timed_stage
+
 logger = logging.getLogger(__name__)
 
+# Proxmox tickets are valid for two hours
+TICKET_LIFETIME = 7200
+# Renew the ticket this many seconds before it expires
+TICKET_RENEW_MARGIN = 300
+
 class ProxmoxAPI:
-    def __init__(self, host, user, password, realm='pam', verify_ssl=False):
+    SUPPORTED_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
+    def __init__(self, host, user, password, realm='pam', verify_ssl=False,
+                 pool_size=10, timeout=30, ticket_lifetime=TICKET_LIFETIME,
+                 renew_margin=TICKET_RENEW_MARGIN, enable_cache=True,
+                 response_cache: Optional[ResponseCache] = None):
         self.host = host
         self.user = user
         self.password = password
@@ -21,6 +37,23 @@ class ProxmoxAPI:
         self.base_url = f"https://{host}:8006/api2/json"
         self.ticket = None
         self.csrf_token = None
+        self.ticket_issued_at = None
+        self.ticket_lifetime = ticket_lifetime
+        self.renew_margin = renew_margin
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._auth_lock = threading.Lock()
+        self.session = self._create_session(pool_size)
+        self.cache = response_cache or (ResponseCache() if enable_cache else None)
+
+    def _create_session(self, pool_size):
+        """Create a keep-alive session with a connection pool sized for concurrent callers"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.verify = self.verify_ssl
+        return session
 
     def authenticate(self):
         """Authenticate with Proxmox API and get ticket and CSRF token"""
@@ -29,48 +62,106 @@ class ProxmoxAPI:
             'username': f"{self.user}@{self.realm}",
             'password': self.password
         }
-        
+
         try:
-            response = requests.post(auth_url, data=data, verify=self.verify_ssl)
+            response = self.session.post(auth_url, data=data, verify=self.verify_ssl, timeout=self.timeout)
             if response.status_code == 200:
                 result = response.json()['data']
                 self.ticket = result['ticket']
                 self.csrf_token = result['CSRFPreventionToken']
+                self.ticket_issued_at = time.monotonic()
                 return True
             else:
-                print(f"Authentication failed: {response.text}")
+                logger.error(f"Authentication failed: {response.text}")
                 return False
         except Exception as e:
-            print(f"Authentication error: {str(e)}")
+            logger.error(f"Authentication error: {str(e)}")
             return False
-    
-    def api_request(self, method, endpoint, data=None):
-        """Make a request to the Proxmox API"""
-        if not self.ticket:
-            if not self.authenticate():
-                return {"success": False, "message": "Authentication failed"}
-        
-        url = f"{self.base_url}/{endpoint}"
+
+    def ticket_expiring(self):
+        """Check whether the current ticket is missing or close to expiry"""
+        if not self.ticket or self.ticket_issued_at is None:
+            return True
+        age = time.monotonic() - self.ticket_issued_at
+        return age >= self.ticket_lifetime - self.renew_margin
+
+    def ensure_authenticated(self, force=False):
+        """Authenticate if there is no ticket, or renew it before it expires.
+
+        Only one thread renews at a time; others waiting on the lock reuse
+        the fresh ticket instead of authenticating again.
+        """
+        stale_ticket = self.ticket
+        if not force and not self.ticket_expiring():
+            return True
+        with self._auth_lock:
+            renewed_meanwhile = self.ticket != stale_ticket
+            if (renewed_meanwhile or not force) and not self.ticket_expiring():
+                return True
+            return self.authenticate()
+
+    @timed_stage('proxmox_api')
+    def _send(self, method, url, data, timeout):
         headers = {'Cookie': f"PVEAuthCookie={self.ticket}"}
-        
         if method in ['POST', 'PUT', 'DELETE']:
             headers['CSRFPreventionToken'] = self.csrf_token
-        
+        return self.session.request(
+            method, url, headers=headers, data=data,
+            verify=self.verify_ssl, timeout=timeout
+        )
+
+    def api_request(self, method, endpoint, data=None, timeout=None):
+        """Make a request to the Proxmox API
+
+        Args:
+            method: HTTP method (GET, POST, PUT or DELETE)
+            endpoint: API path relative to /api2/json
+            data: Optional form data for POST/PUT requests
+            timeout: Per-request timeout in seconds, defaults to the client timeout
+        """
+        if method not in self.SUPPORTED_METHODS:
+            return {"success": False, "message": f"Unsupported method: {method}"}
+
+        use_cache = method == 'GET' and self.cache is not None and self.cache.ttl_for(endpoint) > 0
+        if use_cache:
+            cached = self.cache.get(endpoint, data)
+            if cached is not None:
+                return cached
+
+        if not self.ensure_authenticated():
+            return {"success": False, "message": "Authentication failed"}
+
+        url = f"{self.base_url}/{endpoint}"
+        timeout = timeout if timeout is not None else self.timeout
+
         try:
-            if method == 'GET':
-                response = requests.get(url, headers=headers, verify=self.verify_ssl)
-            elif method == 'POST':
-                response = requests.post(url, headers=headers, data=data, verify=self.verify_ssl)
-            elif method == 'PUT':
-                response = requests.put(url, headers=headers, data=data, verify=self.verify_ssl)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=headers, verify=self.verify_ssl)
-            else:
-                return {"success": False, "message": f"Unsupported method: {method}"}
-            
+            response = self._send(method, url, data, timeout)
+
+            # Ticket was revoked or expired server-side; renew once and retry
+            if response.status_code == 401:
+                if not self.ensure_authenticated(force=True):
+                    return {"success": False, "message": "Authentication failed"}
+                response = self._send(method, url, data, timeout)
+
+            if method != 'GET' and self.cache is not None:
+                self.cache.invalidate(endpoint)
+
             if response.status_code in [200, 201, 202]:
-                return {"success": True, "data": response.json()['data']}
+                result = {"success": True, "data": response.json()['data']}
+                if use_cache:
+                    self.cache.set(endpoint, data, result)
+                return result
             else:
                 return {"success": False, "message": response.text}
         except Exception as e:
-            return {"success": False, "message": str(e)}
\ No newline at end of file
+            return {"success": False, "message": str(e)}
+
+    def cache_stats(self):
+        """Return response cache hit/miss counters"""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
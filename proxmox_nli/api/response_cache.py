@@ -0,0 +1,161 @@
+"""
+Read-through response cache for Proxmox API GET requests.
+
+Entries expire after a per-endpoint TTL, the cache is bounded with LRU
+eviction, and mutating requests invalidate the entries they can affect.
+"""
+import copy
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (endpoint pattern, TTL in seconds); first match wins
+DEFAULT_TTL_RULES = [
+    (r'^version$', 300),
+    (r'^cluster/resources$', 5),
+    (r'^cluster/status$', 5),
+    (r'^nodes$', 10),
+    (r'^storage$', 30),
+    (r'^nodes/[^/]+/storage$', 15),
+    (r'^nodes/[^/]+/(qemu|lxc)$', 5),
+    (r'^nodes/[^/]+/(qemu|lxc)/\d+/config$', 10),
+    (r'^nodes/[^/]+/(qemu|lxc)/\d+/status/current$', 2),
+    (r'^nodes/[^/]+/(status|netstat)$', 2),
+]
+
+# Aggregate endpoints that reflect the state of every guest and node
+CLUSTER_WIDE_ENDPOINTS = ('cluster/resources', 'cluster/status', 'nodes')
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of successful GET responses"""
+
+    def __init__(self, max_entries: int = 1024, ttl_rules: Optional[List[Tuple[str, float]]] = None,
+                 default_ttl: float = 0):
+        """Initialize the cache
+
+        Args:
+            max_entries: Maximum number of cached responses before LRU eviction
+            ttl_rules: List of (regex, ttl_seconds) pairs matched against the endpoint
+            default_ttl: TTL for endpoints matching no rule; 0 disables caching for them
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttl_rules = [(re.compile(pattern), ttl)
+                          for pattern, ttl in (ttl_rules if ttl_rules is not None else DEFAULT_TTL_RULES)]
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(endpoint: str) -> str:
+        return endpoint.strip('/')
+
+    @staticmethod
+    def _make_key(endpoint: str, params: Any) -> Tuple[str, str]:
+        if params is None:
+            return endpoint, ''
+        try:
+            return endpoint, json.dumps(params, sort_keys=True, default=str)
+        except (TypeError, ValueError):
+            return endpoint, repr(params)
+
+    def ttl_for(self, endpoint: str) -> float:
+        """Return the TTL configured for an endpoint"""
+        endpoint = self._normalize(endpoint)
+        for pattern, ttl in self.ttl_rules:
+            if pattern.match(endpoint):
+                return ttl
+        return self.default_ttl
+
+    def get(self, endpoint: str, params: Any = None) -> Optional[Dict[str, Any]]:
+        """Return a cached response, or None on a miss or expired entry"""
+        endpoint = self._normalize(endpoint)
+        key = self._make_key(endpoint, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(response)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, endpoint: str, params: Any, response: Dict[str, Any]):
+        """Store a successful response if the endpoint is cacheable"""
+        if not response.get('success'):
+            return
+        endpoint = self._normalize(endpoint)
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return
+        key = self._make_key(endpoint, params)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, copy.deepcopy(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, endpoint: str) -> int:
+        """Drop cached entries that a mutating request to endpoint may have changed
+
+        Entries under the affected guest/node path, its parent collections and
+        the cluster-wide aggregates are removed. Returns the number removed.
+        """
+        endpoint = self._normalize(endpoint)
+        parts = endpoint.split('/')
+        if len(parts) >= 4 and parts[0] == 'nodes' and parts[2] in ('qemu', 'lxc'):
+            scope = '/'.join(parts[:4])
+        elif len(parts) >= 2 and parts[0] == 'nodes':
+            scope = '/'.join(parts[:2])
+        else:
+            scope = endpoint
+
+        scope_parts = scope.split('/')
+        ancestors = {'/'.join(scope_parts[:i]) for i in range(1, len(scope_parts))}
+        affected_storage = 'storage' in parts
+
+        def affected(cached_endpoint: str) -> bool:
+            if cached_endpoint == scope or cached_endpoint.startswith(scope + '/'):
+                return True
+            if cached_endpoint in ancestors or cached_endpoint in CLUSTER_WIDE_ENDPOINTS:
+                return True
+            return affected_storage and cached_endpoint.endswith('storage')
+
+        with self._lock:
+            stale = [key for key in self._entries if affected(key[0])]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
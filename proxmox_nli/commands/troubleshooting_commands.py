@@ -189,23 +189,26 @@ class TroubleshootingCommands:
             errors = results.get("errors", [])
             warnings = results.get("warnings", [])
             patterns = results.get("patterns", [])
+            # Streamed analyses return a bounded sample plus the full counts
+            error_count = results.get("error_count", len(errors))
+            warning_count = results.get("warning_count", len(warnings))
             
             # Format response message
             message = f"Analyzed {log_type} logs.\n"
             
             if errors:
-                message += f"Found {len(errors)} errors:\n"
+                message += f"Found {error_count} errors:\n"
                 for i, error in enumerate(errors[:5], 1):
                     message += f"{i}. {error}\n"
-                if len(errors) > 5:
-                    message += f"... and {len(errors) - 5} more errors.\n"
+                if error_count > 5:
+                    message += f"... and {error_count - 5} more errors.\n"
             
             if warnings:
-                message += f"Found {len(warnings)} warnings:\n"
+                message += f"Found {warning_count} warnings:\n"
                 for i, warning in enumerate(warnings[:5], 1):
                     message += f"{i}. {warning}\n"
-                if len(warnings) > 5:
-                    message += f"... and {len(warnings) - 5} more warnings.\n"
+                if warning_count > 5:
+                    message += f"... and {warning_count - 5} more warnings.\n"
             
             if patterns:
                 message += f"Detected {len(patterns)} patterns in the logs.\n"
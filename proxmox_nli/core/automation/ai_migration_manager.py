@@ -39,7 +39,8 @@ class AIMigrationManager:
         self.migration_manager = migration_manager or MigrationManager(api)
         self.resource_monitor = resource_monitor or ResourceMonitor(api)
         self.resource_analyzer = ResourceAnalyzer(api)
-        self.predictive_analyzer = PredictiveAnalyzer(self.resource_analyzer)
+        self.predictive_analyzer = PredictiveAnalyzer(
+            self.resource_analyzer, store=self.resource_monitor.metrics_collector.store)
         
         # Configuration parameters
         self.config = {
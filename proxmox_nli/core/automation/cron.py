@@ -0,0 +1,145 @@
+"""
+Cron expression module for Proxmox NLI.
+Parses standard five-field cron expressions and computes their next fire time.
+"""
+from datetime import datetime, timedelta
+from typing import List, Set, Tuple
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+_MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_DAY_NAMES = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+# (name, minimum, maximum, value names starting at the minimum)
+_FIELDS: List[Tuple[str, int, int, List[str]]] = [
+    ("minute", 0, 59, []),
+    ("hour", 0, 23, []),
+    ("day of month", 1, 31, []),
+    ("month", 1, 12, _MONTH_NAMES),
+    ("day of week", 0, 7, _DAY_NAMES),
+]
+
+# Give up when no time matches within this many years (e.g. "0 0 30 2 *")
+_SEARCH_YEARS = 8
+
+
+class CronExpression:
+    """A parsed cron expression: minute hour day-of-month month day-of-week"""
+
+    def __init__(self, expression: str):
+        """
+        Parse a cron expression
+
+        Supports lists, ranges, steps, month and weekday names, "?" for "*",
+        and the @yearly, @monthly, @weekly, @daily and @hourly macros. Weekday
+        0 and 7 are Sunday. As in Vixie cron, when both day fields are
+        restricted a day matching either of them fires.
+
+        Raises:
+            ValueError: If the expression is malformed
+        """
+        self.expression = expression.strip()
+        fields = MACROS.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields, got {len(fields)}: {expression}")
+
+        parsed = [_parse_field(value, *spec) for value, spec in zip(fields, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # Sunday may be written as 0 or 7
+        self.weekdays = {day % 7 for day in weekdays}
+        self.days_restricted = fields[2] not in ("*", "?")
+        self.weekdays_restricted = fields[4] not in ("*", "?")
+        self._sorted_minutes = sorted(self.minutes)
+        self._sorted_hours = sorted(self.hours)
+
+    def __repr__(self):
+        return f"CronExpression({self.expression!r})"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day or weekday
+        return day and weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Return the first matching minute strictly after the given time"""
+        current = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = current.year + _SEARCH_YEARS
+        while current.year <= limit:
+            if current.month not in self.months:
+                # First day of the next month
+                year, month = (current.year + 1, 1) if current.month == 12 else (current.year, current.month + 1)
+                current = current.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(current):
+                current = (current + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if current.hour not in self.hours:
+                hour = _next_value(self._sorted_hours, current.hour)
+                if hour is None:
+                    current = (current + timedelta(days=1)).replace(hour=0, minute=0)
+                else:
+                    current = current.replace(hour=hour, minute=0)
+                continue
+            minute = _next_value(self._sorted_minutes, current.minute)
+            if minute is None:
+                current = (current + timedelta(hours=1)).replace(minute=0)
+                continue
+            return current.replace(minute=minute)
+        raise ValueError(f"Cron expression never matches: {self.expression}")
+
+
+def _next_value(values: List[int], start: int):
+    """Smallest value >= start, or None"""
+    for value in values:
+        if value >= start:
+            return value
+    return None
+
+
+def _parse_value(token: str, name: str, minimum: int, maximum: int, names: List[str]) -> int:
+    lowered = token.lower()
+    if lowered in names:
+        return names.index(lowered) + minimum
+    try:
+        value = int(token)
+    except ValueError:
+        raise ValueError(f"Invalid {name} value: {token}")
+    if not minimum <= value <= maximum:
+        raise ValueError(f"{name.capitalize()} value {value} is outside {minimum}-{maximum}")
+    return value
+
+
+def _parse_field(field: str, name: str, minimum: int, maximum: int, names: List[str]) -> Set[int]:
+    values: Set[int] = set()
+    for part in field.split(","):
+        span, _, step_text = part.partition("/")
+        step = 1
+        if step_text:
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ValueError(f"Invalid {name} step: {part}")
+            step = int(step_text)
+
+        if span in ("*", "?"):
+            start, end = minimum, maximum
+        elif "-" in span:
+            low, high = span.split("-", 1)
+            start = _parse_value(low, name, minimum, maximum, names)
+            end = _parse_value(high, name, minimum, maximum, names)
+            if start > end:
+                raise ValueError(f"Invalid {name} range: {span}")
+        else:
+            start = _parse_value(span, name, minimum, maximum, names)
+            # "5/15" means every 15 starting at 5
+            end = maximum if step_text else start
+        values.update(range(start, end + 1, step))
+    return values
@@ -1,10 +1,14 @@
 """
 Job queue module for Proxmox NLI.
 Handles job scheduling, prioritization, and execution.
+
+Jobs are stored in an SQLite table (see job_store) so they survive restarts.
+Workers lease jobs, failed attempts are retried with exponential backoff, and
+the number of worker threads follows the queue depth and wait time.
 """
 import logging
+import random
 import threading
-import queue
 import time
 import uuid
 from datetime import datetime
@@ -13,8 +17,24 @@ from enum import Enum
 import json
 import os
 
+from prometheus_client import Gauge, Histogram
+
+from .job_store import SQLiteJobStore
+
 logger = logging.getLogger(__name__)
 
+JOB_QUEUE_DEPTH = Gauge('job_queue_depth', 'Jobs in the job queue by state', ['state'])
+JOB_QUEUE_OLDEST_WAIT = Gauge('job_queue_oldest_wait_seconds', 'Wait time of the oldest ready job')
+JOB_QUEUE_WORKERS = Gauge('job_queue_workers', 'Job queue worker threads by state', ['state'])
+JOB_QUEUE_WAIT = Histogram(
+    'job_queue_wait_seconds', 'Time from a job becoming ready to a worker starting it',
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+)
+JOB_QUEUE_RUN = Histogram(
+    'job_queue_run_seconds', 'Job execution time by outcome', ['outcome'],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+)
+
 class JobStatus(Enum):
     """Job status enum"""
     PENDING = "pending"
@@ -30,70 +50,58 @@ class JobPriority(Enum):
     HIGH = 2
     CRITICAL = 3
 
-class Job:
-    """Represents a job in the queue"""
-    
-    def __init__(self, func: Callable, args: tuple = None, kwargs: dict = None, 
-                 name: str = None, priority: JobPriority = JobPriority.NORMAL,
-                 timeout: int = None):
-        """
-        Initialize a job
-        
-        Args:
-            func: Function to execute
-            args: Positional arguments for the function
-            kwargs: Keyword arguments for the function
-            name: Name of the job
-            priority: Priority level
-            timeout: Timeout in seconds
-        """
-        self.id = str(uuid.uuid4())
-        self.func = func
-        self.args = args or ()
-        self.kwargs = kwargs or {}
-        self.name = name or func.__name__
-        self.priority = priority
-        self.timeout = timeout
-        
-        self.status = JobStatus.PENDING
-        self.created_at = datetime.now()
-        self.started_at = None
-        self.completed_at = None
-        self.result = None
-        self.error = None
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert job to dictionary"""
-        return {
-            "id": self.id,
-            "name": self.name,
-            "priority": self.priority.name,
-            "status": self.status.name,
-            "created_at": self.created_at.isoformat(),
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
-            "error": str(self.error) if self.error else None
-        }
-
 class JobQueue:
-    """Queue for managing and executing jobs"""
+    """Durable queue for managing and executing jobs"""
     
-    def __init__(self, num_workers: int = 1, storage_path: str = None):
+    def __init__(self, num_workers: int = 1, storage_path: str = None, max_workers: int = None,
+                 lease_seconds: float = 30.0, max_retries: int = 2, retry_backoff: float = 2.0,
+                 max_backoff: float = 300.0, target_wait: float = 1.0, idle_timeout: float = 30.0,
+                 scale_interval: float = 1.0, poll_interval: float = 1.0):
         """
         Initialize the job queue
         
         Args:
-            num_workers: Number of worker threads
-            storage_path: Path to store job history
+            num_workers: Number of worker threads kept running when the queue is idle
+            storage_path: Path to store the job database
+            max_workers: Upper bound for autoscaling; defaults to max(num_workers, 8)
+            lease_seconds: Visibility timeout; a running job whose lease is not renewed
+                for this long (e.g. its process died) is handed to another worker
+            max_retries: Default number of retries after a failed attempt
+            retry_backoff: Delay before the first retry; doubles with every attempt
+            max_backoff: Maximum retry delay in seconds
+            target_wait: Ready jobs waiting longer than this add workers
+            idle_timeout: Seconds an extra worker stays idle before it exits
+            scale_interval: Seconds between lease renewals and scaling decisions
+            poll_interval: Maximum seconds an idle worker sleeps before checking the store
         """
-        self.job_queue = queue.PriorityQueue()
-        self.jobs = {}  # Storage for job objects by ID
         self.num_workers = num_workers
-        self.workers = []
+        self.max_workers = max(max_workers or max(num_workers, 8), num_workers)
+        self.lease_seconds = lease_seconds
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.target_wait = target_wait
+        self.idle_timeout = idle_timeout
+        self.scale_interval = scale_interval
+        self.poll_interval = poll_interval
+        self.max_history = 1000  # Maximum number of finished jobs to keep
+        
         self.running = False
         self.lock = threading.Lock()
-        self.job_history = []
-        self.max_history = 1000  # Maximum number of completed jobs to keep in history
+        self.wakeup = threading.Condition(self.lock)
+        self.workers: Dict[str, threading.Thread] = {}
+        self.busy_workers = 0
+        self.supervisor = None
+        self._worker_count = 0
+        
+        # Named handlers make jobs runnable after a restart
+        self.handlers: Dict[str, Callable] = {}
+        # Callables of jobs that could not be stored by name, by job ID
+        self.local_jobs: Dict[str, tuple] = {}
+        # Leases held by this queue: job ID -> {"token", "started", "timeout", "name"}
+        self.leases: Dict[str, Dict[str, Any]] = {}
+        # Jobs of this process are owned by this ID when their callable only lives in memory
+        self.instance_id = str(uuid.uuid4())
         
         if storage_path:
             self.storage_path = storage_path
@@ -103,33 +111,44 @@ class JobQueue:
         
         # Create storage directory if it doesn't exist
         os.makedirs(self.storage_path, exist_ok=True)
+        self.store = SQLiteJobStore(os.path.join(self.storage_path, "jobs.db"))
         
-        # Load job history
-        self._load_job_history()
+        # Bring over the history written by the JSON-based queue
+        self._import_job_history()
     
-    def _load_job_history(self):
-        """Load job history from storage"""
+    def _import_job_history(self):
+        """Import job_history.json into the job database once"""
+        history_path = os.path.join(self.storage_path, "job_history.json")
+        if not os.path.exists(history_path):
+            return
         try:
-            history_path = os.path.join(self.storage_path, "job_history.json")
-            if os.path.exists(history_path):
-                with open(history_path, 'r') as f:
-                    self.job_history = json.load(f)
-                logger.info(f"Loaded {len(self.job_history)} jobs from history")
+            with open(history_path, 'r') as f:
+                history = json.load(f)
+            for entry in history:
+                self.store.add({
+                    "id": entry["id"],
+                    "name": entry["name"],
+                    "priority": JobPriority[entry.get("priority", "NORMAL")].value,
+                    "status": entry["status"],
+                    "created_at": _to_timestamp(entry.get("created_at")) or time.time(),
+                    "started_at": _to_timestamp(entry.get("started_at")),
+                    "completed_at": _to_timestamp(entry.get("completed_at")),
+                    "error": entry.get("error")
+                })
+            os.replace(history_path, history_path + ".imported")
+            logger.info(f"Imported {len(history)} jobs from history")
         except Exception as e:
-            logger.error(f"Error loading job history: {str(e)}")
+            logger.error(f"Error importing job history: {str(e)}")
     
-    def _save_job_history(self):
-        """Save job history to storage"""
-        try:
-            # Limit history size
-            if len(self.job_history) > self.max_history:
-                self.job_history = self.job_history[-self.max_history:]
-            
-            history_path = os.path.join(self.storage_path, "job_history.json")
-            with open(history_path, 'w') as f:
-                json.dump(self.job_history, f)
-        except Exception as e:
-            logger.error(f"Error saving job history: {str(e)}")
+    def register_handler(self, name: str, func: Callable):
+        """
+        Register a function that jobs can be submitted for by name
+        
+        Jobs submitted for a registered function with JSON-serializable
+        arguments are run even if the process restarts before they finish.
+        Register handlers before calling start().
+        """
+        self.handlers[name] = func
     
     def start(self):
         """Start worker threads"""
@@ -139,148 +158,263 @@ class JobQueue:
         
         self.running = True
         
-        # Create and start worker threads
-        for i in range(self.num_workers):
-            worker = threading.Thread(target=self._worker_loop)
-            worker.daemon = True
-            worker.start()
-            self.workers.append(worker)
+        orphaned = self.store.fail_orphaned(self.instance_id)
+        if orphaned:
+            logger.warning(f"Failed {orphaned} jobs whose callables were lost in a restart")
+        
+        with self.lock:
+            for _ in range(self.num_workers):
+                self._add_worker()
+        
+        self.supervisor = threading.Thread(target=self._supervise, name="job-queue-supervisor")
+        self.supervisor.daemon = True
+        self.supervisor.start()
         
         logger.info(f"Started {self.num_workers} worker threads")
         return True
     
     def stop(self):
         """Stop worker threads"""
-        self.running = False
+        with self.lock:
+            self.running = False
+            self.wakeup.notify_all()
+            workers = list(self.workers.values())
         
         # Wait for workers to finish
-        for worker in self.workers:
+        for worker in workers:
             worker.join(timeout=2)
+        if self.supervisor:
+            self.supervisor.join(timeout=2)
+            self.supervisor = None
         
-        self.workers = []
         logger.info("Job queue stopped")
         
-        # Save job history
-        self._save_job_history()
+        # Trim job history
+        self.store.prune(self.max_history)
     
-    def _worker_loop(self):
+    def _add_worker(self):
+        """Start one worker thread; caller holds the lock"""
+        self._worker_count += 1
+        name = f"job-worker-{self._worker_count}"
+        worker = threading.Thread(target=self._worker_loop, args=(name,), name=name)
+        worker.daemon = True
+        self.workers[name] = worker
+        worker.start()
+    
+    def _worker_loop(self, name: str):
         """Worker thread function"""
+        idle_since = time.monotonic()
         while self.running:
             try:
-                # Get job from queue with timeout to allow checking running status
-                try:
-                    priority, job_id = self.job_queue.get(timeout=0.5)
-                    job = self.jobs.get(job_id)
-                    
-                    if not job:
-                        # Job may have been cancelled
-                        self.job_queue.task_done()
-                        continue
-                    
-                    # Process the job
-                    self._process_job(job)
-                    
-                    # Mark task as done
-                    self.job_queue.task_done()
-                    
-                except queue.Empty:
-                    # Queue is empty, continue checking running status
-                    continue
-                
+                row = self.store.claim(self.instance_id, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Error claiming job: {str(e)}")
+                row = None
+            
+            if row is None:
+                with self.lock:
+                    if not self.running:
+                        break
+                    # Extra workers retire once the burst has drained
+                    if (len(self.workers) > self.num_workers
+                            and time.monotonic() - idle_since > self.idle_timeout):
+                        self.workers.pop(name, None)
+                        return
+                    self.wakeup.wait(self.poll_interval)
+                continue
+            
+            with self.lock:
+                self.busy_workers += 1
+            try:
+                self._process_job(row)
             except Exception as e:
                 logger.error(f"Error in worker loop: {str(e)}")
-                time.sleep(1)  # Avoid tight loops on error
+            finally:
+                with self.lock:
+                    self.busy_workers -= 1
+            idle_since = time.monotonic()
+        
+        with self.lock:
+            self.workers.pop(name, None)
     
-    def _process_job(self, job: Job):
-        """Process a job"""
-        # Update job status
-        job.status = JobStatus.RUNNING
-        job.started_at = datetime.now()
+    def _process_job(self, row: Dict[str, Any]):
+        """Run a leased job and record the outcome"""
+        job_id, token = row["id"], row["lease_token"]
+        JOB_QUEUE_WAIT.observe(max(0.0, row["started_at"] - row["available_at"]))
         
+        if row["owner"]:
+            func, args, kwargs = self.local_jobs.get(job_id, (None, (), {}))
+        else:
+            func = self.handlers.get(row["handler"])
+            args = tuple(json.loads(row["args"] or "[]"))
+            kwargs = json.loads(row["kwargs"] or "{}")
+        if func is None:
+            self.store.fail(job_id, token, f"No handler registered for job: {row['handler'] or row['name']}")
+            self.local_jobs.pop(job_id, None)
+            logger.error(f"Job failed: {row['name']} - no handler")
+            return
+        
+        started = time.monotonic()
+        with self.lock:
+            self.leases[job_id] = {"token": token, "started": started, "timeout": row["timeout"],
+                                   "name": row["name"]}
         try:
-            # Execute job function with timeout if specified
-            if job.timeout:
-                # Setup a timer to handle timeout
-                timer = threading.Timer(job.timeout, self._handle_timeout, args=[job])
-                timer.start()
-                
-                # Execute function
-                result = job.func(*job.args, **job.kwargs)
-                
-                # Cancel timer if job completes before timeout
-                timer.cancel()
-            else:
-                # Execute without timeout
-                result = job.func(*job.args, **job.kwargs)
-            
-            # Update job with result
-            job.result = result
-            job.status = JobStatus.COMPLETED
-            job.completed_at = datetime.now()
-            
-            logger.info(f"Job completed: {job.name}")
-            
+            func(*args, **kwargs)
+            outcome = "completed" if self.store.complete(job_id, token) else "lost"
+            if outcome == "completed":
+                logger.info(f"Job completed: {row['name']}")
         except Exception as e:
-            # Handle job failure
-            job.error = str(e)
-            job.status = JobStatus.FAILED
-            job.completed_at = datetime.now()
-            
-            logger.error(f"Job failed: {job.name} - {str(e)}")
+            outcome = self._record_failure(row, token, str(e))
+        finally:
+            with self.lock:
+                self.leases.pop(job_id, None)
+        
+        if outcome == "lost":
+            # The job timed out or its lease expired; another attempt owns it now
+            logger.warning(f"Discarding result of job {row['name']}: its lease was lost")
+        if outcome != "retry":
+            self.local_jobs.pop(job_id, None)
+        JOB_QUEUE_RUN.labels(outcome=outcome).observe(time.monotonic() - started)
+    
+    def _record_failure(self, row: Dict[str, Any], token: str, error: str) -> str:
+        """Schedule a retry with backoff, or fail the job when its attempts are used up"""
+        attempt = row["attempts"]
+        if attempt < row["max_attempts"]:
+            delay = min(self.max_backoff, self.retry_backoff * 2 ** (attempt - 1))
+            # Jitter keeps a burst of failures from retrying in lockstep
+            delay *= random.uniform(0.8, 1.2)
+            if not self.store.fail(row["id"], token, error, retry_at=time.time() + delay):
+                return "lost"
+            logger.warning(f"Job {row['name']} failed (attempt {attempt}), retrying in {delay:.1f}s: {error}")
+            return "retry"
+        if not self.store.fail(row["id"], token, error):
+            return "lost"
+        logger.error(f"Job failed: {row['name']} - {error}")
+        return "failed"
+    
+    def _supervise(self):
+        """Renew leases, enforce timeouts, export metrics and scale the worker pool"""
+        while self.running:
+            try:
+                self._renew_leases()
+                self.store.expire_exhausted()
+                self._scale()
+            except Exception as e:
+                logger.error(f"Error supervising job queue: {str(e)}")
+            with self.lock:
+                if self.running:
+                    self.wakeup.wait(self.scale_interval)
+    
+    def _renew_leases(self):
+        now = time.monotonic()
+        with self.lock:
+            leases = list(self.leases.items())
+        for job_id, lease in leases:
+            if lease["timeout"] and now - lease["started"] > lease["timeout"]:
+                # The worker keeps running the call and its result will be discarded.
+                # The job is not retried: a retry would run next to the unfinished call.
+                if self.store.fail(job_id, lease["token"], "Job timed out"):
+                    logger.error(f"Job timed out: {lease['name']}")
+                continue
+            self.store.renew(job_id, lease["token"], self.lease_seconds)
+    
+    def _scale(self):
+        """Export queue metrics and add workers for the backlog"""
+        depth = self.store.depth()
+        JOB_QUEUE_DEPTH.labels(state="ready").set(depth["ready"])
+        JOB_QUEUE_DEPTH.labels(state="delayed").set(depth["delayed"])
+        JOB_QUEUE_DEPTH.labels(state="running").set(depth["running"])
+        JOB_QUEUE_OLDEST_WAIT.set(depth["oldest_wait"])
         
-        # Add to job history
         with self.lock:
-            self.job_history.append(job.to_dict())
-            # Save periodically
-            if len(self.job_history) % 10 == 0:
-                self._save_job_history()
+            if depth["ready"]:
+                # Jobs may have become ready through a retry delay or another process
+                self.wakeup.notify_all()
+            self._scale_up(depth["ready"], depth["oldest_wait"])
+            JOB_QUEUE_WORKERS.labels(state="busy").set(self.busy_workers)
+            JOB_QUEUE_WORKERS.labels(state="idle").set(len(self.workers) - self.busy_workers)
     
-    def _handle_timeout(self, job: Job):
-        """Handle job timeout"""
-        # This runs in a separate thread when job times out
-        if job.status == JobStatus.RUNNING:
-            job.error = "Job timed out"
-            job.status = JobStatus.FAILED
-            job.completed_at = datetime.now()
-            
-            logger.error(f"Job timed out: {job.name}")
-            
-            # Add to job history
-            with self.lock:
-                self.job_history.append(job.to_dict())
-                # Save periodically
-                if len(self.job_history) % 10 == 0:
-                    self._save_job_history()
+    def _scale_up(self, ready: int, oldest_wait: float = 0.0):
+        """
+        Start workers for a backlog; caller holds the lock
+        
+        Workers are added when ready jobs outnumber idle workers and either the
+        oldest has waited longer than target_wait or there are more ready jobs
+        than workers.
+        """
+        if not self.running:
+            return
+        idle = len(self.workers) - self.busy_workers
+        backlog = ready - idle
+        if backlog <= 0 or (oldest_wait < self.target_wait and ready <= len(self.workers)):
+            return
+        for _ in range(min(backlog, self.max_workers - len(self.workers))):
+            self._add_worker()
     
-    def submit(self, func: Callable, args: tuple = None, kwargs: dict = None,
+    def submit(self, func: Union[Callable, str], args: tuple = None, kwargs: dict = None,
                name: str = None, priority: JobPriority = JobPriority.NORMAL,
-               timeout: int = None) -> str:
+               timeout: int = None, max_retries: int = None) -> str:
         """
         Submit a job to the queue
         
         Args:
-            func: Function to execute
+            func: Function to execute, or the name of a registered handler
             args: Positional arguments
             kwargs: Keyword arguments
             name: Job name
             priority: Job priority
-            timeout: Timeout in seconds
+            timeout: Timeout in seconds; a job that exceeds it fails without retries
+            max_retries: Retries after a failed attempt; defaults to the queue's max_retries
             
         Returns:
             Job ID
         """
-        # Create job
-        job = Job(func, args, kwargs, name, priority, timeout)
+        if isinstance(func, str):
+            handler, func = func, self.handlers.get(func)
+        else:
+            handler = self._handler_name(func)
+        
+        job_id = str(uuid.uuid4())
+        row = {
+            "id": job_id,
+            "name": name or handler or func.__name__,
+            "priority": priority.value,
+            "timeout": timeout,
+            "max_attempts": 1 + (self.max_retries if max_retries is None else max_retries)
+        }
         
-        # Store job
-        self.jobs[job.id] = job
+        serialized = None
+        if handler:
+            try:
+                serialized = (json.dumps(list(args or ())), json.dumps(kwargs or {}))
+            except (TypeError, ValueError):
+                pass
+        if serialized:
+            row.update(handler=handler, args=serialized[0], kwargs=serialized[1])
+        else:
+            # Only this queue can run the job; it is lost if the process exits first
+            self.local_jobs[job_id] = (func, tuple(args or ()), kwargs or {})
+            row["owner"] = self.instance_id
+        self.store.add(row)
         
-        # Add to queue with priority (negated for highest-first ordering)
-        self.job_queue.put((-job.priority.value, job.id))
+        with self.lock:
+            self.wakeup.notify()
+            saturated = self.running and self.busy_workers >= len(self.workers)
+        if saturated:
+            # Start burst workers now rather than at the next scaling pass
+            ready = self.store.depth()["ready"]
+            with self.lock:
+                self._scale_up(ready)
         
-        logger.info(f"Job submitted: {job.name} (priority: {job.priority.name})")
+        logger.info(f"Job submitted: {row['name']} (priority: {priority.name})")
         
-        return job.id
+        return job_id
+    
+    def _handler_name(self, func: Callable) -> Optional[str]:
+        for name, handler in self.handlers.items():
+            if handler is func:
+                return name
+        return None
     
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -292,17 +426,8 @@ class JobQueue:
         Returns:
             Job details dictionary or None if not found
         """
-        # First check active jobs
-        job = self.jobs.get(job_id)
-        if job:
-            return job.to_dict()
-        
-        # Then check job history
-        for job_data in self.job_history:
-            if job_data["id"] == job_id:
-                return job_data
-        
-        return None
+        row = self.store.get(job_id)
+        return _row_to_dict(row) if row else None
     
     def cancel_job(self, job_id: str) -> bool:
         """
@@ -314,28 +439,13 @@ class JobQueue:
         Returns:
             True if job was cancelled, False otherwise
         """
-        job = self.jobs.get(job_id)
-        if not job:
-            logger.warning(f"Job not found: {job_id}")
-            return False
-        
         # Can only cancel pending jobs
-        if job.status != JobStatus.PENDING:
-            logger.warning(f"Cannot cancel job with status: {job.status.name}")
+        if not self.store.cancel(job_id):
+            logger.warning(f"Cannot cancel job: {job_id} is not pending")
             return False
         
-        # Update job status
-        job.status = JobStatus.CANCELLED
-        job.completed_at = datetime.now()
-        
-        # Add to job history
-        with self.lock:
-            self.job_history.append(job.to_dict())
-        
-        # Remove from active jobs
-        del self.jobs[job_id]
-        
-        logger.info(f"Job cancelled: {job.name}")
+        self.local_jobs.pop(job_id, None)
+        logger.info(f"Job cancelled: {job_id}")
         
         return True
     
@@ -348,23 +458,10 @@ class JobQueue:
             limit: Maximum number of jobs to return
             
         Returns:
-            List of job dictionaries
+            List of job dictionaries, newest first
         """
-        # Get active jobs
-        active_jobs = [job.to_dict() for job in self.jobs.values()]
-        
-        # Combine with history
-        all_jobs = active_jobs + self.job_history
-        
-        # Filter by status if requested
-        if status:
-            all_jobs = [j for j in all_jobs if j["status"] == status.name]
-        
-        # Sort by created time (descending)
-        all_jobs.sort(key=lambda j: j["created_at"], reverse=True)
-        
-        # Apply limit
-        return all_jobs[:limit]
+        rows = self.store.list(status.name if status else None, limit)
+        return [_row_to_dict(row) for row in rows]
     
     def clear_history(self) -> int:
         """
@@ -373,10 +470,46 @@ class JobQueue:
         Returns:
             Number of jobs cleared
         """
-        with self.lock:
-            count = len(self.job_history)
-            self.job_history = []
-            self._save_job_history()
-        
+        count = self.store.prune(0)
         logger.info(f"Cleared {count} jobs from history")
-        return count
\ No newline at end of file
+        return count
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth, wait time and worker counts"""
+        depth = self.store.depth()
+        with self.lock:
+            workers, busy = len(self.workers), self.busy_workers
+        return {
+            "ready": depth["ready"],
+            "delayed": depth["delayed"],
+            "running": depth["running"],
+            "oldest_wait": depth["oldest_wait"],
+            "workers": workers,
+            "busy_workers": busy,
+            "min_workers": self.num_workers,
+            "max_workers": self.max_workers
+        }
+
+
+def _to_timestamp(value: Optional[str]) -> Optional[float]:
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def _to_isoformat(value: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(value).isoformat() if value else None
+
+
+def _row_to_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a job row to the dictionary returned by get_job and list_jobs"""
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "priority": JobPriority(row["priority"]).name,
+        "status": row["status"],
+        "created_at": _to_isoformat(row["created_at"]),
+        "started_at": _to_isoformat(row["started_at"]),
+        "completed_at": _to_isoformat(row["completed_at"]),
+        "error": row["error"],
+        "attempts": row["attempts"],
+        "max_attempts": row["max_attempts"]
+    }
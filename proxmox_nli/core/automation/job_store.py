@@ -0,0 +1,238 @@
+"""
+Durable job storage for the Proxmox NLI job queue.
+Keeps jobs in an SQLite (WAL) table. Workers claim jobs with a lease that has
+to be renewed while the job runs; a job whose lease expires, e.g. because its
+process died, becomes visible to other workers again.
+"""
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from ..sqlite_pool import get_connection_manager
+
+logger = logging.getLogger(__name__)
+
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+COMPLETED = "COMPLETED"
+FAILED = "FAILED"
+CANCELLED = "CANCELLED"
+TERMINAL_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+_COLUMNS = ("id", "name", "handler", "args", "kwargs", "priority", "status", "attempts", "max_attempts",
+            "timeout", "owner", "available_at", "lease_token", "lease_expires", "created_at",
+            "started_at", "completed_at", "error")
+
+
+class SQLiteJobStore:
+    """Job table with lease-based claiming"""
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the job store
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._db = get_connection_manager(db_path)
+        self._init_db()
+
+    def _init_db(self):
+        """Create the jobs table"""
+        with self._db.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    handler TEXT,
+                    args TEXT,
+                    kwargs TEXT,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 1,
+                    timeout REAL,
+                    owner TEXT,
+                    available_at REAL NOT NULL,
+                    lease_token TEXT,
+                    lease_expires REAL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    completed_at REAL,
+                    error TEXT
+                )
+            ''')
+            # Serves both the claim query and the depth / wait-time metrics
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority DESC, available_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at)')
+
+    def add(self, job: Dict[str, Any]):
+        """Insert a new pending job; missing columns take their defaults"""
+        row = {"status": PENDING, "attempts": 0, "max_attempts": 1, "created_at": time.time()}
+        row.update(job)
+        row.setdefault("available_at", row["created_at"])
+        columns = [column for column in _COLUMNS if column in row]
+        with self._db.connection() as conn:
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [row[column] for column in columns]
+            )
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Lease the highest priority job that is ready to run
+
+        Pending jobs whose retry delay has passed and running jobs whose lease
+        expired are eligible. Jobs with an owner (their callable only exists in
+        that queue's memory) are only claimed by that owner. The single UPDATE
+        makes the claim atomic across threads and processes.
+
+        Returns:
+            The claimed job, or None if nothing is ready
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._db.connection() as conn:
+            claimed = conn.execute('''
+                UPDATE jobs
+                SET status = ?, lease_token = ?, lease_expires = ?, attempts = attempts + 1,
+                    started_at = ?
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE ((status = ? AND available_at <= ?)
+                           OR (status = ? AND lease_expires < ? AND attempts < max_attempts))
+                      AND (owner IS NULL OR owner = ?)
+                    ORDER BY priority DESC, available_at, created_at
+                    LIMIT 1
+                )
+            ''', (RUNNING, token, now + lease_seconds, now, PENDING, now, RUNNING, now, owner)).rowcount
+            if not claimed:
+                return None
+            conn.row_factory = _row_dict
+            return conn.execute('SELECT * FROM jobs WHERE lease_token = ?', (token,)).fetchone()
+
+    def renew(self, job_id: str, token: str, lease_seconds: float) -> bool:
+        """Extend a lease; returns False if the lease was lost"""
+        with self._db.connection() as conn:
+            return conn.execute(
+                'UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_token = ? AND status = ?',
+                (time.time() + lease_seconds, job_id, token, RUNNING)
+            ).rowcount == 1
+
+    def complete(self, job_id: str, token: str) -> bool:
+        """Mark a leased job completed; returns False if the lease was lost"""
+        return self._settle(job_id, token, COMPLETED, None)
+
+    def fail(self, job_id: str, token: str, error: str, retry_at: Optional[float] = None) -> bool:
+        """
+        Record a failed attempt of a leased job
+
+        Args:
+            job_id: Job ID
+            token: Lease token from claim()
+            error: Error message
+            retry_at: When to make the job available again; None fails it for good
+
+        Returns:
+            False if the lease was lost
+        """
+        if retry_at is None:
+            return self._settle(job_id, token, FAILED, error)
+        with self._db.connection() as conn:
+            return conn.execute('''
+                UPDATE jobs SET status = ?, available_at = ?, error = ?, lease_token = NULL, lease_expires = NULL
+                WHERE id = ? AND lease_token = ? AND status = ?
+            ''', (PENDING, retry_at, error, job_id, token, RUNNING)).rowcount == 1
+
+    def _settle(self, job_id: str, token: str, status: str, error: Optional[str]) -> bool:
+        with self._db.connection() as conn:
+            return conn.execute('''
+                UPDATE jobs SET status = ?, error = ?, completed_at = ?, lease_token = NULL, lease_expires = NULL
+                WHERE id = ? AND lease_token = ? AND status = ?
+            ''', (status, error, time.time(), job_id, token, RUNNING)).rowcount == 1
+
+    def expire_exhausted(self) -> int:
+        """Fail jobs whose lease expired after their last allowed attempt; returns the count"""
+        now = time.time()
+        with self._db.connection() as conn:
+            return conn.execute('''
+                UPDATE jobs SET status = ?, error = ?, completed_at = ?, lease_token = NULL, lease_expires = NULL
+                WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts
+            ''', (FAILED, "Worker lost while running the job", now, RUNNING, now)).rowcount
+
+    def fail_orphaned(self, owner: str) -> int:
+        """
+        Fail unfinished jobs owned by another queue instance; returns the count
+
+        Their callables only existed in the memory of a queue that is gone. A
+        database is meant to be used by one JobQueue at a time.
+        """
+        with self._db.connection() as conn:
+            return conn.execute('''
+                UPDATE jobs SET status = ?, error = ?, completed_at = ?, lease_token = NULL, lease_expires = NULL
+                WHERE status IN (?, ?) AND owner IS NOT NULL AND owner != ?
+            ''', (FAILED, "Job callable was lost when the queue restarted", time.time(), PENDING, RUNNING,
+                  owner)).rowcount
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a pending job; returns False if it is not pending"""
+        with self._db.connection() as conn:
+            return conn.execute(
+                'UPDATE jobs SET status = ?, completed_at = ? WHERE id = ? AND status = ?',
+                (CANCELLED, time.time(), job_id, PENDING)
+            ).rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._db.connection() as conn:
+            conn.row_factory = _row_dict
+            return conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Return jobs, newest first"""
+        with self._db.connection() as conn:
+            conn.row_factory = _row_dict
+            if status:
+                return conn.execute('SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?',
+                                    (status, limit)).fetchall()
+            return conn.execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+
+    def depth(self) -> Dict[str, Any]:
+        """Return the number of ready, delayed and running jobs and the wait of the oldest ready job"""
+        now = time.time()
+        with self._db.connection() as conn:
+            ready, oldest = conn.execute(
+                'SELECT COUNT(*), MIN(available_at) FROM jobs WHERE status = ? AND available_at <= ?',
+                (PENDING, now)
+            ).fetchone()
+            delayed, next_retry = conn.execute(
+                'SELECT COUNT(*), MIN(available_at) FROM jobs WHERE status = ? AND available_at > ?',
+                (PENDING, now)
+            ).fetchone()
+            running = conn.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (RUNNING,)).fetchone()[0]
+        return {
+            "ready": ready,
+            "delayed": delayed,
+            "running": running,
+            "oldest_wait": now - oldest if oldest is not None else 0.0,
+            "next_available": next_retry
+        }
+
+    def prune(self, keep: int) -> int:
+        """Delete all but the newest 'keep' finished jobs; returns the number deleted"""
+        placeholders = ', '.join('?' * len(TERMINAL_STATUSES))
+        with self._db.connection() as conn:
+            return conn.execute(f'''
+                DELETE FROM jobs WHERE status IN ({placeholders}) AND id NOT IN (
+                    SELECT id FROM jobs WHERE status IN ({placeholders}) ORDER BY completed_at DESC LIMIT ?
+                )
+            ''', (*TERMINAL_STATUSES, *TERMINAL_STATUSES, keep)).rowcount
+
+    def count(self) -> int:
+        with self._db.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+
+
+def _row_dict(cursor, row) -> Dict[str, Any]:
+    return {description[0]: value for description, value in zip(cursor.description, row)}
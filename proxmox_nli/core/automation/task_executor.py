@@ -159,7 +159,7 @@ class TaskExecutor:
             }
     
     def execute_api_call(self, method: str, path: str, data: Dict[str, Any] = None,
-                        node: str = None) -> Dict[str, Any]:
+                        node: str = None, timeout: int = None) -> Dict[str, Any]:
         """
         Execute an API call to Proxmox
         
@@ -168,6 +168,7 @@ class TaskExecutor:
             path: API path
             data: Request data
             node: Optional node name to target
+            timeout: Request timeout in seconds, defaults to the API client's timeout
             
         Returns:
             Dict with API response
@@ -204,7 +205,10 @@ class TaskExecutor:
                 path = f'nodes/{node}/{path}'
             
             # Execute API call
-            result = self.api.api_request(method, path, data)
+            if timeout:
+                result = self.api.api_request(method, path, data, timeout=timeout)
+            else:
+                result = self.api.api_request(method, path, data)
             
             # Store result
             task["status"] = "completed" if result["success"] else "failed"
@@ -1,213 +1,391 @@
 """
 Task scheduler module for Proxmox NLI.
 Handles scheduling and management of recurring tasks.
+
+Next fire times are kept in a min-heap. The scheduler thread sleeps until the
+earliest one is due (or indefinitely when nothing is scheduled) and hands
+due tasks to a thread pool, so a slow task never delays the others.
 """
+import heapq
+import itertools
 import logging
-import time
 import threading
-import schedule
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Dict, List, Callable, Any, Optional, Union
 
+from prometheus_client import Histogram
+
+from .cron import CronExpression
+
 logger = logging.getLogger(__name__)
 
+SCHEDULER_FIRE_LATENESS = Histogram(
+    'task_scheduler_fire_lateness_seconds', 'Delay between a task\'s scheduled time and its dispatch',
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 60, 300)
+)
+
+# Misfire policies: what to do when a firing is missed by more than misfire_grace
+MISFIRE_RUN_ONCE = "run_once"    # run once now for all missed firings
+MISFIRE_SKIP = "skip"            # drop the missed firings
+MISFIRE_CATCH_UP = "catch_up"    # run every missed firing, up to max_catch_up
+MISFIRE_POLICIES = (MISFIRE_RUN_ONCE, MISFIRE_SKIP, MISFIRE_CATCH_UP)
+
+# Interval names accepted by schedule_task, in seconds
+_INTERVALS = {
+    "weekly": (604800, 1, "weeks"),
+    "daily": (86400, 1, "days"),
+    "hourly": (3600, 1, "hours"),
+    "minutely": (60, 1, "minutes"),
+}
+# Calendar intervals without a fixed length run on cron boundaries
+_CALENDAR_INTERVALS = {"yearly": "@yearly", "annually": "@yearly", "monthly": "@monthly"}
+
+# Upper bound on a single sleep, so wall clock changes are noticed
+_MAX_SLEEP = 300.0
+
+
+class ScheduledTask:
+    """A scheduled task and its run statistics"""
+
+    def __init__(self, task_id: str, func: Callable, args: tuple, kwargs: dict,
+                 interval: float = None, cron: CronExpression = None, description: Dict[str, str] = None):
+        self.id = task_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.interval = interval
+        self.cron = cron
+        # interval / unit / at_time as shown by list_tasks
+        self.description = description or {}
+
+        self.max_instances = 1
+        self.misfire_policy = MISFIRE_RUN_ONCE
+        self.misfire_grace = 1.0
+        self.max_catch_up = 10
+
+        self.next_run: Optional[float] = None
+        self.generation = 0
+        self.running = 0
+        self.backlog = 0
+        self.runs = 0
+        self.failures = 0
+        self.misfires = 0
+        self.skipped = 0
+        self.last_run: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def next_fire_after(self, timestamp: float) -> float:
+        """Return the first fire time after the given time"""
+        if self.cron is not None:
+            return self.cron.next_after(datetime.fromtimestamp(timestamp)).timestamp()
+        return timestamp + self.interval
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "next_run": datetime.fromtimestamp(self.next_run).isoformat() if self.next_run else None,
+            "interval": self.description.get("interval"),
+            "unit": self.description.get("unit"),
+            "at_time": self.description.get("at_time"),
+            "cron": self.cron.expression if self.cron else None,
+            "max_instances": self.max_instances,
+            "misfire_policy": self.misfire_policy,
+            "running": self.running,
+            "backlog": self.backlog,
+            "runs": self.runs,
+            "failures": self.failures,
+            "misfires": self.misfires,
+            "skipped": self.skipped,
+            "last_run": datetime.fromtimestamp(self.last_run).isoformat() if self.last_run else None,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error
+        }
+
+
 class TaskScheduler:
     """Handles scheduling and execution of recurring tasks"""
-    
-    def __init__(self):
-        self.tasks = {}
+
+    def __init__(self, max_workers: int = 8):
+        """
+        Initialize the task scheduler
+
+        Args:
+            max_workers: Maximum number of task bodies running at once
+        """
+        self.tasks: Dict[str, ScheduledTask] = {}
+        self.max_workers = max_workers
         self.scheduler_thread = None
+        self.executor = None
         self.running = False
-        self.lock = threading.Lock()
-        
+        self.lock = threading.RLock()
+        self.wakeup = threading.Condition(self.lock)
+        # (fire time, sequence, task ID, generation); entries of cancelled or
+        # rescheduled tasks are dropped when they reach the top
+        self._heap = []
+        self._sequence = itertools.count()
+
     def start(self):
         """Start the scheduler in a background thread"""
         if self.scheduler_thread and self.scheduler_thread.is_alive():
             logger.warning("Scheduler is already running")
             return False
-            
+
         self.running = True
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scheduled-task")
         self.scheduler_thread = threading.Thread(target=self._run_scheduler, daemon=True)
         self.scheduler_thread.start()
-        
+
         logger.info("Task scheduler started")
         return True
-        
+
     def stop(self):
-        """Stop the scheduler"""
-        self.running = False
+        """Stop the scheduler; task bodies already running are not interrupted"""
+        with self.lock:
+            self.running = False
+            self.wakeup.notify_all()
         if self.scheduler_thread:
             self.scheduler_thread.join(timeout=2)
+        if self.executor:
+            self.executor.shutdown(wait=False)
         logger.info("Task scheduler stopped")
-        
+
     def _run_scheduler(self):
-        """Run the scheduler loop"""
-        while self.running:
-            with self.lock:
-                schedule.run_pending()
-            time.sleep(1)
-    
+        """Sleep until the earliest fire time, then dispatch every due task"""
+        with self.lock:
+            while self.running:
+                if not self._heap:
+                    self.wakeup.wait()
+                    continue
+                fire_at, _, task_id, generation = self._heap[0]
+                delay = fire_at - time.time()
+                if delay > 0:
+                    self.wakeup.wait(min(delay, _MAX_SLEEP))
+                    continue
+                heapq.heappop(self._heap)
+                task = self.tasks.get(task_id)
+                if task is None or task.generation != generation:
+                    continue
+                try:
+                    self._fire(task, fire_at)
+                except Exception as e:
+                    logger.error(f"Error dispatching scheduled task {task_id}: {str(e)}")
+
+    def _fire(self, task: ScheduledTask, scheduled: float):
+        """Dispatch a due task according to its misfire policy and queue its next firing"""
+        now = time.time()
+        lateness = now - scheduled
+        runs = 1
+        next_run = task.next_fire_after(scheduled)
+        if lateness > task.misfire_grace:
+            task.misfires += 1
+            missed = 1
+            while next_run <= now:
+                missed += 1
+                next_run = task.next_fire_after(next_run)
+            if task.misfire_policy == MISFIRE_SKIP:
+                runs = 0
+            elif task.misfire_policy == MISFIRE_CATCH_UP:
+                runs = min(missed, task.max_catch_up)
+            logger.warning(f"Scheduled task {task.id} missed {missed} firing(s) by {lateness:.1f}s, "
+                           f"running it {runs} time(s)")
+        elif next_run <= now:
+            next_run = task.next_fire_after(now)
+
+        for _ in range(runs):
+            self._dispatch(task)
+        if runs:
+            SCHEDULER_FIRE_LATENESS.observe(max(0.0, lateness))
+        self._push(task, next_run)
+
+    def _dispatch(self, task: ScheduledTask):
+        """Submit one run, respecting the task's concurrency limit; caller holds the lock"""
+        if task.running < task.max_instances:
+            task.running += 1
+            self.executor.submit(self._run_task, task)
+        elif task.misfire_policy == MISFIRE_CATCH_UP and task.backlog < task.max_catch_up:
+            task.backlog += 1
+        else:
+            task.skipped += 1
+            logger.warning(f"Skipping run of scheduled task {task.id}: "
+                           f"{task.running} instance(s) still running")
+
+    def _run_task(self, task: ScheduledTask):
+        started = time.time()
+        error = None
+        try:
+            logger.info(f"Running scheduled task: {task.id}")
+            task.func(*task.args, **task.kwargs)
+            logger.info(f"Task completed: {task.id}")
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Error in scheduled task {task.id}: {error}")
+
+        with self.lock:
+            task.running -= 1
+            task.runs += 1
+            task.last_run = started
+            task.last_duration = time.time() - started
+            task.last_error = error
+            if error:
+                task.failures += 1
+            # Runs held back by the concurrency limit start as soon as a slot frees up
+            if task.backlog and self.running and self.tasks.get(task.id) is task:
+                task.backlog -= 1
+                task.running += 1
+                self.executor.submit(self._run_task, task)
+
+    def _push(self, task: ScheduledTask, fire_at: float):
+        """Queue the next firing of a task; caller holds the lock"""
+        task.next_run = fire_at
+        heapq.heappush(self._heap, (fire_at, next(self._sequence), task.id, task.generation))
+        if self._heap[0][2] == task.id:
+            # The new firing is the earliest; shorten the scheduler's sleep
+            self.wakeup.notify()
+
+    def _add_task(self, task: ScheduledTask, first_run: float) -> bool:
+        with self.lock:
+            # Replace existing task if present
+            if task.id in self.tasks:
+                self.cancel_task(task.id)
+            self.tasks[task.id] = task
+            self._push(task, first_run)
+        return True
+
     def schedule_task(self, task_id: str, func: Callable, interval: Union[str, int], *args, **kwargs) -> bool:
         """
         Schedule a task to run at specified intervals
-        
+
         Args:
             task_id: Unique identifier for the task
             func: Function to call
             interval: Either a string like "daily", "hourly", or number of minutes
             *args, **kwargs: Arguments to pass to the function
         """
-        with self.lock:
-            # Cancel existing task if present
-            if task_id in self.tasks:
-                self.cancel_task(task_id)
-            
-            # Create a wrapper function that includes the task_id
-            def task_wrapper():
-                try:
-                    logger.info(f"Running scheduled task: {task_id}")
-                    result = func(*args, **kwargs)
-                    logger.info(f"Task completed: {task_id}")
-                    return result
-                except Exception as e:
-                    logger.error(f"Error in scheduled task {task_id}: {str(e)}")
-                    return None
-            
-            # Schedule according to interval type
-            job = None
-            if isinstance(interval, str):
-                if interval.lower() == "yearly" or interval.lower() == "annually":
-                    job = schedule.every().year.do(task_wrapper)
-                elif interval.lower() == "monthly":
-                    job = schedule.every().month.do(task_wrapper)
-                elif interval.lower() == "weekly":
-                    job = schedule.every().week.do(task_wrapper)
-                elif interval.lower() == "daily":
-                    job = schedule.every().day.do(task_wrapper)
-                elif interval.lower() == "hourly":
-                    job = schedule.every().hour.do(task_wrapper)
-                elif interval.lower() == "minutely":
-                    job = schedule.every().minute.do(task_wrapper)
-                else:
-                    logger.error(f"Invalid interval string: {interval}")
-                    return False
-            elif isinstance(interval, int):
-                # Schedule to run every X minutes
-                job = schedule.every(interval).minutes.do(task_wrapper)
-            else:
-                logger.error(f"Invalid interval type: {type(interval)}")
+        if isinstance(interval, str):
+            name = interval.lower()
+            if name in _CALENDAR_INTERVALS:
+                return self.schedule_cron(task_id, func, _CALENDAR_INTERVALS[name], *args, **kwargs)
+            if name not in _INTERVALS:
+                logger.error(f"Invalid interval string: {interval}")
                 return False
-            
-            if job:
-                self.tasks[task_id] = job
-                logger.info(f"Scheduled task {task_id} with interval {interval}")
-                return True
-            
+            seconds, count, unit = _INTERVALS[name]
+        elif isinstance(interval, int) and not isinstance(interval, bool) and interval > 0:
+            # Schedule to run every X minutes
+            seconds, count, unit = interval * 60, interval, "minutes"
+        else:
+            logger.error(f"Invalid interval: {interval!r}")
             return False
-    
+
+        task = ScheduledTask(task_id, func, args, kwargs, interval=seconds,
+                             description={"interval": str(count), "unit": unit})
+        self._add_task(task, time.time() + seconds)
+        logger.info(f"Scheduled task {task_id} with interval {interval}")
+        return True
+
     def schedule_at_time(self, task_id: str, func: Callable, time_str: str, *args, **kwargs) -> bool:
         """
         Schedule a task to run daily at a specific time
-        
+
         Args:
             task_id: Unique identifier for the task
             func: Function to call
             time_str: Time string in HH:MM format (24-hour)
             *args, **kwargs: Arguments to pass to the function
         """
-        with self.lock:
-            # Cancel existing task if present
-            if task_id in self.tasks:
-                self.cancel_task(task_id)
-                
-            # Create a wrapper function
-            def task_wrapper():
-                try:
-                    logger.info(f"Running scheduled task at time: {task_id}")
-                    result = func(*args, **kwargs)
-                    logger.info(f"Task completed: {task_id}")
-                    return result
-                except Exception as e:
-                    logger.error(f"Error in scheduled task {task_id}: {str(e)}")
-                    return None
-            
-            try:
-                # Parse the time string
-                hour, minute = map(int, time_str.split(':'))
-                if hour < 0 or hour > 23 or minute < 0 or minute > 59:
-                    raise ValueError("Invalid time format")
-                    
-                # Schedule the job to run daily at specified time
-                job = schedule.every().day.at(time_str).do(task_wrapper)
-                self.tasks[task_id] = job
-                logger.info(f"Scheduled task {task_id} to run daily at {time_str}")
-                return True
-            except Exception as e:
-                logger.error(f"Error scheduling task at time: {str(e)}")
-                return False
-    
+        try:
+            # Parse the time string
+            hour, minute = map(int, time_str.split(':'))
+            if hour < 0 or hour > 23 or minute < 0 or minute > 59:
+                raise ValueError("Invalid time format")
+            cron = CronExpression(f"{minute} {hour} * * *")
+        except Exception as e:
+            logger.error(f"Error scheduling task at time: {str(e)}")
+            return False
+
+        task = ScheduledTask(task_id, func, args, kwargs, cron=cron,
+                             description={"interval": "1", "unit": "days", "at_time": f"{hour:02d}:{minute:02d}:00"})
+        self._add_task(task, task.next_fire_after(time.time()))
+        logger.info(f"Scheduled task {task_id} to run daily at {time_str}")
+        return True
+
     def schedule_cron(self, task_id: str, func: Callable, cron_expression: str, *args, **kwargs) -> bool:
         """
-        Schedule a task using cron-like expressions (limited support via schedule package)
-        
+        Schedule a task using a cron expression
+
         Args:
             task_id: Unique identifier for the task
             func: Function to call
-            cron_expression: Limited cron expression (see schedule package)
+            cron_expression: Five-field cron expression ("*/15 2-4 * * mon-fri") or a
+                macro such as "@daily"; times are local
             *args, **kwargs: Arguments to pass to the function
         """
-        logger.warning("Cron expressions have limited support. Using at() and every() methods instead.")
-        # This is a placeholder - the schedule package doesn't directly support cron expressions
-        # We would need to parse the cron expression and convert to schedule's syntax
-        
-        # For now, just log a warning that this isn't fully implemented
-        logger.error("schedule_cron is not fully implemented yet")
-        return False
-    
+        try:
+            cron = CronExpression(cron_expression)
+            task = ScheduledTask(task_id, func, args, kwargs, cron=cron)
+            first_run = task.next_fire_after(time.time())
+        except ValueError as e:
+            logger.error(f"Invalid cron expression for task {task_id}: {str(e)}")
+            return False
+
+        self._add_task(task, first_run)
+        logger.info(f"Scheduled task {task_id} with cron expression {cron_expression}")
+        return True
+
+    def configure_task(self, task_id: str, max_instances: int = None, misfire_policy: str = None,
+                       misfire_grace: float = None, max_catch_up: int = None) -> bool:
+        """
+        Set the concurrency limit and misfire handling of a scheduled task
+
+        Args:
+            task_id: ID of the task
+            max_instances: Maximum number of runs of the task at once (default 1)
+            misfire_policy: "run_once" (default), "skip" or "catch_up"; catch_up also
+                queues runs that the concurrency limit holds back
+            misfire_grace: Seconds a firing may be late before it counts as missed
+            max_catch_up: Maximum number of missed or held-back runs to make up
+        """
+        if misfire_policy is not None and misfire_policy not in MISFIRE_POLICIES:
+            logger.error(f"Invalid misfire policy: {misfire_policy}")
+            return False
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                logger.warning(f"Task not found: {task_id}")
+                return False
+            if max_instances is not None:
+                task.max_instances = max(1, max_instances)
+            if misfire_policy is not None:
+                task.misfire_policy = misfire_policy
+            if misfire_grace is not None:
+                task.misfire_grace = misfire_grace
+            if max_catch_up is not None:
+                task.max_catch_up = max_catch_up
+        return True
+
     def cancel_task(self, task_id: str) -> bool:
-        """Cancel a scheduled task"""
+        """Cancel a scheduled task; a run in progress is allowed to finish"""
         with self.lock:
-            if task_id in self.tasks:
-                schedule.cancel_job(self.tasks[task_id])
-                del self.tasks[task_id]
+            task = self.tasks.pop(task_id, None)
+            if task is not None:
+                # Invalidates the task's entry in the heap
+                task.generation += 1
+                task.backlog = 0
                 logger.info(f"Cancelled task: {task_id}")
                 return True
             else:
                 logger.warning(f"Task not found: {task_id}")
                 return False
-                
+
     def list_tasks(self) -> List[Dict[str, Any]]:
         """List all scheduled tasks"""
         with self.lock:
-            tasks_list = []
-            for task_id, job in self.tasks.items():
-                next_run = job.next_run
-                next_run_str = next_run.isoformat() if next_run else None
-                
-                tasks_list.append({
-                    "id": task_id,
-                    "next_run": next_run_str,
-                    "interval": str(job.interval),
-                    "unit": str(job.unit) if hasattr(job, 'unit') else None,
-                    "at_time": str(job.at_time) if hasattr(job, 'at_time') else None
-                })
-            
-            return tasks_list
-    
+            return [task.to_dict() for task in self.tasks.values()]
+
     def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get details about a specific task"""
         with self.lock:
-            if task_id in self.tasks:
-                job = self.tasks[task_id]
-                next_run = job.next_run
-                next_run_str = next_run.isoformat() if next_run else None
-                
-                return {
-                    "id": task_id,
-                    "next_run": next_run_str,
-                    "interval": str(job.interval),
-                    "unit": str(job.unit) if hasattr(job, 'unit') else None,
-                    "at_time": str(job.at_time) if hasattr(job, 'at_time') else None
-                }
-            
-            return None
\ No newline at end of file
+            task = self.tasks.get(task_id)
+            return task.to_dict() if task else None
@@ -0,0 +1,325 @@
+"""
+Workflow engine module for Proxmox NLI.
+Executes workflow steps through the TaskExecutor, running independent steps in parallel.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .task_executor import TaskExecutor
+
+logger = logging.getLogger(__name__)
+
+# Step types accepted in workflow definitions, mapped to the TaskExecutor call that runs them
+SHELL_STEP_TYPES = ("shell", "command")
+API_STEP_TYPES = ("api", "api_call")
+PYTHON_STEP_TYPES = ("python", "function")
+
+# Mirrors WorkflowStatus / StepStatus in workflow_manager
+_RUNNING, _COMPLETED, _FAILED, _CANCELLED = "running", "completed", "failed", "cancelled"
+_PENDING, _SKIPPED = "pending", "skipped"
+_TERMINAL = (_COMPLETED, _FAILED, _CANCELLED)
+
+
+def resolve_dependencies(steps: List[Dict[str, Any]]) -> Dict[int, List[int]]:
+    """
+    Return the step indexes each step waits for.
+
+    Steps reference their prerequisites by name or index in "depends_on". A
+    workflow in which no step declares depends_on runs its steps in order, as
+    the sequential executor did.
+
+    Raises:
+        ValueError: On unknown or ambiguous references and on dependency cycles
+    """
+    if not any("depends_on" in step for step in steps):
+        return {i: [i - 1] if i else [] for i in range(len(steps))}
+
+    by_name: Dict[str, int] = {}
+    duplicates = set()
+    for i, step in enumerate(steps):
+        name = step.get("name")
+        if name in by_name:
+            duplicates.add(name)
+        by_name[name] = i
+
+    dependencies = {}
+    for i, step in enumerate(steps):
+        refs = step.get("depends_on") or []
+        if isinstance(refs, (str, int)):
+            refs = [refs]
+        resolved = []
+        for ref in refs:
+            if isinstance(ref, int) and 0 <= ref < len(steps):
+                resolved.append(ref)
+            elif ref in duplicates:
+                raise ValueError(f"Step '{step.get('name')}' depends on ambiguous step name '{ref}'")
+            elif ref in by_name:
+                resolved.append(by_name[ref])
+            else:
+                raise ValueError(f"Step '{step.get('name')}' depends on unknown step '{ref}'")
+        dependencies[i] = resolved
+
+    # Kahn's algorithm; anything left unvisited is on a cycle
+    remaining = {i: len(set(deps)) for i, deps in dependencies.items()}
+    dependents: Dict[int, List[int]] = {i: [] for i in dependencies}
+    for i, deps in dependencies.items():
+        for dep in set(deps):
+            dependents[dep].append(i)
+    ready = [i for i, count in remaining.items() if count == 0]
+    visited = 0
+    while ready:
+        current = ready.pop()
+        visited += 1
+        for dependent in dependents[current]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    if visited != len(steps):
+        cycle = [steps[i].get("name", i) for i, count in remaining.items() if count > 0]
+        raise ValueError(f"Workflow steps have a dependency cycle: {', '.join(map(str, cycle))}")
+    return dependencies
+
+
+class _Run:
+    """Scheduling state of one execution"""
+
+    def __init__(self, execution: Dict[str, Any], steps: List[Dict[str, Any]],
+                 dependencies: Dict[int, List[int]]):
+        self.execution = execution
+        self.steps = steps
+        self.dependencies = dependencies
+        self.running = 0
+        self.done = threading.Event()
+
+
+class WorkflowEngine:
+    """Runs workflow executions as dependency graphs on a shared bounded thread pool"""
+
+    def __init__(self, task_executor: TaskExecutor, checkpoint_dir: str, max_workers: int = 8,
+                 default_step_timeout: int = 300):
+        """
+        Initialize the workflow engine
+
+        Args:
+            task_executor: Executor used to run shell, API and python steps
+            checkpoint_dir: Directory for per-execution checkpoints
+            max_workers: Maximum number of steps running at once across all executions
+            default_step_timeout: Timeout in seconds for steps that do not set one
+        """
+        self.task_executor = task_executor
+        self.checkpoint_dir = checkpoint_dir
+        self.default_step_timeout = default_step_timeout
+        self.functions: Dict[str, Callable] = {}
+        self.runs: Dict[str, _Run] = {}
+        self.lock = threading.RLock()
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="workflow-step")
+
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+    def register_function(self, name: str, func: Callable):
+        """Make a python function available to "python" steps under the given name"""
+        self.functions[name] = func
+
+    def start(self, execution: Dict[str, Any], steps: List[Dict[str, Any]]):
+        """
+        Start running an execution
+
+        Args:
+            execution: Execution record created by the WorkflowManager; updated in place
+            steps: Step definitions of the workflow
+
+        Raises:
+            ValueError: If the step dependencies are invalid
+        """
+        dependencies = resolve_dependencies(steps)
+        run = _Run(execution, steps, dependencies)
+        with self.lock:
+            # The definition is checkpointed too, so later edits do not affect a resumed run
+            execution["definition"] = steps
+            for i, record in enumerate(execution["steps"]):
+                record["depends_on"] = dependencies[i]
+            self.runs[execution["id"]] = run
+            self._schedule(run)
+
+    def resume(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Restart the executions that were running when the process stopped
+
+        Steps that were running are started again; completed steps are kept.
+
+        Returns:
+            Dict of resumed executions by ID
+        """
+        resumed = {}
+        for filename in sorted(os.listdir(self.checkpoint_dir)):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.checkpoint_dir, filename)
+            try:
+                with open(path, 'r') as f:
+                    execution = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading workflow checkpoint {filename}: {str(e)}")
+                continue
+            if execution.get("status") in _TERMINAL:
+                os.remove(path)
+                continue
+
+            for record in execution["steps"]:
+                if record["status"] == _RUNNING:
+                    record["status"] = _PENDING
+                    record["started_at"] = None
+            execution["resumed_at"] = datetime.now().isoformat()
+            try:
+                self.start(execution, execution["definition"])
+            except Exception as e:
+                logger.error(f"Error resuming workflow execution {execution.get('id')}: {str(e)}")
+                continue
+            resumed[execution["id"]] = execution
+            logger.info(f"Resumed workflow execution {execution['id']} ({execution['workflow_name']})")
+        return resumed
+
+    def cancel(self, execution_id: str):
+        """Stop scheduling steps of an execution; steps already running are allowed to finish"""
+        with self.lock:
+            run = self.runs.get(execution_id)
+            if run is None:
+                return
+            run.execution["status"] = _CANCELLED
+            run.execution["updated_at"] = datetime.now().isoformat()
+            self._finish_if_idle(run)
+
+    def wait(self, execution_id: str, timeout: Optional[float] = None) -> bool:
+        """Block until an execution has finished; returns False on timeout"""
+        run = self.runs.get(execution_id)
+        if run is None:
+            return True
+        return run.done.wait(timeout)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the step pool; unfinished executions resume from their checkpoint on the next start"""
+        self.pool.shutdown(wait=wait)
+
+    def _schedule(self, run: _Run):
+        """Submit every pending step whose dependencies have completed; caller holds the lock"""
+        execution = run.execution
+        records = execution["steps"]
+        if execution["status"] == _RUNNING:
+            for i, record in enumerate(records):
+                if record["status"] != _PENDING:
+                    continue
+                if all(records[dep]["status"] == _COMPLETED for dep in run.dependencies[i]):
+                    record["status"] = _RUNNING
+                    record["started_at"] = datetime.now().isoformat()
+                    execution["current_step"] = i
+                    run.running += 1
+                    self.pool.submit(self._run_step, run, i)
+        self._checkpoint(execution)
+        self._finish_if_idle(run)
+
+    def _run_step(self, run: _Run, index: int):
+        step = run.steps[index]
+        logger.info(f"Executing step {index}: {step['name']}")
+        started = time.monotonic()
+        try:
+            result = self.execute_step(step, run.execution.get("params", {}))
+        except Exception as e:
+            logger.error(f"Error executing step {index}: {str(e)}")
+            result = {"success": False, "message": str(e)}
+
+        with self.lock:
+            execution = run.execution
+            record = execution["steps"][index]
+            record["status"] = _COMPLETED if result.get("success") else _FAILED
+            record["completed_at"] = datetime.now().isoformat()
+            record["duration"] = round(time.monotonic() - started, 3)
+            record["result"] = result
+            execution["results"][step["name"]] = result
+            execution["updated_at"] = record["completed_at"]
+            run.running -= 1
+            if record["status"] == _FAILED and execution["status"] == _RUNNING:
+                execution["status"] = _FAILED
+                execution["error"] = f"Step '{step['name']}' failed: {result.get('message', '')}"
+            self._schedule(run)
+
+    def execute_step(self, step: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run one step through the TaskExecutor
+
+        Args:
+            step: Step definition with type and params
+            params: Parameters of the workflow execution, passed to python steps as "workflow_params"
+
+        Returns:
+            Dict with the step result
+        """
+        step_type = step.get("type", "shell")
+        step_params = step.get("params", {})
+        timeout = step.get("timeout") or step_params.get("timeout") or self.default_step_timeout
+
+        if step_type in SHELL_STEP_TYPES:
+            result = self.task_executor.execute_shell_command(
+                step_params["command"], node=step_params.get("node"), timeout=timeout
+            )
+        elif step_type in API_STEP_TYPES:
+            result = self.task_executor.execute_api_call(
+                step_params.get("method", "GET"), step_params["path"], step_params.get("data"),
+                node=step_params.get("node"), timeout=timeout
+            )
+        elif step_type in PYTHON_STEP_TYPES:
+            func = self.functions.get(step_params.get("function"))
+            if func is None:
+                return {"success": False, "message": f"Unknown workflow function: {step_params.get('function')}"}
+            kwargs = dict(step_params.get("kwargs", {}))
+            if step_params.get("pass_workflow_params"):
+                kwargs["workflow_params"] = params
+            result = self.task_executor.execute_python_function(
+                func, tuple(step_params.get("args", ())), kwargs, timeout=timeout
+            )
+        else:
+            return {"success": False, "message": f"Unknown step type: {step_type}"}
+
+        # Background process handles and similar objects cannot be checkpointed
+        return {key: value for key, value in result.items() if key != "process"}
+
+    def _finish_if_idle(self, run: _Run):
+        """Settle the execution once no step is running or can still start; caller holds the lock"""
+        if run.running or run.done.is_set():
+            return
+        execution = run.execution
+        records = execution["steps"]
+        if execution["status"] == _RUNNING and any(r["status"] == _PENDING for r in records):
+            return
+
+        for record in records:
+            if record["status"] == _PENDING:
+                record["status"] = _SKIPPED
+        if execution["status"] == _RUNNING:
+            execution["status"] = _COMPLETED
+        now = datetime.now().isoformat()
+        execution["updated_at"] = now
+        execution["completed_at"] = now
+        self._checkpoint(execution)
+        run.done.set()
+        self.runs.pop(execution["id"], None)
+
+    def _checkpoint(self, execution: Dict[str, Any]):
+        """Persist an execution; finished executions have their checkpoint removed"""
+        path = os.path.join(self.checkpoint_dir, f"{execution['id']}.json")
+        try:
+            if execution["status"] in _TERMINAL and "completed_at" in execution:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(execution, f, default=str)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error writing workflow checkpoint {execution['id']}: {str(e)}")
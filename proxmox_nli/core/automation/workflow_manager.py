@@ -10,6 +10,9 @@ from datetime import datetime
 from typing import Dict, List, Any, Callable, Optional, Union
 from enum import Enum
 
+from .task_executor import TaskExecutor
+from .workflow_engine import WorkflowEngine
+
 logger = logging.getLogger(__name__)
 
 class WorkflowStatus(Enum):
@@ -32,12 +35,19 @@ class StepStatus(Enum):
 class WorkflowManager:
     """Manages execution of multi-step workflows"""
     
-    def __init__(self, storage_path: str = None):
+    def __init__(self, storage_path: str = None, task_executor: TaskExecutor = None,
+                 max_workers: int = 8, default_step_timeout: int = 300,
+                 functions: Dict[str, Callable] = None):
         """
         Initialize the workflow manager
         
         Args:
             storage_path: Path to store workflow definitions and state
+            task_executor: Executor for workflow steps; a local-only one is created if omitted
+            max_workers: Maximum number of steps running at once across all executions
+            default_step_timeout: Timeout in seconds for steps that do not set one
+            functions: Python functions for "python" steps by name; registered before
+                interrupted executions resume
         """
         self.workflows = {}
         self.running_workflows = {}
@@ -53,6 +63,18 @@ class WorkflowManager:
         
         # Load existing workflow definitions
         self._load_workflows()
+        
+        # Steps of all executions share one bounded pool; running executions are
+        # checkpointed so they resume after a restart
+        self.engine = WorkflowEngine(
+            task_executor or TaskExecutor(),
+            os.path.join(self.storage_path, "executions"),
+            max_workers=max_workers,
+            default_step_timeout=default_step_timeout
+        )
+        for name, func in (functions or {}).items():
+            self.register_function(name, func)
+        self.running_workflows.update(self.engine.resume())
     
     def _load_workflows(self):
         """Load workflow definitions from storage"""
@@ -176,20 +198,24 @@ class WorkflowManager:
             execution["steps"].append({
                 "index": i,
                 "name": step["name"],
-                "status": StepStatus.PENDING.value if i > 0 else StepStatus.RUNNING.value,
-                "started_at": datetime.now().isoformat() if i == 0 else None,
+                "status": StepStatus.PENDING.value,
+                "started_at": None,
                 "completed_at": None,
                 "result": None
             })
         
-        # Store execution
+        # Store execution and hand it to the engine, which runs steps as their
+        # dependencies complete
         self.running_workflows[execution_id] = execution
-        
-        # Start execution in a separate thread
-        import threading
-        thread = threading.Thread(target=self._process_workflow_steps, args=(execution_id,))
-        thread.daemon = True
-        thread.start()
+        try:
+            self.engine.start(execution, workflow["steps"])
+        except ValueError as e:
+            logger.error(f"Invalid workflow {workflow_id}: {str(e)}")
+            del self.running_workflows[execution_id]
+            return {
+                "success": False,
+                "message": f"Invalid workflow: {str(e)}"
+            }
         
         return {
             "success": True,
@@ -197,77 +223,29 @@ class WorkflowManager:
             "execution_id": execution_id
         }
     
-    def _process_workflow_steps(self, execution_id: str):
+    def register_function(self, name: str, func: Callable):
         """
-        Process workflow steps in sequence
+        Register a python function for use in "python" workflow steps
         
         Args:
-            execution_id: ID of the execution to process
+            name: Name referenced by the step's "function" parameter
+            func: Function to call
         """
-        if execution_id not in self.running_workflows:
-            logger.error(f"Execution not found: {execution_id}")
-            return
-        
-        execution = self.running_workflows[execution_id]
-        workflow_id = execution["workflow_id"]
-        workflow = self.get_workflow(workflow_id)
-        
-        if not workflow:
-            logger.error(f"Workflow not found: {workflow_id}")
-            execution["status"] = WorkflowStatus.FAILED.value
-            execution["updated_at"] = datetime.now().isoformat()
-            return
+        self.engine.register_function(name, func)
+    
+    def wait_for_execution(self, execution_id: str, timeout: float = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for a workflow execution to finish
         
-        try:
-            # Process each step
-            for i, step in enumerate(workflow["steps"]):
-                # Skip steps that aren't pending
-                if execution["steps"][i]["status"] != StepStatus.PENDING.value and i != 0:
-                    continue
-                
-                # Update step status
-                execution["steps"][i]["status"] = StepStatus.RUNNING.value
-                execution["steps"][i]["started_at"] = datetime.now().isoformat()
-                execution["current_step"] = i
-                
-                # Execute the step
-                try:
-                    # This is where we would typically call the function defined by the step
-                    # For now, we'll just simulate success
-                    logger.info(f"Executing step {i}: {step['name']}")
-                    
-                    # Simulate step execution
-                    import time
-                    time.sleep(1)  # Simulate work
-                    
-                    # Save step result
-                    execution["steps"][i]["status"] = StepStatus.COMPLETED.value
-                    execution["steps"][i]["completed_at"] = datetime.now().isoformat()
-                    execution["steps"][i]["result"] = {"success": True, "message": "Step completed"}
-                    
-                except Exception as e:
-                    # Handle step failure
-                    logger.error(f"Error executing step {i}: {str(e)}")
-                    execution["steps"][i]["status"] = StepStatus.FAILED.value
-                    execution["steps"][i]["completed_at"] = datetime.now().isoformat()
-                    execution["steps"][i]["result"] = {"success": False, "message": str(e)}
-                    
-                    # Mark workflow as failed
-                    execution["status"] = WorkflowStatus.FAILED.value
-                    execution["updated_at"] = datetime.now().isoformat()
-                    return
-            
-            # If all steps completed successfully
-            execution["status"] = WorkflowStatus.COMPLETED.value
-            execution["updated_at"] = datetime.now().isoformat()
-            execution["completed_at"] = datetime.now().isoformat()
+        Args:
+            execution_id: ID of the execution
+            timeout: Maximum seconds to wait
             
-        except Exception as e:
-            # Handle overall workflow failure
-            logger.error(f"Error processing workflow: {str(e)}")
-            execution["status"] = WorkflowStatus.FAILED.value
-            execution["updated_at"] = datetime.now().isoformat()
-            execution["error"] = str(e)
+        Returns:
+            The execution, or None if it is unknown
+        """
+        self.engine.wait(execution_id, timeout)
+        return self.get_execution_status(execution_id)
     
     def get_execution_status(self, execution_id: str) -> Optional[Dict[str, Any]]:
         """Get the status of a workflow execution"""
@@ -304,7 +282,8 @@ class WorkflowManager:
                 "message": f"Cannot cancel execution with status: {execution['status']}"
             }
         
-        # Update execution status
+        # Steps already running finish; no further steps are started
+        self.engine.cancel(execution_id)
         execution["status"] = WorkflowStatus.CANCELLED.value
         execution["updated_at"] = datetime.now().isoformat()
         
@@ -314,15 +293,19 @@ class WorkflowManager:
         }
     
     def add_workflow_step(self, workflow_id: str, step_name: str, 
-                         step_type: str, step_params: Dict[str, Any] = None) -> Dict[str, Any]:
+                         step_type: str, step_params: Dict[str, Any] = None,
+                         depends_on: List[Union[str, int]] = None, timeout: int = None) -> Dict[str, Any]:
         """
         Add a step to a workflow
         
         Args:
             workflow_id: ID of the workflow
             step_name: Name of the step
-            step_type: Type of step (function, api_call, etc)
+            step_type: Type of step (shell, api_call or python)
             step_params: Parameters for the step
+            depends_on: Names or indexes of steps that must complete first; if no
+                step of a workflow sets this, its steps run in order
+            timeout: Step timeout in seconds
             
         Returns:
             Dict with operation result
@@ -341,6 +324,10 @@ class WorkflowManager:
             "type": step_type,
             "params": step_params or {}
         }
+        if depends_on is not None:
+            step["depends_on"] = depends_on
+        if timeout is not None:
+            step["timeout"] = timeout
         
         # Add step to workflow
         workflow["steps"].append(step)
@@ -418,7 +405,7 @@ class WorkflowManager:
         
         # Update step fields
         for key, value in updates.items():
-            if key in ["name", "type", "params"]:
+            if key in ["name", "type", "params", "depends_on", "timeout"]:
                 workflow["steps"][step_index][key] = value
         
         workflow["updated_at"] = datetime.now().isoformat()
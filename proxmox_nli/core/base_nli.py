@@ -14,6 +14,7 @@ from proxmox_nli.core.conversation_persistence import ConversationPersistence
 from proxmox_nli.core.topic_manager import TopicManager
 from proxmox_nli.core.memory_manager import MemoryManager
 from proxmox_nli.core.context_bridge import ContextBridge
+from proxmox_nli.utils.query_profiler import set_intent, stage, trace_query
 
 logger = logging.getLogger(__name__)
 
@@ -78,7 +79,8 @@ class BaseNLI:
         
         # Synchronize context between systems
         if self.context_bridge:
-            self.context_bridge.sync_context(user_id)
+            with stage('context_sync'):
+                self.context_bridge.sync_context(user_id)
     
     def get_intent_and_entities(self, query: str) -> Dict:
         """Get intent and entities from query"""
@@ -100,7 +102,8 @@ class BaseNLI:
         
         # Synchronize context between systems using context bridge
         if self.context_bridge:
-            self.context_bridge.sync_context(self.current_user_id)
+            with stage('context_sync'):
+                self.context_bridge.sync_context(self.current_user_id)
         # Fallback if context bridge is not available
         elif hasattr(self.nlu, 'context_manager') and hasattr(self.nlu.context_manager, 'add_cross_session_context'):
             # If this is related to a previous conversation, add cross-session context
@@ -141,6 +144,10 @@ class BaseNLI:
     
     def process_query(self, query: str, user_id: str = None) -> Dict:
         """Process a user query"""
+        with trace_query():
+            return self._process_query(query, user_id)
+    
+    def _process_query(self, query: str, user_id: str = None) -> Dict:
         if user_id:
             self.current_user_id = user_id
         
@@ -152,9 +159,11 @@ class BaseNLI:
         resolved_intent = self.resolve_intent(query)
         intent = resolved_intent.get("intent")
         entities = resolved_intent.get("entities", {})
+        set_intent(intent)
         
         # Execute the intent
-        result = self.execute_intent(intent, entities)
+        with stage('command'):
+            result = self.execute_intent(intent, entities)
         
         # Process system response through topic manager
         response_message = result.get("message", "")
@@ -163,13 +172,14 @@ class BaseNLI:
             
             # Enhance response with context bridge if available
             if self.context_bridge:
-                enhanced_response = self.context_bridge.enhance_response(
-                    response_message,
-                    query,
-                    intent,
-                    entities,
-                    self.current_user_id
-                )
+                with stage('memory_enhance'):
+                    enhanced_response = self.context_bridge.enhance_response(
+                        response_message,
+                        query,
+                        intent,
+                        entities,
+                        self.current_user_id
+                    )
                 result["message"] = enhanced_response
                 
                 # Extract and store context
@@ -182,16 +192,17 @@ class BaseNLI:
                 )
             else:
                 # Fallback to memory manager and topic manager if context bridge is not available
-                enhanced_response = self.memory_manager.enhance_response_with_memory(
-                    response_message,
-                    current_topic=self.topic_manager.current_topic,
-                    previous_topic=self.topic_manager.previous_topic,
-                    user_id=self.current_user_id
-                )
-                
-                # If memory manager didn't enhance the response, try the topic manager
-                if enhanced_response == response_message:
-                    enhanced_response = self.topic_manager.enhance_response_with_memory(response_message)
+                with stage('memory_enhance'):
+                    enhanced_response = self.memory_manager.enhance_response_with_memory(
+                        response_message,
+                        current_topic=self.topic_manager.current_topic,
+                        previous_topic=self.topic_manager.previous_topic,
+                        user_id=self.current_user_id
+                    )
+                    
+                    # If memory manager didn't enhance the response, try the topic manager
+                    if enhanced_response == response_message:
+                        enhanced_response = self.topic_manager.enhance_response_with_memory(response_message)
                     
                 result["message"] = enhanced_response
                 
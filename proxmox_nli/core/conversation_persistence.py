@@ -10,6 +10,7 @@ import os
 import sqlite3
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Set
+from .sqlite_pool import PendingRowId, get_connection_manager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,12 +21,20 @@ class ConversationPersistence:
     Class for managing persistence of conversations across sessions.
     """
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, write_batch_size: int = 100, write_flush_interval: float = 1.0):
         """
         Initialize the conversation persistence manager.
         
+        Messages, topics and topic updates are buffered and written in a single
+        transaction once write_batch_size writes are queued or after
+        write_flush_interval seconds. Reads flush the buffer first, so they
+        always see earlier writes. The settings apply to this instance's
+        writes only; the connection manager is shared per database file.
+        
         Args:
             db_path: Path to the SQLite database file
+            write_batch_size: Number of buffered writes that triggers a flush
+            write_flush_interval: Maximum seconds a buffered write waits before being flushed
         """
         if not db_path:
             # Use default path in the data directory
@@ -35,12 +44,15 @@ class ConversationPersistence:
             db_path = os.path.join(data_dir, "conversations.db")
         
         self.db_path = db_path
+        self.write_batch_size = write_batch_size
+        self.write_flush_interval = write_flush_interval
+        self._db = get_connection_manager(self.db_path)
         self._initialize_database()
         
     def _initialize_database(self):
         """Initialize the database tables if they don't exist."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Create conversations table
@@ -110,7 +122,7 @@ class ConversationPersistence:
         now = datetime.now().isoformat()
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.write_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO conversations 
@@ -136,35 +148,31 @@ class ConversationPersistence:
             entities: The detected entities (for user messages)
             
         Returns:
-            The message ID
+            The message ID. The message is buffered with its topics, so this is
+            a PendingRowId that the database assigns (AUTOINCREMENT, unique
+            across processes) when the batch is flushed; int() flushes it.
         """
         now = datetime.now().isoformat()
         entities_json = json.dumps(entities) if entities else None
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Update the last_updated_at timestamp for the conversation
-                cursor.execute('''
-                    UPDATE conversations SET last_updated_at = ? WHERE id = ?
-                ''', (now, conversation_id))
-                
-                # Insert the message
-                cursor.execute('''
-                    INSERT INTO conversation_messages 
-                    (conversation_id, message_type, content, intent, entities, timestamp) 
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (conversation_id, message_type, content, intent, entities_json, now))
-                
-                conn.commit()
-                message_id = cursor.lastrowid
+            # Update the last_updated_at timestamp for the conversation
+            self._queue_write('''
+                UPDATE conversations SET last_updated_at = ? WHERE id = ?
+            ''', (now, conversation_id))
+            
+            # Insert the message
+            message_id = self._queue_write('''
+                INSERT INTO conversation_messages 
+                (conversation_id, message_type, content, intent, entities, timestamp) 
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (conversation_id, message_type, content, intent, entities_json, now), rowid=True)
+            
+            # Extract and save topics if this is a user message
+            if message_type == 'user' and content:
+                self._extract_and_save_topics(conversation_id, content, intent, entities)
                 
-                # Extract and save topics if this is a user message
-                if message_type == 'user' and content:
-                    self._extract_and_save_topics(conversation_id, content, intent, entities)
-                    
-                return message_id
+            return message_id
         except Exception as e:
             logger.error(f"Failed to add message: {e}")
             return -1
@@ -181,13 +189,10 @@ class ConversationPersistence:
             Success status
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE conversations SET topic = ? WHERE id = ?
-                ''', (topic, conversation_id))
-                conn.commit()
-                return True
+            self._queue_write('''
+                UPDATE conversations SET topic = ? WHERE id = ?
+            ''', (topic, conversation_id))
+            return True
         except Exception as e:
             logger.error(f"Failed to update conversation topic: {e}")
             return False
@@ -203,7 +208,8 @@ class ConversationPersistence:
             The conversation details or None if not found
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            self.flush()
+            with self._db.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('''
@@ -264,7 +270,8 @@ class ConversationPersistence:
             List of recent conversations
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            self.flush()
+            with self._db.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('''
@@ -296,7 +303,8 @@ class ConversationPersistence:
             List of relevant conversations
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            self.flush()
+            with self._db.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -345,7 +353,8 @@ class ConversationPersistence:
             The active conversation or None
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            self.flush()
+            with self._db.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('''
@@ -409,8 +418,7 @@ class ConversationPersistence:
                 topics.add(clean_type)
         
         # Save identified topics
-        for topic in topics:
-            self._save_topic(conversation_id, topic)
+        self._save_topics(conversation_id, topics)
     
     def _save_topic(self, conversation_id: int, topic: str, relevance: float = 1.0) -> None:
         """
@@ -421,38 +429,37 @@ class ConversationPersistence:
             topic: The topic name
             relevance: The topic relevance score (0-1)
         """
+        self._save_topics(conversation_id, [topic], relevance)
+    
+    def _save_topics(self, conversation_id: int, topics, relevance: float = 1.0) -> None:
+        """
+        Save topics and associate them with a conversation.
+        
+        All topic inserts are queued before the mappings so each group is
+        written with a single executemany in the next flush.
+        
+        Args:
+            conversation_id: The conversation ID
+            topics: The topic names
+            relevance: The topic relevance score (0-1)
+        """
+        topics = sorted(topics)
+        now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # First, get or create the topic
-                cursor.execute('''
-                    SELECT id FROM conversation_topics WHERE topic_name = ?
-                ''', (topic,))
-                
-                row = cursor.fetchone()
-                if row:
-                    topic_id = row[0]
-                else:
-                    # Create new topic
-                    now = datetime.now().isoformat()
-                    cursor.execute('''
-                        INSERT INTO conversation_topics (topic_name, created_at)
-                        VALUES (?, ?)
-                    ''', (topic, now))
-                    conn.commit()
-                    topic_id = cursor.lastrowid
-                
-                # Associate topic with conversation
-                cursor.execute('''
+            # Get or create the topics, then associate them with the conversation
+            for topic in topics:
+                self._queue_write('''
+                    INSERT OR IGNORE INTO conversation_topics (topic_name, created_at)
+                    VALUES (?, ?)
+                ''', (topic, now))
+            for topic in topics:
+                self._queue_write('''
                     INSERT OR REPLACE INTO conversation_topic_mapping 
                     (conversation_id, topic_id, relevance)
-                    VALUES (?, ?, ?)
-                ''', (conversation_id, topic_id, relevance))
-                
-                conn.commit()
+                    SELECT ?, id, ? FROM conversation_topics WHERE topic_name = ?
+                ''', (conversation_id, relevance, topic))
         except Exception as e:
-            logger.error(f"Failed to save topic: {e}")
+            logger.error(f"Failed to save topics: {e}")
     
     def get_topic_history(self, user_id: str) -> Dict[str, int]:
         """
@@ -465,7 +472,8 @@ class ConversationPersistence:
             Dictionary mapping topics to usage counts
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            self.flush()
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT t.topic_name, COUNT(*) as count
@@ -505,7 +513,8 @@ class ConversationPersistence:
         
         # Try to find actual conversations that link these topics
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            self.flush()
+            with self._db.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -546,4 +555,27 @@ class ConversationPersistence:
         except Exception as e:
             logger.error(f"Failed to get conversation transition: {e}")
             import random
-            return random.choice(default_transitions)
\ No newline at end of file
+            return random.choice(default_transitions)
+
+    def _queue_write(self, sql: str, params, rowid: bool = False) -> Optional[PendingRowId]:
+        """Buffer a write with this instance's batch size and flush interval."""
+        return self._db.execute_write(sql, params, batch_size=self.write_batch_size,
+                                      flush_interval=self.write_flush_interval, rowid=rowid)
+
+    def flush(self) -> int:
+        """
+        Write all buffered conversation and topic updates to the database.
+        
+        Returns:
+            The number of buffered writes applied
+        """
+        return self._db.flush()
+    
+    def close(self) -> None:
+        """
+        Flush buffered writes.
+        
+        The connection manager is shared by every user of the database file,
+        so its connections stay open; close_all_managers closes them at exit.
+        """
+        self.flush()
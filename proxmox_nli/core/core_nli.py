@@ -19,6 +19,7 @@ from ..commands.update_command import UpdateCommand
 from ..services.update_manager import UpdateManager
 from ..utils.discovery import discover_network_services, DEFAULT_SERVICE_DEFINITIONS
 from ..utils.dns_config import update_hosts_file
+from ..utils.query_profiler import set_intent, stage, trace_query
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -254,19 +255,12 @@ class ProxmoxNLI(BaseNLI):
         }
         return messages.get(intent, "Are you sure you want to execute this command?") + "\nReply with 'yes' to confirm or 'no' to cancel."
 
-    @REQUEST_TIME.time()
-    def process_query(self, query, user=None, source="cli", ip_address=None):
+    def _run_query(self, query, user=None, source="cli", ip_address=None):
         """
-        Process a natural language query and execute the corresponding action.
+        Understand and execute a query, recording it in the audit log.
         
-        Args:
-            query: The natural language query
-            user: The user who made the query
-            source: The source of the query (e.g., cli, web, voice)
-            ip_address: The IP address of the user (for web queries)
-            
         Returns:
-            str: The response to the query
+            tuple: (intent, result), or (None, message) if the query was not executed
         """
         # Check if a confirmation is pending
         if self.pending_command:
@@ -280,31 +274,31 @@ class ProxmoxNLI(BaseNLI):
                 source, 
                 ip_address
             )
-            return "Please confirm the previous command first."
+            return None, "Please confirm the previous command first."
         
         # Process the query with the NLU engine
         intent, args, entities = self.nlu_engine.process_query(query)
+        set_intent(intent)
         
         # Execute the intent
-        result = self.execute_intent(intent, args, entities)
-        
-        # Generate a response based on the result
-        response = self.response_generator.generate_response(query, intent, result)
+        with stage('command'):
+            result = self.execute_intent(intent, args, entities)
         
         # Log the query to the audit log
         success = result.get("success", False) if isinstance(result, dict) else False
         result_msg = result.get("message", str(result)) if isinstance(result, dict) else str(result)
         
-        self.audit_logger.log_query(
-            query, 
-            intent, 
-            entities, 
-            result_msg, 
-            success,
-            user, 
-            source, 
-            ip_address
-        )
+        with stage('audit_log'):
+            self.audit_logger.log_query(
+                query, 
+                intent, 
+                entities, 
+                result_msg, 
+                success,
+                user, 
+                source, 
+                ip_address
+            )
         
         # Track command in user history if it was successful
         if user and success and not query.lower().strip() in ["yes", "no", "y", "n"]:
@@ -313,7 +307,51 @@ class ProxmoxNLI(BaseNLI):
             except Exception as e:
                 logger.error(f"Error adding command to history: {str(e)}")
         
-        return response
+        return intent, result
+
+    @REQUEST_TIME.time()
+    def process_query(self, query, user=None, source="cli", ip_address=None, profile=False):
+        """
+        Process a natural language query and execute the corresponding action.
+        
+        Args:
+            query: The natural language query
+            user: The user who made the query
+            source: The source of the query (e.g., cli, web, voice)
+            ip_address: The IP address of the user (for web queries)
+            profile: Run cProfile over the query; see utils.query_profiler
+            
+        Returns:
+            str: The response to the query
+        """
+        with trace_query(source, profile):
+            intent, result = self._run_query(query, user, source, ip_address)
+            if intent is None:
+                return result
+            
+            # Generate a response based on the result
+            with stage('response'):
+                return self.response_generator.generate_response(query, intent, result)
+
+    def process_query_stream(self, query, user=None, source="web", ip_address=None, profile=False):
+        """
+        Process a query like process_query, but yield the response as it is generated.
+        
+        The command is executed before the first fragment is yielded; only the
+        natural language response is streamed. The 'response' stage and the
+        request time include the time the caller spends consuming the fragments.
+        
+        Yields:
+            str: Response text fragments
+        """
+        with REQUEST_TIME.time(), trace_query(source, profile):
+            intent, result = self._run_query(query, user, source, ip_address)
+            if intent is None:
+                yield result
+                return
+            
+            with stage('response'):
+                yield from self.response_generator.generate_response_stream(query, intent, result)
 
     def get_recent_activity(self, limit=100):
         """Get recent audit logs with the specified limit"""
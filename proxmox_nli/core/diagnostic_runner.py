@@ -0,0 +1,202 @@
+"""
+Shared execution engine for diagnostic probes and commands.
+
+Diagnostics such as performance analysis, system checks and security audits
+are made of independent probes, many of which shell out to sampling tools
+(mpstat, iostat, ...) that take seconds each. DiagnosticRunner runs those
+probes concurrently with per-probe timeouts and reports each probe's wall
+time. Within one diagnosis session identical commands run once and every
+caller shares the output, and commands can be prefetched so code that reads
+them one after another only waits for the slowest.
+"""
+import contextvars
+import functools
+import logging
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_session: contextvars.ContextVar = contextvars.ContextVar('diagnostic_session', default=None)
+# How many run_probes calls enclose the current code; nested probes get their own pool
+_probe_depth: contextvars.ContextVar = contextvars.ContextVar('diagnostic_probe_depth', default=0)
+
+def in_session(method: Callable) -> Callable:
+    """Run a method of an object with a 'runner' attribute inside a runner session"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.runner.session():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class DiagnosticSession:
+    """Commands started during one diagnosis, keyed by command line"""
+
+    def __init__(self, runner: 'DiagnosticRunner'):
+        self.runner = runner
+        self._commands: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.command_timings: Dict[str, float] = {}
+        self.deduplicated = 0
+
+    def command_future(self, command: str, timeout: Optional[float] = None) -> Future:
+        """Return the future for a command, starting it if this session has not run it yet"""
+        with self._lock:
+            future = self._commands.get(command)
+            if future is not None:
+                self.deduplicated += 1
+                return future
+            future = self.runner._submit('command', self._timed_command, command, timeout)
+            self._commands[command] = future
+            return future
+
+    def _timed_command(self, command: str, timeout: Optional[float]) -> str:
+        start = time.perf_counter()
+        try:
+            return self.runner._execute(command, timeout)
+        finally:
+            self.command_timings[command] = time.perf_counter() - start
+
+
+class DiagnosticRunner:
+    """Runs diagnostic probes and shell commands concurrently"""
+
+    def __init__(self, max_workers: int = 8, command_timeout: float = 30.0, probe_timeout: float = 60.0):
+        """
+        Initialize the runner.
+
+        Args:
+            max_workers: Threads per pool (commands, and probes at each nesting level)
+            command_timeout: Seconds before a command is killed
+            probe_timeout: Seconds to wait for a probe before reporting it as timed out
+        """
+        self.max_workers = max_workers
+        self.command_timeout = command_timeout
+        self.probe_timeout = probe_timeout
+        # Probes wait on commands and on nested probes, so each kind gets its own
+        # pool; otherwise waiting probes could occupy every thread the work needs
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._executor_lock = threading.Lock()
+
+    def _submit(self, kind: str, func: Callable, *args) -> Future:
+        """Submit work to the probe or command pool, carrying the caller's session along"""
+        with self._executor_lock:
+            executor = self._executors.get(kind)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                              thread_name_prefix=f'diagnostic-{kind}')
+                self._executors[kind] = executor
+        context = contextvars.copy_context()
+        return executor.submit(context.run, func, *args)
+
+    @contextmanager
+    def session(self) -> Iterator[DiagnosticSession]:
+        """
+        Group the commands of one diagnosis so duplicates run once.
+
+        Nested calls reuse the enclosing session.
+        """
+        current = _current_session.get()
+        if current is not None and current.runner is self:
+            yield current
+            return
+        session = DiagnosticSession(self)
+        token = _current_session.set(session)
+        try:
+            yield session
+        finally:
+            _current_session.reset(token)
+
+    def prefetch(self, commands: Iterable[str], timeout: Optional[float] = None):
+        """Start commands in the background of the current session; no-op outside a session"""
+        session = _current_session.get()
+        if session is None or session.runner is not self:
+            return
+        for command in commands:
+            session.command_future(command, timeout)
+
+    def run_command(self, command: str, timeout: Optional[float] = None) -> str:
+        """
+        Run a shell command and return its stdout.
+
+        Inside a session the output of an identical command that already ran
+        (or is running) is reused. Failures and timeouts return whatever
+        output was captured, like the per-module _run_command helpers did.
+        """
+        session = _current_session.get()
+        if session is None or session.runner is not self:
+            return self._execute(command, timeout)
+        return session.command_future(command, timeout).result()
+
+    def _execute(self, command: str, timeout: Optional[float] = None) -> str:
+        timeout = self.command_timeout if timeout is None else timeout
+        try:
+            result = subprocess.run(command, shell=True, check=True, capture_output=True,
+                                    text=True, timeout=timeout)
+            return result.stdout
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Command execution failed: {str(e)}")
+            return e.stdout if e.stdout else ""
+        except subprocess.TimeoutExpired as e:
+            logger.error(f"Command timed out after {timeout}s: {command}")
+            output = e.stdout or ""
+            return output.decode(errors='replace') if isinstance(output, bytes) else output
+
+    def run_probes(self, probes: Dict[str, Callable[[], Any]],
+                   timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Run independent probes concurrently within one session.
+
+        Args:
+            probes: Mapping of probe name to a zero-argument callable
+            timeout: Seconds to wait for each probe (default: probe_timeout)
+
+        Returns:
+            Mapping of probe name to a dict with 'success', 'result', 'error',
+            'timed_out' and 'duration' (wall time in seconds)
+        """
+        timeout = self.probe_timeout if timeout is None else timeout
+        with self.session():
+            depth = _probe_depth.get()
+            started = {}
+            finished = {}
+            futures = {}
+            token = _probe_depth.set(depth + 1)
+            try:
+                for name, probe in probes.items():
+                    started[name] = time.perf_counter()
+                    futures[name] = self._submit(f'probe-{depth}', probe)
+                    futures[name].add_done_callback(
+                        lambda _, name=name: finished.__setitem__(name, time.perf_counter()))
+            finally:
+                _probe_depth.reset(token)
+
+            deadline = time.perf_counter() + timeout
+            results = {}
+            for name, future in futures.items():
+                outcome = {'success': False, 'result': None, 'error': None, 'timed_out': False}
+                try:
+                    outcome['result'] = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+                    outcome['success'] = True
+                except FutureTimeoutError:
+                    outcome['timed_out'] = True
+                    outcome['error'] = f"Probe timed out after {timeout}s"
+                    logger.warning(f"Diagnostic probe '{name}' timed out after {timeout}s")
+                except Exception as e:
+                    outcome['error'] = str(e)
+                    logger.error(f"Diagnostic probe '{name}' failed: {str(e)}")
+                outcome['duration'] = finished.get(name, time.perf_counter()) - started[name]
+                results[name] = outcome
+            return results
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        with self._executor_lock:
+            for executor in self._executors.values():
+                executor.shutdown(wait=False)
+            self._executors.clear()
@@ -78,7 +78,10 @@ class AlertManager:
     def _register_event_handlers(self) -> None:
         """Register for relevant system events"""
         if self.event_dispatcher:
-            self.event_dispatcher.subscribe("resource_metric", self._handle_resource_metric)
+            # Only the latest sample of each metric and source matters for threshold checks
+            self.event_dispatcher.subscribe("resource_metric", self._handle_resource_metric, async_dispatch=True,
+                                            overflow="coalesce",
+                                            coalesce_key=lambda m: (m.get("type"), m.get("source")))
             self.event_dispatcher.subscribe("system_event", self._handle_system_event)
             self.event_dispatcher.subscribe("security_event", self._handle_security_event)
 
@@ -6,8 +6,8 @@ import os
 import json
 from datetime import datetime
 from loguru import logger
-import sqlite3
 from typing import Dict, Any
+from ..sqlite_pool import get_connection_manager
 
 class AuditLogger:
     def __init__(self, log_dir: str = None):
@@ -24,11 +24,12 @@ class AuditLogger:
 
         # Initialize SQLite database for structured audit logs
         self.db_path = os.path.join(self.log_dir, 'audit.db')
+        self._db = get_connection_manager(self.db_path)
         self._init_db()
 
     def _init_db(self):
         """Initialize the SQLite database for audit logs"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._db.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS audit_log (
@@ -82,29 +83,28 @@ class AuditLogger:
         
         logger.info("Command execution: {}", json.dumps(log_entry, indent=2))
         
-        # Store in database
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO audit_log 
-                (timestamp, user, query, intent, entities, result, success, source, ip_address)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                timestamp,
-                user,
-                query,
-                intent,
-                json.dumps(entities),
-                json.dumps(result),
-                1 if result.get('success', False) else 0,
-                source,
-                ip_address
-            ))
-            conn.commit()
+        # Queue the row; the connection manager batches audit inserts into one transaction
+        self._db.execute_write('''
+            INSERT INTO audit_log 
+            (timestamp, user, query, intent, entities, result, success, source, ip_address)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            timestamp,
+            user,
+            query,
+            intent,
+            json.dumps(entities),
+            json.dumps(result),
+            1 if result.get('success', False) else 0,
+            source,
+            ip_address
+        ))
 
     def get_recent_logs(self, limit: int = 100) -> list:
         """Get recent audit logs from the database"""
-        with sqlite3.connect(self.db_path) as conn:
+        # Make queued audit rows visible to the query
+        self._db.flush()
+        with self._db.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT timestamp, user, query, intent, entities, result, success, source, ip_address
@@ -118,7 +118,9 @@ class AuditLogger:
 
     def get_user_activity(self, user: str, limit: int = 100) -> list:
         """Get recent activity for a specific user"""
-        with sqlite3.connect(self.db_path) as conn:
+        # Make queued audit rows visible to the query
+        self._db.flush()
+        with self._db.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT timestamp, query, intent, entities, result, success, source, ip_address
@@ -133,7 +135,9 @@ class AuditLogger:
 
     def get_failed_commands(self, limit: int = 100) -> list:
         """Get recent failed command executions"""
-        with sqlite3.connect(self.db_path) as conn:
+        # Make queued audit rows visible to the query
+        self._db.flush()
+        with self._db.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT timestamp, user, query, intent, entities, result, source, ip_address
@@ -1,81 +1,295 @@
 """
 Event dispatcher for Proxmox NLI.
 Handles event subscription and publishing using a pub/sub pattern.
+
+Subscribers are called on the publisher's thread by default. Asynchronous
+subscribers instead get their own bounded queue and worker thread, so a slow
+subscriber cannot stall the code that publishes events.
 """
 import logging
-from typing import Dict, List, Callable, Any
-from collections import defaultdict
+import threading
+import time
+from collections import defaultdict, deque, OrderedDict
+from itertools import count
+from typing import Dict, List, Callable, Any, Optional, Union
+
+from prometheus_client import Counter, Gauge, Histogram
 
 logger = logging.getLogger(__name__)
 
+SUBSCRIBER_QUEUE_DEPTH = Gauge(
+    'event_subscriber_queue_depth', 'Events waiting in an asynchronous subscriber\'s queue', ['subscriber']
+)
+SUBSCRIBER_LAG = Histogram(
+    'event_subscriber_lag_seconds', 'Time between publishing an event and a subscriber handling it',
+    ['subscriber'], buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+SUBSCRIBER_DROPPED = Counter(
+    'event_subscriber_dropped_total', 'Events an asynchronous subscriber never handled', ['subscriber', 'reason']
+)
+
+# Overflow policies for asynchronous subscribers
+DROP_OLDEST = "drop_oldest"    # discard the oldest queued event to make room
+DROP_NEWEST = "drop_newest"    # discard the event being published
+COALESCE = "coalesce"          # a queued event with the same key is replaced by the newer one
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, COALESCE)
+
+CoalesceKey = Union[str, Callable[[Dict[str, Any]], Any]]
+
+
+class _Subscription:
+    """Bounded queue and worker thread of one asynchronous subscriber"""
+
+    def __init__(self, callback: Callable, queue_size: int):
+        self.callback = callback
+        self.name = getattr(callback, "__qualname__", None) or repr(callback)
+        self.queue_size = queue_size
+        # event_type -> (overflow policy, coalesce key)
+        self.policies: Dict[str, tuple] = {}
+        # key -> (event_type, data, published_at); coalesced events keep their position
+        self.queue: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.condition = threading.Condition()
+        self.sequence = count()
+        self.busy = False
+        self.closed = False
+        self.stats = {"delivered": 0, "errors": 0, "dropped": 0, "coalesced": 0, "last_lag": None, "max_lag": 0.0}
+        self.thread = threading.Thread(target=self._run, name=f"event-{self.name}", daemon=True)
+        self.thread.start()
+
+    def offer(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Queue an event, applying the event type's overflow policy"""
+        overflow, coalesce_key = self.policies.get(event_type, (DROP_OLDEST, None))
+        key = None
+        if overflow == COALESCE and coalesce_key is not None:
+            try:
+                key = (event_type, coalesce_key(data) if callable(coalesce_key) else data.get(coalesce_key))
+            except Exception as e:
+                logger.error(f"Error computing coalesce key for {self.name}: {str(e)}")
+
+        with self.condition:
+            if self.closed:
+                return
+            if key is not None and key in self.queue:
+                # Keep the original publish time so lag reflects how long the slot waited
+                self.queue[key] = (event_type, data, self.queue[key][2])
+                self._drop("coalesced")
+                return
+            if len(self.queue) >= self.queue_size:
+                if overflow == DROP_NEWEST:
+                    self._drop("dropped")
+                    return
+                self.queue.popitem(last=False)
+                self._drop("dropped")
+            self.queue[key if key is not None else next(self.sequence)] = (event_type, data, time.time())
+            SUBSCRIBER_QUEUE_DEPTH.labels(subscriber=self.name).set(len(self.queue))
+            self.condition.notify()
+
+    def _drop(self, reason: str) -> None:
+        self.stats[reason] += 1
+        SUBSCRIBER_DROPPED.labels(subscriber=self.name, reason=reason).inc()
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                _, (event_type, data, published_at) = self.queue.popitem(last=False)
+                self.busy = True
+                SUBSCRIBER_QUEUE_DEPTH.labels(subscriber=self.name).set(len(self.queue))
+
+            lag = time.time() - published_at
+            SUBSCRIBER_LAG.labels(subscriber=self.name).observe(lag)
+            try:
+                self.callback(data)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error in event subscriber {self.name} for {event_type}: {str(e)}")
+
+            with self.condition:
+                self.busy = False
+                self.stats["delivered"] += 1
+                self.stats["last_lag"] = lag
+                self.stats["max_lag"] = max(self.stats["max_lag"], lag)
+                self.condition.notify_all()
+
+    def wait_idle(self, deadline: float) -> bool:
+        with self.condition:
+            while (self.queue or self.busy) and not self.closed:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        """Stop the worker; queued events are discarded"""
+        with self.condition:
+            self.closed = True
+            self.queue.clear()
+            SUBSCRIBER_QUEUE_DEPTH.labels(subscriber=self.name).set(0)
+            self.condition.notify_all()
+
+
 class EventDispatcher:
-    def __init__(self):
-        """Initialize the event dispatcher"""
+    def __init__(self, async_dispatch: bool = False, queue_size: int = 1000, max_history: int = 1000):
+        """
+        Initialize the event dispatcher
+
+        Args:
+            async_dispatch: Deliver events to subscribers on their own worker
+                threads instead of the publisher's thread; can be overridden per
+                subscription
+            queue_size: Default queue bound of asynchronous subscribers
+            max_history: Number of events kept in the history
+        """
         self.subscribers: Dict[str, List[Callable]] = defaultdict(list)
-        self.event_history: List[Dict[str, Any]] = []
-        self.max_history = 1000  # Keep last 1000 events
+        self.async_dispatch = async_dispatch
+        self.queue_size = queue_size
+        self.max_history = max_history
+        self.event_history = deque(maxlen=max_history)
+        self._subscriptions: Dict[Callable, _Subscription] = {}
+        self._lock = threading.Lock()
 
-    def subscribe(self, event_type: str, callback: Callable) -> None:
+    def subscribe(self, event_type: str, callback: Callable, async_dispatch: Optional[bool] = None,
+                  overflow: str = DROP_OLDEST, coalesce_key: Optional[CoalesceKey] = None,
+                  queue_size: Optional[int] = None) -> None:
         """
         Subscribe to an event type
-        
+
         Args:
             event_type: The type of event to subscribe to
             callback: Function to be called when event occurs
+            async_dispatch: Call the callback on its own worker thread; defaults
+                to the dispatcher's mode. A callback has one queue shared by all
+                event types it subscribes to asynchronously.
+            overflow: What to do with this event type when the queue is full:
+                "drop_oldest", "drop_newest" or "coalesce"
+            coalesce_key: For "coalesce", the event field (or a function of the
+                event data) identifying events that supersede each other, e.g.
+                the metric source. A queued event is replaced by a newer one
+                with the same key; when the queue is full the oldest is dropped.
+            queue_size: Queue bound of this callback
         """
-        if callback not in self.subscribers[event_type]:
-            self.subscribers[event_type].append(callback)
-            logger.debug(f"Subscribed to event: {event_type}")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy: {overflow}")
+        if overflow == COALESCE and coalesce_key is None:
+            raise ValueError("The coalesce policy requires a coalesce_key")
+
+        with self._lock:
+            if async_dispatch if async_dispatch is not None else self.async_dispatch:
+                subscription = self._subscriptions.get(callback)
+                if subscription is None:
+                    subscription = _Subscription(callback, queue_size or self.queue_size)
+                    self._subscriptions[callback] = subscription
+                elif queue_size:
+                    subscription.queue_size = queue_size
+                subscription.policies[event_type] = (overflow, coalesce_key)
+            if callback not in self.subscribers[event_type]:
+                self.subscribers[event_type].append(callback)
+                logger.debug(f"Subscribed to event: {event_type}")
 
     def unsubscribe(self, event_type: str, callback: Callable) -> None:
         """
         Unsubscribe from an event type
-        
+
         Args:
             event_type: The type of event to unsubscribe from
             callback: Function to be removed from subscribers
         """
-        if event_type in self.subscribers:
-            self.subscribers[event_type] = [
-                cb for cb in self.subscribers[event_type] if cb != callback
-            ]
-            logger.debug(f"Unsubscribed from event: {event_type}")
+        with self._lock:
+            if event_type in self.subscribers:
+                self.subscribers[event_type] = [
+                    cb for cb in self.subscribers[event_type] if cb != callback
+                ]
+                logger.debug(f"Unsubscribed from event: {event_type}")
+
+            subscription = self._subscriptions.get(callback)
+            if subscription:
+                subscription.policies.pop(event_type, None)
+                if not any(callback in callbacks for callbacks in self.subscribers.values()):
+                    del self._subscriptions[callback]
+                    subscription.close()
 
     def publish(self, event_type: str, data: Dict[str, Any]) -> None:
         """
         Publish an event to all subscribers
-        
+
         Args:
             event_type: The type of event being published
             data: Event data to be passed to subscribers
         """
-        if event_type in self.subscribers:
+        callbacks = self.subscribers.get(event_type)
+        if callbacks:
             # Store in history
             self.event_history.append({"type": event_type, "data": data})
-            if len(self.event_history) > self.max_history:
-                self.event_history.pop(0)
 
             # Notify subscribers
-            for callback in self.subscribers[event_type]:
+            for callback in list(callbacks):
+                subscription = self._subscriptions.get(callback)
+                if subscription is not None:
+                    subscription.offer(event_type, data)
+                    continue
                 try:
                     callback(data)
                 except Exception as e:
                     logger.error(f"Error in event subscriber for {event_type}: {str(e)}")
 
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until asynchronous subscribers have handled all queued events
+
+        Returns:
+            False if the timeout expired first
+        """
+        deadline = time.time() + timeout if timeout is not None else float("inf")
+        return all(subscription.wait_idle(deadline) for subscription in list(self._subscriptions.values()))
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Drain the asynchronous subscribers' queues and stop their workers"""
+        self.flush(timeout)
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+            self._subscriptions.clear()
+        for subscription in subscriptions:
+            subscription.close()
+
+    def get_subscriber_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get queue statistics of asynchronous subscribers
+
+        Returns:
+            Per subscriber: queue depth and bound, seconds the oldest queued event
+            has waited, and delivered / error / dropped / coalesced counts
+        """
+        now = time.time()
+        stats = {}
+        for subscription in list(self._subscriptions.values()):
+            with subscription.condition:
+                oldest = next(iter(subscription.queue.values()), None)
+                stats[subscription.name] = {
+                    "depth": len(subscription.queue),
+                    "queue_size": subscription.queue_size,
+                    "oldest_wait": now - oldest[2] if oldest else 0.0,
+                    **subscription.stats
+                }
+        return stats
+
     def get_event_history(self, event_type: str = None) -> List[Dict[str, Any]]:
         """
         Get historical events, optionally filtered by type
-        
+
         Args:
             event_type: Optional event type to filter by
-            
+
         Returns:
             List of historical events
         """
         if event_type:
             return [event for event in self.event_history if event["type"] == event_type]
-        return self.event_history.copy()
+        return list(self.event_history)
 
     def clear_history(self) -> None:
         """Clear the event history"""
-        self.event_history.clear()
\ No newline at end of file
+        self.event_history.clear()
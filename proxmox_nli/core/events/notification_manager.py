@@ -58,9 +58,10 @@ class NotificationManager:
     def _register_event_handlers(self) -> None:
         """Register for relevant system events"""
         if self.event_dispatcher:
-            self.event_dispatcher.subscribe("system_alert", self.send_notification)
-            self.event_dispatcher.subscribe("security_event", self.send_notification)
-            self.event_dispatcher.subscribe("resource_warning", self.send_notification)
+            # Sending may block on SMTP, so notifications are delivered off the publisher's thread
+            self.event_dispatcher.subscribe("system_alert", self.send_notification, async_dispatch=True)
+            self.event_dispatcher.subscribe("security_event", self.send_notification, async_dispatch=True)
+            self.event_dispatcher.subscribe("resource_warning", self.send_notification, async_dispatch=True)
 
     def send_notification(self, 
                          message: str,
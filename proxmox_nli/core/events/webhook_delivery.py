@@ -0,0 +1,361 @@
+"""
+Webhook delivery service for Proxmox NLI.
+
+Deliveries are written to a durable outbox and sent by one background thread
+that owns an asyncio event loop and a single pooled aiohttp session. Events
+for the same endpoint that arrive within a short window are sent as one
+batch, each endpoint has a limit on concurrent requests, and a circuit
+breaker stops sending to an endpoint that keeps failing.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import aiohttp
+from prometheus_client import Counter, Gauge, Histogram
+
+from .webhook_outbox import WebhookOutbox
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_DELIVERIES = Counter(
+    'webhook_deliveries_total', 'Webhook events by delivery outcome', ['result']
+)
+WEBHOOK_BATCH_SIZE = Histogram(
+    'webhook_batch_size', 'Events sent per webhook request', buckets=(1, 2, 5, 10, 25, 50, 100, 250)
+)
+WEBHOOK_OUTBOX_PENDING = Gauge('webhook_outbox_pending', 'Webhook deliveries waiting in the outbox')
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def sign_payload(payload: bytes, secret: str) -> str:
+    """HMAC-SHA256 signature of a request body, sent as X-Webhook-Signature"""
+    return hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
+
+
+class CircuitBreaker:
+    """Stops requests to an endpoint after repeated failures"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        """
+        Args:
+            failure_threshold: Consecutive failed requests that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial request
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; an expired open circuit lets one trial request through"""
+        if self.state == OPEN and time.time() >= self.open_until:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+        return self.state != OPEN
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning(f"Opening webhook circuit for {self.reset_timeout}s after {self.failures} failures")
+            self.state = OPEN
+            self.open_until = time.time() + self.reset_timeout
+
+
+class WebhookDeliveryService:
+    """Sends webhook events from a durable outbox"""
+
+    def __init__(self, get_webhook: Callable[[int], Optional[Dict[str, Any]]], storage_path: str = None,
+                 batch_window: float = 0.2, max_batch: int = 100, max_concurrency: int = 2,
+                 timeout: float = 10.0, max_retries: int = 3, retry_backoff: float = 1.0,
+                 max_backoff: float = 300.0, failure_threshold: int = 5, reset_timeout: float = 60.0,
+                 retention: float = 86400.0, on_attempt: Callable = None):
+        """
+        Initialize the delivery service
+
+        Args:
+            get_webhook: Returns the current configuration of a webhook by ID
+                (url, secret, headers, enabled, batch), or None if it was removed.
+                Only webhooks with batch set receive several events per request.
+            storage_path: Directory of the outbox database
+            batch_window: Seconds to collect events before sending, so a burst
+                for one endpoint goes out in few requests
+            max_batch: Maximum events per request
+            max_concurrency: Maximum concurrent requests per endpoint
+            timeout: Request timeout in seconds
+            max_retries: Attempts per event before it is given up
+            retry_backoff: Delay before the first retry; doubles with every attempt
+            max_backoff: Maximum retry delay in seconds
+            failure_threshold: Consecutive failures that open an endpoint's circuit
+            reset_timeout: Seconds an open circuit waits before a trial request
+            retention: Seconds delivered and given-up events are kept in the outbox
+            on_attempt: Called as on_attempt(webhook_id, payload, status_code, success, error)
+                after every request
+        """
+        self.get_webhook = get_webhook
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.retention = retention
+        self.on_attempt = on_attempt
+
+        if storage_path is None:
+            storage_path = os.path.expanduser(os.path.join("~", ".proxmox_nli", "webhooks"))
+        os.makedirs(storage_path, exist_ok=True)
+        self.outbox = WebhookOutbox(os.path.join(storage_path, "outbox.db"))
+
+        self.breakers: Dict[int, CircuitBreaker] = {}
+        # Requests in flight per webhook ID
+        self._in_flight: Dict[int, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self.running = False
+
+    def start(self) -> bool:
+        """Start the delivery thread; deliveries left in flight by a previous run are requeued"""
+        with self._lock:
+            if self.running:
+                return False
+            recovered = self.outbox.recover()
+            if recovered:
+                logger.info(f"Requeued {recovered} webhook deliveries from the outbox")
+            self.running = True
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="webhook-delivery", daemon=True)
+            self._thread.start()
+        self._ready.wait(5)
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """Stop sending; unsent deliveries stay in the outbox"""
+        with self._lock:
+            if not self.running:
+                return
+            self.running = False
+            if self._loop:
+                self._loop.call_soon_threadsafe(self._wake.set)
+        if self._thread:
+            self._thread.join(timeout)
+
+    def enqueue(self, webhook_ids: Iterable[int], event: Dict[str, Any]) -> int:
+        """
+        Queue an event for delivery to webhooks; safe to call from any thread
+
+        Returns:
+            Number of deliveries queued
+        """
+        added = self.outbox.add(webhook_ids, event)
+        if added:
+            if not self.running:
+                self.start()
+            self._notify()
+        return added
+
+    def _notify(self):
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                # The loop closed between the check and the call
+                pass
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._pump())
+        except Exception as e:
+            logger.error(f"Webhook delivery loop failed: {str(e)}")
+        finally:
+            self._loop = None
+            loop.close()
+            self.running = False
+
+    async def _pump(self):
+        """Send due deliveries until stopped"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        # One connection pool for all endpoints; the per-endpoint limit is applied by _dispatch_due
+        connector = aiohttp.TCPConnector(limit=100, limit_per_host=self.max_concurrency)
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._ready.set()
+        tasks = set()
+        last_prune = 0.0
+        try:
+            while self.running:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self._next_wait())
+                    # Let a burst accumulate so it goes out in few requests
+                    if self.batch_window:
+                        await asyncio.sleep(self.batch_window)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                if not self.running:
+                    break
+                if time.time() - last_prune > 3600:
+                    self.outbox.prune(time.time() - self.retention)
+                    last_prune = time.time()
+                for task in self._dispatch_due():
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                # Give requests in flight a chance to finish; unfinished ones are requeued on restart
+                await asyncio.wait(tasks, timeout=self.timeout)
+        finally:
+            await self._session.close()
+            self._session = None
+
+    def _next_wait(self) -> Optional[float]:
+        """Seconds until the next delivery becomes due, or None to wait for new events"""
+        # Busy endpoints are woken by their requests finishing
+        busy = [webhook_id for webhook_id, count in self._in_flight.items() if count >= self.max_concurrency]
+        busy += [webhook_id for webhook_id, breaker in self.breakers.items()
+                 if breaker.state == HALF_OPEN and breaker.trial_in_flight]
+        next_available = self.outbox.next_available(busy)
+        WEBHOOK_OUTBOX_PENDING.set(self.outbox.pending_count())
+        if next_available is None:
+            return None
+        return max(0.0, next_available - time.time())
+
+    def _dispatch_due(self) -> List[asyncio.Task]:
+        """Start a request for every batch that endpoint limits allow"""
+        tasks = []
+        for webhook_id in self.outbox.due_webhooks():
+            breaker = self.breakers.setdefault(webhook_id, CircuitBreaker(self.failure_threshold, self.reset_timeout))
+            while self._in_flight.get(webhook_id, 0) < self.max_concurrency:
+                if not breaker.allow():
+                    if breaker.state == OPEN:
+                        self.outbox.defer(webhook_id, breaker.open_until)
+                    break
+                webhook = self.get_webhook(webhook_id)
+                batch_size = self.max_batch if webhook is None or webhook.get("batch", False) else 1
+                rows = self.outbox.claim(webhook_id, batch_size)
+                if not rows:
+                    if breaker.state == HALF_OPEN:
+                        breaker.trial_in_flight = False
+                    break
+                self._in_flight[webhook_id] = self._in_flight.get(webhook_id, 0) + 1
+                tasks.append(asyncio.ensure_future(self._deliver(webhook_id, webhook, rows)))
+                if breaker.state == HALF_OPEN:
+                    break
+        return tasks
+
+    async def _deliver(self, webhook_id: int, webhook: Optional[Dict[str, Any]], rows: List[Dict[str, Any]]):
+        """Send one batch and record the outcome in the outbox"""
+        ids = [row["id"] for row in rows]
+        breaker = self.breakers[webhook_id]
+        try:
+            if webhook is None or not webhook.get("enabled", True):
+                self.outbox.mark_failed(ids, "Webhook was removed or disabled")
+                breaker.record_success()
+                WEBHOOK_DELIVERIES.labels(result="dropped").inc(len(ids))
+                return
+
+            events = [row["event"] for row in rows]
+            # A single event is sent as is; receivers see the batch envelope only during bursts
+            payload = events[0] if len(events) == 1 else {"events": events, "count": len(events)}
+            body = json.dumps(payload, sort_keys=True, default=str).encode()
+            headers = {"Content-Type": "application/json", **webhook.get("headers", {})}
+            if len(events) > 1:
+                headers["X-Webhook-Batch-Size"] = str(len(events))
+            if webhook.get("secret"):
+                headers["X-Webhook-Signature"] = sign_payload(body, webhook["secret"])
+
+            status_code, error = 0, None
+            try:
+                async with self._session.post(webhook["url"], data=body, headers=headers) as response:
+                    status_code = response.status
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+                logger.error(f"Webhook delivery error: {error}")
+            success = 200 <= status_code < 300
+            WEBHOOK_BATCH_SIZE.observe(len(events))
+
+            if success:
+                breaker.record_success()
+                self.outbox.mark_delivered(ids)
+                WEBHOOK_DELIVERIES.labels(result="delivered").inc(len(ids))
+            else:
+                error = error or f"HTTP {status_code}"
+                breaker.record_failure()
+                self._schedule_retry(rows, error)
+
+            if self.on_attempt:
+                try:
+                    self.on_attempt(webhook_id, payload, status_code, success, error)
+                except Exception as e:
+                    logger.error(f"Error recording webhook attempt: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error delivering webhook {webhook_id}: {str(e)}")
+            breaker.record_failure()
+            self._schedule_retry(rows, str(e))
+        finally:
+            self._in_flight[webhook_id] -= 1
+            self._wake.set()
+
+    def _schedule_retry(self, rows: List[Dict[str, Any]], error: str):
+        """Retry a failed batch with backoff, giving up on events whose attempts are used up"""
+        retry, dead = [], []
+        for row in rows:
+            (retry if row["attempts"] + 1 < self.max_retries else dead).append(row["id"])
+        if retry:
+            attempt = max(row["attempts"] for row in rows) + 1
+            delay = min(self.max_backoff, self.retry_backoff * 2 ** (attempt - 1))
+            # Jitter spreads retries of many endpoints that failed together
+            delay *= random.uniform(0.8, 1.2)
+            self.outbox.mark_failed(retry, error, time.time() + delay)
+            WEBHOOK_DELIVERIES.labels(result="retried").inc(len(retry))
+        if dead:
+            self.outbox.mark_failed(dead, error)
+            WEBHOOK_DELIVERIES.labels(result="failed").inc(len(dead))
+            logger.error(f"Giving up on {len(dead)} webhook deliveries: {error}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Outbox counts and circuit state per endpoint"""
+        return {
+            "running": self.running,
+            "outbox": self.outbox.counts(),
+            "endpoints": {
+                webhook_id: {
+                    "circuit": breaker.state,
+                    "failures": breaker.failures,
+                    "in_flight": self._in_flight.get(webhook_id, 0)
+                }
+                for webhook_id, breaker in list(self.breakers.items())
+            }
+        }
@@ -5,22 +5,37 @@ Manages webhook registrations and dispatches events to external services.
 import logging
 import json
 import os
-import aiohttp
-import asyncio
 from typing import Dict, List, Any, Optional
 from datetime import datetime
-import hmac
-import hashlib
+
+from .webhook_delivery import WebhookDeliveryService, sign_payload
 
 logger = logging.getLogger(__name__)
 
 class WebhookHandler:
-    def __init__(self, event_dispatcher=None):
-        """Initialize the webhook handler"""
+    def __init__(self, event_dispatcher=None, storage_path: str = None):
+        """
+        Initialize the webhook handler
+
+        Args:
+            event_dispatcher: Optional EventDispatcher instance
+            storage_path: Directory of the delivery outbox database
+        """
         self.event_dispatcher = event_dispatcher
         self.config = self._load_config()
         self.webhook_history: List[Dict[str, Any]] = []
-        self.max_retries = 3
+        self.max_retries = self.config["max_retries"]
+        # Delivery runs on its own event loop thread, so events can be handled from any thread
+        self.delivery = WebhookDeliveryService(
+            self.get_webhook,
+            storage_path=storage_path,
+            batch_window=self.config["batch_window"],
+            max_batch=self.config["max_batch"],
+            max_concurrency=self.config["max_concurrency"],
+            timeout=self.config["timeout"],
+            max_retries=self.max_retries,
+            on_attempt=self._log_webhook_attempt
+        )
         
         # Register for system events if dispatcher provided
         if event_dispatcher:
@@ -33,6 +48,9 @@ class WebhookHandler:
             "webhooks": [],
             "max_retries": 3,
             "timeout": 10,
+            "batch_window": 0.2,
+            "max_batch": 100,
+            "max_concurrency": 2,
             "enabled": True
         }
         
@@ -59,7 +77,9 @@ class WebhookHandler:
         Args:
             webhook: Dictionary containing webhook configuration
                     Required keys: url, events
-                    Optional: secret, headers, enabled
+                    Optional: secret, headers, enabled, batch (send bursts of
+                    events as one request; receivers must accept the batch
+                    envelope, default False)
                     
         Returns:
             Dict with registration status
@@ -76,6 +96,7 @@ class WebhookHandler:
             "secret": webhook.get("secret", ""),
             "headers": webhook.get("headers", {}),
             "enabled": webhook.get("enabled", True),
+            "batch": webhook.get("batch", False),
             "created_at": datetime.now().isoformat()
         }
 
@@ -116,59 +137,29 @@ class WebhookHandler:
             if w["enabled"] and (event_type in w["events"] or "*" in w["events"])
         ]
 
-        # Dispatch event to each webhook
-        for webhook in relevant_webhooks:
-            asyncio.create_task(self._dispatch_webhook(webhook, event_data))
+        # Queue the event for each webhook; the delivery service batches and sends them
+        if relevant_webhooks:
+            self.delivery.enqueue([w["id"] for w in relevant_webhooks], event_data)
 
-    async def _dispatch_webhook(self, webhook: Dict[str, Any], event_data: Dict[str, Any]) -> None:
-        """
-        Dispatch an event to a webhook with retries
-        
-        Args:
-            webhook: Webhook configuration
-            event_data: Event data to send
-        """
-        headers = {**webhook.get("headers", {})}
-        
-        # Add signature if secret is configured
-        if webhook.get("secret"):
-            signature = self._generate_signature(event_data, webhook["secret"])
-            headers["X-Webhook-Signature"] = signature
-
-        async with aiohttp.ClientSession() as session:
-            for attempt in range(self.max_retries):
-                try:
-                    async with session.post(
-                        webhook["url"],
-                        json=event_data,
-                        headers=headers,
-                        timeout=self.config["timeout"]
-                    ) as response:
-                        success = 200 <= response.status < 300
-                        
-                        # Log the attempt
-                        self._log_webhook_attempt(webhook["id"], event_data, response.status, success)
-                        
-                        if success:
-                            return
-                        
-                except Exception as e:
-                    logger.error(f"Webhook delivery error: {str(e)}")
-                    self._log_webhook_attempt(webhook["id"], event_data, 0, False, str(e))
-                    
-                    if attempt == self.max_retries - 1:
-                        break
-                    
-                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+    def get_webhook(self, webhook_id: int) -> Optional[Dict[str, Any]]:
+        """Get a registered webhook by ID"""
+        for webhook in self.config["webhooks"]:
+            if webhook["id"] == webhook_id:
+                return webhook
+        return None
 
     def _generate_signature(self, data: Dict[str, Any], secret: str) -> str:
         """Generate HMAC signature for webhook payload"""
-        payload = json.dumps(data, sort_keys=True).encode()
-        return hmac.new(
-            secret.encode(),
-            payload,
-            hashlib.sha256
-        ).hexdigest()
+        payload = json.dumps(data, sort_keys=True, default=str).encode()
+        return sign_payload(payload, secret)
+
+    def get_delivery_stats(self) -> Dict[str, Any]:
+        """Get outbox counts and circuit state per webhook"""
+        return self.delivery.stats()
+
+    def shutdown(self) -> None:
+        """Stop delivering; undelivered events are sent after the next start"""
+        self.delivery.stop()
 
     def _log_webhook_attempt(self,
                            webhook_id: int,
@@ -0,0 +1,140 @@
+"""
+Durable outbox for webhook deliveries.
+Events are written to an SQLite (WAL) table before they are sent, so deliveries
+that are pending or in flight when the process stops are sent after a restart.
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..sqlite_pool import get_connection_manager
+
+logger = logging.getLogger(__name__)
+
+PENDING = "PENDING"
+SENDING = "SENDING"
+DELIVERED = "DELIVERED"
+DEAD = "DEAD"
+
+
+class WebhookOutbox:
+    """Outbox table of webhook deliveries"""
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the outbox
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._db = get_connection_manager(db_path)
+        self._init_db()
+
+    def _init_db(self):
+        """Create the outbox table"""
+        with self._db.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS webhook_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    webhook_id INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    delivered_at REAL,
+                    last_error TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_ready ON webhook_outbox (status, available_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_webhook ON webhook_outbox (webhook_id, status, available_at)')
+
+    def add(self, webhook_ids: Iterable[int], event: Dict[str, Any]) -> int:
+        """Queue an event for each webhook; returns the number of deliveries added"""
+        now = time.time()
+        payload = json.dumps(event, default=str)
+        rows = [(webhook_id, payload, PENDING, now, now) for webhook_id in webhook_ids]
+        if not rows:
+            return 0
+        with self._db.connection() as conn:
+            conn.executemany(
+                'INSERT INTO webhook_outbox (webhook_id, event, status, available_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?)', rows
+            )
+        return len(rows)
+
+    def due_webhooks(self) -> List[int]:
+        """IDs of webhooks with deliveries that are due"""
+        with self._db.connection() as conn:
+            rows = conn.execute(
+                'SELECT DISTINCT webhook_id FROM webhook_outbox WHERE status = ? AND available_at <= ?',
+                (PENDING, time.time())
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def claim(self, webhook_id: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Mark up to 'limit' due deliveries of a webhook as sending and return them, oldest first
+
+        Only one delivery service may claim from an outbox at a time.
+        """
+        with self._db.connection() as conn:
+            rows = conn.execute('''
+                SELECT id, event, attempts FROM webhook_outbox
+                WHERE webhook_id = ? AND status = ? AND available_at <= ?
+                ORDER BY id LIMIT ?
+            ''', (webhook_id, PENDING, time.time(), limit)).fetchall()
+            conn.executemany('UPDATE webhook_outbox SET status = ? WHERE id = ?', [(SENDING, row[0]) for row in rows])
+        return [{"id": row[0], "event": json.loads(row[1]), "attempts": row[2]} for row in rows]
+
+    def defer(self, webhook_id: int, until: float):
+        """Hold back a webhook's pending deliveries until the given time"""
+        with self._db.connection() as conn:
+            conn.execute('UPDATE webhook_outbox SET available_at = ? WHERE webhook_id = ? AND status = ? '
+                         'AND available_at < ?', (until, webhook_id, PENDING, until))
+
+    def mark_delivered(self, ids: List[int]):
+        with self._db.connection() as conn:
+            conn.executemany('UPDATE webhook_outbox SET status = ?, delivered_at = ?, attempts = attempts + 1, '
+                             'last_error = NULL WHERE id = ?', [(DELIVERED, time.time(), i) for i in ids])
+
+    def mark_failed(self, ids: List[int], error: str, retry_at: Optional[float] = None):
+        """Record a failed attempt; retry_at None gives up on the deliveries"""
+        status = PENDING if retry_at is not None else DEAD
+        with self._db.connection() as conn:
+            conn.executemany('UPDATE webhook_outbox SET status = ?, available_at = ?, attempts = attempts + 1, '
+                             'last_error = ? WHERE id = ?',
+                             [(status, retry_at or time.time(), error, i) for i in ids])
+
+    def recover(self) -> int:
+        """Requeue deliveries left in flight by a previous process; returns the count"""
+        with self._db.connection() as conn:
+            return conn.execute('UPDATE webhook_outbox SET status = ? WHERE status = ?', (PENDING, SENDING)).rowcount
+
+    def next_available(self, exclude_webhooks: Iterable[int] = ()) -> Optional[float]:
+        """Time the earliest pending delivery becomes due, ignoring the given webhooks"""
+        excluded = list(exclude_webhooks)
+        not_in = f" AND webhook_id NOT IN ({', '.join('?' * len(excluded))})" if excluded else ""
+        with self._db.connection() as conn:
+            return conn.execute(f'SELECT MIN(available_at) FROM webhook_outbox WHERE status = ?{not_in}',
+                                (PENDING, *excluded)).fetchone()[0]
+
+    def pending_count(self) -> int:
+        with self._db.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM webhook_outbox WHERE status = ?', (PENDING,)).fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of deliveries per status"""
+        with self._db.connection() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) FROM webhook_outbox GROUP BY status').fetchall()
+        counts = {status: 0 for status in (PENDING, SENDING, DELIVERED, DEAD)}
+        counts.update(dict(rows))
+        return counts
+
+    def prune(self, older_than: float) -> int:
+        """Delete delivered and dead deliveries created before the given time; returns the count"""
+        with self._db.connection() as conn:
+            return conn.execute('DELETE FROM webhook_outbox WHERE status IN (?, ?) AND created_at < ?',
+                                (DELIVERED, DEAD, older_than)).rowcount
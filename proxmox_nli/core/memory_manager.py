@@ -13,6 +13,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Set, Tuple
 
 from proxmox_nli.core.conversation_persistence import ConversationPersistence
+from proxmox_nli.core.sqlite_pool import get_connection_manager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -41,6 +42,7 @@ class MemoryManager:
             db_path = os.path.join(data_dir, "memory.db")
         
         self.db_path = db_path
+        self._db = get_connection_manager(self.db_path)
         self._initialize_database()
         
         # Memory settings
@@ -79,7 +81,7 @@ class MemoryManager:
     def _initialize_database(self):
         """Initialize the database tables if they don't exist."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Create memories table
@@ -150,7 +152,7 @@ class MemoryManager:
         entities_json = json.dumps(entities) if entities else None
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.write_connection() as conn:
                 cursor = conn.cursor()
                 
                 # Check if we already have a similar memory
@@ -201,7 +203,7 @@ class MemoryManager:
             topic: The topic to prune
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Count memories for this topic
@@ -254,7 +256,7 @@ class MemoryManager:
         now = datetime.now().isoformat()
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.write_connection() as conn:
                 cursor = conn.cursor()
                 
                 # Check if association already exists
@@ -297,7 +299,7 @@ class MemoryManager:
     def _prune_old_associations(self):
         """Remove old associations if we have too many."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Count total associations
@@ -342,7 +344,7 @@ class MemoryManager:
         now = datetime.now().isoformat()
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Insert new transition
@@ -371,7 +373,7 @@ class MemoryManager:
             List of memories
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -424,7 +426,7 @@ class MemoryManager:
             List of related topics with relationship information
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -476,7 +478,7 @@ class MemoryManager:
             A transition phrase or None
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Try to find an existing transition
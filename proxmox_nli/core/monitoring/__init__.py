@@ -4,8 +4,10 @@ Monitoring module for Proxmox NLI.
 This module handles system monitoring, metrics collection, and resource tracking.
 """
 
+from .cluster_snapshot import ClusterSnapshot
 from .metrics_collector import MetricsCollector
 from .resource_monitor import ResourceMonitor
 from .system_health import SystemHealth
+from .timeseries_store import TimeSeriesStore
 
-__all__ = ['MetricsCollector', 'ResourceMonitor', 'SystemHealth']
\ No newline at end of file
+__all__ = ['ClusterSnapshot', 'MetricsCollector', 'ResourceMonitor', 'SystemHealth', 'TimeSeriesStore']
\ No newline at end of file
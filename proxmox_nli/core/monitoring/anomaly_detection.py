@@ -0,0 +1,383 @@
+"""
+Online anomaly detection for live metric streams.
+
+Each (entity, metric) series is tracked by two streaming detectors that are
+updated per sample as metrics arrive: an EWMA/EW-variance z-score detector and
+a rolling-quantile band detector. Per-entity IsolationForest models, which
+catch unusual combinations of metrics, are refitted periodically in a
+background process pool and then used to score each new sample.
+"""
+import bisect
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .timeseries_store import LABEL_FIELDS, META_FIELDS, TimeSeriesStore
+
+logger = logging.getLogger(__name__)
+
+# Cumulative counters reported by MetricsCollector, by metric type. They only
+# ever grow, so they are turned into per-second rates before detection.
+COUNTER_FIELDS = {
+    'vm_disk': ('read', 'write'),
+    'vm_network': ('in', 'out'),
+    'network': ('in', 'out'),
+}
+
+class EWMADetector:
+    """Exponentially weighted mean/variance z-score detector, O(1) per sample"""
+
+    def __init__(self, alpha: float = 0.1, threshold: float = 4.0, warmup: int = 30):
+        """
+        Args:
+            alpha: Weight of the newest sample in the moving mean and variance
+            threshold: z-score above which a sample is anomalous
+            warmup: Samples to observe before reporting anomalies
+        """
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+
+    def update(self, value: float) -> float:
+        """Score a sample against the current state, then fold it in; returns the z-score"""
+        if self.count == 0:
+            self.mean = value
+            self.count = 1
+            return 0.0
+        diff = value - self.mean
+        std = math.sqrt(self.var)
+        score = abs(diff) / std if std > 1e-12 else (0.0 if abs(diff) < 1e-12 else math.inf)
+        increment = self.alpha * diff
+        self.mean += increment
+        self.var = (1 - self.alpha) * (self.var + diff * increment)
+        self.count += 1
+        return score
+
+    def is_anomalous(self, score: float) -> bool:
+        return self.count > self.warmup and score > self.threshold
+
+
+class RollingQuantileDetector:
+    """Flags samples beyond a fence around the [low, high] quantile band of a sliding window"""
+
+    def __init__(self, window: int = 500, low: float = 0.01, high: float = 0.99, warmup: int = 30,
+                 margin: float = 0.5):
+        """
+        Args:
+            window: Number of recent samples the quantiles are computed over
+            low: Lower quantile of the normal band
+            high: Upper quantile of the normal band
+            warmup: Samples to observe before reporting anomalies; at least
+                2 / min(low, 1 - high) samples are needed to resolve the tails,
+                so a window smaller than that never reports
+            margin: Distance beyond the band, as a fraction of its width, a
+                sample must fall to be anomalous. Without it every sample past
+                the band would be reported, i.e. low + 1 - high of normal data.
+        """
+        self.window = window
+        self.low = low
+        self.high = high
+        self.warmup = max(warmup, int(math.ceil(2 / min(low, 1 - high))))
+        self.margin = margin
+        self._recent: Deque[float] = deque()
+        self._sorted: List[float] = []
+
+    def update(self, value: float) -> Optional[Tuple[float, float]]:
+        """
+        Check a sample against the fenced band of the samples before it, then add it.
+
+        Window maintenance is a bisect plus a list shift, which stays in the
+        microsecond range for windows of a few thousand samples.
+
+        Returns:
+            The (low, high) fence the sample fell outside of, or None
+        """
+        band = None
+        if len(self._sorted) >= self.warmup:
+            lo = self._sorted[int(self.low * (len(self._sorted) - 1))]
+            hi = self._sorted[int(math.ceil(self.high * (len(self._sorted) - 1)))]
+            fence = self.margin * (hi - lo)
+            if value < lo - fence or value > hi + fence:
+                band = (lo - fence, hi + fence)
+
+        self._recent.append(value)
+        bisect.insort(self._sorted, value)
+        if len(self._recent) > self.window:
+            oldest = self._recent.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        return band
+
+
+def _fit_isolation_forest(samples: np.ndarray, contamination: float, random_state: int):
+    """Fit an IsolationForest; module level so it can run in a worker process"""
+    from sklearn.ensemble import IsolationForest
+    model = IsolationForest(contamination=contamination, random_state=random_state)
+    model.fit(samples)
+    return model
+
+
+class OnlineAnomalyEngine:
+    """Streaming anomaly detection over collected metrics"""
+
+    def __init__(self, ewma_alpha: float = 0.1, z_threshold: float = 4.0, quantile_window: int = 500,
+                 warmup: int = 30, refit_interval: float = 3600, refit_min_samples: int = 100,
+                 history_size: int = 2000, contamination: float = 0.01,
+                 forest_threshold: float = -0.6, executor: Optional[Executor] = None,
+                 on_anomaly: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            ewma_alpha: Smoothing factor of the EWMA detectors
+            z_threshold: z-score that triggers an EWMA anomaly
+            quantile_window: Samples kept by the rolling-quantile detectors
+            warmup: Samples per series before anomalies are reported
+            refit_interval: Seconds between IsolationForest refits per entity
+            refit_min_samples: Feature vectors needed before an entity gets a model
+            history_size: Feature vectors kept per entity for refits
+            contamination: IsolationForest contamination parameter
+            forest_threshold: score_samples value below which a sample is anomalous
+            executor: Executor for refits; a one-worker process pool is created if omitted
+            on_anomaly: Callback invoked with every anomaly found
+        """
+        self.ewma_alpha = ewma_alpha
+        self.z_threshold = z_threshold
+        self.quantile_window = quantile_window
+        self.warmup = warmup
+        self.refit_interval = refit_interval
+        self.refit_min_samples = refit_min_samples
+        self.history_size = history_size
+        self.contamination = contamination
+        self.forest_threshold = forest_threshold
+        self.on_anomaly = on_anomaly
+
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._lock = threading.Lock()
+        self._detectors: Dict[Tuple[str, str], Tuple[EWMADetector, RollingQuantileDetector]] = {}
+        # entity -> feature names, feature vector history, latest labels
+        self._features: Dict[str, Tuple[str, ...]] = {}
+        self._history: Dict[str, Deque[np.ndarray]] = {}
+        self._labels: Dict[str, Dict[str, Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._last_refit: Dict[str, float] = {}
+        self._pending_refits: Dict[str, Tuple[Future, Tuple[str, ...]]] = {}
+        # (entity, counter field) -> previous (value, timestamp)
+        self._counters: Dict[Tuple[str, str], Tuple[float, float]] = {}
+
+        self.samples_seen = 0
+        self.anomalies_found = 0
+        self.refits_completed = 0
+
+    def observe(self, entity: str, metric: str, value: float, timestamp: Optional[float] = None,
+                labels: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Update the detectors of one series with a sample; returns anomalies it triggered"""
+        timestamp = time.time() if timestamp is None else timestamp
+        key = (entity, metric)
+        with self._lock:
+            detectors = self._detectors.get(key)
+            if detectors is None:
+                detectors = (
+                    EWMADetector(self.ewma_alpha, self.z_threshold, self.warmup),
+                    RollingQuantileDetector(self.quantile_window, warmup=self.warmup)
+                )
+                self._detectors[key] = detectors
+            ewma, quantiles = detectors
+            score = ewma.update(value)
+            band = quantiles.update(value)
+            self.samples_seen += 1
+
+        anomalies = []
+        if ewma.is_anomalous(score):
+            anomalies.append(self._anomaly('ewma', entity, metric, value, timestamp, labels, {
+                'z_score': score if math.isfinite(score) else None,
+                'expected': ewma.mean
+            }))
+        if band is not None:
+            anomalies.append(self._anomaly('quantile', entity, metric, value, timestamp, labels, {
+                'low': band[0],
+                'high': band[1]
+            }))
+        return anomalies
+
+    def observe_metrics(self, metrics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Feed one MetricsCollector cycle through the detectors.
+
+        Every numeric field of every metric is a separate series; cumulative
+        counters (COUNTER_FIELDS) are tracked as their per-second rate, named
+        '<field>_rate'. The fields of each entity also form one feature vector
+        that is scored by the entity's IsolationForest model, if one has been
+        fitted.
+        """
+        anomalies = []
+        vectors: Dict[str, Dict[str, float]] = {}
+        timestamps: Dict[str, float] = {}
+        for metric in metrics:
+            entity = f"{metric.get('type')}:{TimeSeriesStore.entity_id(metric)}"
+            labels = {name: metric[name] for name in LABEL_FIELDS if name in metric}
+            timestamp = float(metric.get('timestamp') or time.time())
+            counters = COUNTER_FIELDS.get(metric.get('type'), ())
+            for field, value in metric.items():
+                if field in LABEL_FIELDS or field in META_FIELDS:
+                    continue
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                if field in counters:
+                    value = self._counter_rate(entity, field, float(value), timestamp)
+                    if value is None:
+                        continue
+                    field = f"{field}_rate"
+                anomalies.extend(self.observe(entity, field, float(value), timestamp, labels))
+                vectors.setdefault(entity, {})[field] = float(value)
+            timestamps[entity] = timestamp
+            self._labels[entity] = labels
+
+        for entity, values in vectors.items():
+            anomalies.extend(self._observe_vector(entity, values, timestamps[entity]))
+        self._maybe_refit()
+        return anomalies
+
+    def _counter_rate(self, entity: str, field: str, value: float, timestamp: float) -> Optional[float]:
+        """Per-second rate of a counter since its previous sample; None for the first sample or a reset"""
+        key = (entity, field)
+        with self._lock:
+            previous = self._counters.get(key)
+            self._counters[key] = (value, timestamp)
+        if previous is None:
+            return None
+        elapsed = timestamp - previous[1]
+        if elapsed <= 0 or value < previous[0]:
+            # Same cycle replayed, or the counter restarted (e.g. VM reboot)
+            return None
+        return (value - previous[0]) / elapsed
+
+    def _observe_vector(self, entity: str, values: Dict[str, float], timestamp: float) -> List[Dict[str, Any]]:
+        """Record an entity's feature vector and score it with its forest model"""
+        with self._lock:
+            features = self._features.get(entity)
+            if features is None or set(features) != set(values):
+                # Feature set changed: start a new history and drop the old model
+                features = tuple(sorted(values))
+                self._features[entity] = features
+                self._history[entity] = deque(maxlen=self.history_size)
+                self._models.pop(entity, None)
+            vector = np.array([values[name] for name in features], dtype=np.float64)
+            self._history[entity].append(vector)
+            model = self._models.get(entity)
+
+        if model is None:
+            return []
+        score = float(model.score_samples(vector.reshape(1, -1))[0])
+        if score >= self.forest_threshold:
+            return []
+        return [self._anomaly('isolation_forest', entity, None, None, timestamp, self._labels.get(entity), {
+            'score': score,
+            'features': dict(zip(features, vector.tolist()))
+        })]
+
+    def _maybe_refit(self, now: Optional[float] = None):
+        """Submit IsolationForest refits for entities whose model is due"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._collect_refits()
+            due = [
+                entity for entity, history in self._history.items()
+                if len(history) >= self.refit_min_samples
+                and entity not in self._pending_refits
+                and now - self._last_refit.get(entity, 0) >= self.refit_interval
+            ]
+            for entity in due:
+                samples = np.vstack(self._history[entity])
+                try:
+                    future = self._get_executor().submit(
+                        _fit_isolation_forest, samples, self.contamination, 42)
+                except Exception as e:
+                    logger.error(f"Failed to submit anomaly model refit for {entity}: {str(e)}")
+                    continue
+                self._pending_refits[entity] = (future, self._features[entity])
+                self._last_refit[entity] = now
+
+    def _collect_refits(self):
+        """Install models from finished refits; caller holds the lock"""
+        for entity, (future, features) in list(self._pending_refits.items()):
+            if not future.done():
+                continue
+            del self._pending_refits[entity]
+            try:
+                model = future.result()
+            except Exception as e:
+                logger.error(f"Anomaly model refit for {entity} failed: {str(e)}")
+                continue
+            # Ignore a model fitted on a feature set the entity no longer has
+            if self._features.get(entity) == features:
+                self._models[entity] = model
+                self.refits_completed += 1
+
+    def refit_models(self, wait: bool = False):
+        """Force a refit of every entity with enough history"""
+        with self._lock:
+            self._last_refit.clear()
+        self._maybe_refit()
+        if wait:
+            with self._lock:
+                futures = [future for future, _ in self._pending_refits.values()]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+            with self._lock:
+                self._collect_refits()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1)
+        return self._executor
+
+    def _anomaly(self, detector: str, entity: str, metric: Optional[str], value: Optional[float],
+                 timestamp: float, labels: Optional[Dict[str, Any]], details: Dict[str, Any]) -> Dict[str, Any]:
+        anomaly = {
+            'detector': detector,
+            'entity': entity,
+            'metric': metric,
+            'value': value,
+            'timestamp': timestamp,
+            'labels': dict(labels or {}),
+            'details': details
+        }
+        self.anomalies_found += 1
+        if self.on_anomaly:
+            try:
+                self.on_anomaly(anomaly)
+            except Exception as e:
+                logger.error(f"Error in anomaly callback: {str(e)}")
+        return anomaly
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters describing the engine state"""
+        with self._lock:
+            return {
+                'series': len(self._detectors),
+                'entities': len(self._history),
+                'models': len(self._models),
+                'pending_refits': len(self._pending_refits),
+                'samples_seen': self.samples_seen,
+                'anomalies_found': self.anomalies_found,
+                'refits_completed': self.refits_completed
+            }
+
+    def shutdown(self):
+        """Stop the refit executor if the engine created it"""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
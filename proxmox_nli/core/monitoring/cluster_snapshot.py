@@ -0,0 +1,118 @@
+"""
+Cluster snapshot module providing a single bulk view of cluster resources per collection cycle.
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+# Fields that cluster/resources reports for guests and nodes
+VM_BULK_FIELDS = ('cpu', 'mem', 'maxmem', 'disk', 'maxdisk', 'netin', 'netout', 'diskread', 'diskwrite')
+NODE_BULK_FIELDS = ('cpu', 'maxcpu', 'mem', 'maxmem', 'disk', 'maxdisk', 'uptime')
+
+class ClusterSnapshot:
+    """Point-in-time view of the cluster built from one cluster/resources call.
+
+    The snapshot is fetched lazily on first access and shared by every
+    collector in the same cycle, so concurrent collectors never trigger
+    more than one bulk request.
+    """
+
+    def __init__(self, api):
+        """Initialize with API connection"""
+        self.api = api
+        self.timestamp = None
+        self._resources = None
+        self._nodes = None
+        self._lock = threading.Lock()
+        self.api_calls = 0
+
+    def _request(self, method: str, endpoint: str) -> Dict[str, Any]:
+        self.api_calls += 1
+        return self.api.api_request(method, endpoint)
+
+    def _load(self):
+        """Fetch cluster resources once; later calls reuse the result"""
+        if self._resources is not None:
+            return
+        with self._lock:
+            if self._resources is not None:
+                return
+            resources = []
+            try:
+                result = self._request('GET', 'cluster/resources')
+                if result.get('success'):
+                    resources = result.get('data') or []
+                else:
+                    logger.warning(f"Cluster resources unavailable: {result.get('message')}")
+            except Exception as e:
+                logger.error(f"Error fetching cluster resources: {str(e)}")
+
+            nodes = [r for r in resources if r.get('type') == 'node']
+            if not nodes:
+                # Standalone hosts or restricted tokens may not expose node entries
+                try:
+                    result = self._request('GET', 'nodes')
+                    if result.get('success'):
+                        nodes = result.get('data') or []
+                except Exception as e:
+                    logger.error(f"Error fetching node list: {str(e)}")
+
+            self._nodes = nodes
+            self.timestamp = int(time.time())
+            self._resources = resources
+
+    @property
+    def resources(self) -> List[Dict]:
+        """All entries returned by cluster/resources"""
+        self._load()
+        return self._resources
+
+    def vms(self) -> List[Dict]:
+        """QEMU and LXC guests in the cluster"""
+        return [r for r in self.resources if r.get('type') in ('qemu', 'lxc') and r.get('vmid') is not None]
+
+    def nodes(self) -> List[Dict]:
+        """Cluster nodes, shared across collectors for this cycle"""
+        self._load()
+        return self._nodes
+
+    def storages(self) -> List[Dict]:
+        """Storage entries in the cluster"""
+        return [r for r in self.resources if r.get('type') == 'storage']
+
+    def vm_status(self, vm: Dict) -> Dict[str, Any]:
+        """Return status fields for a guest, using the bulk entry where possible.
+
+        A per-guest status/current request is only made when the bulk entry
+        is missing one of the requested fields.
+        """
+        if all(field in vm for field in ('cpu', 'mem')):
+            return vm
+        guest_type = vm.get('type') if vm.get('type') in ('qemu', 'lxc') else 'qemu'
+        try:
+            result = self._request('GET', f'nodes/{vm["node"]}/{guest_type}/{vm["vmid"]}/status/current')
+            if result.get('success'):
+                merged = dict(result['data'])
+                merged.update({k: v for k, v in vm.items() if k in VM_BULK_FIELDS})
+                return merged
+        except Exception as e:
+            logger.error(f"Error fetching status for VM {vm.get('vmid')}: {str(e)}")
+        return vm
+
+    def node_status(self, node: Dict) -> Dict[str, Any]:
+        """Return cpu and memory figures for a node, falling back to nodes/{node}/status"""
+        if all(field in node for field in ('cpu', 'mem', 'maxmem')):
+            return {
+                'cpu': node.get('cpu', 0),
+                'memory': {'used': node.get('mem', 0), 'total': node.get('maxmem', 0)}
+            }
+        try:
+            result = self._request('GET', f'nodes/{node["node"]}/status')
+            if result.get('success'):
+                return result['data']
+        except Exception as e:
+            logger.error(f"Error fetching status for node {node.get('node')}: {str(e)}")
+        return {}
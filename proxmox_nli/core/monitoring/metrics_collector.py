@@ -8,20 +8,31 @@ from datetime import datetime, timedelta
 import threading
 from concurrent.futures import ThreadPoolExecutor
 
+from .cluster_snapshot import ClusterSnapshot
+from .timeseries_store import TimeSeriesStore
+
 logger = logging.getLogger(__name__)
 
 class MetricsCollector:
     """Collects and aggregates metrics from various sources"""
     
-    def __init__(self, api, monitoring_integration=None):
-        """Initialize with API connection and optional monitoring integration"""
+    def __init__(self, api, monitoring_integration=None, store: Optional[TimeSeriesStore] = None):
+        """Initialize with API connection, optional monitoring integration and history store"""
         self.api = api
         self.monitoring = monitoring_integration
         self.collection_active = False
         self.collection_thread = None
-        self.metrics_buffer = []
-        self.buffer_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        # Components that started collection and have not stopped it yet
+        self._owners = 0
+        self._owners_lock = threading.Lock()
+        # Metric history lives in per-series ring buffers shared with readers
+        self.store = store or TimeSeriesStore()
+        self.last_collected_at = None
+        self.listeners = []
         self.default_collection_interval = 60  # seconds
+        self.collection_interval = self.default_collection_interval
+        self.last_snapshot = None
         
         # Define metric types and their collection methods
         self.metric_collectors = {
@@ -32,21 +43,30 @@ class MetricsCollector:
         }
     
     def start_collection(self, interval: int = None) -> Dict[str, Any]:
-        """Start metrics collection in background thread"""
+        """Start metrics collection in background thread
+        
+        The collector is shared by several components, so each call registers
+        one owner. Starting an already running collection succeeds; the
+        interval of the first owner is kept.
+        """
         try:
-            if self.collection_active:
-                return {
-                    "success": False,
-                    "message": "Metrics collection already running"
-                }
-            
-            self.collection_active = True
-            self.collection_thread = threading.Thread(
-                target=self._collection_loop,
-                args=(interval or self.default_collection_interval,),
-                daemon=True
-            )
-            self.collection_thread.start()
+            with self._owners_lock:
+                self._owners += 1
+                if self.collection_active:
+                    return {
+                        "success": True,
+                        "message": "Metrics collection already running"
+                    }
+                
+                self.collection_active = True
+                self.collection_interval = interval or self.default_collection_interval
+                self._stop_event = threading.Event()
+                self.collection_thread = threading.Thread(
+                    target=self._collection_loop,
+                    args=(self.collection_interval, self._stop_event),
+                    daemon=True
+                )
+                self.collection_thread.start()
             
             return {
                 "success": True,
@@ -60,17 +80,27 @@ class MetricsCollector:
             }
     
     def stop_collection(self) -> Dict[str, Any]:
-        """Stop metrics collection"""
+        """Release one owner's hold on metrics collection; stops when the last owner leaves"""
         try:
-            if not self.collection_active:
-                return {
-                    "success": False,
-                    "message": "Metrics collection not running"
-                }
-            
-            self.collection_active = False
-            if self.collection_thread:
-                self.collection_thread.join(timeout=5)
+            with self._owners_lock:
+                if not self.collection_active:
+                    return {
+                        "success": False,
+                        "message": "Metrics collection not running"
+                    }
+                
+                self._owners = max(self._owners - 1, 0)
+                if self._owners:
+                    return {
+                        "success": True,
+                        "message": f"Metrics collection still used by {self._owners} other owner(s)"
+                    }
+                
+                self.collection_active = False
+                self._stop_event.set()
+                thread, self.collection_thread = self.collection_thread, None
+            if thread:
+                thread.join(timeout=5)
             
             return {
                 "success": True,
@@ -83,44 +113,72 @@ class MetricsCollector:
                 "message": f"Error stopping metrics collection: {str(e)}"
             }
     
-    def _collection_loop(self, interval: int):
+    def _collection_loop(self, interval: int, stop_event: threading.Event):
         """Main collection loop running in background thread"""
-        while self.collection_active:
+        while not stop_event.is_set():
             try:
-                metrics = self.collect_all_metrics()
+                metrics = self.collect_and_store()
                 if metrics["success"]:
-                    self._buffer_metrics(metrics["metrics"])
                     if self.monitoring:
                         self.monitoring.send_metrics(metrics["metrics"])
             except Exception as e:
                 logger.error(f"Error in metrics collection loop: {str(e)}")
             
-            time.sleep(interval)
+            stop_event.wait(interval)
     
     def _buffer_metrics(self, metrics: List[Dict]):
-        """Buffer metrics in memory"""
-        with self.buffer_lock:
-            self.metrics_buffer.extend(metrics)
-            # Trim buffer if it gets too large
-            if len(self.metrics_buffer) > 1000:
-                self.metrics_buffer = self.metrics_buffer[-1000:]
+        """Append a collection cycle to the time-series store"""
+        self.store.append_metrics(metrics)
+        if metrics:
+            self.last_collected_at = max(metric.get('timestamp', 0) for metric in metrics)
+        for listener in list(self.listeners):
+            try:
+                listener(metrics)
+            except Exception as e:
+                logger.error(f"Error in metrics listener: {str(e)}")
+    
+    def add_listener(self, callback: callable) -> None:
+        """Register a callback that receives every collected metrics cycle"""
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+    
+    def remove_listener(self, callback: callable) -> None:
+        """Unregister a metrics cycle callback"""
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+    
+    def collect_and_store(self) -> Dict[str, Any]:
+        """Run one collection cycle and append the results to the store"""
+        metrics = self.collect_all_metrics()
+        if metrics["success"]:
+            self._buffer_metrics(metrics["metrics"])
+        return metrics
+    
+    def get_latest_metrics(self) -> List[Dict]:
+        """Get the metrics of the most recent collection cycle from the store"""
+        if self.last_collected_at is None:
+            return []
+        return self.store.latest(since=self.last_collected_at)
     
     def get_buffered_metrics(self, count: int = None) -> List[Dict]:
-        """Get metrics from buffer"""
-        with self.buffer_lock:
-            if count:
-                return self.metrics_buffer[-count:]
-            return self.metrics_buffer.copy()
+        """Get metrics of the most recent collection cycle, optionally only the last count"""
+        metrics = self.get_latest_metrics()
+        if count:
+            return metrics[-count:]
+        return metrics
     
     def collect_all_metrics(self) -> Dict[str, Any]:
         """Collect all configured metrics"""
         try:
             results = []
             timestamp = int(time.time())
+            # One bulk view of the cluster shared by all collectors this cycle
+            snapshot = ClusterSnapshot(self.api)
+            self.last_snapshot = snapshot
             
             with ThreadPoolExecutor(max_workers=4) as executor:
                 futures = {
-                    collector_name: executor.submit(collector_func)
+                    collector_name: executor.submit(collector_func, snapshot)
                     for collector_name, collector_func in self.metric_collectors.items()
                 }
                 
@@ -148,60 +206,71 @@ class MetricsCollector:
                 "message": f"Error collecting metrics: {str(e)}"
             }
     
-    def _collect_vm_metrics(self) -> List[Dict]:
-        """Collect VM-level metrics"""
+    def _collect_vm_metrics(self, snapshot: Optional[ClusterSnapshot] = None) -> List[Dict]:
+        """Collect VM-level metrics from the bulk cluster/resources response"""
         metrics = []
         try:
-            vms = self.api.api_request('GET', 'cluster/resources', {'type': 'vm'})
-            if vms['success']:
-                for vm in vms['data']:
-                    vm_id = vm.get('vmid')
-                    if vm_id:
-                        status = self.api.api_request('GET', f'nodes/{vm["node"]}/qemu/{vm_id}/status/current')
-                        if status['success']:
-                            data = status['data']
-                            metrics.append({
-                                'type': 'vm_cpu',
-                                'vm_id': vm_id,
-                                'node': vm['node'],
-                                'value': data.get('cpu', 0)
-                            })
-                            metrics.append({
-                                'type': 'vm_memory',
-                                'vm_id': vm_id,
-                                'node': vm['node'],
-                                'value': data.get('mem', 0)
-                            })
+            snapshot = snapshot or ClusterSnapshot(self.api)
+            for vm in snapshot.vms():
+                vm_id = vm['vmid']
+                data = snapshot.vm_status(vm)
+                metrics.append({
+                    'type': 'vm_cpu',
+                    'vm_id': vm_id,
+                    'node': vm['node'],
+                    'value': data.get('cpu', 0)
+                })
+                metrics.append({
+                    'type': 'vm_memory',
+                    'vm_id': vm_id,
+                    'node': vm['node'],
+                    'value': data.get('mem', 0),
+                    'total': data.get('maxmem', 0)
+                })
+                metrics.append({
+                    'type': 'vm_disk',
+                    'vm_id': vm_id,
+                    'node': vm['node'],
+                    'value': data.get('disk', 0),
+                    'total': data.get('maxdisk', 0),
+                    'read': data.get('diskread', 0),
+                    'write': data.get('diskwrite', 0)
+                })
+                metrics.append({
+                    'type': 'vm_network',
+                    'vm_id': vm_id,
+                    'node': vm['node'],
+                    'in': data.get('netin', 0),
+                    'out': data.get('netout', 0)
+                })
         except Exception as e:
             logger.error(f"Error collecting VM metrics: {str(e)}")
         return metrics
     
-    def _collect_node_metrics(self) -> List[Dict]:
+    def _collect_node_metrics(self, snapshot: Optional[ClusterSnapshot] = None) -> List[Dict]:
         """Collect node-level metrics"""
         metrics = []
         try:
-            nodes = self.api.api_request('GET', 'nodes')
-            if nodes['success']:
-                for node in nodes['data']:
-                    status = self.api.api_request('GET', f'nodes/{node["node"]}/status')
-                    if status['success']:
-                        data = status['data']
-                        metrics.append({
-                            'type': 'node_cpu',
-                            'node': node['node'],
-                            'value': data.get('cpu', 0)
-                        })
-                        metrics.append({
-                            'type': 'node_memory',
-                            'node': node['node'],
-                            'value': data.get('memory', {}).get('used', 0),
-                            'total': data.get('memory', {}).get('total', 0)
-                        })
+            snapshot = snapshot or ClusterSnapshot(self.api)
+            for node in snapshot.nodes():
+                data = snapshot.node_status(node)
+                if data:
+                    metrics.append({
+                        'type': 'node_cpu',
+                        'node': node['node'],
+                        'value': data.get('cpu', 0)
+                    })
+                    metrics.append({
+                        'type': 'node_memory',
+                        'node': node['node'],
+                        'value': data.get('memory', {}).get('used', 0),
+                        'total': data.get('memory', {}).get('total', 0)
+                    })
         except Exception as e:
             logger.error(f"Error collecting node metrics: {str(e)}")
         return metrics
     
-    def _collect_storage_metrics(self) -> List[Dict]:
+    def _collect_storage_metrics(self, snapshot: Optional[ClusterSnapshot] = None) -> List[Dict]:
         """Collect storage-related metrics"""
         metrics = []
         try:
@@ -218,23 +287,22 @@ class MetricsCollector:
             logger.error(f"Error collecting storage metrics: {str(e)}")
         return metrics
     
-    def _collect_network_metrics(self) -> List[Dict]:
+    def _collect_network_metrics(self, snapshot: Optional[ClusterSnapshot] = None) -> List[Dict]:
         """Collect network-related metrics"""
         metrics = []
         try:
-            nodes = self.api.api_request('GET', 'nodes')
-            if nodes['success']:
-                for node in nodes['data']:
-                    netdata = self.api.api_request('GET', f'nodes/{node["node"]}/netstat')
-                    if netdata['success']:
-                        for interface in netdata.get('data', []):
-                            metrics.append({
-                                'type': 'network',
-                                'node': node['node'],
-                                'interface': interface['iface'],
-                                'in': interface.get('in', 0),
-                                'out': interface.get('out', 0)
-                            })
+            snapshot = snapshot or ClusterSnapshot(self.api)
+            for node in snapshot.nodes():
+                netdata = self.api.api_request('GET', f'nodes/{node["node"]}/netstat')
+                if netdata['success']:
+                    for interface in netdata.get('data', []):
+                        metrics.append({
+                            'type': 'network',
+                            'node': node['node'],
+                            'interface': interface['iface'],
+                            'in': interface.get('in', 0),
+                            'out': interface.get('out', 0)
+                        })
         except Exception as e:
             logger.error(f"Error collecting network metrics: {str(e)}")
         return metrics
\ No newline at end of file
@@ -3,26 +3,34 @@ Predictive resource allocation and power management module.
 """
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LinearRegression
 from .resource_analyzer import ResourceAnalyzer
+from .timeseries_store import TimeSeriesStore
 
 logger = logging.getLogger(__name__)
 
 class PredictiveAnalyzer:
     """Analyzes resource usage patterns and predicts future requirements."""
     
-    def __init__(self, resource_analyzer: ResourceAnalyzer):
+    def __init__(self, resource_analyzer: ResourceAnalyzer, store: Optional[TimeSeriesStore] = None):
         """Initialize the predictive analyzer.
         
         Args:
             resource_analyzer: ResourceAnalyzer instance for historical data
+            store: Optional TimeSeriesStore filled by a MetricsCollector; when it
+                holds enough history it is used instead of querying Prometheus/API
         """
         self.resource_analyzer = resource_analyzer
+        self.store = store
         self.scaler = StandardScaler()
         self.models = {}
+        # (series key, seasonal period) -> (data fingerprint, coefficients, series length)
+        self._forecast_cache: Dict[Tuple, Tuple] = {}
+        self.forecast_cache_hits = 0
+        self.forecast_fits = 0
         self.power_thresholds = {
             'cpu_idle': 0.2,  # CPU usage below 20% indicates potential power saving
             'memory_idle': 0.3,  # Memory usage below 30% indicates potential power saving
@@ -40,8 +48,10 @@ class PredictiveAnalyzer:
             Dict with predicted resource requirements
         """
         try:
-            # Get historical data for the past week
-            history = self.resource_analyzer.analyze_vm_resources(vm_id, days=7)
+            # Prefer locally collected history, fall back to the past week from Prometheus/API
+            history = self._history_from_store(vm_id)
+            if history is None:
+                history = self.resource_analyzer.analyze_vm_resources(vm_id, days=7)
             if not history.get('success'):
                 return {"success": False, "message": "Failed to get historical data"}
             
@@ -78,6 +88,140 @@ class PredictiveAnalyzer:
             logger.error(f"Error predicting resource needs: {str(e)}")
             return {"success": False, "message": str(e)}
             
+    def predict_cluster_needs(self, vm_ids: Optional[List[str]] = None, hours_ahead: int = 24,
+                              seasonal_period: Optional[int] = None) -> Dict:
+        """Predict resource requirements for many VMs with one batched fit.
+        
+        Args:
+            vm_ids: VM identifiers; defaults to every VM in the time-series store
+            hours_ahead: Number of hours to predict ahead
+            seasonal_period: Optional period in hours (e.g. 24) for a seasonal term
+            
+        Returns:
+            Dict with per-VM predictions and recommendations
+        """
+        try:
+            if vm_ids is None:
+                vm_ids = [entity for _, entity in self.store.series('vm_cpu')] if self.store else []
+            
+            series = {}
+            failed = []
+            for vm_id in vm_ids:
+                vm_id = str(vm_id)
+                history = self._history_from_store(vm_id)
+                if history is None:
+                    history = self.resource_analyzer.analyze_vm_resources(vm_id, days=7)
+                if not history.get('success'):
+                    failed.append(vm_id)
+                    continue
+                for metric in ('cpu', 'memory'):
+                    if metric in history['metrics']:
+                        values = self._prepare_time_series(history['metrics'][metric]).ravel()
+                        series[(vm_id, metric)] = values
+            
+            forecasts = self.forecast_batch(series, hours_ahead, seasonal_period)
+            
+            vms = {}
+            for (vm_id, metric), forecast in forecasts.items():
+                predictions = vms.setdefault(vm_id, {})
+                predictions[metric] = {
+                    'next_24h': forecast,
+                    'trend': self._analyze_trend(forecast),
+                    'peak_time': self._find_peak_time(forecast)
+                }
+            
+            return {
+                "success": True,
+                "vms": {
+                    vm_id: {
+                        "predictions": predictions,
+                        "recommendations": self._generate_predictive_recommendations(predictions)
+                    }
+                    for vm_id, predictions in vms.items()
+                },
+                "failed": failed
+            }
+            
+        except Exception as e:
+            logger.error(f"Error predicting cluster resource needs: {str(e)}")
+            return {"success": False, "message": str(e)}
+    
+    def forecast_batch(self, series: Dict[Tuple, Sequence[float]], hours_ahead: int = 24,
+                       seasonal_period: Optional[int] = None) -> Dict[Tuple, List[float]]:
+        """Forecast many hourly series at once.
+        
+        Series are right-aligned into one 2D array and their least-squares
+        trends (plus an optional sine/cosine seasonal term) are solved in a
+        single vectorized pass. Fitted coefficients are cached per series and
+        only refitted when that series' data changes.
+        
+        Args:
+            series: Mapping of series key to hourly values, oldest first
+            hours_ahead: Number of hours to forecast
+            seasonal_period: Optional seasonal period in hours
+            
+        Returns:
+            Mapping of series key to forecast values
+        """
+        forecasts = {}
+        stale = {}
+        for key, values in series.items():
+            values = np.asarray(values, dtype=np.float64).ravel()
+            if len(values) < 24:  # Need at least 24 hours of data, same as _train_and_predict
+                forecasts[key] = [float(values[0]) if len(values) else 0.0] * hours_ahead
+                continue
+            fingerprint = (len(values), hash(values.tobytes()))
+            cached = self._forecast_cache.get((key, seasonal_period))
+            if cached is not None and cached[0] == fingerprint:
+                self.forecast_cache_hits += 1
+                forecasts[key] = self._extrapolate(cached[1], cached[2], hours_ahead, seasonal_period)
+            else:
+                stale[key] = (fingerprint, values)
+        
+        if stale:
+            keys = list(stale)
+            length = max(len(stale[key][1]) for key in keys)
+            # Right-align so every series ends at the same (most recent) hour
+            Y = np.full((len(keys), length), np.nan)
+            for row, key in enumerate(keys):
+                values = stale[key][1]
+                Y[row, length - len(values):] = values
+            coefficients = self._fit_trends(Y, seasonal_period)
+            self.forecast_fits += len(keys)
+            for row, key in enumerate(keys):
+                self._forecast_cache[(key, seasonal_period)] = (stale[key][0], coefficients[row], length)
+                forecasts[key] = self._extrapolate(coefficients[row], length, hours_ahead, seasonal_period)
+        
+        return forecasts
+    
+    @staticmethod
+    def _design_matrix(t: np.ndarray, seasonal_period: Optional[int]) -> np.ndarray:
+        """Regression features for hour offsets t: intercept, trend and optional seasonality."""
+        columns = [np.ones_like(t), t]
+        if seasonal_period:
+            angle = 2 * np.pi * t / seasonal_period
+            columns.extend([np.sin(angle), np.cos(angle)])
+        return np.stack(columns, axis=1)
+    
+    @classmethod
+    def _fit_trends(cls, Y: np.ndarray, seasonal_period: Optional[int]) -> np.ndarray:
+        """Solve least squares for every row of Y (NaN = missing) in one batched solve."""
+        X = cls._design_matrix(np.arange(Y.shape[1], dtype=np.float64), seasonal_period)
+        weights = (~np.isnan(Y)).astype(np.float64)
+        observed = np.where(weights > 0, Y, 0.0)
+        # Per-series normal equations (X^T W X) b = X^T W y
+        xtx = np.einsum('sp,pk,pl->skl', weights, X, X)
+        xty = np.einsum('sp,pk->sk', observed, X)
+        xtx += np.eye(X.shape[1]) * 1e-9
+        return np.linalg.solve(xtx, xty[..., None])[..., 0]
+    
+    @classmethod
+    def _extrapolate(cls, coefficients: np.ndarray, length: int, hours_ahead: int,
+                     seasonal_period: Optional[int]) -> List[float]:
+        """Evaluate fitted coefficients for the hours following a series."""
+        future = cls._design_matrix(np.arange(length, length + hours_ahead, dtype=np.float64), seasonal_period)
+        return (future @ coefficients).tolist()
+    
     def analyze_power_efficiency(self, node_id: str = None) -> Dict:
         """Analyze power efficiency and generate recommendations.
         
@@ -155,6 +299,35 @@ class PredictiveAnalyzer:
             logger.error(f"Error analyzing power efficiency: {str(e)}")
             return {"success": False, "message": str(e)}
     
+    def _history_from_store(self, vm_id: str, days: int = 7) -> Optional[Dict]:
+        """Build hourly CPU/memory history for a VM from the time-series store.
+        
+        Returns None when there is no store or it holds less than a day of data.
+        """
+        if self.store is None:
+            return None
+        start = datetime.now().timestamp() - days * 86400
+        cpu = self.store.downsample('vm_cpu', vm_id, 3600, start=start)
+        memory = self.store.downsample('vm_memory', vm_id, 3600, start=start)
+        if len(cpu.get('timestamp', [])) < 24:
+            return None
+        
+        metrics = {'cpu': self._summarize_series(cpu['value'] * 100)}
+        if len(memory.get('timestamp', [])) >= 24:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                memory_percent = memory['value'] / memory['total'] * 100
+            metrics['memory'] = self._summarize_series(memory_percent)
+        return {"success": True, "vm_id": vm_id, "metrics": metrics, "source": "store"}
+    
+    def _summarize_series(self, values: np.ndarray) -> Dict:
+        """Convert an hourly series into the metric dict used for prediction."""
+        values = values[np.isfinite(values)]
+        return {
+            'values': values.tolist(),
+            'average': float(values.mean()) if len(values) else 0.0,
+            'peak': float(values.max()) if len(values) else 0.0
+        }
+    
     def _prepare_time_series(self, metric_data: Dict) -> np.ndarray:
         """Prepare time series data for prediction."""
         values = []
@@ -14,6 +14,7 @@ import numpy as np
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 
+from proxmox_nli.core.monitoring.anomaly_detection import OnlineAnomalyEngine
 from proxmox_nli.core.monitoring.resource_analyzer import ResourceAnalyzer
 from proxmox_nli.core.monitoring.system_health import SystemHealth
 
@@ -47,11 +48,22 @@ class PredictiveMaintenance:
             'gpu_temp_threshold': 85,  # GPU temperature threshold (°C)
             'memory_error_threshold': 10,  # Memory errors per day
             'notification_cooldown': 86400,  # 24 hours between repeat notifications
+            'online_detection': True,  # Score live metrics as they are collected
+            'online_z_threshold': 4.0,  # EWMA z-score that raises an online alert
+            'online_refit_interval': 3600,  # Seconds between IsolationForest refits
         }
         
+        # Streaming detectors fed by the metrics collector
+        self.anomaly_engine = OnlineAnomalyEngine(
+            z_threshold=self.config['online_z_threshold'],
+            refit_interval=self.config['online_refit_interval'],
+            on_anomaly=self._handle_online_anomaly
+        )
+        
         # Runtime state
         self.running = False
         self.monitor_thread = None
+        self.started_collection = False  # Whether start() holds an owner reference on the shared metrics collector
         self.last_notification = {}  # Track last notification time for each issue
         self.alert_history = []  # Track alert history
     
@@ -97,6 +109,9 @@ class PredictiveMaintenance:
             )
             self.monitor_thread.start()
             
+            if self.config['online_detection']:
+                self._start_online_detection()
+            
             logger.info("Predictive maintenance started")
             return {
                 "success": True,
@@ -122,6 +137,8 @@ class PredictiveMaintenance:
             if self.monitor_thread:
                 self.monitor_thread.join(timeout=5)
             
+            self._stop_online_detection()
+            
             logger.info("Predictive maintenance stopped")
             return {
                 "success": True,
@@ -141,10 +158,53 @@ class PredictiveMaintenance:
             "status": {
                 "running": self.running,
                 "recent_alerts": self.alert_history[-10:] if self.alert_history else [],
+                "online_detection": self.anomaly_engine.stats(),
                 "config": self.config
             }
         }
     
+    def _start_online_detection(self):
+        """Feed every collected metrics cycle through the online detectors."""
+        collector = self.system_health.metrics_collector
+        collector.add_listener(self.anomaly_engine.observe_metrics)
+        self.started_collection = collector.start_collection()["success"]
+    
+    def _stop_online_detection(self):
+        """Detach the online detectors from the metrics feed and release our hold on collection."""
+        collector = self.system_health.metrics_collector
+        collector.remove_listener(self.anomaly_engine.observe_metrics)
+        if self.started_collection:
+            collector.stop_collection()
+            self.started_collection = False
+        self.anomaly_engine.shutdown()
+    
+    def _handle_online_anomaly(self, anomaly: Dict):
+        """Turn an online detector finding into a maintenance alert."""
+        labels = anomaly.get('labels', {})
+        metric_type = anomaly['entity'].split(':', 1)[0]
+        component = metric_type.split('_', 1)[-1] if '_' in metric_type else metric_type
+        metric = anomaly.get('metric')
+        if metric:
+            series = metric_type if metric == 'value' else f"{metric_type} {metric}"
+            message = f"Unusual {series} value {anomaly['value']:.4g} detected by {anomaly['detector']}"
+        else:
+            message = f"Unusual combination of {metric_type} metrics detected by {anomaly['detector']}"
+        if labels.get('vm_id') is not None:
+            message += f" on VM {labels['vm_id']}"
+        
+        self._process_alert({
+            "node": labels.get('node', 'cluster'),
+            "component": component,
+            "type": f"online_anomaly_{anomaly['entity']}_{metric or 'combined'}",
+            "severity": "medium",
+            "message": message,
+            "details": anomaly,
+            "recommendations": [
+                "Check recent changes and workload on the affected resource",
+                "Compare with the resource's history in the metrics dashboard"
+            ]
+        })
+    
     def analyze_hardware(self, node_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Analyze hardware health and predict potential issues.
@@ -14,15 +14,16 @@ logger = logging.getLogger(__name__)
 class ResourceMonitor:
     """Actively monitors system resources and provides alerts"""
     
-    def __init__(self, api, monitoring_integration=None):
-        """Initialize with API connection and optional monitoring integration"""
+    def __init__(self, api, monitoring_integration=None, metrics_collector: Optional[MetricsCollector] = None):
+        """Initialize with API connection, optional monitoring integration and a shared collector"""
         self.api = api
         self.monitoring = monitoring_integration
-        self.metrics_collector = MetricsCollector(api, monitoring_integration)
+        self.metrics_collector = metrics_collector or MetricsCollector(api, monitoring_integration)
         self.resource_analyzer = ResourceAnalyzer(api)
         self.alert_callbacks = []
         self.monitoring_active = False
         self.monitor_thread = None
+        self.last_analyzed_at = None
         
         # Default thresholds
         self.thresholds = {
@@ -130,14 +131,36 @@ class ResourceMonitor:
         """Main monitoring loop"""
         while self.monitoring_active:
             try:
-                metrics = self.metrics_collector.collect_all_metrics()
-                if metrics["success"]:
-                    self._analyze_current_state(metrics["metrics"])
+                self._analyze_latest_metrics()
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {str(e)}")
             
             time.sleep(interval)
     
+    def _analyze_latest_metrics(self) -> bool:
+        """Analyze the collector's latest cycle once; returns whether anything was analyzed"""
+        collector = self.metrics_collector
+        if collector.last_collected_at is None:
+            collected = collector.collect_and_store()
+            if not collected["success"]:
+                return False
+        
+        collected_at = collector.last_collected_at
+        if collected_at is None or collected_at == self.last_analyzed_at:
+            # Nothing was collected since the previous analysis
+            return False
+        if time.time() - collected_at > collector.collection_interval:
+            logger.debug("Skipping resource analysis, the latest metrics are older than the collection interval")
+            return False
+        
+        # Analyze what the collector already stored instead of pulling the API again
+        metrics = collector.get_latest_metrics()
+        if not metrics:
+            return False
+        self._analyze_current_state(metrics)
+        self.last_analyzed_at = collected_at
+        return True
+    
     def _analyze_current_state(self, metrics: List[Dict]):
         """Analyze current system state and generate alerts if needed"""
         try:
@@ -240,7 +263,7 @@ class ResourceMonitor:
     def get_resource_summary(self) -> Dict[str, Any]:
         """Get a summary of current resource usage"""
         try:
-            metrics = self.metrics_collector.get_buffered_metrics(1)
+            metrics = self.metrics_collector.get_latest_metrics()
             if not metrics:
                 return {
                     "success": False,
@@ -252,7 +275,7 @@ class ResourceMonitor:
                 "nodes": {},
                 "storage": {},
                 "network": {},
-                "timestamp": metrics[-1]['timestamp']
+                "timestamp": max(metric['timestamp'] for metric in metrics)
             }
             
             for metric in metrics:
@@ -22,7 +22,8 @@ class SystemHealth:
         self.api = api
         self.monitoring = monitoring_integration
         self.metrics_collector = MetricsCollector(api, monitoring_integration)
-        self.resource_monitor = ResourceMonitor(api, monitoring_integration)
+        self.resource_monitor = ResourceMonitor(api, monitoring_integration,
+                                                metrics_collector=self.metrics_collector)
         self.alert_manager = AlertManager()
         self.health_checks_active = False
         self.health_check_thread = None
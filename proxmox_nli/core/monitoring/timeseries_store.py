@@ -0,0 +1,262 @@
+"""
+In-process time-series store for collected metrics.
+
+Every (metric type, entity) pair gets a fixed-size ring buffer made of a
+timestamp column plus one float column per numeric field. Appends overwrite
+the oldest sample in O(1), memory stays bounded no matter how long collection
+runs, and range and downsample queries work on NumPy slices instead of lists
+of per-sample dicts.
+"""
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Metric keys that identify the entity a sample belongs to
+LABEL_FIELDS = ('vm_id', 'node', 'storage', 'interface')
+# Metric keys that are neither labels nor values
+META_FIELDS = ('type', 'collector', 'timestamp')
+
+AGGREGATIONS = ('mean', 'max', 'min', 'sum', 'last')
+
+class RingBuffer:
+    """Fixed-capacity columnar buffer of (timestamp, values) samples"""
+
+    def __init__(self, fields: Sequence[str], capacity: int):
+        """
+        Initialize an empty buffer.
+
+        Args:
+            fields: Names of the value columns
+            capacity: Number of samples kept before the oldest is overwritten
+        """
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._values = np.full((capacity, len(self.fields)), np.nan, dtype=np.float64)
+        self._head = 0  # index the next sample is written to
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, values: Sequence[float]):
+        """Write one sample, overwriting the oldest when full"""
+        self._timestamps[self._head] = timestamp
+        self._values[self._head] = values
+        self._head = (self._head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def ordered(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (timestamps, values) oldest first"""
+        if self._size < self.capacity:
+            return self._timestamps[:self._size].copy(), self._values[:self._size].copy()
+        order = np.r_[self._head:self.capacity, 0:self._head]
+        return self._timestamps[order], self._values[order]
+
+    def last(self) -> Optional[Tuple[float, np.ndarray]]:
+        """Return the newest (timestamp, values) sample"""
+        if not self._size:
+            return None
+        index = (self._head - 1) % self.capacity
+        return float(self._timestamps[index]), self._values[index].copy()
+
+    def range(self, start: Optional[float] = None,
+              end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return samples with start <= timestamp <= end, oldest first"""
+        timestamps, values = self.ordered()
+        lo = 0 if start is None else np.searchsorted(timestamps, start, side='left')
+        hi = len(timestamps) if end is None else np.searchsorted(timestamps, end, side='right')
+        return timestamps[lo:hi], values[lo:hi]
+
+    @property
+    def nbytes(self) -> int:
+        return self._timestamps.nbytes + self._values.nbytes
+
+
+def downsample_arrays(timestamps: np.ndarray, values: np.ndarray, bucket_seconds: float,
+                      agg: str = 'mean') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregate sorted samples into fixed-width time buckets.
+
+    Returns the bucket start times and one aggregated row per non-empty
+    bucket. NaN values are ignored by mean, max, min and sum.
+    """
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation '{agg}', expected one of {AGGREGATIONS}")
+    if bucket_seconds <= 0:
+        raise ValueError("bucket_seconds must be positive")
+    if not len(timestamps):
+        return timestamps, values
+
+    buckets = np.floor(timestamps / bucket_seconds)
+    # Samples are sorted, so each bucket is a contiguous run starting at these offsets
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    bucket_times = buckets[starts] * bucket_seconds
+
+    if agg == 'last':
+        ends = np.r_[starts[1:], len(timestamps)] - 1
+        return bucket_times, values[ends]
+
+    present = ~np.isnan(values)
+    if agg in ('mean', 'sum'):
+        sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0)
+        if agg == 'sum':
+            return bucket_times, sums
+        counts = np.add.reduceat(present.astype(np.float64), starts, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return bucket_times, sums / counts
+    if agg == 'max':
+        return bucket_times, np.fmax.reduceat(values, starts, axis=0)
+    return bucket_times, np.fmin.reduceat(values, starts, axis=0)
+
+
+class TimeSeriesStore:
+    """Thread-safe collection of ring buffers keyed by (metric type, entity)"""
+
+    def __init__(self, capacity: int = 1440):
+        """
+        Initialize the store.
+
+        Args:
+            capacity: Samples kept per series; 1440 covers one day at the
+                collector's default 60 second interval
+        """
+        self.capacity = capacity
+        self._series: Dict[Tuple[str, str], RingBuffer] = {}
+        self._labels: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.samples_appended = 0
+
+    @staticmethod
+    def entity_id(metric: Dict[str, Any]) -> str:
+        """Derive the entity a collected metric describes"""
+        if metric.get('vm_id') is not None:
+            return str(metric['vm_id'])
+        if metric.get('storage') is not None:
+            return str(metric['storage'])
+        if metric.get('interface') is not None:
+            return f"{metric.get('node')}/{metric['interface']}"
+        return str(metric.get('node', ''))
+
+    def append(self, metric_type: str, entity: str, timestamp: float,
+               values: Dict[str, float], labels: Optional[Dict[str, Any]] = None):
+        """
+        Append one sample to a series, creating the series on first use.
+
+        The value columns are fixed when the series is created; fields that
+        appear later are ignored and missing fields are stored as NaN.
+        """
+        key = (metric_type, str(entity))
+        with self._lock:
+            buffer = self._series.get(key)
+            if buffer is None:
+                buffer = RingBuffer(sorted(values), self.capacity)
+                self._series[key] = buffer
+            if labels:
+                self._labels[key] = dict(labels)
+            buffer.append(timestamp, [values.get(field, np.nan) for field in buffer.fields])
+            self.samples_appended += 1
+
+    def append_metrics(self, metrics: List[Dict[str, Any]]):
+        """Append a batch of metric dicts as produced by MetricsCollector"""
+        for metric in metrics:
+            try:
+                values = {
+                    name: float(value) for name, value in metric.items()
+                    if name not in LABEL_FIELDS and name not in META_FIELDS
+                    and isinstance(value, (int, float)) and not isinstance(value, bool)
+                }
+                labels = {name: metric[name] for name in LABEL_FIELDS if name in metric}
+                self.append(metric['type'], self.entity_id(metric),
+                            float(metric.get('timestamp', 0)), values, labels)
+            except Exception as e:
+                logger.warning(f"Skipping metric that could not be stored: {str(e)}")
+
+    def series(self, metric_type: Optional[str] = None) -> List[Tuple[str, str]]:
+        """List (metric type, entity) keys, optionally for one metric type"""
+        with self._lock:
+            return [key for key in self._series if metric_type is None or key[0] == metric_type]
+
+    def query_range(self, metric_type: str, entity: str, start: Optional[float] = None,
+                    end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        Return the samples of one series between start and end (inclusive).
+
+        The result maps 'timestamp' and each field name to a NumPy array;
+        an unknown series gives an empty dict.
+        """
+        key = (metric_type, str(entity))
+        with self._lock:
+            buffer = self._series.get(key)
+            if buffer is None:
+                return {}
+            timestamps, values = buffer.range(start, end)
+            fields = buffer.fields
+        return self._columns(fields, timestamps, values)
+
+    def downsample(self, metric_type: str, entity: str, bucket_seconds: float, agg: str = 'mean',
+                   start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Return one series aggregated into bucket_seconds wide buckets"""
+        key = (metric_type, str(entity))
+        with self._lock:
+            buffer = self._series.get(key)
+            if buffer is None:
+                return {}
+            timestamps, values = buffer.range(start, end)
+            fields = buffer.fields
+        timestamps, values = downsample_arrays(timestamps, values, bucket_seconds, agg)
+        return self._columns(fields, timestamps, values)
+
+    def latest(self, metric_type: Optional[str] = None, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Return the newest sample of each series as a metric dict.
+
+        Args:
+            metric_type: Only include series of this type
+            since: Skip series whose newest sample is older than this timestamp,
+                e.g. VMs that no longer exist
+        """
+        results = []
+        with self._lock:
+            for key, buffer in self._series.items():
+                if metric_type is not None and key[0] != metric_type:
+                    continue
+                last = buffer.last()
+                if last is None or (since is not None and last[0] < since):
+                    continue
+                timestamp, values = last
+                metric = {'type': key[0], **self._labels.get(key, {})}
+                for field, value in zip(buffer.fields, values):
+                    metric[field] = None if np.isnan(value) else float(value)
+                metric['timestamp'] = int(timestamp)
+                results.append(metric)
+        return results
+
+    def clear(self):
+        """Drop every series"""
+        with self._lock:
+            self._series.clear()
+            self._labels.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return series count, stored samples and memory used"""
+        with self._lock:
+            return {
+                'series': len(self._series),
+                'capacity': self.capacity,
+                'samples': sum(len(buffer) for buffer in self._series.values()),
+                'samples_appended': self.samples_appended,
+                'bytes': sum(buffer.nbytes for buffer in self._series.values())
+            }
+
+    @staticmethod
+    def _columns(fields: Sequence[str], timestamps: np.ndarray, values: np.ndarray) -> Dict[str, np.ndarray]:
+        columns = {'timestamp': timestamps}
+        for index, field in enumerate(fields):
+            columns[field] = values[:, index]
+        return columns
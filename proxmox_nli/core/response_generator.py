@@ -4,7 +4,7 @@ Response generator module for producing natural language responses.
 import os
 import json
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterator
 
 class ResponseGenerator:
     def __init__(self):
@@ -57,6 +57,42 @@ class ResponseGenerator:
         response = self._generate_basic_response(intent, result)
         return response
         
+    def generate_response_stream(self, query, intent, result) -> Iterator[str]:
+        """Generate a natural language response as a stream of text fragments
+        
+        Ollama output is yielded token by token as it is generated. Hugging Face
+        and templated responses are yielded as a single fragment.
+        """
+        if not result:
+            yield "I'm sorry, I couldn't process that request."
+            return
+        
+        if result.get('error'):
+            yield f"Error: {result['error']}"
+            return
+        
+        if self.use_huggingface and self.huggingface_client:
+            try:
+                enhanced_response = self.huggingface_client.enhance_response(query, intent, result)
+                if enhanced_response:
+                    yield enhanced_response
+                    return
+            except Exception as e:
+                print(f"Error using Hugging Face for response generation: {e}")
+        
+        if self.use_ollama and self.ollama_client:
+            streamed = False
+            try:
+                for token in self.ollama_client.stream_enhance_response(query, intent, result):
+                    streamed = True
+                    yield token
+            except Exception as e:
+                print(f"Error using Ollama for response generation: {e}")
+            if streamed:
+                return
+        
+        yield self._generate_basic_response(intent, result)
+        
     def _generate_basic_response(self, intent, result):
         """Generate a basic response without LLM assistance"""
         if intent == "list_vms":
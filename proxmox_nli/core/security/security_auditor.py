@@ -9,20 +9,24 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import re
 
+from ..diagnostic_runner import DiagnosticRunner
+
 logger = logging.getLogger(__name__)
 
 class SecurityAuditor:
     """Performs security audits and generates reports"""
     
-    def __init__(self, api, base_nli=None):
+    def __init__(self, api, base_nli=None, runner: Optional[DiagnosticRunner] = None):
         """Initialize the security auditor
         
         Args:
             api: Proxmox API client
             base_nli: Base NLI instance for accessing other components
+            runner: Diagnostic runner used to run the audit components concurrently
         """
         self.api = api
         self.base_nli = base_nli
+        self.runner = runner or DiagnosticRunner()
         self.audit_history = []
         self.audit_storage_path = os.path.join(os.path.dirname(__file__), "audit_history")
         
@@ -45,32 +49,28 @@ class SecurityAuditor:
             "recommendations": []
         }
         
-        # Audit system updates
-        update_audit = self._audit_system_updates()
-        audit_result["components"]["updates"] = update_audit
-        audit_result["findings"].extend(update_audit.get("findings", []))
-        
-        # Audit firewall
-        firewall_audit = self._audit_firewall()
-        audit_result["components"]["firewall"] = firewall_audit
-        audit_result["findings"].extend(firewall_audit.get("findings", []))
-        
-        # Audit user permissions
-        permissions_audit = self._audit_permissions()
-        audit_result["components"]["permissions"] = permissions_audit
-        audit_result["findings"].extend(permissions_audit.get("findings", []))
-        
-        # Audit SSL certificates
-        certificates_audit = self._audit_certificates()
-        audit_result["components"]["certificates"] = certificates_audit
-        audit_result["findings"].extend(certificates_audit.get("findings", []))
+        # The components are independent API reads, so audit them concurrently
+        probes = self.runner.run_probes({
+            "updates": self._audit_system_updates,
+            "firewall": self._audit_firewall,
+            "permissions": self._audit_permissions,
+            "certificates": self._audit_certificates
+        })
+        audit_result["timings"] = {}
+        
+        for component, probe in probes.items():
+            if probe["success"]:
+                component_audit = probe["result"]
+            else:
+                component_audit = {"score": 0, "findings": [], "error": probe["error"]}
+            audit_result["components"][component] = component_audit
+            audit_result["findings"].extend(component_audit.get("findings", []))
+            audit_result["timings"][component] = probe["duration"]
         
         # Calculate overall score and risk level
         component_scores = [
-            update_audit.get("score", 0),
-            firewall_audit.get("score", 0),
-            permissions_audit.get("score", 0),
-            certificates_audit.get("score", 0)
+            component_audit.get("score", 0)
+            for component_audit in audit_result["components"].values()
         ]
         
         if component_scores:
@@ -0,0 +1,355 @@
+"""
+Shared SQLite connection management for the sqlite-backed stores.
+
+Each database file gets one SQLiteConnectionManager. It keeps a persistent
+connection per thread (instead of opening a new connection in every method;
+an in-memory database is private to its connection, so ":memory:" uses one
+shared connection serialized by a lock instead),
+configures WAL journaling with synchronous=NORMAL, relies on the sqlite3
+statement cache to reuse prepared statements, and offers a write queue that
+batches fire-and-forget inserts into a single transaction. A queued insert
+can ask for its row id, which is assigned by the database when the batch
+is flushed.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..utils.query_profiler import stage
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_NO_LOCK = nullcontext()
+
+class PendingRowId:
+    """Row id of a queued insert, assigned when the write is flushed"""
+
+    def __init__(self, manager: "SQLiteConnectionManager"):
+        self._manager = manager
+        # None while queued; -1 if the write failed
+        self.value: Optional[int] = None
+
+    def get(self) -> int:
+        """Return the row id, flushing the write queue first if the insert is still queued"""
+        if self.value is None:
+            self._manager.flush()
+        return self.value
+
+    def __int__(self) -> int:
+        return self.get()
+
+    __index__ = __int__
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (int, PendingRowId)):
+            return self.get() == int(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.get())
+
+    def __repr__(self) -> str:
+        return f"PendingRowId({self.value if self.value is not None else 'queued'})"
+
+class SQLiteConnectionManager:
+    """Thread-aware persistent connections and batched writes for one database file"""
+
+    def __init__(self, db_path: str, batch_size: int = 100, flush_interval: float = 1.0,
+                 statement_cache_size: int = 256, busy_timeout: float = 5.0):
+        """
+        Initialize the connection manager.
+
+        Args:
+            db_path: Path to the SQLite database file
+            batch_size: Number of queued writes that triggers an immediate flush
+            flush_interval: Maximum seconds a queued write waits before being flushed
+            statement_cache_size: Prepared statements cached per connection
+            busy_timeout: Seconds to wait for a lock held by another connection
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.statement_cache_size = statement_cache_size
+        self.busy_timeout = busy_timeout
+
+        self._local = threading.local()
+        self._in_memory = db_path == ':memory:'
+        self._shared_conn: Optional[sqlite3.Connection] = None
+        self._shared_lock = threading.RLock()
+        # thread ident -> (thread, connection), used to close connections of finished threads
+        self._connections: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._connections_lock = threading.Lock()
+
+        self._pending: List[Tuple[str, Tuple[Any, ...], Optional[PendingRowId]]] = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        # Earliest time a queued write must be flushed by, and whether a full batch is waiting
+        self._flush_deadline: Optional[float] = None
+        self._flush_requested = False
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+
+        self.connections_opened = 0
+        self.writes_queued = 0
+        self.writes_flushed = 0
+        self.flushes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new connection"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            cached_statements=self.statement_cache_size,
+            check_same_thread=False
+        )
+        if not self._in_memory:
+            conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use"""
+        if self._in_memory:
+            with self._shared_lock:
+                if self._shared_conn is None:
+                    self._shared_conn = self._connect()
+                    self.connections_opened += 1
+                return self._shared_conn
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+
+        conn = self._connect()
+        self._local.conn = conn
+        current = threading.current_thread()
+        with self._connections_lock:
+            # Close connections left behind by threads that have exited
+            for ident, (thread, stale) in list(self._connections.items()):
+                if not thread.is_alive():
+                    stale.close()
+                    del self._connections[ident]
+            self._connections[current.ident] = (current, conn)
+            self.connections_opened += 1
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Use the calling thread's persistent connection.
+
+        Behaves like ``with sqlite3.connect(path) as conn``: the transaction is
+        committed on success and rolled back on error, but the connection stays
+        open for the next call. A row_factory set inside the block is reset
+        when it exits. For ":memory:" the shared connection is held for the
+        whole block.
+
+        Blocks nested on the same thread share the connection and join the
+        outer transaction: only the outermost block commits or rolls back.
+        """
+        with self._shared_lock if self._in_memory else _NO_LOCK:
+            conn = self._thread_connection()
+            depth = getattr(self._local, 'depth', 0)
+            previous_row_factory = conn.row_factory
+            conn.row_factory = None
+            self._local.depth = depth + 1
+            try:
+                with conn if depth == 0 else nullcontext(conn):
+                    yield conn
+            finally:
+                self._local.depth = depth
+                conn.row_factory = previous_row_factory
+
+    @contextmanager
+    def write_connection(self) -> Iterator[sqlite3.Connection]:
+        """Use connection() for a synchronous write, timed as the query's 'sqlite_write' stage"""
+        with stage('sqlite_write'), self.connection() as conn:
+            yield conn
+
+    def execute_write(self, sql: str, params: Sequence[Any] = (), batch_size: Optional[int] = None,
+                      flush_interval: Optional[float] = None, rowid: bool = False) -> Optional[PendingRowId]:
+        """
+        Queue a write to be applied in the next batched transaction.
+
+        Args:
+            sql: Statement to execute
+            params: Statement parameters
+            batch_size: Queue length at which this write triggers a flush;
+                defaults to the manager's batch_size
+            flush_interval: Maximum seconds this write waits before being
+                flushed; defaults to the manager's flush_interval
+            rowid: Return a PendingRowId that receives the insert's row id
+                when the batch is flushed
+
+        Returns:
+            The pending row id if requested, else None
+
+        Raises:
+            RuntimeError: If the manager has been closed; get a new one from
+                get_connection_manager
+        """
+        deadline = time.monotonic() + (self.flush_interval if flush_interval is None else flush_interval)
+        row_id = PendingRowId(self) if rowid else None
+        with self._pending_lock:
+            # Checked under the lock so close() always flushes a write that got in
+            if self._closed:
+                raise RuntimeError(f"Connection manager for {self.db_path} is closed")
+            self._pending.append((sql, tuple(params), row_id))
+            self.writes_queued += 1
+            wake = self._flush_deadline is None or deadline < self._flush_deadline
+            if wake:
+                self._flush_deadline = deadline
+            if len(self._pending) >= (batch_size or self.batch_size):
+                self._flush_requested = wake = True
+        self._ensure_flusher()
+        if wake:
+            self._flush_event.set()
+        return row_id
+
+    def flush(self) -> int:
+        """Apply all queued writes in one transaction; returns the number applied"""
+        with self._flush_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+                self._flush_deadline = None
+                self._flush_requested = False
+            if not batch:
+                return 0
+
+            # Group consecutive statements with the same SQL for executemany;
+            # inserts that report their row id are executed on their own
+            groups: List[Tuple[str, List[Tuple[Any, ...]], Optional[PendingRowId]]] = []
+            for sql, params, row_id in batch:
+                if groups and groups[-1][0] == sql and row_id is None and groups[-1][2] is None:
+                    groups[-1][1].append(params)
+                else:
+                    groups.append((sql, [params], row_id))
+
+            try:
+                # On the flusher thread there is no query trace, so the stage is
+                # recorded under intent "none"; a flush forced by a read is
+                # attributed to that read's query
+                assigned = []
+                with stage('sqlite_write'), self.connection() as conn:
+                    for sql, rows, row_id in groups:
+                        if row_id is None:
+                            conn.executemany(sql, rows)
+                        else:
+                            assigned.append((row_id, conn.execute(sql, rows[0]).lastrowid))
+                for row_id, value in assigned:
+                    row_id.value = value
+                applied = len(batch)
+            except Exception as e:
+                # One bad row should not lose the whole batch; retry row by row
+                logger.warning(f"Batched flush to {self.db_path} failed ({e}), retrying writes individually")
+                applied = 0
+                for sql, params, row_id in batch:
+                    try:
+                        with self.connection() as conn:
+                            value = conn.execute(sql, params).lastrowid
+                        applied += 1
+                    except Exception as row_error:
+                        value = -1
+                        logger.error(f"Failed to apply queued write to {self.db_path}: {row_error}")
+                    if row_id is not None:
+                        row_id.value = value
+            self.writes_flushed += applied
+            self.flushes += 1
+            return applied
+
+    def pending_writes(self) -> int:
+        """Number of queued writes not yet flushed"""
+        with self._pending_lock:
+            return len(self._pending)
+
+    def _ensure_flusher(self):
+        """Start the background flush thread on first use"""
+        if self._flusher is not None or self._closed:
+            return
+        with self._pending_lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop,
+                name=f"sqlite-writer-{os.path.basename(self.db_path)}",
+                daemon=True
+            )
+            self._flusher.start()
+
+    def _flush_loop(self):
+        """Flush queued writes when the earliest one is due or the batch is full"""
+        while not self._closed:
+            with self._pending_lock:
+                deadline = self._flush_deadline
+            self._flush_event.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            self._flush_event.clear()
+            with self._pending_lock:
+                due = self._flush_requested or (
+                    self._flush_deadline is not None and time.monotonic() >= self._flush_deadline)
+            if due:
+                self.flush()
+
+    def close(self):
+        """Flush queued writes and close every connection; later writes are rejected"""
+        with self._pending_lock:
+            self._closed = True
+        self._flush_event.set()
+        self.flush()
+        with self._connections_lock:
+            for _, conn in self._connections.values():
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+        with self._shared_lock:
+            if self._shared_conn is not None:
+                self._shared_conn.close()
+                self._shared_conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return connection and write-queue counters"""
+        with self._connections_lock:
+            open_connections = len(self._connections) + (self._shared_conn is not None)
+        return {
+            'db_path': self.db_path,
+            'open_connections': open_connections,
+            'connections_opened': self.connections_opened,
+            'writes_queued': self.writes_queued,
+            'writes_flushed': self.writes_flushed,
+            'pending_writes': self.pending_writes(),
+            'flushes': self.flushes
+        }
+
+
+_managers: Dict[str, SQLiteConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+def get_connection_manager(db_path: str) -> SQLiteConnectionManager:
+    """Return the shared connection manager for a database file"""
+    key = db_path if db_path == ':memory:' else os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None or manager._closed:
+            manager = SQLiteConnectionManager(db_path)
+            _managers[key] = manager
+        return manager
+
+def close_all_managers():
+    """Flush and close every shared connection manager"""
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.close()
+
+atexit.register(close_all_managers)
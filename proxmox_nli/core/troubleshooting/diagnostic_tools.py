@@ -3,24 +3,27 @@ Diagnostic Tools for Proxmox NLI.
 Provides tools for diagnosing common issues in Proxmox environments.
 """
 import logging
-import subprocess
 import os
 import json
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+from ..diagnostic_runner import DiagnosticRunner, in_session
+
 logger = logging.getLogger(__name__)
 
 class DiagnosticTools:
     """Collection of diagnostic tools for troubleshooting Proxmox environments."""
     
-    def __init__(self, api):
+    def __init__(self, api, runner: Optional[DiagnosticRunner] = None):
         """Initialize the diagnostic tools.
         
         Args:
             api: Proxmox API client
+            runner: Diagnostic runner used to execute commands
         """
         self.api = api
+        self.runner = runner or DiagnosticRunner()
         
         # Common diagnostic commands
         self.diagnostic_commands = {
@@ -85,6 +88,7 @@ class DiagnosticTools:
                 "recommendations": ["Please specify a valid diagnostic type: network, storage, system, proxmox"]
             }
     
+    @in_session
     def check_network(self, context: Dict = None) -> Dict:
         """Check network connectivity and configuration.
         
@@ -103,6 +107,10 @@ class DiagnosticTools:
         }
         
         try:
+            # Start every command up front; the checks below read them in order
+            self._prefetch("network", ["connectivity", "dns", "interfaces", "routes", "open_ports", "firewall"],
+                           target=context.get("target", "8.8.8.8"), domain=context.get("domain", "google.com"))
+            
             # Check internet connectivity
             target = context.get("target", "8.8.8.8")  # Default to Google DNS
             ping_cmd = self.diagnostic_commands["network"]["connectivity"].format(target=target)
@@ -202,6 +210,7 @@ class DiagnosticTools:
         
         return results
     
+    @in_session
     def check_storage(self, node: str = "pve", storage_id: str = None) -> Dict:
         """Check storage health and configuration.
         
@@ -220,6 +229,8 @@ class DiagnosticTools:
         }
         
         try:
+            self._prefetch("storage", ["disk_usage", "disk_io", "zfs_status"])
+            
             # Get storage information from Proxmox API
             if storage_id:
                 storage_info = self.api.nodes(node).storage(storage_id).status.get()
@@ -332,6 +343,7 @@ class DiagnosticTools:
         
         return results
     
+    @in_session
     def check_system(self, node: str = "pve") -> Dict:
         """Check system health and configuration.
         
@@ -349,6 +361,8 @@ class DiagnosticTools:
         }
         
         try:
+            self._prefetch("system", ["cpu_usage", "memory_usage", "process_list", "kernel_messages"])
+            
             # Get node status from Proxmox API
             node_status = self.api.nodes(node).status.get()
             results["node_status"] = node_status
@@ -430,6 +444,7 @@ class DiagnosticTools:
         
         return results
     
+    @in_session
     def check_proxmox(self, node: str = "pve") -> Dict:
         """Check Proxmox-specific configuration and status.
         
@@ -447,6 +462,8 @@ class DiagnosticTools:
         }
         
         try:
+            self._prefetch("proxmox", ["cluster_status", "node_status", "vm_list", "container_list", "storage_status"])
+            
             # Check cluster status
             cluster_status_cmd = self.diagnostic_commands["proxmox"]["cluster_status"]
             cluster_status_output = self._run_command(cluster_status_cmd)
@@ -533,11 +550,10 @@ class DiagnosticTools:
         
         return results
     
+    def _prefetch(self, category: str, names: List[str], **params):
+        """Start diagnostic commands in the background of the current session."""
+        self.runner.prefetch(self.diagnostic_commands[category][name].format(**params) for name in names)
+    
     def _run_command(self, command: str) -> str:
         """Run a shell command and return the output."""
-        try:
-            result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-            return result.stdout
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Command execution failed: {str(e)}")
-            return e.stdout if e.stdout else ""
+        return self.runner.run_command(command)
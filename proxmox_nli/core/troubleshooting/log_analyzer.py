@@ -3,25 +3,34 @@ Log Analyzer for Proxmox NLI.
 Provides natural language analysis of system and service logs.
 """
 import logging
-import re
 import os
 import json
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 import subprocess
 
+from .log_index import UNCATEGORIZED, LogIssueIndex, parse_period
+from .log_stream import JournalReader, LogClassifier, LogStats
+
 logger = logging.getLogger(__name__)
 
 class LogAnalyzer:
     """Analyzes logs using natural language processing to identify issues and patterns."""
     
-    def __init__(self, api):
+    # Cursor name of the unfiltered journal stream that feeds the issue index
+    INDEX_SOURCE = "journal"
+    
+    def __init__(self, api, data_dir: str = None):
         """Initialize the log analyzer.
         
         Args:
             api: Proxmox API client
+            data_dir: Directory for the persistent issue index
         """
         self.api = api
+        self.data_dir = data_dir or os.path.expanduser(os.path.join("~", ".proxmox_nli", "troubleshooting"))
         
         # Common error patterns to look for in logs
         self.error_patterns = {
@@ -79,12 +88,27 @@ class LogAnalyzer:
             "nginx": "/var/log/nginx/error.log",
             "docker": "/var/log/docker.log"
         }
+        
+        # Patterns are compiled once into combined regexes shared by all analyses
+        self.classifier = LogClassifier(self.error_patterns)
+        self.journal_reader = JournalReader()
+        self.sample_size = 50
+        
+        # Issues already read from the journal are kept in an index, so repeated
+        # analyses only read lines written since the previous one
+        try:
+            os.makedirs(self.data_dir, exist_ok=True)
+            self.issue_index = LogIssueIndex(os.path.join(self.data_dir, 'log_index.db'))
+        except Exception as e:
+            logger.error(f"Error opening log issue index: {str(e)}")
+            self.issue_index = None
+        self._index_lock = threading.Lock()
     
     def analyze_logs(self, log_type: str, context: Dict = None) -> Dict:
         """Analyze logs using natural language processing.
         
         Args:
-            log_type: Type of logs to analyze (system, vm, container, service)
+            log_type: Type of logs to analyze (system, history, vm, container, service)
             context: Additional context for log analysis (e.g., VM ID, service name)
             
         Returns:
@@ -94,6 +118,8 @@ class LogAnalyzer:
         
         if log_type == "system":
             return self.analyze_system_logs(context)
+        elif log_type == "history":
+            return self.query_issue_history(context)
         elif log_type == "vm":
             return self.analyze_vm_logs(context.get("vm_id"), context.get("node", "pve"))
         elif log_type == "container":
@@ -104,7 +130,7 @@ class LogAnalyzer:
             return {
                 "success": False,
                 "message": f"Unknown log type: {log_type}",
-                "recommendations": ["Please specify a valid log type: system, vm, container, service"]
+                "recommendations": ["Please specify a valid log type: system, history, vm, container, service"]
             }
     
     def analyze_system_logs(self, context: Dict = None) -> Dict:
@@ -128,41 +154,42 @@ class LogAnalyzer:
         
         # Determine time period for log analysis
         time_period = context.get("time_period", "24h")
-        since_arg = f"--since=\"{time_period}\""
         
         try:
-            # Analyze syslog
-            syslog_cmd = f"journalctl -p err {since_arg} --no-pager"
-            syslog_output = self._run_command(syslog_cmd)
-            
-            # Extract errors and warnings
-            errors, warnings = self._extract_issues(syslog_output)
-            results["errors"].extend(errors)
-            results["warnings"].extend(warnings)
+            window = parse_period(time_period)
+            filtered = any(context.get(key) for key in ("identifiers", "unit")) or \
+                context.get("priority", "warning") != "warning"
             
-            # Analyze auth log
-            auth_cmd = f"journalctl -p err -t auth {since_arg} --no-pager"
-            auth_output = self._run_command(auth_cmd)
-            
-            # Extract auth errors
-            auth_errors, auth_warnings = self._extract_issues(auth_output)
-            results["errors"].extend(auth_errors)
-            results["warnings"].extend(auth_warnings)
-            
-            # Analyze Proxmox logs
-            proxmox_cmd = f"journalctl -p err -t pve {since_arg} --no-pager"
-            proxmox_output = self._run_command(proxmox_cmd)
+            if self.issue_index is not None and window is not None and not filtered:
+                # Read only the lines written since the last analysis; the rest
+                # of the window comes from the issue index
+                stats = self._update_index(time_period)
+                self._results_from_index(results, stats, time.time() - window)
+            else:
+                # Stream the journal through one process instead of buffering
+                # it; only counts and bounded samples are kept
+                stats = LogStats(self.classifier, sample_size=self.sample_size)
+                stats.add_entries(self.journal_reader.entries(
+                    since=time_period,
+                    priority=context.get("priority", "warning"),
+                    identifiers=context.get("identifiers"),
+                    unit=context.get("unit")
+                ))
+                
+                results["errors"] = stats.errors()
+                results["warnings"] = stats.warnings()
+                results["error_count"] = stats.counts["error"]
+                results["warning_count"] = stats.counts["warning"]
+                results["sources"] = stats.source_counts
+                results["categories"] = stats.categories()
+                results["category_counts"] = stats.category_counts
             
-            # Extract Proxmox errors
-            proxmox_errors, proxmox_warnings = self._extract_issues(proxmox_output)
-            results["errors"].extend(proxmox_errors)
-            results["warnings"].extend(proxmox_warnings)
+            results["lines_read"] = stats.lines_read
+            results["top_messages"] = stats.top_messages()
             
             # Generate summary
-            results["summary"] = self._generate_log_summary(results["errors"], results["warnings"])
-            
-            # Categorize issues
-            results["categories"] = self._categorize_issues(results["errors"] + results["warnings"])
+            results["summary"] = self._generate_log_summary(
+                results["errors"], results["warnings"], results["error_count"], results["warning_count"])
             
         except Exception as e:
             logger.error(f"Error analyzing system logs: {str(e)}")
@@ -171,6 +198,122 @@ class LogAnalyzer:
         
         return results
     
+    def query_issue_history(self, context: Dict = None) -> Dict:
+        """Answer questions about past log issues from the issue index.
+        
+        Args:
+            context: Query context with time_period (default 7d) and optional
+                category, unit and severity filters
+            
+        Returns:
+            Dict with issue counts grouped by category, unit and severity
+        """
+        context = context or {}
+        time_period = context.get("time_period", "7d")
+        results = {
+            "success": True,
+            "message": f"Queried log issues of the last {time_period}",
+            "time_period": time_period,
+            "issues": []
+        }
+        
+        window = parse_period(time_period)
+        if self.issue_index is None or window is None:
+            results["success"] = False
+            results["message"] = "Log issue history is only available for relative periods such as 24h or 7d"
+            return results
+        
+        try:
+            # Index whatever was logged since the last run before answering
+            self._update_index(time_period)
+            since = time.time() - window
+            results["issues"] = self.issue_index.query(
+                since,
+                category=context.get("category"),
+                unit=context.get("unit"),
+                severity=context.get("severity"),
+                group_by=("category", "unit", "severity")
+            )
+            counts = {issue["severity"]: 0 for issue in results["issues"]}
+            for issue in results["issues"]:
+                counts[issue["severity"]] += issue["count"]
+            results["error_count"] = counts.get("error", 0)
+            results["warning_count"] = counts.get("warning", 0)
+            results["summary"] = (
+                f"Found {results['error_count']} errors and {results['warning_count']} warnings "
+                f"in the last {time_period} across {len(results['issues'])} category/unit groups."
+            )
+        except Exception as e:
+            logger.error(f"Error querying log issue history: {str(e)}")
+            results["success"] = False
+            results["message"] = f"Error querying log issue history: {str(e)}"
+        
+        return results
+    
+    def _update_index(self, period: str = "24h") -> LogStats:
+        """Bring the issue index up to date for a window ending now.
+        
+        Lines written since the stored cursor are added, and when the window
+        starts before the range indexed so far, the missing older part is read
+        with --since/--until. Updates are serialized, so concurrent analyses do
+        not index the same lines twice.
+        
+        Args:
+            period: Window the index must cover, e.g. "24h" or "7d"
+        """
+        with self._index_lock:
+            start = int(time.time() - parse_period(period))
+            cursor, covered_since = self.issue_index.get_state(self.INDEX_SOURCE)
+            backfilled = 0
+            
+            if cursor is not None and (covered_since is None or start < covered_since):
+                # Backfill the older part of the window; the cursor stays put
+                batch = self.issue_index.new_batch()
+                backfill = LogStats(self.classifier, sample_size=self.sample_size, on_issue=batch.add)
+                until = covered_since if covered_since is not None else time.time()
+                backfill.add_entries(
+                    entry for entry in self.journal_reader.entries(
+                        since=f"@{start}", until=f"@{int(until)}", priority="warning")
+                    if entry["timestamp"] is None or entry["timestamp"] < until
+                )
+                batch.cursor = cursor
+                self.issue_index.record(self.INDEX_SOURCE, batch, covered_since=start)
+                backfilled = backfill.lines_read
+            
+            batch = self.issue_index.new_batch()
+            stats = LogStats(self.classifier, sample_size=self.sample_size, on_issue=batch.add)
+            stats.add_entries(self.journal_reader.entries(since=f"@{start}", priority="warning", after_cursor=cursor))
+            batch.cursor = stats.last_cursor
+            self.issue_index.record(self.INDEX_SOURCE, batch, covered_since=start if cursor is None else None)
+            stats.lines_read += backfilled
+            return stats
+    
+    def _results_from_index(self, results: Dict, stats: LogStats, since: float):
+        """Fill analysis results from the issue index, preferring samples of the lines just read."""
+        counts = {row["severity"]: row["count"] for row in self.issue_index.query(since, group_by=("severity",))}
+        results["error_count"] = counts.get("error", 0)
+        results["warning_count"] = counts.get("warning", 0)
+        
+        for severity, key, fresh in (("error", "errors", stats.errors()), ("warning", "warnings", stats.warnings())):
+            samples = list(fresh)
+            for line in self.issue_index.recent_samples(since, severity, self.sample_size):
+                if len(samples) >= self.sample_size:
+                    break
+                if line not in samples:
+                    samples.append(line)
+            results[key] = samples
+        
+        fresh_categories = stats.categories()
+        results["categories"] = {}
+        results["category_counts"] = {}
+        for row in self.issue_index.query(since, group_by=("category",)):
+            if row["category"] == UNCATEGORIZED:
+                continue
+            results["category_counts"][row["category"]] = row["count"]
+            results["categories"][row["category"]] = fresh_categories.get(row["category"]) or [row["sample"]]
+        
+        results["sources"] = {row["unit"]: row["count"] for row in self.issue_index.query(since, group_by=("unit",))}
+    
     def analyze_vm_logs(self, vm_id: str, node: str = "pve") -> Dict:
         """Analyze VM logs for issues.
         
@@ -333,38 +476,43 @@ class LogAnalyzer:
             line = line.strip()
             if not line:
                 continue
-                
-            # Check for error indicators
-            if any(re.search(r"error", line, re.IGNORECASE) for r in ["error", "err", "exception", "fail", "critical"]):
+            
+            severity = self.classifier.severity(line)
+            if severity == "error":
                 errors.append(line)
-            # Check for warning indicators
-            elif any(re.search(r"warn", line, re.IGNORECASE) for r in ["warning", "warn"]):
+            elif severity == "warning":
                 warnings.append(line)
         
         return errors, warnings
     
     def _categorize_issues(self, issues: List[str]) -> Dict[str, List[str]]:
         """Categorize issues based on predefined patterns."""
-        categories = {category: [] for category in self.error_patterns.keys()}
+        categories = {}
         
         for issue in issues:
-            for category, patterns in self.error_patterns.items():
-                if any(re.search(pattern, issue, re.IGNORECASE) for pattern in patterns):
-                    categories[category].append(issue)
-                    break
+            category = self.classifier.category(issue)
+            if category is not None:
+                categories.setdefault(category, []).append(issue)
         
-        # Remove empty categories
-        return {k: v for k, v in categories.items() if v}
+        return categories
     
-    def _generate_log_summary(self, errors: List[str], warnings: List[str]) -> str:
-        """Generate a natural language summary of log analysis."""
+    def _generate_log_summary(self, errors: List[str], warnings: List[str],
+                              error_count: Optional[int] = None, warning_count: Optional[int] = None) -> str:
+        """Generate a natural language summary of log analysis.
+        
+        The counts default to the list lengths; streamed analyses pass the full
+        counts since the lists only hold a bounded sample.
+        """
+        error_count = len(errors) if error_count is None else error_count
+        warning_count = len(warnings) if warning_count is None else warning_count
+        
         if not errors and not warnings:
             return "No issues found in the logs. The system appears to be functioning normally."
         
         summary_parts = []
         
         if errors:
-            summary_parts.append(f"Found {len(errors)} errors in the logs.")
+            summary_parts.append(f"Found {error_count} errors in the logs.")
             
             # Add details about the most recent errors (up to 3)
             if len(errors) > 0:
@@ -373,7 +521,7 @@ class LogAnalyzer:
                     summary_parts.append(f"  {i+1}. {error}")
         
         if warnings:
-            summary_parts.append(f"Found {len(warnings)} warnings in the logs.")
+            summary_parts.append(f"Found {warning_count} warnings in the logs.")
             
             # Add details about the most recent warnings (up to 3)
             if len(warnings) > 0:
@@ -0,0 +1,237 @@
+"""
+Persistent log issue index for Proxmox NLI.
+Stores journal cursors per log source and classified issue counts keyed by
+time bucket, category, unit and severity, so repeated analyses only read new
+journal lines and historical questions are answered from the index.
+"""
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..sqlite_pool import get_connection_manager
+
+logger = logging.getLogger(__name__)
+
+UNCATEGORIZED = "uncategorized"
+UNKNOWN_UNIT = "unknown"
+
+_PERIOD = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(s|m|min|h|d|w)?\s*$", re.IGNORECASE)
+_PERIOD_SECONDS = {"s": 1, "m": 60, "min": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_period(period: str) -> Optional[float]:
+    """Convert a relative period such as '30m', '24h' or '7d' to seconds; None if not relative"""
+    match = _PERIOD.match(str(period))
+    if not match:
+        return None
+    unit = (match.group(2) or "s").lower()
+    return float(match.group(1)) * _PERIOD_SECONDS[unit]
+
+
+class IssueBatch:
+    """Issues classified during one analysis, aggregated by index key before writing"""
+
+    def __init__(self, bucket_seconds: int):
+        self.bucket_seconds = bucket_seconds
+        # (bucket, category, unit, severity) -> [count, first_seen, last_seen, sample]
+        self.rows: Dict[Tuple[int, str, str, str], List[Any]] = {}
+        self.cursor: Optional[str] = None
+
+    def add(self, entry: Dict[str, Any], severity: str, category: Optional[str]):
+        timestamp = entry.get("timestamp") or time.time()
+        bucket = int(timestamp // self.bucket_seconds * self.bucket_seconds)
+        unit = entry.get("unit") or entry.get("identifier") or UNKNOWN_UNIT
+        key = (bucket, category or UNCATEGORIZED, unit, severity)
+        row = self.rows.get(key)
+        if row is None:
+            self.rows[key] = [1, timestamp, timestamp, entry["message"]]
+        else:
+            row[0] += 1
+            row[1] = min(row[1], timestamp)
+            if timestamp >= row[2]:
+                row[2] = timestamp
+                row[3] = entry["message"]
+
+
+class LogIssueIndex:
+    """SQLite index of classified log issues and the journal cursor of each source"""
+
+    def __init__(self, db_path: str, bucket_seconds: int = 3600, retention_days: int = 90):
+        """
+        Initialize the index.
+
+        Args:
+            db_path: Path to the SQLite database file
+            bucket_seconds: Width of the time buckets issues are counted in
+            retention_days: Buckets older than this are pruned when new issues are recorded
+        """
+        self.db_path = db_path
+        self.bucket_seconds = bucket_seconds
+        self.retention_days = retention_days
+        self._db = get_connection_manager(db_path)
+        self._init_db()
+
+    def _init_db(self):
+        """Create the index tables"""
+        with self._db.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS log_cursors (
+                    source TEXT PRIMARY KEY,
+                    cursor TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    covered_since REAL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS log_issues (
+                    bucket INTEGER NOT NULL,
+                    category TEXT NOT NULL,
+                    unit TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    sample TEXT,
+                    PRIMARY KEY (bucket, category, unit, severity)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_log_issues_category ON log_issues (category, bucket)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_log_issues_unit ON log_issues (unit, bucket)')
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(log_cursors)')]
+            if 'covered_since' not in columns:
+                # Indexes created before coverage was tracked: everything indexed
+                # lies after the oldest issue seen
+                conn.execute('ALTER TABLE log_cursors ADD COLUMN covered_since REAL')
+                conn.execute('''
+                    UPDATE log_cursors
+                    SET covered_since = COALESCE((SELECT MIN(first_seen) FROM log_issues), updated_at)
+                ''')
+
+    def new_batch(self) -> IssueBatch:
+        return IssueBatch(self.bucket_seconds)
+
+    def get_cursor(self, source: str) -> Optional[str]:
+        """Return the journal cursor after which the source has not been indexed yet"""
+        return self.get_state(source)[0]
+
+    def get_state(self, source: str) -> Tuple[Optional[str], Optional[float]]:
+        """Return the source's cursor and the start of the time range indexed up to it"""
+        with self._db.connection() as conn:
+            row = conn.execute('SELECT cursor, covered_since FROM log_cursors WHERE source = ?',
+                               (source,)).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def record(self, source: str, batch: IssueBatch, covered_since: Optional[float] = None) -> int:
+        """
+        Merge a batch into the index and advance the source's cursor.
+
+        Both happen in one transaction, so an interrupted analysis neither
+        loses nor double counts lines. Returns the number of issues recorded.
+
+        Args:
+            source: Log source name
+            batch: Issues to merge; batch.cursor is the new cursor of the source
+            covered_since: Start of the time range the batch covers, when it
+                extends the indexed range further back
+        """
+        rows = [
+            (bucket, category, unit, severity, count, first_seen, last_seen, sample)
+            for (bucket, category, unit, severity), (count, first_seen, last_seen, sample) in batch.rows.items()
+        ]
+        now = time.time()
+        with self._db.connection() as conn:
+            conn.executemany('''
+                INSERT INTO log_issues (bucket, category, unit, severity, count, first_seen, last_seen, sample)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (bucket, category, unit, severity) DO UPDATE SET
+                    count = count + excluded.count,
+                    first_seen = MIN(first_seen, excluded.first_seen),
+                    sample = CASE WHEN excluded.last_seen >= last_seen THEN excluded.sample ELSE sample END,
+                    last_seen = MAX(last_seen, excluded.last_seen)
+            ''', rows)
+            if batch.cursor:
+                conn.execute('''
+                    INSERT INTO log_cursors (source, cursor, updated_at, covered_since) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (source) DO UPDATE SET
+                        cursor = excluded.cursor,
+                        updated_at = excluded.updated_at,
+                        covered_since = CASE
+                            WHEN excluded.covered_since IS NULL THEN covered_since
+                            WHEN covered_since IS NULL THEN excluded.covered_since
+                            ELSE MIN(covered_since, excluded.covered_since)
+                        END
+                ''', (source, batch.cursor, now, covered_since))
+            if rows and self.retention_days:
+                conn.execute('DELETE FROM log_issues WHERE bucket < ?', (now - self.retention_days * 86400,))
+        return sum(row[4] for row in rows)
+
+    def query(self, since: float, until: Optional[float] = None, category: Optional[str] = None,
+              unit: Optional[str] = None, severity: Optional[str] = None,
+              group_by: Tuple[str, ...] = ("category", "severity")) -> List[Dict[str, Any]]:
+        """
+        Aggregate indexed issues over a time range.
+
+        The range is matched at bucket granularity: a bucket is included when
+        it starts at or after the bucket containing 'since'.
+
+        Args:
+            since: Start of the range (Unix time)
+            until: End of the range (Unix time, default: now)
+            category, unit, severity: Optional filters
+            group_by: Columns to group by (any of bucket, category, unit, severity)
+
+        Returns:
+            List of dicts with the group columns, count, first_seen, last_seen and a sample line
+        """
+        columns = [column for column in group_by if column in ("bucket", "category", "unit", "severity")]
+        start = int(since // self.bucket_seconds * self.bucket_seconds)
+        where = ['bucket >= ?']
+        params: List[Any] = [start]
+        if until is not None:
+            where.append('bucket <= ?')
+            params.append(until)
+        for column, value in (("category", category), ("unit", unit), ("severity", severity)):
+            if value is not None:
+                where.append(f'{column} = ?')
+                params.append(value)
+
+        select = ', '.join(columns + ['SUM(count)', 'MIN(first_seen)', 'MAX(last_seen)'])
+        sql = f'SELECT {select} FROM log_issues WHERE {" AND ".join(where)}'
+        if columns:
+            sql += f' GROUP BY {", ".join(columns)}'
+        sql += ' ORDER BY SUM(count) DESC'
+
+        with self._db.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+            results = []
+            for row in rows:
+                if row[len(columns)] is None:
+                    continue
+                result = dict(zip(columns, row))
+                result.update({
+                    "count": row[len(columns)],
+                    "first_seen": row[len(columns) + 1],
+                    "last_seen": row[len(columns) + 2]
+                })
+                # The sample is the latest line among the group's rows
+                sample_where = where + [f'{column} = ?' for column in columns]
+                sample = conn.execute(
+                    f'SELECT sample FROM log_issues WHERE {" AND ".join(sample_where)} '
+                    f'ORDER BY last_seen DESC LIMIT 1',
+                    params + [result[column] for column in columns]
+                ).fetchone()
+                result["sample"] = sample[0] if sample else None
+                results.append(result)
+        return results
+
+    def recent_samples(self, since: float, severity: str, limit: int = 50) -> List[str]:
+        """Latest sample line of each indexed row, newest first"""
+        start = int(since // self.bucket_seconds * self.bucket_seconds)
+        with self._db.connection() as conn:
+            rows = conn.execute(
+                'SELECT sample FROM log_issues WHERE bucket >= ? AND severity = ? '
+                'ORDER BY last_seen DESC LIMIT ?',
+                (start, severity, limit)
+            ).fetchall()
+        return [row[0] for row in rows if row[0]]
@@ -0,0 +1,265 @@
+"""
+Streaming log pipeline for Proxmox NLI.
+Reads journal entries one at a time and folds them into bounded per-category
+statistics, so memory stays flat regardless of how much log is scanned.
+"""
+import json
+import logging
+import re
+import subprocess
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Text markers used to decide severity when an entry carries no syslog priority
+SEVERITY_PATTERNS = {
+    "error": [r"error", r"\berr\b", r"exception", r"fail", r"critical"],
+    "warning": [r"warn"]
+}
+
+# Digits, hex ids and paths vary between otherwise identical messages
+_VARIABLE_PARTS = re.compile(r"0x[0-9a-f]+|\b[0-9a-f]{8,}\b|\d+", re.IGNORECASE)
+
+
+def _ordered_alternation(patterns: Dict[str, List[str]]) -> Tuple[re.Pattern, List[str]]:
+    """Compile named pattern lists into one regex whose match names the first list that hits.
+
+    Each alternative is a lookahead over the whole line, so the alternatives are
+    tried in dictionary order rather than by position in the line, matching the
+    precedence of checking the lists one after another.
+    """
+    names = list(patterns)
+    alternatives = [
+        f"(?=.*?(?:{'|'.join(patterns[name])}))(?P<g{i}>)"
+        for i, name in enumerate(names)
+    ]
+    return re.compile(f"^(?:{'|'.join(alternatives)})", re.IGNORECASE | re.DOTALL), names
+
+
+class LogClassifier:
+    """Assigns a severity and a category to log lines with precompiled combined regexes"""
+
+    def __init__(self, category_patterns: Dict[str, List[str]]):
+        self._categories, self._category_names = _ordered_alternation(category_patterns)
+        self._severity, self._severity_names = _ordered_alternation(SEVERITY_PATTERNS)
+
+    def _lookup(self, regex: re.Pattern, names: List[str], line: str) -> Optional[str]:
+        match = regex.match(line)
+        if match is None:
+            return None
+        return names[int(match.lastgroup[1:])]
+
+    def category(self, line: str) -> Optional[str]:
+        """Return the first category whose patterns match the line"""
+        return self._lookup(self._categories, self._category_names, line)
+
+    def severity(self, line: str, priority: Optional[int] = None) -> Optional[str]:
+        """Return 'error', 'warning' or None, preferring the syslog priority when known"""
+        if priority is not None:
+            if priority <= 3:
+                return "error"
+            if priority == 4:
+                return "warning"
+            return None
+        return self._lookup(self._severity, self._severity_names, line)
+
+
+class TopMessages:
+    """Approximate most frequent messages in bounded memory (Space-Saving algorithm)"""
+
+    def __init__(self, capacity: int = 20):
+        self.capacity = capacity
+        # message key -> [count, overestimate, sample line]
+        self._entries: Dict[str, List[Any]] = {}
+
+    def add(self, line: str):
+        key = _VARIABLE_PARTS.sub("#", line)
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[0] += 1
+            entry[2] = line
+            return
+        if len(self._entries) < self.capacity:
+            self._entries[key] = [1, 0, line]
+            return
+        # Replace the rarest message; the newcomer inherits its count as an upper bound
+        victim = min(self._entries, key=lambda k: self._entries[k][0])
+        floor = self._entries.pop(victim)[0]
+        self._entries[key] = [floor + 1, floor, line]
+
+    def top(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        ranked = sorted(self._entries.values(), key=lambda entry: entry[0], reverse=True)
+        return [
+            {"message": sample, "count": count, "error_margin": margin}
+            for count, margin, sample in ranked[:n]
+        ]
+
+
+class LogStats:
+    """Counts and bounded samples of classified log lines"""
+
+    def __init__(self, classifier: LogClassifier, sample_size: int = 50, top_size: int = 20,
+                 on_issue: Optional[Callable[[Dict[str, Any], str, Optional[str]], None]] = None):
+        """
+        Args:
+            classifier: Classifier assigning severity and category
+            sample_size: Recent lines kept per severity and per category
+            top_size: Distinct messages tracked per category for top_messages
+            on_issue: Called with (entry, severity, category) for each journal entry that is an issue
+        """
+        self.classifier = classifier
+        self.sample_size = sample_size
+        self.top_size = top_size
+        self.on_issue = on_issue
+        self.lines_read = 0
+        self.last_cursor: Optional[str] = None
+        self.counts = {"error": 0, "warning": 0}
+        self.samples: Dict[str, Deque[str]] = {
+            "error": deque(maxlen=sample_size),
+            "warning": deque(maxlen=sample_size)
+        }
+        self.category_counts: Dict[str, int] = {}
+        self.category_samples: Dict[str, Deque[str]] = {}
+        self.category_top: Dict[str, TopMessages] = {}
+        self.source_counts: Dict[str, int] = {}
+
+    def add(self, line: str, priority: Optional[int] = None,
+            source: Optional[str] = None) -> Optional[Tuple[str, Optional[str]]]:
+        """Classify one line and fold it into the statistics; returns (severity, category) for issues"""
+        self.lines_read += 1
+        line = line.strip()
+        if not line:
+            return None
+        severity = self.classifier.severity(line, priority)
+        if severity is None:
+            return None
+
+        self.counts[severity] += 1
+        self.samples[severity].append(line)
+        if source:
+            self.source_counts[source] = self.source_counts.get(source, 0) + 1
+
+        category = self.classifier.category(line)
+        if category is not None:
+            self.category_counts[category] = self.category_counts.get(category, 0) + 1
+            if category not in self.category_samples:
+                self.category_samples[category] = deque(maxlen=self.sample_size)
+                self.category_top[category] = TopMessages(self.top_size)
+            self.category_samples[category].append(line)
+            self.category_top[category].add(line)
+        return severity, category
+
+    def add_lines(self, lines: Iterable[str]) -> "LogStats":
+        for line in lines:
+            self.add(line)
+        return self
+
+    def add_entries(self, entries: Iterable[Dict[str, Any]]) -> "LogStats":
+        """Fold in journal entries as produced by JournalReader"""
+        for entry in entries:
+            issue = self.add(entry["message"], entry.get("priority"), entry.get("identifier"))
+            if entry.get("cursor"):
+                self.last_cursor = entry["cursor"]
+            if issue is not None and self.on_issue is not None:
+                self.on_issue(entry, *issue)
+        return self
+
+    def errors(self) -> List[str]:
+        """Most recent error lines, newest first"""
+        return list(reversed(self.samples["error"]))
+
+    def warnings(self) -> List[str]:
+        """Most recent warning lines, newest first"""
+        return list(reversed(self.samples["warning"]))
+
+    def categories(self) -> Dict[str, List[str]]:
+        """Most recent lines per category, newest first"""
+        return {category: list(reversed(lines)) for category, lines in self.category_samples.items()}
+
+    def top_messages(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {category: top.top() for category, top in self.category_top.items()}
+
+
+class JournalReader:
+    """Streams entries from a single `journalctl -o json` process"""
+
+    def __init__(self, journalctl: str = "journalctl"):
+        self.journalctl = journalctl
+
+    def build_command(self, since: str = "24h", priority: str = "warning",
+                      identifiers: Optional[List[str]] = None, unit: Optional[str] = None,
+                      after_cursor: Optional[str] = None, until: Optional[str] = None) -> List[str]:
+        """Return the journalctl argument list for the requested slice of the journal
+
+        since and until are relative periods ("24h") or journalctl time specs
+        such as "@<unix time>".
+        """
+        command = [self.journalctl, "-o", "json", "--no-pager", "-p", priority]
+        if after_cursor:
+            # Resume where the previous read stopped instead of re-reading the window
+            command.extend(["--after-cursor", after_cursor])
+        elif since:
+            # journalctl reads relative times as "-24h"; bare "24h" is not accepted
+            command.extend(["--since", f"-{since}" if since[0].isdigit() else since])
+        if until:
+            command.extend(["--until", f"-{until}" if until[0].isdigit() else until])
+        for identifier in identifiers or []:
+            command.extend(["-t", identifier])
+        if unit:
+            command.extend(["-u", unit])
+        return command
+
+    def entries(self, since: str = "24h", priority: str = "warning",
+                identifiers: Optional[List[str]] = None, unit: Optional[str] = None,
+                after_cursor: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield journal entries as dicts with message, priority, identifier, unit, timestamp and cursor.
+
+        Output is consumed line by line from the pipe; the process is killed if
+        the caller stops iterating early.
+        """
+        command = self.build_command(since, priority, identifiers, unit, after_cursor, until)
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                   text=True, errors="replace", bufsize=1)
+        try:
+            for line in process.stdout:
+                entry = self.parse_entry(line)
+                if entry is not None:
+                    yield entry
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            returncode = process.wait()
+            if returncode not in (0, 1, -9):
+                logger.error(f"journalctl exited with code {returncode}")
+
+    @staticmethod
+    def parse_entry(line: str) -> Optional[Dict[str, Any]]:
+        """Convert one line of `journalctl -o json` output; returns None for unparsable lines"""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        message = record.get("MESSAGE")
+        if message is None:
+            return None
+        if isinstance(message, list):
+            # Non-UTF-8 messages are emitted as byte arrays
+            message = bytes(message).decode("utf-8", errors="replace")
+        try:
+            priority = int(record["PRIORITY"])
+        except (KeyError, TypeError, ValueError):
+            priority = None
+        try:
+            timestamp = int(record["__REALTIME_TIMESTAMP"]) / 1_000_000
+        except (KeyError, TypeError, ValueError):
+            timestamp = None
+        return {
+            "message": str(message),
+            "priority": priority,
+            "identifier": record.get("SYSLOG_IDENTIFIER") or record.get("_COMM"),
+            "unit": record.get("_SYSTEMD_UNIT"),
+            "timestamp": timestamp,
+            "cursor": record.get("__CURSOR")
+        }
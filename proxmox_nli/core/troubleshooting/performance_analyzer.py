@@ -3,24 +3,27 @@ Performance Analyzer for Proxmox NLI.
 Provides tools for analyzing system performance and detecting bottlenecks.
 """
 import logging
-import subprocess
 import re
 import json
 import time
 from typing import Dict, List, Any, Optional
 
+from ..diagnostic_runner import DiagnosticRunner
+
 logger = logging.getLogger(__name__)
 
 class PerformanceAnalyzer:
     """Analyzes system performance and detects bottlenecks."""
     
-    def __init__(self, api):
+    def __init__(self, api, runner: Optional[DiagnosticRunner] = None):
         """Initialize the performance analyzer.
         
         Args:
             api: Proxmox API client
+            runner: Diagnostic runner used to execute commands and probes
         """
         self.api = api
+        self.runner = runner or DiagnosticRunner()
         
         # Performance monitoring commands
         self.monitoring_commands = {
@@ -86,37 +89,31 @@ class PerformanceAnalyzer:
             "recommendations": []
         }
         
-        # Analyze CPU performance
-        cpu_results = self.analyze_cpu_performance(node)
-        results["cpu"] = cpu_results
-        
-        if cpu_results.get("bottleneck", False):
-            results["bottlenecks"].append("CPU")
-            results["recommendations"].extend(cpu_results.get("recommendations", []))
-        
-        # Analyze memory performance
-        memory_results = self.analyze_memory_performance(node)
-        results["memory"] = memory_results
-        
-        if memory_results.get("bottleneck", False):
-            results["bottlenecks"].append("Memory")
-            results["recommendations"].extend(memory_results.get("recommendations", []))
-        
-        # Analyze disk performance
-        disk_results = self.analyze_disk_performance(node)
-        results["disk"] = disk_results
-        
-        if disk_results.get("bottleneck", False):
-            results["bottlenecks"].append("Disk")
-            results["recommendations"].extend(disk_results.get("recommendations", []))
-        
-        # Analyze network performance
-        network_results = self.analyze_network_performance(node)
-        results["network"] = network_results
-        
-        if network_results.get("bottleneck", False):
-            results["bottlenecks"].append("Network")
-            results["recommendations"].extend(network_results.get("recommendations", []))
+        # The four analyses sample for several seconds each, so run them concurrently
+        probes = self.runner.run_probes({
+            "cpu": lambda: self.analyze_cpu_performance(node),
+            "memory": lambda: self.analyze_memory_performance(node),
+            "disk": lambda: self.analyze_disk_performance(node),
+            "network": lambda: self.analyze_network_performance(node)
+        })
+        results["timings"] = {}
+        
+        for resource, label in (("cpu", "CPU"), ("memory", "Memory"), ("disk", "Disk"), ("network", "Network")):
+            probe = probes[resource]
+            results["timings"][resource] = probe["duration"]
+            if probe["success"]:
+                resource_results = probe["result"]
+            else:
+                resource_results = {
+                    "success": False,
+                    "message": f"Error analyzing {resource} performance: {probe['error']}",
+                    "timed_out": probe["timed_out"]
+                }
+            results[resource] = resource_results
+            
+            if resource_results.get("bottleneck", False):
+                results["bottlenecks"].append(label)
+                results["recommendations"].extend(resource_results.get("recommendations", []))
         
         # Generate overall summary
         if results["bottlenecks"]:
@@ -677,9 +674,4 @@ class PerformanceAnalyzer:
     
     def _run_command(self, command: str) -> str:
         """Run a shell command and return the output."""
-        try:
-            result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-            return result.stdout
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Command execution failed: {str(e)}")
-            return e.stdout if e.stdout else ""
+        return self.runner.run_command(command)
@@ -8,6 +8,7 @@ import json
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 
+from ..diagnostic_runner import DiagnosticRunner
 from ..security.security_auditor import SecurityAuditor
 from ...services.health_monitoring import ServiceHealthMonitor
 
@@ -27,7 +28,9 @@ class TroubleshootingAssistant:
         """
         self.api = api
         self.service_manager = service_manager
-        self.security_auditor = security_auditor or SecurityAuditor(api)
+        # One runner for all components so a diagnosis runs each command once
+        self.diagnostic_runner = DiagnosticRunner()
+        self.security_auditor = security_auditor or SecurityAuditor(api, runner=self.diagnostic_runner)
         self.health_monitor = health_monitor
         
         # Import components lazily to avoid circular imports
@@ -40,9 +43,9 @@ class TroubleshootingAssistant:
         
         # Initialize diagnostic components
         self.log_analyzer = LogAnalyzer(api)
-        self.diagnostic_tools = DiagnosticTools(api)
+        self.diagnostic_tools = DiagnosticTools(api, runner=self.diagnostic_runner)
         self.network_diagnostics = NetworkDiagnostics(api)
-        self.performance_analyzer = PerformanceAnalyzer(api)
+        self.performance_analyzer = PerformanceAnalyzer(api, runner=self.diagnostic_runner)
         self.self_healing_tools = SelfHealingTools(api)
         self.report_generator = ReportGenerator()
         
@@ -76,7 +79,7 @@ class TroubleshootingAssistant:
         """Run guided diagnostics for a specific issue type.
         
         Args:
-            issue_type: Type of issue to diagnose (vm, container, network, storage, service, security)
+            issue_type: Type of issue to diagnose (vm, container, network, storage, service, security, performance, node)
             context: Additional context for the diagnostics (e.g., VM ID, service name)
             
         Returns:
@@ -109,11 +112,13 @@ class TroubleshootingAssistant:
             results = self._diagnose_security_issues(context)
         elif issue_type == "performance":
             results = self._diagnose_performance_issues(context)
+        elif issue_type == "node":
+            results = self._diagnose_node_issues(context)
         else:
             return {
                 "success": False,
                 "message": f"Unknown issue type: {issue_type}",
-                "recommendations": ["Please specify a valid issue type: vm, container, network, storage, service, security, performance"]
+                "recommendations": ["Please specify a valid issue type: vm, container, network, storage, service, security, performance, node"]
             }
         
         # Update session with results and recommendations
@@ -284,6 +289,29 @@ class TroubleshootingAssistant:
         """Diagnose performance-related issues."""
         return self.performance_analyzer.analyze_performance(context)
     
+    def _diagnose_node_issues(self, context: Dict) -> Dict:
+        """Diagnose a node by running the performance, system, Proxmox and storage checks concurrently."""
+        node = context.get("node", "pve")
+        probes = self.diagnostic_runner.run_probes({
+            "performance": lambda: self.performance_analyzer.analyze_all_performance(node),
+            "system": lambda: self.diagnostic_tools.check_system(node),
+            "proxmox": lambda: self.diagnostic_tools.check_proxmox(node),
+            "storage": lambda: self.diagnostic_tools.check_storage(node, context.get("storage_id"))
+        })
+        
+        results = {"node": node, "issues": [], "bottlenecks": [], "timings": {}}
+        for name, probe in probes.items():
+            results["timings"][name] = probe["duration"]
+            if not probe["success"]:
+                logger.error(f"Error running {name} diagnostics for node {node}: {probe['error']}")
+                results[name] = {"success": False, "error": probe["error"], "timed_out": probe["timed_out"]}
+                continue
+            results[name] = probe["result"]
+            results["issues"].extend(probe["result"].get("issues", []))
+            results["bottlenecks"].extend(probe["result"].get("bottlenecks", []))
+        
+        return results
+    
     def _generate_recommendations(self, issue_type: str, results: Dict) -> List[str]:
         """Generate recommendations based on diagnostic results."""
         recommendations = []
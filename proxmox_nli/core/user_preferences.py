@@ -4,10 +4,10 @@ Handles persistent storage of user environment preferences across sessions.
 """
 import os
 import json
-import sqlite3
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 import logging
+from .sqlite_pool import get_connection_manager
 
 logger = logging.getLogger(__name__)
 
@@ -24,11 +24,12 @@ class UserPreferencesManager:
         
         # Initialize SQLite database for user preferences
         self.db_path = os.path.join(self.data_dir, 'user_preferences.db')
+        self._db = get_connection_manager(self.db_path)
         self._init_db()
         
     def _init_db(self):
         """Initialize the SQLite database for user preferences"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._db.connection() as conn:
             cursor = conn.cursor()
             
             # User preferences table
@@ -164,7 +165,7 @@ class UserPreferencesManager:
         """
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO user_preferences (user_id, preference_key, preference_value, created_at, updated_at)
@@ -193,7 +194,7 @@ class UserPreferencesManager:
             Any: The preference value or default if not found
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT preference_value FROM user_preferences
@@ -218,7 +219,7 @@ class UserPreferencesManager:
             Dict[str, Any]: Dictionary of all user preferences
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT preference_key, preference_value FROM user_preferences
@@ -242,7 +243,7 @@ class UserPreferencesManager:
             bool: True if successful, False otherwise
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     DELETE FROM user_preferences
@@ -267,7 +268,7 @@ class UserPreferencesManager:
         """
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO favorite_vms (user_id, vm_id, vm_name, created_at)
@@ -291,7 +292,7 @@ class UserPreferencesManager:
             bool: True if successful, False otherwise
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     DELETE FROM favorite_vms
@@ -313,7 +314,7 @@ class UserPreferencesManager:
             List[Dict[str, Any]]: List of favorite VMs
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT vm_id, vm_name, created_at FROM favorite_vms
@@ -339,7 +340,7 @@ class UserPreferencesManager:
         """
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO favorite_nodes (user_id, node_name, created_at)
@@ -362,7 +363,7 @@ class UserPreferencesManager:
             List[Dict[str, Any]]: List of favorite nodes
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT node_name, created_at FROM favorite_nodes
@@ -389,7 +390,7 @@ class UserPreferencesManager:
         """
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.write_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO frequent_commands (user_id, command, intent, usage_count, last_used)
@@ -414,7 +415,7 @@ class UserPreferencesManager:
             List[Dict[str, Any]]: List of frequent commands
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT command, intent, usage_count, last_used FROM frequent_commands
@@ -442,7 +443,7 @@ class UserPreferencesManager:
         """
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO quick_access_services (user_id, service_id, vm_id, created_at)
@@ -465,7 +466,7 @@ class UserPreferencesManager:
             List[Dict[str, Any]]: List of quick access services
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT service_id, vm_id, created_at FROM quick_access_services
@@ -498,7 +499,7 @@ class UserPreferencesManager:
         entities_json = json.dumps(entities) if entities else None
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.write_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO command_history
@@ -507,11 +508,11 @@ class UserPreferencesManager:
                 ''', (user_id, command, intent, entities_json, now, success))
                 conn.commit()
                 
-                # Also update the frequent commands table
-                if success and intent:
-                    self.track_command_usage(user_id, command, intent)
-                    
-                return True
+            # Also update the frequent commands table
+            if success and intent:
+                self.track_command_usage(user_id, command, intent)
+                
+            return True
         except Exception as e:
             logger.error(f"Error adding to command history: {e}")
             return False
@@ -529,7 +530,7 @@ class UserPreferencesManager:
             List[Dict[str, Any]]: List of command history items
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 query = '''
@@ -575,7 +576,7 @@ class UserPreferencesManager:
             bool: True if successful, False otherwise
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     DELETE FROM command_history
@@ -601,7 +602,7 @@ class UserPreferencesManager:
         """
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO favorite_commands
@@ -626,7 +627,7 @@ class UserPreferencesManager:
             List[Dict[str, Any]]: List of favorite commands
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT id, command_text, description, created_at
@@ -652,7 +653,7 @@ class UserPreferencesManager:
             bool: True if successful, False otherwise
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     DELETE FROM favorite_commands
@@ -679,7 +680,7 @@ class UserPreferencesManager:
         """
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO notification_preferences
@@ -704,7 +705,7 @@ class UserPreferencesManager:
             List[Dict[str, Any]]: List of notification preferences
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT event_type, channel, enabled, created_at, updated_at
@@ -731,7 +732,7 @@ class UserPreferencesManager:
             Optional[bool]: Whether the notification is enabled, or None if not found
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT enabled FROM notification_preferences
@@ -757,7 +758,7 @@ class UserPreferencesManager:
             List[str]: List of enabled notification channels for this event
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT channel FROM notification_preferences
@@ -817,7 +818,7 @@ class UserPreferencesManager:
             ]
             
             # Insert default preferences
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 now = datetime.now().isoformat()
                 
@@ -845,7 +846,7 @@ class UserPreferencesManager:
             bool: True if successful, False otherwise
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     DELETE FROM notification_preferences
@@ -878,7 +879,7 @@ class UserPreferencesManager:
         """
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Check if shortcut already exists
@@ -925,7 +926,7 @@ class UserPreferencesManager:
             List[Dict[str, Any]]: List of shortcuts
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 if category:
@@ -973,7 +974,7 @@ class UserPreferencesManager:
             return None
             
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 if shortcut_id:
@@ -1018,7 +1019,7 @@ class UserPreferencesManager:
             return False
             
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 if shortcut_id:
@@ -1048,7 +1049,7 @@ class UserPreferencesManager:
             List[str]: List of category names
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT DISTINCT category
@@ -1074,7 +1075,7 @@ class UserPreferencesManager:
             bool: True if successful, False otherwise
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Update the position
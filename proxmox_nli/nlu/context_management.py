@@ -135,6 +135,12 @@ class ContextManager:
                 self.context[key] = value
                 logger.info(f"Updated context: {key} = {value}")
     
+    def has_contextual_reference(self, query):
+        """Check whether a query refers back to earlier context ('it', 'that vm', ...)"""
+        query_lower = query.lower()
+        return any(re.search(rf'\b{pattern}\b', query_lower)
+                   for patterns in self.reference_patterns.values() for pattern in patterns)
+
     def resolve_contextual_references(self, query, entities):
         """Resolve contextual references like 'it', 'that one', 'this vm', etc.
         
@@ -1,6 +1,27 @@
 import re
 from nltk.tokenize import word_tokenize
 
+from .intent_matcher import CompiledIntentMatcher
+
+# Argument extractors used by the keyword fallbacks
+_VM_ARG_RE = re.compile(r'(?:vm|virtual\s+machine)?[-_]?([a-zA-Z0-9-_]+)')
+_CONTAINER_NAME_RE = re.compile(r'container\s+(\w+)')
+_VM_NAME_RE = re.compile(r'vm\s+(\w+)')
+_QUOTED_COMMAND_RE = re.compile(r'(?:run|execute)\s+(?:command\s+)?[\'"]([^\'"]+)[\'"]')
+_SERVICE_PURPOSE_RE = re.compile(r'(?:for|to)\s+(.+)$')
+_FOR_SERVICE_RE = re.compile(r'for\s+(?:service\s+)?(\w+)')
+_FOR_TO_SERVICE_RE = re.compile(r'(?:for|to)\s+(?:service\s+)?(\w+)')
+_SCHEDULE_TIME_RE = re.compile(r'(?:at|on|for)\s+(.+)$')
+_DEPLOY_SERVICE_RE = re.compile(r'(?:deploy|install|setup)\s+(?:service\s+)?(\w+)')
+_TARGET_VM_RE = re.compile(r'(?:on|to)\s+(?:vm|virtual\s+machine)\s+(\w+)')
+_UPDATE_SERVICE_RE = re.compile(r'(?:update|upgrade)\s+(?:service\s+)?(\w+)')
+
+# Confidence scores reported by identify_intent_with_confidence
+PATTERN_BASE_CONFIDENCE = 0.7
+CONTEXT_CONFIDENCE = 0.9
+KEYWORD_CONFIDENCE = 0.5
+CONTEXT_FALLBACK_CONFIDENCE = 0.4
+
 class IntentIdentifier:
     def __init__(self):
         """Initialize intent patterns and context"""
@@ -252,177 +273,193 @@ class IntentIdentifier:
             ]
         }
 
+        # Compile and index the patterns once
+        self.matcher = CompiledIntentMatcher(self.patterns)
+
     def identify_intent(self, preprocessed_query):
         """Identify the intent of the query"""
-        # First check for contextual commands using pronouns
-        query_lower = preprocessed_query.lower()
-        tokens = set(word_tokenize(preprocessed_query))
+        intent, args, _ = self.identify_intent_with_confidence(preprocessed_query)
+        return intent, args
 
-        # Handle contextual commands using pronouns
-        if ('it' in tokens or 'its' in tokens or 'this' in tokens or 'that' in tokens) and self.context.get('current_vm'):
+    def identify_intent_with_confidence(self, preprocessed_query):
+        """Identify the intent of the query along with a confidence score in [0, 1]
+
+        Exact pattern matches score highest, scaled by how much of the query
+        the match covers; keyword fallbacks score lower and the default help
+        intent scores 0.
+        """
+        # Tokenizing is only needed for the contextual checks and keyword
+        # fallbacks, so defer it until one of them actually runs
+        tokens = None
+
+        # First check for contextual commands using pronouns
+        if self.context.get('current_vm'):
+            tokens = set(word_tokenize(preprocessed_query))
+        if tokens and ('it' in tokens or 'its' in tokens or 'this' in tokens or 'that' in tokens):
             if any(word in tokens for word in ['start', 'boot', 'launch', 'power on']):
-                return 'start_vm', [self.context['current_vm']]
+                return 'start_vm', [self.context['current_vm']], CONTEXT_CONFIDENCE
             elif any(word in tokens for word in ['stop', 'shutdown', 'halt', 'power off']):
-                return 'stop_vm', [self.context['current_vm']]
+                return 'stop_vm', [self.context['current_vm']], CONTEXT_CONFIDENCE
             elif any(word in tokens for word in ['status', 'check', 'how is']):
-                return 'vm_status', [self.context['current_vm']]
+                return 'vm_status', [self.context['current_vm']], CONTEXT_CONFIDENCE
             elif any(word in tokens for word in ['restart', 'reboot']):
-                return 'restart_vm', [self.context['current_vm']]
+                return 'restart_vm', [self.context['current_vm']], CONTEXT_CONFIDENCE
 
         # Try exact pattern matching
-        for intent, patterns in self.patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, preprocessed_query, re.IGNORECASE)
-                if match:
-                    # Convert tuple to list for consistency
-                    args = list(match.groups()) if match.groups() else []
-                    return intent, args
+        match = self.matcher.match_detail(preprocessed_query)
+        if match:
+            intent, args, span = match
+            coverage = span / max(len(preprocessed_query.strip()), 1)
+            return intent, args, PATTERN_BASE_CONFIDENCE + (1.0 - PATTERN_BASE_CONFIDENCE) * min(coverage, 1.0)
+
+        if tokens is None:
+            tokens = set(word_tokenize(preprocessed_query))
 
         # If no pattern matches, try more flexible keyword matching
         if 'list' in tokens and ('vm' in tokens or 'vms' in tokens or 'machine' in tokens or 'machines' in tokens):
-            return 'list_vms', []
+            return 'list_vms', [], KEYWORD_CONFIDENCE
 
         if 'start' in tokens and ('vm' in tokens or 'machine' in tokens):
             # Try to extract VM name/ID
-            vm_match = re.search(r'(?:vm|virtual\s+machine)?[-_]?([a-zA-Z0-9-_]+)', preprocessed_query)
-            return 'start_vm', [vm_match.group(1) if vm_match else None]
+            vm_match = _VM_ARG_RE.search(preprocessed_query)
+            return 'start_vm', [vm_match.group(1) if vm_match else None], KEYWORD_CONFIDENCE
 
         # Docker related intents
         if 'list' in tokens and 'docker' in tokens and 'container' in tokens:
-            return 'list_docker_containers', []
+            return 'list_docker_containers', [], KEYWORD_CONFIDENCE
 
         if 'list' in tokens and 'docker' in tokens and 'image' in tokens:
-            return 'list_docker_images', []
+            return 'list_docker_images', [], KEYWORD_CONFIDENCE
 
         if ('start' in tokens or 'run' in tokens) and 'docker' in tokens and 'container' in tokens:
             # Try to extract container name
-            container_match = re.search(r'container\s+(\w+)', preprocessed_query)
-            vm_match = re.search(r'vm\s+(\w+)', preprocessed_query)
-            return 'start_docker_container', [container_match.group(1) if container_match else None, vm_match.group(1) if vm_match else None]
+            container_match = _CONTAINER_NAME_RE.search(preprocessed_query)
+            vm_match = _VM_NAME_RE.search(preprocessed_query)
+            return 'start_docker_container', [container_match.group(1) if container_match else None, vm_match.group(1) if vm_match else None], KEYWORD_CONFIDENCE
 
         # CLI command execution
         if ('run' in tokens or 'execute' in tokens) and ('command' in tokens or '"' in preprocessed_query or "'" in preprocessed_query):
-            command_match = re.search(r'(?:run|execute)\s+(?:command\s+)?[\'"]([^\'"]+)[\'"]', preprocessed_query)
-            vm_match = re.search(r'vm\s+(\w+)', preprocessed_query)
-            return 'run_cli_command', [command_match.group(1) if command_match else None, vm_match.group(1) if vm_match else None]
+            command_match = _QUOTED_COMMAND_RE.search(preprocessed_query)
+            vm_match = _VM_NAME_RE.search(preprocessed_query)
+            return 'run_cli_command', [command_match.group(1) if command_match else None, vm_match.group(1) if vm_match else None], KEYWORD_CONFIDENCE
 
         # Service related intents
         if ('list' in tokens or 'show' in tokens) and 'service' in tokens and not ('deployed' in tokens or 'installed' in tokens):
-            return 'list_available_services', []
+            return 'list_available_services', [], KEYWORD_CONFIDENCE
 
         if ('list' in tokens or 'show' in tokens) and 'service' in tokens and ('deployed' in tokens or 'installed' in tokens):
-            return 'list_deployed_services', []
+            return 'list_deployed_services', [], KEYWORD_CONFIDENCE
 
         if ('find' in tokens or 'search' in tokens) and 'service' in tokens:
-            service_match = re.search(r'(?:for|to)\s+(.+)$', preprocessed_query)
-            return 'find_service', [service_match.group(1) if service_match else None]
+            service_match = _SERVICE_PURPOSE_RE.search(preprocessed_query)
+            return 'find_service', [service_match.group(1) if service_match else None], KEYWORD_CONFIDENCE
 
         # Update related intents
         if ('check' in tokens or 'search' in tokens or 'scan' in tokens) and 'update' in tokens:
-            service_match = re.search(r'for\s+(?:service\s+)?(\w+)', preprocessed_query)
-            return 'check_updates', [service_match.group(1) if service_match else None]
+            service_match = _FOR_SERVICE_RE.search(preprocessed_query)
+            return 'check_updates', [service_match.group(1) if service_match else None], KEYWORD_CONFIDENCE
 
         if ('list' in tokens or 'show' in tokens) and 'update' in tokens:
-            service_match = re.search(r'for\s+(?:service\s+)?(\w+)', preprocessed_query)
-            return 'list_updates', [service_match.group(1) if service_match else None]
+            service_match = _FOR_SERVICE_RE.search(preprocessed_query)
+            return 'list_updates', [service_match.group(1) if service_match else None], KEYWORD_CONFIDENCE
 
         if ('apply' in tokens or 'install' in tokens) and 'update' in tokens:
-            service_match = re.search(r'(?:for|to)\s+(?:service\s+)?(\w+)', preprocessed_query)
-            return 'apply_updates', [service_match.group(1) if service_match else None]
+            service_match = _FOR_TO_SERVICE_RE.search(preprocessed_query)
+            return 'apply_updates', [service_match.group(1) if service_match else None], KEYWORD_CONFIDENCE
 
         if ('update' in tokens and 'settings' in tokens) or ('configure' in tokens and 'update' in tokens):
-            return 'update_settings', []
+            return 'update_settings', [], KEYWORD_CONFIDENCE
 
         # Update planning and analysis
         if ('plan' in tokens or 'generate' in tokens or 'create' in tokens) and 'update' in tokens:
-            service_match = re.search(r'for\s+(?:service\s+)?(\w+)', preprocessed_query)
-            return 'generate_update_plan', [service_match.group(1) if service_match else None]
+            service_match = _FOR_SERVICE_RE.search(preprocessed_query)
+            return 'generate_update_plan', [service_match.group(1) if service_match else None], KEYWORD_CONFIDENCE
 
         if 'schedule' in tokens and 'update' in tokens:
-            service_match = re.search(r'for\s+(?:service\s+)?(\w+)', preprocessed_query)
-            time_match = re.search(r'(?:at|on|for)\s+(.+)$', preprocessed_query)
-            return 'schedule_updates', [service_match.group(1) if service_match else None, time_match.group(1) if time_match else None]
+            service_match = _FOR_SERVICE_RE.search(preprocessed_query)
+            time_match = _SCHEDULE_TIME_RE.search(preprocessed_query)
+            return 'schedule_updates', [service_match.group(1) if service_match else None, time_match.group(1) if time_match else None], KEYWORD_CONFIDENCE
 
         if ('analyze' in tokens or 'examine' in tokens or 'evaluate' in tokens) and 'update' in tokens:
-            return 'analyze_updates', []
+            return 'analyze_updates', [], KEYWORD_CONFIDENCE
 
         if 'history' in tokens and 'update' in tokens:
-            service_match = re.search(r'for\s+(?:service\s+)?(\w+)', preprocessed_query)
-            return 'get_update_history', [service_match.group(1) if service_match else None]
+            service_match = _FOR_SERVICE_RE.search(preprocessed_query)
+            return 'get_update_history', [service_match.group(1) if service_match else None], KEYWORD_CONFIDENCE
 
         if 'explain' in tokens and 'update' in tokens:
-            service_match = re.search(r'for\s+(?:service\s+)?(\w+)', preprocessed_query)
-            return 'explain_updates', [service_match.group(1) if service_match else None]
+            service_match = _FOR_SERVICE_RE.search(preprocessed_query)
+            return 'explain_updates', [service_match.group(1) if service_match else None], KEYWORD_CONFIDENCE
 
         if any(word in tokens for word in ['want', 'need', 'like', 'looking']):
             if any(word in tokens for word in ['install', 'setup', 'deploy']):
-                return 'find_service', [preprocessed_query]
+                return 'find_service', [preprocessed_query], KEYWORD_CONFIDENCE
             else:
                 # This is a more generic "I want X" request that might be service-related
-                return 'find_service', [preprocessed_query]
+                return 'find_service', [preprocessed_query], KEYWORD_CONFIDENCE
 
         if ('deploy' in tokens or 'install' in tokens or 'setup' in tokens) and not ('docker' in tokens) and not ('update' in tokens):
             # Try to extract service ID
-            service_match = re.search(r'(?:deploy|install|setup)\s+(?:service\s+)?(\w+)', preprocessed_query)
-            vm_match = re.search(r'(?:on|to)\s+(?:vm|virtual\s+machine)\s+(\w+)', preprocessed_query)
-            return 'deploy_service', [service_match.group(1) if service_match else None, vm_match.group(1) if vm_match else None]
+            service_match = _DEPLOY_SERVICE_RE.search(preprocessed_query)
+            vm_match = _TARGET_VM_RE.search(preprocessed_query)
+            return 'deploy_service', [service_match.group(1) if service_match else None, vm_match.group(1) if vm_match else None], KEYWORD_CONFIDENCE
 
         # Simple update command
         if ('update' in tokens or 'upgrade' in tokens) and not ('settings' in tokens or 'configuration' in tokens):
             # Check for "update all" pattern
             if 'all' in tokens:
-                return 'apply_updates', [None]
+                return 'apply_updates', [None], KEYWORD_CONFIDENCE
             # Check for "update X" pattern
-            service_match = re.search(r'(?:update|upgrade)\s+(?:service\s+)?(\w+)', preprocessed_query)
+            service_match = _UPDATE_SERVICE_RE.search(preprocessed_query)
             if service_match:
-                return 'apply_updates', [service_match.group(1)]
+                return 'apply_updates', [service_match.group(1)], KEYWORD_CONFIDENCE
         
         # Update status check
         if ('status' in tokens or 'settings' in tokens) and 'update' in tokens:
-            return 'get_update_status', []
+            return 'get_update_status', [], KEYWORD_CONFIDENCE
             
         # Check for scheduled updates
         if (('scheduled' in tokens or 'schedule' in tokens) and 'update' in tokens) or ('update' in tokens and 'schedule' in tokens):
-            return 'get_scheduled_updates', []
+            return 'get_scheduled_updates', [], KEYWORD_CONFIDENCE
 
         # Handle contextual commands like "start it" or "check its status"
         if 'it' in tokens or 'its' in tokens:
             if 'start' in tokens and self.context.get('current_vm'):
-                return 'start_vm', [self.context['current_vm']]
+                return 'start_vm', [self.context['current_vm']], CONTEXT_FALLBACK_CONFIDENCE
             elif ('stop' in tokens or 'shutdown' in tokens) and self.context.get('current_vm'):
-                return 'stop_vm', [self.context['current_vm']]
+                return 'stop_vm', [self.context['current_vm']], CONTEXT_FALLBACK_CONFIDENCE
             elif ('status' in tokens or 'check' in tokens) and self.context.get('current_vm'):
-                return 'vm_status', [self.context['current_vm']]
+                return 'vm_status', [self.context['current_vm']], CONTEXT_FALLBACK_CONFIDENCE
             elif ('update' in tokens or 'upgrade' in tokens) and self.context.get('current_service'):
-                return 'apply_updates', [self.context['current_service']]
+                return 'apply_updates', [self.context['current_service']], CONTEXT_FALLBACK_CONFIDENCE
             elif ('explain' in tokens or 'tell' in tokens or 'about' in tokens) and 'update' in tokens and self.context.get('current_service'):
-                return 'explain_updates', [self.context['current_service']]
+                return 'explain_updates', [self.context['current_service']], CONTEXT_FALLBACK_CONFIDENCE
 
         # Handle contextual commands for Docker containers
         if self.context.get('current_container') and self.context.get('current_vm'):
             if 'start' in tokens or 'run' in tokens:
-                return 'start_docker_container', [self.context['current_container'], self.context['current_vm']]
+                return 'start_docker_container', [self.context['current_container'], self.context['current_vm']], CONTEXT_FALLBACK_CONFIDENCE
             elif 'stop' in tokens or 'halt' in tokens:
-                return 'stop_docker_container', [self.context['current_container'], self.context['current_vm']]
+                return 'stop_docker_container', [self.context['current_container'], self.context['current_vm']], CONTEXT_FALLBACK_CONFIDENCE
             elif 'logs' in tokens or 'log' in tokens:
-                return 'docker_container_logs', [self.context['current_container'], self.context['current_vm']]
+                return 'docker_container_logs', [self.context['current_container'], self.context['current_vm']], CONTEXT_FALLBACK_CONFIDENCE
 
         # Handle contextual commands for services
         if self.context.get('current_service') and self.context.get('current_service_vm'):
             if 'status' in tokens or 'running' in tokens:
-                return 'service_status', [self.context['current_service'], self.context['current_service_vm']]
+                return 'service_status', [self.context['current_service'], self.context['current_service_vm']], CONTEXT_FALLBACK_CONFIDENCE
             elif 'stop' in tokens or 'halt' in tokens:
-                return 'stop_service', [self.context['current_service'], self.context['current_service_vm']]
+                return 'stop_service', [self.context['current_service'], self.context['current_service_vm']], CONTEXT_FALLBACK_CONFIDENCE
             elif 'remove' in tokens or 'uninstall' in tokens or 'delete' in tokens:
-                return 'remove_service', [self.context['current_service'], self.context['current_service_vm']]
+                return 'remove_service', [self.context['current_service'], self.context['current_service_vm']], CONTEXT_FALLBACK_CONFIDENCE
             elif 'update' in tokens or 'upgrade' in tokens:
-                return 'apply_updates', [self.context['current_service']]
+                return 'apply_updates', [self.context['current_service']], CONTEXT_FALLBACK_CONFIDENCE
             elif 'check' in tokens and 'update' in tokens:
-                return 'check_updates', [self.context['current_service']]
+                return 'check_updates', [self.context['current_service']], CONTEXT_FALLBACK_CONFIDENCE
             elif 'explain' in tokens and 'update' in tokens:
-                return 'explain_updates', [self.context['current_service']]
+                return 'explain_updates', [self.context['current_service']], CONTEXT_FALLBACK_CONFIDENCE
             elif 'plan' in tokens and 'update' in tokens:
-                return 'generate_update_plan', [self.context['current_service']]
+                return 'generate_update_plan', [self.context['current_service']], CONTEXT_FALLBACK_CONFIDENCE
 
         # Default to help intent if no other intent is identified
-        return 'help', []
+        return 'help', [], 0.0
@@ -0,0 +1,114 @@
+"""
+Compiled intent pattern matcher.
+
+Compiles the intent regexes once and indexes them by the literal text every
+match must start with, so a query is only tested against patterns whose
+leading keyword actually occurs in it. Patterns are still tried in their
+original order, so the first matching intent and its groups are the same as
+trying every raw pattern with re.search.
+"""
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+class CompiledIntentMatcher:
+    """Single-pass matcher over a dict of intent -> regex patterns"""
+
+    def __init__(self, patterns: Dict[str, List[str]], flags: int = re.IGNORECASE):
+        self.flags = flags
+        # (order, intent, compiled pattern) in the original dict order
+        self.compiled: List[Tuple[int, str, re.Pattern]] = []
+        # keyword -> pattern indices whose matches must start with that keyword
+        self.keyword_index: Dict[str, List[int]] = {}
+        # patterns without a usable leading keyword are always tried
+        self.unindexed: List[int] = []
+
+        for intent, intent_patterns in patterns.items():
+            for pattern in intent_patterns:
+                order = len(self.compiled)
+                self.compiled.append((order, intent, re.compile(pattern, flags)))
+                keywords = self._leading_literals(pattern)
+                if keywords:
+                    for keyword in keywords:
+                        self.keyword_index.setdefault(keyword, []).append(order)
+                else:
+                    self.unindexed.append(order)
+
+        self.keywords = sorted(self.keyword_index)
+
+    @staticmethod
+    def _literal_prefixes(items) -> Optional[Set[str]]:
+        """Return the literal strings a parsed sequence must start with, or None if unknown"""
+        prefixes = {''}
+        for op, av in items:
+            if op is sre_constants.LITERAL:
+                prefixes = {p + chr(av) for p in prefixes}
+                continue
+            if op is sre_constants.SUBPATTERN:
+                inner = CompiledIntentMatcher._literal_prefixes(av[-1])
+            elif op is sre_constants.BRANCH:
+                inner = set()
+                for branch in av[1]:
+                    branch_prefixes = CompiledIntentMatcher._literal_prefixes(branch)
+                    if branch_prefixes is None:
+                        inner = None
+                        break
+                    inner |= branch_prefixes
+            else:
+                inner = None
+            if inner is None or '' in inner:
+                # Stop at the first element that is not a fixed literal
+                break
+            prefixes = {p + q for p in prefixes for q in inner}
+            # Alternations do not always end at a word boundary; stop after one
+            break
+        if '' in prefixes:
+            return None
+        return prefixes
+
+    def _leading_literals(self, pattern: str) -> Optional[Set[str]]:
+        """Lowercased literals that every match of pattern starts with"""
+        try:
+            parsed = sre_parse.parse(pattern, self.flags)
+        except Exception:
+            return None
+        prefixes = self._literal_prefixes(list(parsed))
+        if not prefixes:
+            return None
+        return {p.lower() for p in prefixes}
+
+    def candidates(self, query: str) -> List[int]:
+        """Indices of patterns that could match query, in original order"""
+        if not query.isascii():
+            # Case-insensitive regex matching of non-ASCII text does not
+            # always agree with str.lower(); try every pattern
+            return list(range(len(self.compiled)))
+        query_lower = query.lower()
+        selected = set(self.unindexed)
+        for keyword in self.keywords:
+            if keyword in query_lower:
+                selected.update(self.keyword_index[keyword])
+        return sorted(selected)
+
+    def match_detail(self, query: str) -> Optional[Tuple[str, List, int]]:
+        """Return (intent, args, matched length) for the first pattern that matches, or None"""
+        for order in self.candidates(query):
+            _, intent, compiled = self.compiled[order]
+            match = compiled.search(query)
+            if match:
+                args = list(match.groups()) if match.groups() else []
+                return intent, args, match.end() - match.start()
+        return None
+
+    def match(self, query: str) -> Optional[Tuple[str, List]]:
+        """Return (intent, args) for the first pattern that matches, or None"""
+        match = self.match_detail(query)
+        if match:
+            return match[0], match[1]
+        return None
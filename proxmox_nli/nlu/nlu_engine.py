@@ -2,8 +2,10 @@ import re
 import nltk
 import logging
 import os
+import time
 from typing import Dict, Any, List, Tuple, Optional
 from nltk.tokenize import word_tokenize
+from prometheus_client import Counter, Histogram
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,17 +26,40 @@ from .entity_extraction import EntityExtractor
 from .intent_identification import IntentIdentifier
 from .ollama_client import OllamaClient
 from .huggingface_client import HuggingFaceClient
+from .query_cache import QueryResultCache
+from ..utils.query_profiler import stage
+
+# Pronouns replaced with the current VM before pattern matching
+_PRONOUN_RE = re.compile(r'\b(?:it|its|this|that)\b', re.IGNORECASE)
+
+NLU_TIER_LATENCY = Histogram(
+    'nlu_tier_latency_seconds', 'Time spent in each NLU tier', ['tier'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+NLU_TIER_DECISIONS = Counter('nlu_tier_decisions_total', 'Queries resolved by each NLU tier', ['tier'])
 
 class NLU_Engine:
     def __init__(self, use_ollama=True, use_huggingface=False, 
                  ollama_model="llama3", ollama_url=None, 
-                 huggingface_model="mistralai/Mistral-7B-Instruct-v0.2", huggingface_api_key=None):
+                 huggingface_model="mistralai/Mistral-7B-Instruct-v0.2", huggingface_api_key=None,
+                 query_cache_size=512, query_cache_ttl=600, pattern_confidence_threshold=0.75):
         """Initialize the NLU Engine with optional Ollama/Hugging Face integration"""
         self.preprocessor = Preprocessor()
         self.context_manager = ContextManager()
         self.entity_extractor = EntityExtractor()
         self.intent_identifier = IntentIdentifier()
         
+        # Cache of LLM intent results so repeated queries skip the LLM round trip
+        self.query_cache = QueryResultCache(
+            max_entries=int(os.getenv("NLU_CACHE_SIZE", query_cache_size)),
+            ttl=float(os.getenv("NLU_CACHE_TTL", query_cache_ttl))
+        )
+        
+        # Pattern NLU results at or above this confidence skip the LLM
+        self.pattern_confidence_threshold = float(
+            os.getenv("NLU_PATTERN_CONFIDENCE", pattern_confidence_threshold)
+        )
+        
         # Share context manager's context with intent identifier
         self.intent_identifier.context = self.context_manager.context
         
@@ -70,96 +95,115 @@ class NLU_Engine:
                 logger.warning("NLU will fall back to Ollama or basic pattern matching")
                 self.use_huggingface = False
     
-    def process_query(self, query: str):
-        """Process a natural language query"""
-        try:
-            # Preprocess the query
-            preprocessed_query = self.preprocessor.preprocess_query(query)
-            
-            # Try Hugging Face first if available
-            if self.use_huggingface and self.huggingface_client:
-                try:
-                    # Pass conversation history for contextual understanding
-                    intent, args, entities = self.huggingface_client.get_intent_and_entities(
-                        query, 
-                        conversation_history=self.context_manager.get_active_context()
-                    )
-                    
-                    # If Hugging Face returned a valid intent, use it
-                    if intent and intent != "unknown":
-                        # Convert entities to lowercase keys and preserve original VM names
-                        entities = {k.lower(): v for k, v in entities.items()}
-                        
-                        # Update conversation context
-                        self.context_manager.update_context(intent, entities)
-                        
-                        # Resolve contextual references
-                        entities = self.context_manager.resolve_contextual_references(query, entities)
-                        
-                        # Keep intent identifier's context in sync
-                        self.intent_identifier.context = self.context_manager.context
-                        
-                        logger.info(f"Hugging Face identified intent: {intent} with entities: {entities}")
-                        return intent, list(args) if args else [], entities
-                except Exception as e:
-                    logger.warning(f"Error using Hugging Face for NLU: {str(e)}")
-                    logger.warning("Falling back to Ollama or traditional NLU pipeline")
-            
-            # Try Ollama next if available and Hugging Face failed or is not enabled
-            if self.use_ollama and self.ollama_client:
-                try:
-                    # Pass conversation history for contextual understanding
-                    intent, args, entities = self.ollama_client.get_intent_and_entities(
+    def _get_llm_intent(self, query: str, cache_key) -> Optional[Tuple[str, List, Dict[str, Any], str]]:
+        """Return (intent, args, entities, source) from the cache or the first LLM that recognizes the query"""
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"NLU cache hit for query: {query}")
+            return cached
+        
+        clients = []
+        # Try Hugging Face first if available, then Ollama
+        if self.use_huggingface and self.huggingface_client:
+            clients.append(("Hugging Face", self.huggingface_client))
+        if self.use_ollama and self.ollama_client:
+            clients.append(("Ollama", self.ollama_client))
+        
+        for source, client in clients:
+            try:
+                started = time.perf_counter()
+                # Pass conversation history for contextual understanding
+                with stage('llm'):
+                    intent, args, entities = client.get_intent_and_entities(
                         query, 
                         conversation_history=self.context_manager.get_active_context()
                     )
-                    
-                    # If Ollama returned a valid intent, use it
-                    if intent and intent != "unknown":
-                        # Convert entities to lowercase keys and preserve original VM names
-                        entities = {k.lower(): v for k, v in entities.items()}
-                        
-                        # Update conversation context
-                        self.context_manager.update_context(intent, entities)
-                        
-                        # Resolve contextual references
-                        entities = self.context_manager.resolve_contextual_references(query, entities)
-                        
-                        # Keep intent identifier's context in sync
-                        self.intent_identifier.context = self.context_manager.context
-                        
-                        logger.info(f"Ollama identified intent: {intent} with entities: {entities}")
-                        return intent, list(args) if args else [], entities
-                except Exception as e:
-                    logger.warning(f"Error using Ollama for NLU: {str(e)}")
-                    logger.warning("Falling back to traditional NLU pipeline")
-            
-            # Fallback to traditional NLU pipeline
-            logger.info("Using traditional NLU pipeline")
-            
-            # First check the context for any references
-            context = self.context_manager.get_active_context()
-            resolved_query = query
+                llm_ms = (time.perf_counter() - started) * 1000
+                
+                # If the LLM returned a valid intent, use it
+                if intent and intent != "unknown":
+                    # Convert entities to lowercase keys and preserve original VM names
+                    entities = {k.lower(): v for k, v in entities.items()}
+                    self.query_cache.set(cache_key, intent, args, entities, source, llm_ms)
+                    return intent, list(args) if args else [], entities, source
+            except Exception as e:
+                logger.warning(f"Error using {source} for NLU: {str(e)}")
+                logger.warning("Falling back to the next NLU option")
+        return None
+    
+    def _identify_with_patterns(self, query: str) -> Tuple[str, List, Dict[str, Any], float]:
+        """Run the pattern NLU tier and return (intent, args, entities, confidence)"""
+        # First check the context for any references
+        context = self.context_manager.get_active_context()
+        resolved_query = query
+        
+        # If query contains pronouns, check if we have context
+        if context.get('current_vm') and _PRONOUN_RE.search(query):
+            # For example, replace "Stop it" with "Stop vm-100" if that was the last VM referenced
+            resolved_query = _PRONOUN_RE.sub(context['current_vm'], query.lower())
+            logger.info(f"Resolved query with context: {resolved_query}")
+        
+        # Check intent patterns
+        intent, args, confidence = self.intent_identifier.identify_intent_with_confidence(resolved_query)
+        
+        # Extract entities
+        entities = self.entity_extractor.extract_entities(resolved_query)
+        return intent, args, entities, confidence
+    
+    def process_query(self, query: str):
+        """Process a natural language query
+        
+        The pattern NLU runs first; the LLM clients are only consulted when its
+        confidence is below pattern_confidence_threshold.
+        """
+        try:
+            # Preprocess the query
+            with stage('preprocess'):
+                preprocessed_query = self.preprocessor.preprocess_query(query)
             
-            # If query contains pronouns, check if we have context
-            if any(word in query.lower() for word in ['it', 'its', 'this', 'that']):
-                # Try to resolve the pronoun using context
-                if context.get('current_vm'):
-                    # For example, replace "Stop it" with "Stop vm-100" if that was the last VM referenced
-                    resolved_query = query.lower().replace('it', context['current_vm'])
-                    resolved_query = resolved_query.replace('this', context['current_vm'])
-                    resolved_query = resolved_query.replace('that', context['current_vm'])
-                    logger.info(f"Resolved query with context: {resolved_query}")
+            try:
+                with NLU_TIER_LATENCY.labels(tier='pattern').time(), stage('pattern_nlu'):
+                    intent, args, entities, confidence = self._identify_with_patterns(query)
+            except Exception as e:
+                logger.warning(f"Error in pattern NLU: {str(e)}")
+                intent, args, entities, confidence = "error", ["error"], {"error": str(e)}, 0.0
             
-            # Check intent patterns
-            intent, args = self.intent_identifier.identify_intent(resolved_query)
+            llm_enabled = self.use_huggingface or self.use_ollama
+            if confidence >= self.pattern_confidence_threshold or not llm_enabled:
+                NLU_TIER_DECISIONS.labels(tier='pattern').inc()
+                # Update context with the new entities
+                self.context_manager.update_context(intent, entities)
+                return intent, args, entities
             
-            # Extract entities
-            entities = self.entity_extractor.extract_entities(resolved_query, intent)
+            logger.debug(f"Pattern NLU confidence {confidence:.2f} for '{intent}' is below "
+                         f"{self.pattern_confidence_threshold}, consulting LLM")
+            cache_key = self.query_cache.make_key(
+                preprocessed_query,
+                self.context_manager.context,
+                contextual=self.context_manager.has_contextual_reference(query)
+            )
+            with NLU_TIER_LATENCY.labels(tier='llm').time():
+                llm_result = self._get_llm_intent(query, cache_key)
+            if llm_result:
+                llm_intent, llm_args, llm_entities, source = llm_result
+                NLU_TIER_DECISIONS.labels(tier='llm').inc()
+                
+                # Update conversation context
+                self.context_manager.update_context(llm_intent, llm_entities)
+                
+                # Resolve contextual references
+                llm_entities = self.context_manager.resolve_contextual_references(query, llm_entities)
+                
+                # Keep intent identifier's context in sync
+                self.intent_identifier.context = self.context_manager.context
+                
+                logger.info(f"{source} identified intent: {llm_intent} with entities: {llm_entities}")
+                return llm_intent, llm_args, llm_entities
             
-            # Update context with the new entities
+            # Fall back to the low-confidence pattern result
+            logger.info("Using traditional NLU pipeline")
+            NLU_TIER_DECISIONS.labels(tier='pattern_fallback').inc()
             self.context_manager.update_context(intent, entities)
-            
             return intent, args, entities
             
         except Exception as e:
@@ -187,6 +231,10 @@ class NLU_Engine:
         # If both failed, return None to use default response formatting
         return None
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get hit rate and saved LLM time for the query result cache"""
+        return self.query_cache.stats()
+    
     def save_context(self, filepath: str) -> bool:
         """Save current context to a file"""
         return self.context_manager.save_context(filepath)
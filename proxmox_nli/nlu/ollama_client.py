@@ -8,7 +8,13 @@ import os
 import json
 import requests
 import time
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, List, Any, Tuple, Optional, Iterator
+from prometheus_client import Histogram
+
+TIME_TO_FIRST_TOKEN = Histogram(
+    'ollama_time_to_first_token_seconds', 'Time from request to the first streamed token',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16)
+)
 
 class OllamaClient:
     def __init__(self, model_name: str = "llama3", base_url: str = None):
@@ -219,18 +225,8 @@ class OllamaClient:
         # Fallback to unknown intent if anything fails
         return "unknown", [], {}
     
-    def enhance_response(self, query: str, intent: str, result: Dict[str, Any]) -> str:
-        """
-        Enhance a response using Ollama for better natural language generation.
-        
-        Args:
-            query: Original user query
-            intent: Identified intent
-            result: Command execution result dictionary
-            
-        Returns:
-            Enhanced natural language response
-        """
+    def _build_enhance_prompt(self, query: str, intent: str, result: Dict[str, Any]) -> Tuple[str, str]:
+        """Build the (system prompt, prompt) pair used to enhance a response"""
         system_prompt = """You are an assistant for a Proxmox VE environment. 
         Format the response data into a helpful, natural language reply for the user.
         Keep responses concise and professional. Focus on the most important information.
@@ -261,6 +257,21 @@ class OllamaClient:
         
         Generate a natural language response summarizing this information:
         """
+        return system_prompt, prompt
+    
+    def enhance_response(self, query: str, intent: str, result: Dict[str, Any]) -> str:
+        """
+        Enhance a response using Ollama for better natural language generation.
+        
+        Args:
+            query: Original user query
+            intent: Identified intent
+            result: Command execution result dictionary
+            
+        Returns:
+            Enhanced natural language response
+        """
+        system_prompt, prompt = self._build_enhance_prompt(query, intent, result)
         
         try:
             start_time = time.time()
@@ -288,7 +299,61 @@ class OllamaClient:
         
         # Fallback to original result if enhancement fails
         return None
+    
+    def stream_enhance_response(self, query: str, intent: str, result: Dict[str, Any]) -> Iterator[str]:
+        """
+        Stream an enhanced response token by token as Ollama generates it.
+        
+        Args:
+            query: Original user query
+            intent: Identified intent
+            result: Command execution result dictionary
+            
+        Yields:
+            Response text fragments in generation order. Nothing is yielded
+            if the request fails before the first token.
+        """
+        system_prompt, prompt = self._build_enhance_prompt(query, intent, result)
         
+        start_time = time.time()
+        first_token_time = None
+        try:
+            with requests.post(
+                self.api_url,
+                json={
+                    "model": self.model_name,
+                    "prompt": prompt,
+                    "system": system_prompt,
+                    "stream": True,
+                    "temperature": 0.7,
+                },
+                stream=True,
+                timeout=(5, 30)  # Connect timeout, then max gap between streamed chunks
+            ) as response:
+                if response.status_code != 200:
+                    print(f"Warning: Ollama API returned status code {response.status_code}")
+                    return
+                
+                # Ollama streams one JSON object per line
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    token = chunk.get("response", "")
+                    if token:
+                        if first_token_time is None:
+                            first_token_time = time.time() - start_time
+                            TIME_TO_FIRST_TOKEN.observe(first_token_time)
+                        yield token
+                    if chunk.get("done"):
+                        break
+        except Exception as e:
+            print(f"Warning: Error streaming enhanced response: {str(e)}")
+        
+        if first_token_time is not None:
+            print(f"First token in {first_token_time:.2f} seconds, "
+                  f"response streamed in {time.time() - start_time:.2f} seconds")
+    
     def get_contextual_information(self) -> Dict[str, Any]:
         """
         Get current conversation context information
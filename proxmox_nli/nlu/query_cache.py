@@ -0,0 +1,110 @@
+"""
+Result cache for LLM-backed intent recognition.
+
+Stores the (intent, args, entities) an LLM returned for a query so repeated
+queries like "list vms" skip the LLM round trip. Entries are keyed on the
+preprocessed query plus the context fields that affect resolution, expire
+after a TTL and are bounded with LRU eviction.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+# Context fields that change how a contextual query resolves
+CONTEXT_KEY_FIELDS = ('current_vm', 'current_service')
+
+class QueryResultCache:
+    """Thread-safe TTL + LRU cache of LLM intent results"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 600):
+        """Initialize the cache
+
+        Args:
+            max_entries: Maximum number of cached results before LRU eviction
+            ttl: Seconds a cached result stays valid; 0 disables caching
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_llm_ms = 0.0
+
+    @staticmethod
+    def make_key(preprocessed_query: str, context: Optional[Dict[str, Any]] = None,
+                 contextual: bool = True) -> Tuple:
+        """Build a cache key
+
+        Args:
+            preprocessed_query: Output of Preprocessor.preprocess_query
+            context: Active conversation context
+            contextual: Whether the query refers to earlier context; context-free
+                queries share one entry regardless of the current context
+        """
+        context = context or {}
+        if contextual:
+            fields = tuple(str(context.get(field)) if context.get(field) is not None else None
+                           for field in CONTEXT_KEY_FIELDS)
+        else:
+            fields = (None,) * len(CONTEXT_KEY_FIELDS)
+        return (preprocessed_query.strip(),) + fields
+
+    def get(self, key: Tuple) -> Optional[Tuple[str, List, Dict[str, Any], str]]:
+        """Return (intent, args, entities, source) for a key, or None on a miss"""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.saved_llm_ms += result['llm_ms']
+                    return (result['intent'], list(result['args']),
+                            copy.deepcopy(result['entities']), result['source'])
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Tuple, intent: str, args: List, entities: Dict[str, Any],
+            source: str, llm_ms: float):
+        """Store an LLM result along with how long the LLM call took"""
+        if self.ttl <= 0 or not intent or intent in ('unknown', 'error'):
+            return
+        result = {
+            'intent': intent,
+            'args': list(args) if args else [],
+            'entities': copy.deepcopy(entities),
+            'source': source,
+            'llm_ms': llm_ms
+        }
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all cached results"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit rate and LLM time saved by the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'saved_llm_ms': round(self.saved_llm_ms, 1)
+            }
@@ -3,58 +3,79 @@ Service health monitoring for Proxmox NLI.
 Provides natural language status reports on service health.
 """
 import logging
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import threading
-import json
 import os
-from collections import defaultdict
+from collections import defaultdict, deque
+
+from .state_journal import StateJournal
 
 logger = logging.getLogger(__name__)
 
 class ServiceHealthMonitor:
     """Monitors health of deployed services and provides natural language status reports."""
     
-    def __init__(self, service_manager, check_interval: int = 300):
+    # Markers separating the sections of the batched per-VM docker command
+    STATS_MARKER = "<<<health-stats>>>"
+    LOGS_MARKER = "<<<health-logs "
+    
+    def __init__(self, service_manager, check_interval: int = 300, max_workers: int = 8,
+                 jitter: float = 0.1, data_dir: str = None):
         """Initialize the service health monitor.
         
         Args:
             service_manager: ServiceManager instance to interact with services
             check_interval: Interval in seconds between health checks (default: 5 minutes)
+            max_workers: Maximum number of VMs checked at the same time
+            jitter: Fraction of the check interval used to randomize the schedule and
+                spread the per-VM checks of one round
+            data_dir: Directory for persisted health data (default: data/health next to this module)
         """
         self.service_manager = service_manager
         self.check_interval = check_interval
-        self.health_data = {}
+        self.max_workers = max_workers
+        self.jitter = jitter
         self.monitoring_thread = None
         self.monitoring_active = False
         
+        # Recent check latencies in seconds, per VM batch and per service
+        self.check_latencies = {
+            "vm": deque(maxlen=500),
+            "service": deque(maxlen=500),
+            "round": deque(maxlen=100)
+        }
+        self.last_check_latencies = {}
+        
         # Create data directory if it doesn't exist
-        self.data_dir = os.path.join(os.path.dirname(__file__), 'data', 'health')
+        self.data_dir = data_dir or os.path.join(os.path.dirname(__file__), 'data', 'health')
         os.makedirs(self.data_dir, exist_ok=True)
         
-        # Load existing health data if available
+        # Changes are journaled as deltas and the state is loaded in the background
+        self._journal = StateJournal(self.data_dir, 'health_data',
+                                     legacy_file=os.path.join(self.data_dir, 'health_data.json'))
         self._load_health_data()
+    
+    @property
+    def health_data(self) -> Dict:
+        """Health data per service, waiting for the initial load if it is still running."""
+        return self._journal.state()
         
     def _load_health_data(self):
-        """Load health data from disk."""
-        try:
-            health_file = os.path.join(self.data_dir, 'health_data.json')
-            if os.path.exists(health_file):
-                with open(health_file, 'r') as f:
-                    self.health_data = json.load(f)
-                logger.info(f"Loaded health data for {len(self.health_data)} services")
-        except Exception as e:
-            logger.error(f"Error loading health data: {str(e)}")
-            self.health_data = {}
+        """Start loading health data from disk."""
+        self._journal.start_loading()
             
-    def _save_health_data(self):
-        """Save health data to disk."""
+    def _save_health_data(self, wait: bool = False):
+        """Persist recorded health data changes.
+        
+        Changes are appended to the journal by a background writer, so by
+        default this only wakes the writer up instead of blocking the caller.
+        """
         try:
-            health_file = os.path.join(self.data_dir, 'health_data.json')
-            with open(health_file, 'w') as f:
-                json.dump(self.health_data, f)
-            logger.debug("Health data saved to disk")
+            self._journal.flush(wait=wait)
         except Exception as e:
             logger.error(f"Error saving health data: {str(e)}")
     
@@ -73,29 +94,41 @@ class ServiceHealthMonitor:
     def stop_monitoring(self):
         """Stop the monitoring thread."""
         self.monitoring_active = False
+        stopped = False
         if self.monitoring_thread:
             self.monitoring_thread.join(timeout=10)
             logger.info("Stopped service health monitoring")
-            return True
-        return False
+            stopped = True
+        self._save_health_data(wait=True)
+        return stopped
     
     def _monitoring_loop(self):
         """Main monitoring loop to check service health periodically."""
+        spread = self.check_interval * self.jitter
         while self.monitoring_active:
             try:
-                self.check_services_health()
+                self.check_services_health(spread=spread)
                 self._save_health_data()
             except Exception as e:
                 logger.error(f"Error in health monitoring loop: {str(e)}")
                 
-            # Sleep for the check interval
-            for _ in range(self.check_interval):
-                if not self.monitoring_active:
-                    break
-                time.sleep(1)
+            # Sleep for the check interval, randomized so that monitors started
+            # together drift apart instead of checking at the same second
+            delay = self.check_interval + random.uniform(-spread, spread) / 2
+            deadline = time.time() + max(1.0, delay)
+            while self.monitoring_active and time.time() < deadline:
+                time.sleep(min(1.0, max(0.0, deadline - time.time())))
     
-    def check_services_health(self):
-        """Check health of all deployed services."""
+    def check_services_health(self, spread: float = 0.0):
+        """Check health of all deployed services.
+        
+        Services are grouped by VM and the VMs are checked concurrently by a
+        bounded worker pool. Docker services on one VM share a single guest
+        agent exec for their status, stats and logs.
+        
+        Args:
+            spread: Seconds over which the start of the per-VM checks is randomly spread
+        """
         # Get list of all deployed services
         deployed_services = self.service_manager.list_deployed_services()
         if not deployed_services.get("success", False):
@@ -103,9 +136,29 @@ class ServiceHealthMonitor:
             return False
             
         now = datetime.now().isoformat()
+        round_start = time.perf_counter()
         
-        # Check each service
+        services_by_vm = defaultdict(list)
         for service in deployed_services.get("services", []):
+            services_by_vm[service["vm_id"]].append(service)
+        
+        results = []
+        if services_by_vm:
+            workers = max(1, min(self.max_workers, len(services_by_vm)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="health-check") as executor:
+                futures = {
+                    vm_id: executor.submit(self._check_vm_services, vm_id, services,
+                                           random.uniform(0, spread) if spread > 0 else 0.0)
+                    for vm_id, services in services_by_vm.items()
+                }
+                for vm_id, future in futures.items():
+                    try:
+                        results.extend(future.result())
+                    except Exception as e:
+                        logger.error(f"Error checking services on VM {vm_id}: {str(e)}")
+        
+        # Apply the results from this thread so health_data is never shared
+        for service, status, metrics, latency in results:
             service_id = service["service_id"]
             vm_id = service["vm_id"]
             
@@ -119,43 +172,189 @@ class ServiceHealthMonitor:
                     "last_uptime": None,
                     "status_history": []
                 }
-            
-            # Get service status
-            status = self.service_manager.get_service_status(service_id, vm_id)
-            
-            # Get service metrics
-            metrics = self._collect_service_metrics(service_id, vm_id)
+                self._journal.set([service_id], self.health_data[service_id])
             
             # Add health check record
             health_check = {
                 "timestamp": now,
                 "status": status.get("status", "Unknown"),
                 "success": status.get("success", False),
-                "metrics": metrics
+                "metrics": metrics,
+                "latency": round(latency, 4)
             }
             
             # Update service health data
             service_health = self.health_data[service_id]
-            service_health["vm_id"] = vm_id  # Update VM ID in case it changed
-            service_health["checks"].append(health_check)
-            service_health["status_history"].append({
+            status_entry = {
                 "timestamp": now,
                 "status": status.get("status", "Unknown")
-            })
+            }
+            if service_health.get("vm_id") != vm_id:
+                service_health["vm_id"] = vm_id  # Update VM ID in case it changed
+                self._journal.set([service_id, "vm_id"], vm_id)
+            service_health["checks"].append(health_check)
+            service_health["status_history"].append(status_entry)
             
             # Keep only the last 50 checks for history
             if len(service_health["checks"]) > 50:
                 service_health["checks"] = service_health["checks"][-50:]
             if len(service_health["status_history"]) > 100:
                 service_health["status_history"] = service_health["status_history"][-100:]
+            self._journal.append([service_id, "checks"], health_check, limit=50)
+            self._journal.append([service_id, "status_history"], status_entry, limit=100)
                 
             # Check for issues based on status and metrics
+            issues = service_health["issues"]
+            known_issues = len(issues)
+            resolved_before = sum(1 for issue in issues if issue.get("resolved"))
             self._detect_issues(service_id, health_check)
+            if sum(1 for issue in issues if issue.get("resolved")) != resolved_before:
+                self._journal.set([service_id, "issues"], issues)
+            else:
+                for issue in issues[known_issues:]:
+                    self._journal.append([service_id, "issues"], issue)
             
             # Calculate uptime if possible
             self._calculate_uptime(service_id)
-            
+            self._journal.set([service_id, "last_uptime"], service_health.get("last_uptime"))
+        
+        self.check_latencies["round"].append(time.perf_counter() - round_start)
         return True
+    
+    def _check_vm_services(self, vm_id: str, services: List[Dict], delay: float = 0.0) -> List[Tuple[Dict, Dict, Dict, float]]:
+        """Check every service deployed on one VM.
+        
+        Returns:
+            List of (service, status, metrics, latency) tuples
+        """
+        if delay > 0:
+            time.sleep(delay)
+        vm_start = time.perf_counter()
+        
+        docker_services = []
+        results = []
+        for service in services:
+            service_def = self.service_manager.catalog.get_service(service["service_id"])
+            if service_def and service_def['deployment'].get('method', 'docker') == 'docker':
+                docker_services.append(service)
+                continue
+            start = time.perf_counter()
+            status = self.service_manager.get_service_status(service["service_id"], vm_id)
+            metrics = self._collect_service_metrics(service["service_id"], vm_id)
+            results.append((service, status, metrics, self._record_latency(
+                "service", service["service_id"], time.perf_counter() - start)))
+        
+        if docker_services:
+            start = time.perf_counter()
+            checks = self._check_docker_services(vm_id, [s["service_id"] for s in docker_services])
+            # The services share one exec, so each is charged the batch's latency
+            latency = time.perf_counter() - start
+            for service in docker_services:
+                status, metrics = checks[service["service_id"]]
+                results.append((service, status, metrics, self._record_latency(
+                    "service", service["service_id"], latency)))
+        
+        self._record_latency("vm", vm_id, time.perf_counter() - vm_start)
+        return results
+    
+    def _check_docker_services(self, vm_id: str, service_ids: List[str]) -> Dict[str, Tuple[Dict, Dict]]:
+        """Get status, stats and recent logs of a VM's docker services with one guest agent exec."""
+        names = " ".join(service_ids)
+        command = (
+            "docker ps -a --format '{{.Names}}|{{.Status}}'; "
+            f"echo '{self.STATS_MARKER}'; "
+            "docker stats --no-stream --format '{{.Name}},{{.CPUPerc}},{{.MemUsage}},{{.NetIO}},{{.BlockIO}}'; "
+            f"for c in {names}; do echo \"{self.LOGS_MARKER}$c>>>\"; docker logs --tail 5 \"$c\" 2>&1; done"
+        )
+        result = self.service_manager.docker_deployer.run_command(vm_id, command)
+        
+        if not result.get("success"):
+            status = {
+                "success": False,
+                "message": f"Failed to get Docker container status: {result.get('error', result.get('message', ''))}"
+            }
+            return {service_id: (status, {}) for service_id in service_ids}
+        
+        statuses, stats, logs = self._parse_docker_batch(result.get("output", ""))
+        checks = {}
+        for service_id in service_ids:
+            # docker ps --filter name= matches substrings, so fall back to that
+            container = service_id if service_id in statuses else next(
+                (name for name in statuses if service_id in name), None)
+            status = {
+                "success": True,
+                "status": statuses[container] if container else "Not running",
+                "service_id": service_id,
+                "vm_id": vm_id
+            }
+            metrics = {}
+            if container in stats:
+                metrics.update(stats[container])
+            if service_id in logs:
+                metrics["recent_logs"] = logs[service_id]
+            checks[service_id] = (status, metrics)
+        return checks
+    
+    def _parse_docker_batch(self, output: str) -> Tuple[Dict[str, str], Dict[str, Dict], Dict[str, str]]:
+        """Split the batched docker command output into statuses, stats and logs per container."""
+        statuses, stats, logs = {}, {}, {}
+        section = "ps"
+        log_lines = None
+        for line in output.splitlines():
+            if line.strip() == self.STATS_MARKER:
+                section = "stats"
+                continue
+            if line.startswith(self.LOGS_MARKER) and line.endswith(">>>"):
+                section = "logs"
+                log_lines = []
+                logs[line[len(self.LOGS_MARKER):-3]] = log_lines
+                continue
+            
+            if section == "ps" and "|" in line:
+                name, status = line.split("|", 1)
+                statuses[name.strip()] = status.strip()
+            elif section == "stats":
+                parts = line.split(',')
+                if len(parts) >= 5:
+                    stats[parts[0].strip()] = {
+                        "cpu_usage": parts[1].strip(),
+                        "memory_usage": parts[2].strip(),
+                        "network_io": parts[3].strip(),
+                        "disk_io": parts[4].strip()
+                    }
+            elif section == "logs":
+                log_lines.append(line)
+        
+        return statuses, stats, {name: "\n".join(lines) for name, lines in logs.items()}
+    
+    def _record_latency(self, kind: str, key: str, latency: float) -> float:
+        """Record a check latency and return it."""
+        self.check_latencies[kind].append(latency)
+        self.last_check_latencies[f"{kind}:{key}"] = latency
+        return latency
+    
+    def get_check_metrics(self) -> Dict:
+        """Get latency statistics of recent health checks.
+        
+        Returns:
+            Dictionary with count, average, p50, p95 and max latency in seconds per
+            check kind (round, vm, service) and the latest latency per VM and service
+        """
+        metrics = {}
+        for kind, latencies in self.check_latencies.items():
+            values = sorted(latencies)
+            if not values:
+                metrics[kind] = {"count": 0}
+                continue
+            metrics[kind] = {
+                "count": len(values),
+                "avg": sum(values) / len(values),
+                "p50": values[len(values) // 2],
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "max": values[-1]
+            }
+        metrics["latest"] = dict(self.last_check_latencies)
+        return metrics
         
     def _collect_service_metrics(self, service_id: str, vm_id: str) -> Dict:
         """Collect metrics for a specific service."""
@@ -0,0 +1,309 @@
+"""
+Append-only on-disk archive for numeric service metrics.
+
+Samples are written as fixed-width binary records into time-partitioned
+segment files, so recording a sample is a single append instead of
+re-serializing the whole history. Every sample also updates 1 minute, 1 hour
+and 1 day rollups, which are flushed to their own segments when a bucket
+closes. Queries memory-map only the segments overlapping the requested range,
+and retention is enforced by deleting whole expired segments.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RAW_DTYPE = np.dtype([('ts', '<f8'), ('series', '<u4'), ('value', '<f8')])
+ROLLUP_DTYPE = np.dtype([('ts', '<f8'), ('series', '<u4'), ('count', '<u4'),
+                         ('sum', '<f8'), ('min', '<f8'), ('max', '<f8'), ('last', '<f8')])
+
+# resolution -> bucket width in seconds (0 for raw samples)
+RESOLUTIONS = {'raw': 0, '1m': 60, '1h': 3600, '1d': 86400}
+
+# resolution -> seconds of data per segment file
+SEGMENT_SECONDS = {'raw': 3600, '1m': 86400, '1h': 30 * 86400, '1d': 365 * 86400}
+
+# resolution -> seconds of data kept before segments are deleted
+DEFAULT_RETENTION = {'raw': 2 * 86400, '1m': 30 * 86400, '1h': 365 * 86400, '1d': 5 * 365 * 86400}
+
+# Archives whose open rollup buckets are flushed at interpreter exit
+_open_archives: 'weakref.WeakSet[MetricsArchive]' = weakref.WeakSet()
+
+class MetricsArchive:
+    """Segmented, memory-mapped metric archive with automatic rollups"""
+
+    def __init__(self, data_dir: str, retention: Optional[Dict[str, float]] = None,
+                 compact_interval: float = 3600):
+        """
+        Initialize the archive.
+
+        Args:
+            data_dir: Directory holding the series index and segment files
+            retention: Seconds to keep per resolution, overriding DEFAULT_RETENTION
+            compact_interval: Minimum seconds between automatic retention passes
+        """
+        self.data_dir = data_dir
+        self.retention = dict(DEFAULT_RETENTION)
+        self.retention.update(retention or {})
+        self.compact_interval = compact_interval
+        self._lock = threading.RLock()
+
+        for resolution in RESOLUTIONS:
+            os.makedirs(os.path.join(data_dir, resolution), exist_ok=True)
+
+        self._index_path = os.path.join(data_dir, 'series.json')
+        self._series_ids: Dict[str, int] = {}
+        self._series_names: List[str] = []
+        self._load_index()
+
+        # resolution -> (segment start, open file) for the segment being appended to
+        self._writers: Dict[str, Tuple[float, object]] = {}
+        # (resolution, series id) -> open bucket [start, count, sum, min, max, last]
+        self._open_buckets: Dict[Tuple[str, int], List[float]] = {}
+        self._last_values: Dict[int, Tuple[float, float]] = {}
+        self._last_compaction = 0.0
+        _open_archives.add(self)
+
+    def _load_index(self):
+        """Load the series name -> id index"""
+        if not os.path.exists(self._index_path):
+            return
+        try:
+            with open(self._index_path, 'r') as f:
+                self._series_names = json.load(f)
+            self._series_ids = {name: i for i, name in enumerate(self._series_names)}
+        except Exception as e:
+            logger.error(f"Error loading metrics archive index: {str(e)}")
+
+    def _series_id(self, name: str) -> int:
+        """Return the id for a series, registering it on first use"""
+        series_id = self._series_ids.get(name)
+        if series_id is None:
+            series_id = len(self._series_names)
+            self._series_names.append(name)
+            self._series_ids[name] = series_id
+            # The index only changes when a new series appears
+            tmp_path = self._index_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self._series_names, f)
+            os.replace(tmp_path, self._index_path)
+        return series_id
+
+    def series_names(self, prefix: str = '') -> List[str]:
+        """List archived series names, optionally filtered by prefix"""
+        with self._lock:
+            return [name for name in self._series_names if name.startswith(prefix)]
+
+    def append(self, name: str, value: float, timestamp: Optional[float] = None):
+        """Record one sample for a series"""
+        self.append_many({name: value}, timestamp)
+
+    def append_many(self, values: Dict[str, float], timestamp: Optional[float] = None):
+        """Record samples for several series taken at the same time"""
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        with self._lock:
+            records = np.zeros(len(values), dtype=RAW_DTYPE)
+            for i, (name, value) in enumerate(values.items()):
+                series_id = self._series_id(name)
+                records[i] = (timestamp, series_id, float(value))
+                self._last_values[series_id] = (timestamp, float(value))
+                for resolution, width in RESOLUTIONS.items():
+                    if width:
+                        self._update_bucket(resolution, width, series_id, timestamp, float(value))
+            self._write('raw', timestamp, records)
+            if timestamp - self._last_compaction >= self.compact_interval:
+                self.compact(timestamp)
+
+    def _update_bucket(self, resolution: str, width: int, series_id: int, timestamp: float, value: float):
+        """Fold a sample into its open rollup bucket, writing the previous bucket once it closes"""
+        start = timestamp - timestamp % width
+        key = (resolution, series_id)
+        bucket = self._open_buckets.get(key)
+        if bucket is not None and bucket[0] != start:
+            self._write_bucket(resolution, series_id, bucket)
+            bucket = None
+        if bucket is None:
+            self._open_buckets[key] = [start, 1, value, value, value, value]
+            return
+        bucket[1] += 1
+        bucket[2] += value
+        bucket[3] = min(bucket[3], value)
+        bucket[4] = max(bucket[4], value)
+        bucket[5] = value
+
+    def _write_bucket(self, resolution: str, series_id: int, bucket: List[float]):
+        record = np.array([(bucket[0], series_id, bucket[1], bucket[2], bucket[3], bucket[4], bucket[5])],
+                          dtype=ROLLUP_DTYPE)
+        self._write(resolution, bucket[0], record)
+
+    def _segment_start(self, resolution: str, timestamp: float) -> float:
+        width = SEGMENT_SECONDS[resolution]
+        return timestamp - timestamp % width
+
+    def _segment_path(self, resolution: str, segment_start: float) -> str:
+        return os.path.join(self.data_dir, resolution, f"{int(segment_start)}.seg")
+
+    def _write(self, resolution: str, timestamp: float, records: np.ndarray):
+        """Append fixed-width records to the segment covering timestamp"""
+        segment_start = self._segment_start(resolution, timestamp)
+        writer = self._writers.get(resolution)
+        if writer is None or writer[0] != segment_start:
+            if writer is not None:
+                writer[1].close()
+            writer = (segment_start, open(self._segment_path(resolution, segment_start), 'ab'))
+            self._writers[resolution] = writer
+        writer[1].write(records.tobytes())
+        writer[1].flush()
+
+    def _segments(self, resolution: str, start: float, end: float) -> List[str]:
+        """Segment files that may hold records between start and end"""
+        width = SEGMENT_SECONDS[resolution]
+        directory = os.path.join(self.data_dir, resolution)
+        paths = []
+        for filename in os.listdir(directory):
+            if not filename.endswith('.seg'):
+                continue
+            segment_start = float(filename[:-4])
+            if segment_start <= end and segment_start + width > start:
+                paths.append((segment_start, os.path.join(directory, filename)))
+        return [path for _, path in sorted(paths)]
+
+    def query(self, name: str, start: Optional[float] = None, end: Optional[float] = None,
+              resolution: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Read one series between start and end.
+
+        Args:
+            name: Series name
+            start: Range start timestamp (default: beginning of retention)
+            end: Range end timestamp (default: now)
+            resolution: 'raw', '1m', '1h' or '1d'; picked from the span when omitted
+
+        Returns:
+            Raw resolution: arrays 'timestamp' and 'value'.
+            Rollups: arrays 'timestamp', 'count', 'mean', 'min', 'max' and 'last'.
+            An unknown series gives an empty dict.
+        """
+        end = time.time() if end is None else end
+        resolution = resolution or self.pick_resolution(start, end)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}', expected one of {tuple(RESOLUTIONS)}")
+        start = end - self.retention[resolution] if start is None else start
+
+        with self._lock:
+            series_id = self._series_ids.get(name)
+            if series_id is None:
+                return {}
+            dtype = RAW_DTYPE if resolution == 'raw' else ROLLUP_DTYPE
+            chunks = []
+            for path in self._segments(resolution, start, end):
+                # Ignore a torn trailing record left by an interrupted write
+                count = os.path.getsize(path) // dtype.itemsize
+                if not count:
+                    continue
+                records = np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+                mask = (records['series'] == series_id) & (records['ts'] >= start) & (records['ts'] <= end)
+                chunks.append(np.array(records[mask]))
+                del records
+            if resolution != 'raw':
+                bucket = self._open_buckets.get((resolution, series_id))
+                if bucket is not None and start <= bucket[0] <= end:
+                    chunks.append(np.array([(bucket[0], series_id) + tuple(bucket[1:])], dtype=ROLLUP_DTYPE))
+
+        records = np.concatenate(chunks) if chunks else np.zeros(0, dtype=dtype)
+        records = records[np.argsort(records['ts'], kind='stable')]
+        if resolution == 'raw':
+            return {'timestamp': records['ts'], 'value': records['value']}
+        return self._merge_buckets(records)
+
+    @staticmethod
+    def _merge_buckets(records: np.ndarray) -> Dict[str, np.ndarray]:
+        """Combine rollup records that share a bucket (e.g. written before and after a restart)"""
+        if not len(records):
+            empty = np.zeros(0)
+            return {'timestamp': empty, 'count': empty, 'mean': empty, 'min': empty, 'max': empty, 'last': empty}
+        starts = np.flatnonzero(np.r_[True, records['ts'][1:] != records['ts'][:-1]])
+        ends = np.r_[starts[1:], len(records)] - 1
+        counts = np.add.reduceat(records['count'].astype(np.float64), starts)
+        return {
+            'timestamp': records['ts'][starts],
+            'count': counts,
+            'mean': np.add.reduceat(records['sum'], starts) / counts,
+            'min': np.minimum.reduceat(records['min'], starts),
+            'max': np.maximum.reduceat(records['max'], starts),
+            'last': records['last'][ends]
+        }
+
+    def pick_resolution(self, start: Optional[float], end: float) -> str:
+        """Pick the finest resolution that keeps the span readable and is still retained"""
+        if start is None:
+            return '1d'
+        age = time.time() - start
+        span = end - start
+        for resolution, max_span in (('raw', 6 * 3600), ('1m', 7 * 86400), ('1h', 180 * 86400)):
+            if span <= max_span and age <= self.retention[resolution]:
+                return resolution
+        return '1d'
+
+    def latest(self, name: str) -> Optional[Tuple[float, float]]:
+        """Return the newest (timestamp, value) recorded for a series since startup"""
+        with self._lock:
+            series_id = self._series_ids.get(name)
+            return None if series_id is None else self._last_values.get(series_id)
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Delete segments that are entirely past their retention; returns files removed"""
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            self._last_compaction = now
+            for resolution in RESOLUTIONS:
+                cutoff = now - self.retention[resolution]
+                width = SEGMENT_SECONDS[resolution]
+                writer = self._writers.get(resolution)
+                for path in self._segments(resolution, float('-inf'), cutoff - width):
+                    segment_start = float(os.path.basename(path)[:-4])
+                    if segment_start + width > cutoff:
+                        continue
+                    if writer is not None and writer[0] == segment_start:
+                        writer[1].close()
+                        del self._writers[resolution]
+                    os.remove(path)
+                    removed += 1
+        if removed:
+            logger.debug(f"Removed {removed} expired metrics archive segments")
+        return removed
+
+    def flush(self):
+        """Write open rollup buckets so they survive a restart"""
+        with self._lock:
+            for (resolution, series_id), bucket in self._open_buckets.items():
+                self._write_bucket(resolution, series_id, bucket)
+            self._open_buckets.clear()
+
+    def close(self):
+        """Flush open buckets and close segment files"""
+        with self._lock:
+            self.flush()
+            for _, handle in self._writers.values():
+                handle.close()
+            self._writers.clear()
+
+
+def close_all_archives():
+    """Flush the open rollup buckets of every archive and close its segment files"""
+    for archive in list(_open_archives):
+        try:
+            archive.close()
+        except Exception as e:
+            logger.error(f"Error closing metrics archive {archive.data_dir}: {str(e)}")
+
+atexit.register(close_all_archives)
@@ -7,32 +7,41 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import os
-import json
 import threading
 from collections import defaultdict
 import statistics
 
+from .metrics_archive import MetricsArchive
+from .state_journal import StateJournal
+
 logger = logging.getLogger(__name__)
 
 class ServiceMetricsDashboard:
     """Provides a dashboard with plain language explanations of service metrics."""
     
-    def __init__(self, service_manager, health_monitor=None):
+    def __init__(self, service_manager, health_monitor=None, data_dir: str = None):
         """Initialize the metrics dashboard.
         
         Args:
             service_manager: ServiceManager instance to interact with services
             health_monitor: Optional ServiceHealthMonitor instance for health data
+            data_dir: Optional directory for metrics data (default: services/data/metrics)
         """
         self.service_manager = service_manager
         self.health_monitor = health_monitor
         
         # Create data directory if it doesn't exist
-        self.data_dir = os.path.join(os.path.dirname(__file__), 'data', 'metrics')
+        self.data_dir = data_dir or os.path.join(os.path.dirname(__file__), 'data', 'metrics')
         os.makedirs(self.data_dir, exist_ok=True)
         
-        # Store historical metrics
-        self.metrics_history = {}
+        # Numeric samples are appended to a segmented archive with rollups;
+        # metrics_history only holds the recent window kept in memory and is
+        # persisted as a journal of changes
+        self.archive = MetricsArchive(os.path.join(self.data_dir, 'archive'))
+        self._journal = StateJournal(self.data_dir, 'metrics_history',
+                                     legacy_file=os.path.join(self.data_dir, 'metrics_history.json'))
+        self._history_ready = False
+        self._history_lock = threading.Lock()
         self.load_metrics_history()
         
         # Configure metric thresholds (these can be customized per service)
@@ -136,25 +145,54 @@ class ServiceMetricsDashboard:
             }
         }
         
+    @property
+    def metrics_history(self) -> Dict:
+        """Recent metrics per service, waiting for the initial load if it is still running."""
+        history = self._journal.state()
+        if not self._history_ready:
+            with self._history_lock:
+                if not self._history_ready:
+                    self._restore_recent_metrics(history)
+                    self._history_ready = True
+        return history
+        
     def load_metrics_history(self):
-        """Load metrics history from disk."""
-        try:
-            metrics_file = os.path.join(self.data_dir, 'metrics_history.json')
-            if os.path.exists(metrics_file):
-                with open(metrics_file, 'r') as f:
-                    self.metrics_history = json.load(f)
-                logger.info(f"Loaded metrics history for {len(self.metrics_history)} services")
-        except Exception as e:
-            logger.error(f"Error loading metrics history: {str(e)}")
-            self.metrics_history = {}
+        """Start loading metrics history from disk in the background."""
+        self._journal.start_loading()
+    
+    def _restore_recent_metrics(self, history: Dict, hours: int = 24):
+        """Rebuild the recent metrics window of archived services missing from the saved history."""
+        start = time.time() - hours * 3600
+        snapshots = defaultdict(lambda: defaultdict(dict))
+        for name in self.archive.series_names():
+            service_id, _, metric = name.partition('/')
+            if service_id in history:
+                continue
+            series = self.archive.query(name, start=start, resolution='raw')
+            for ts, value in zip(series.get('timestamp', []), series.get('value', [])):
+                snapshots[service_id][float(ts)][metric] = float(value)
+        
+        for service_id, by_time in snapshots.items():
+            recent = []
+            for ts in sorted(by_time)[-100:]:
+                snapshot = dict(by_time[ts])
+                snapshot['timestamp'] = datetime.fromtimestamp(ts).isoformat()
+                recent.append(snapshot)
+            history[service_id] = {
+                'recent_metrics': recent,
+                'daily_averages': {},
+                'weekly_averages': {}
+            }
+            self._journal.set([service_id], history[service_id])
             
-    def save_metrics_history(self):
-        """Save metrics history to disk."""
+    def save_metrics_history(self, wait: bool = True):
+        """Persist recorded metrics history changes.
+        
+        Every update is already journaled as a delta by a background writer,
+        so this only writes out the deltas still queued.
+        """
         try:
-            metrics_file = os.path.join(self.data_dir, 'metrics_history.json')
-            with open(metrics_file, 'w') as f:
-                json.dump(self.metrics_history, f)
-            logger.debug("Metrics history saved to disk")
+            self._journal.flush(wait=wait)
         except Exception as e:
             logger.error(f"Error saving metrics history: {str(e)}")
     
@@ -171,9 +209,11 @@ class ServiceMetricsDashboard:
                 'daily_averages': {},
                 'weekly_averages': {}
             }
+            self._journal.set([service_id], self.metrics_history[service_id])
             
         # Add timestamp to metrics
-        metrics['timestamp'] = datetime.now().isoformat()
+        now = datetime.now()
+        metrics['timestamp'] = now.isoformat()
         
         # Add to recent metrics list
         self.metrics_history[service_id]['recent_metrics'].append(metrics)
@@ -182,6 +222,7 @@ class ServiceMetricsDashboard:
         if len(self.metrics_history[service_id]['recent_metrics']) > 100:
             self.metrics_history[service_id]['recent_metrics'] = \
                 self.metrics_history[service_id]['recent_metrics'][-100:]
+        self._journal.append([service_id, 'recent_metrics'], metrics, limit=100)
         
         # Calculate and update daily average
         today = datetime.now().strftime('%Y-%m-%d')
@@ -204,9 +245,18 @@ class ServiceMetricsDashboard:
                 # Running average calculation
                 day_metrics[metric_key] = ((day_metrics[metric_key] * (day_metrics['count'] - 1)) 
                                           + value) / day_metrics['count']
+        self._journal.set([service_id, 'daily_averages', today], day_metrics)
         
-        # Save updated metrics
-        self.save_metrics_history()
+        # Append numeric samples to the archive instead of rewriting the whole history
+        numeric = {
+            f"{service_id}/{key}": value for key, value in metrics.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        if numeric:
+            try:
+                self.archive.append_many(numeric, now.timestamp())
+            except Exception as e:
+                logger.error(f"Error archiving metrics for {service_id}: {str(e)}")
     
     def update_service_metrics_from_health(self):
         """Update metrics for all services using health monitor data."""
@@ -311,7 +361,7 @@ class ServiceMetricsDashboard:
             "service_name": service_name,
             "last_updated": recent_metrics[-1].get('timestamp'),
             "metrics": self._get_latest_metrics(recent_metrics),
-            "trends": self._analyze_trends(recent_metrics),
+            "trends": self._analyze_archived_trends(service_id) or self._analyze_trends(recent_metrics),
             "explanations": {},
             "recommendations": []
         }
@@ -388,6 +438,37 @@ class ServiceMetricsDashboard:
         
         return trends
     
+    def _analyze_archived_trends(self, service_id: str, hours: int = 24) -> Dict:
+        """Analyze trends from the archive's one minute rollups."""
+        trends = {}
+        start = time.time() - hours * 3600
+        for metric in ['cpu_percent', 'memory_percent']:
+            try:
+                rollup = self.archive.query(f"{service_id}/{metric}", start=start, resolution='1m')
+            except Exception as e:
+                logger.error(f"Error reading archived {metric} for {service_id}: {str(e)}")
+                continue
+            means = rollup.get('mean', [])
+            if len(means) < 2:
+                continue
+            
+            change = float(rollup['last'][-1] - rollup['last'][0])
+            if abs(change) < 5:  # Less than 5% change is considered stable
+                trend = 0
+            else:
+                trend = 1 if change > 0 else -1
+            
+            trends[metric] = {
+                'change': change,
+                'trend': trend,
+                'volatility': statistics.stdev(means.tolist()) if len(means) >= 3 else 0,
+                'min': float(rollup['min'].min()),
+                'max': float(rollup['max'].max()),
+                'avg': float((rollup['mean'] * rollup['count']).sum() / rollup['count'].sum())
+            }
+        
+        return trends
+    
     def _generate_explanations(self, metrics: Dict, trends: Dict) -> Dict:
         """Generate plain language explanations for metrics and trends."""
         explanations = {}
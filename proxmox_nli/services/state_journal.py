@@ -0,0 +1,316 @@
+"""
+Delta journal persistence for in-memory service state.
+
+Components such as the health monitor and the metrics dashboard keep a nested
+dict in memory and used to rewrite the whole dict as JSON after every change.
+StateJournal instead records each change as a small delta (set, append or
+delete at a key path) that a background thread appends to a journal file.
+When the journal grows past a threshold the same thread folds it into a
+snapshot. Loading replays the snapshot and journal, and can run in the
+background so constructors do not wait for it.
+
+Files in the journal directory:
+    <name>.snapshot.json    {"seq": last folded delta, "state": {...}}
+    <name>.journal          one JSON delta per line
+    <name>.journal.old      journal being folded into a new snapshot
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Journals whose queued deltas are written out when the interpreter exits
+_open_journals: 'weakref.WeakSet[StateJournal]' = weakref.WeakSet()
+
+class StateJournal:
+    """Journaled, lazily loaded dict state"""
+
+    def __init__(self, directory: str, name: str, legacy_file: Optional[str] = None,
+                 flush_interval: float = 1.0, compact_bytes: int = 4 * 1024 * 1024):
+        """
+        Initialize the journal.
+
+        Args:
+            directory: Directory holding the snapshot and journal files
+            name: Base name of the files
+            legacy_file: JSON file with the full state written by the old
+                persistence; imported when no snapshot exists yet
+            flush_interval: Maximum seconds a delta waits before it is written
+            compact_bytes: Journal size that triggers compaction into a snapshot
+        """
+        self.directory = directory
+        self.name = name
+        self.legacy_file = legacy_file
+        self.flush_interval = flush_interval
+        self.compact_bytes = compact_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self.snapshot_path = os.path.join(directory, f'{name}.snapshot.json')
+        self.journal_path = os.path.join(directory, f'{name}.journal')
+        self.old_journal_path = self.journal_path + '.old'
+
+        self._state: Dict[str, Any] = {}
+        self._seq = 0
+        self._loaded = threading.Event()
+        self._load_lock = threading.Lock()
+        self._load_thread: Optional[threading.Thread] = None
+
+        self._pending: List[str] = []
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._journal_file = None
+        self._closed = False
+
+        self.deltas_recorded = 0
+        self.bytes_written = 0
+        self.compactions = 0
+        _open_journals.add(self)
+
+    # Loading
+
+    def start_loading(self):
+        """Load the state in a background thread; state() waits for it"""
+        with self._load_lock:
+            if self._loaded.is_set() or self._load_thread is not None:
+                return
+            self._load_thread = threading.Thread(target=self._load, name=f'journal-load-{self.name}',
+                                                 daemon=True)
+            self._load_thread.start()
+
+    def state(self) -> Dict[str, Any]:
+        """Return the state dict, loading it first if needed"""
+        if not self._loaded.is_set():
+            with self._load_lock:
+                loader = self._load_thread
+            if loader is None:
+                self._load()
+            else:
+                self._loaded.wait()
+        return self._state
+
+    def _load(self):
+        with self._load_lock:
+            if self._loaded.is_set():
+                return
+            try:
+                self._state, self._seq = self._read_state()
+            except Exception as e:
+                logger.error(f"Error loading {self.name} state: {str(e)}")
+                self._state, self._seq = {}, 0
+            finally:
+                self._loaded.set()
+
+    def _read_state(self):
+        """Read the snapshot and replay the journals written after it"""
+        state, seq = {}, 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+            state, seq = snapshot.get('state', {}), snapshot.get('seq', 0)
+        elif self.legacy_file and os.path.exists(self.legacy_file):
+            with open(self.legacy_file, 'r') as f:
+                state = json.load(f)
+            logger.info(f"Imported {self.name} state from {self.legacy_file}")
+
+        for path in (self.old_journal_path, self.journal_path):
+            seq = self._replay(path, state, seq)
+        return state, seq
+
+    @classmethod
+    def _replay(cls, path: str, state: Dict[str, Any], seq: int) -> int:
+        """
+        Apply the deltas of a journal file newer than seq; returns the last applied seq
+
+        A torn write at the end of the file is cut off, so deltas appended
+        after a restart start on a line of their own instead of being glued
+        to the fragment and lost with it.
+        """
+        if not os.path.exists(path):
+            return seq
+        complete = 0
+        with open(path, 'rb+') as f:
+            for line in f:
+                try:
+                    delta = json.loads(line)
+                except ValueError:
+                    # Later lines cannot be trusted either
+                    logger.warning(f"Truncating torn delta at the end of {path}")
+                    f.truncate(complete)
+                    break
+                complete += len(line)
+                if not line.endswith(b'\n'):
+                    # Written up to the line break
+                    f.write(b'\n')
+                if delta['s'] <= seq:
+                    continue
+                cls._apply(state, delta)
+                seq = delta['s']
+        return seq
+
+    @staticmethod
+    def _apply(state: Dict[str, Any], delta: Dict[str, Any]):
+        path = delta['p']
+        parent = state
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        key = path[-1]
+        op = delta['o']
+        if op == 'set':
+            parent[key] = delta['v']
+        elif op == 'del':
+            parent.pop(key, None)
+        elif op == 'app':
+            items = parent.setdefault(key, [])
+            items.append(delta['v'])
+            limit = delta.get('l')
+            if limit and len(items) > limit:
+                del items[:len(items) - limit]
+
+    # Recording
+
+    def set(self, path: Sequence[str], value: Any):
+        """Record that the value at path was replaced"""
+        self._record({'o': 'set', 'p': list(path), 'v': value})
+
+    def append(self, path: Sequence[str], value: Any, limit: Optional[int] = None):
+        """Record an append to the list at path, trimmed to its last 'limit' items"""
+        delta = {'o': 'app', 'p': list(path), 'v': value}
+        if limit:
+            delta['l'] = limit
+        self._record(delta)
+
+    def delete(self, path: Sequence[str]):
+        """Record that the key at path was removed"""
+        self._record({'o': 'del', 'p': list(path)})
+
+    def _record(self, delta: Dict[str, Any]):
+        """
+        Serialize a delta and queue it for the writer thread.
+
+        The state itself is changed by the caller; the delta is serialized now
+        so later in-place changes to the value are not picked up.
+        """
+        self.state()
+        with self._pending_lock:
+            self._seq += 1
+            delta['s'] = self._seq
+            self._pending.append(json.dumps(delta, separators=(',', ':'), default=str))
+            self.deltas_recorded += 1
+        self._ensure_writer()
+
+    # Writing and compaction
+
+    def _ensure_writer(self):
+        if self._writer is not None or self._closed:
+            return
+        with self._pending_lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(target=self._write_loop, name=f'journal-writer-{self.name}',
+                                            daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._write_pending()
+            except Exception as e:
+                logger.error(f"Error writing {self.name} journal: {str(e)}")
+
+    def _write_pending(self):
+        """Append queued deltas to the journal and compact it when it is large"""
+        with self._write_lock:
+            with self._pending_lock:
+                lines, self._pending = self._pending, []
+            if lines:
+                if self._journal_file is None:
+                    self._journal_file = open(self.journal_path, 'a')
+                data = '\n'.join(lines) + '\n'
+                self._journal_file.write(data)
+                self._journal_file.flush()
+                self.bytes_written += len(data)
+            if self._journal_file is not None and self._journal_file.tell() >= self.compact_bytes:
+                self._compact()
+
+    def _compact(self):
+        """Fold the journal into a new snapshot; caller holds the write lock"""
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+        if os.path.exists(self.journal_path):
+            if os.path.exists(self.old_journal_path):
+                # A previous compaction was interrupted; fold both journals
+                with open(self.old_journal_path, 'a') as old, open(self.journal_path, 'r') as new:
+                    old.write(new.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.old_journal_path)
+
+        # Rebuild from disk rather than the live dict, which callers keep mutating
+        state, seq = self._read_state()
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'seq': seq, 'state': state}, f, separators=(',', ':'), default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        os.remove(self.old_journal_path)
+        self.compactions += 1
+
+    def flush(self, wait: bool = True):
+        """Write queued deltas now, or ask the writer thread to if wait is False"""
+        if wait:
+            self._write_pending()
+        else:
+            self._wakeup.set()
+
+    def compact(self):
+        """Write queued deltas and fold the journal into a snapshot"""
+        with self._write_lock:
+            self._write_pending()
+            self._compact()
+
+    def close(self):
+        """Write queued deltas and stop the writer thread"""
+        self._closed = True
+        self._wakeup.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+        self._write_pending()
+        with self._write_lock:
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return journal counters"""
+        with self._pending_lock:
+            pending = len(self._pending)
+        journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        return {
+            'deltas_recorded': self.deltas_recorded,
+            'pending_deltas': pending,
+            'bytes_written': self.bytes_written,
+            'journal_bytes': journal_size,
+            'compactions': self.compactions
+        }
+
+
+def flush_all_journals():
+    """Write the queued deltas of every open journal"""
+    for journal in list(_open_journals):
+        try:
+            journal.flush()
+        except Exception as e:
+            logger.error(f"Error flushing {journal.name} journal: {str(e)}")
+
+atexit.register(flush_all_journals)
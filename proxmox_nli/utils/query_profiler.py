@@ -0,0 +1,177 @@
+"""
+Stage timing and opt-in profiling for the query pipeline.
+
+Code on the query path wraps its expensive steps in ``stage(name)``. While a
+query is being processed the timings are collected on the active QueryTrace
+and, once the query finishes and its intent is known, observed in the
+``query_stage_seconds`` histogram labelled with stage and intent. Stages that
+run outside a query (background monitors, batched flushes) are observed with
+the intent label "none".
+
+A trace can also run cProfile over the whole query. This is opt-in per
+request (see PROFILE_HEADER) because deterministic profiling slows the query
+down several times.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Request header that turns on profiling for one query
+PROFILE_HEADER = 'X-Profile-Query'
+
+# Intent label for stages recorded outside a query, or before the intent is known
+NO_INTENT = 'none'
+
+_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_LATENCY = Histogram(
+    'query_stage_seconds', 'Time spent in each stage of query processing', ['stage', 'intent'],
+    buckets=_BUCKETS
+)
+QUERY_LATENCY = Histogram(
+    'query_duration_seconds', 'End-to-end query processing time', ['intent', 'source'],
+    buckets=_BUCKETS
+)
+
+_current_trace: ContextVar[Optional['QueryTrace']] = ContextVar('query_trace', default=None)
+
+
+class QueryTrace:
+    """Stage timings, and optionally a profile, of one query"""
+
+    def __init__(self, source: str = 'cli', profile: bool = False, profile_limit: int = 40):
+        self.source = source
+        self.profile_requested = profile
+        self.profile_limit = profile_limit
+        self.intent: Optional[str] = None
+        self.duration: Optional[float] = None
+        self.profile: Optional[str] = None
+        # stage -> [total seconds, calls]
+        self.stages: Dict[str, list] = {}
+
+    def record(self, stage: str, seconds: float):
+        totals = self.stages.setdefault(stage, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+    def observe(self):
+        """Export the collected timings to the Prometheus histograms"""
+        intent = self.intent or NO_INTENT
+        for stage, (seconds, _) in self.stages.items():
+            STAGE_LATENCY.labels(stage=stage, intent=intent).observe(seconds)
+        if self.duration is not None:
+            QUERY_LATENCY.labels(intent=intent, source=self.source).observe(self.duration)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the timings as a dict, slowest stage first; stages may nest"""
+        ranked = sorted(self.stages.items(), key=lambda item: item[1][0], reverse=True)
+        summary = {
+            'intent': self.intent,
+            'duration': round(self.duration, 6) if self.duration is not None else None,
+            'stages': {stage: {'seconds': round(seconds, 6), 'calls': calls}
+                       for stage, (seconds, calls) in ranked}
+        }
+        if self.profile is not None:
+            summary['profile'] = self.profile
+        return summary
+
+
+def current_trace() -> Optional[QueryTrace]:
+    """Return the trace of the query being processed, if any"""
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_query(source: str = 'cli', profile: bool = False) -> Iterator[QueryTrace]:
+    """
+    Collect stage timings for the query processed inside the block.
+
+    If a trace is already active (e.g. the web handler opened one to honour
+    the profile header) it is reused, so only the outermost block observes
+    the histograms and owns the profiler.
+    """
+    outer = _current_trace.get()
+    if outer is not None:
+        yield outer
+        return
+
+    trace = QueryTrace(source, profile)
+    token = _current_trace.set(trace)
+    profiler = cProfile.Profile() if profile else None
+    started = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield trace
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            trace.profile = _format_profile(profiler, trace.profile_limit)
+        trace.duration = time.perf_counter() - started
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # A streaming generator was closed from a different context
+            _current_trace.set(None)
+        try:
+            trace.observe()
+        except Exception as e:
+            logger.error(f"Error recording query metrics: {str(e)}")
+
+
+def set_intent(intent: Optional[str]):
+    """Label the active trace with the intent once the NLU has resolved it"""
+    trace = _current_trace.get()
+    if trace is not None and intent:
+        trace.intent = intent
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage into the active trace, or directly if there is none"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.record(name, elapsed)
+        else:
+            STAGE_LATENCY.labels(stage=name, intent=NO_INTENT).observe(elapsed)
+
+
+def timed_stage(name: str):
+    """Decorator form of stage()"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profiling_requested(headers: Optional[Mapping[str, str]]) -> bool:
+    """Return True if the request headers ask for the query to be profiled"""
+    if not headers:
+        return False
+    return str(headers.get(PROFILE_HEADER, '')).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _format_profile(profiler: cProfile.Profile, limit: int) -> str:
+    """Render the functions with the highest cumulative time as text"""
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
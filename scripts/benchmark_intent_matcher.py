@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Intent matcher benchmark for Proxmox NLI
+This script compares per-query latency of the compiled intent matcher against
+trying every raw regex pattern in order, and checks both return the same result.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from proxmox_nli.nlu.intent_identification import IntentIdentifier
+
+SAMPLE_QUERIES = [
+    "list vms", "show all virtual machines", "start vm 101", "power on vm 200",
+    "stop vm 101", "restart vm 101", "status of vm 101", "how is vm 101 doing",
+    "create a new vm called test-vm with 2GB RAM", "delete vm 105", "list containers",
+    "show cluster status", "get status of node pve1", "show storage info",
+    "list docker containers on vm 101", "start docker container nginx on vm 101",
+    "show logs for docker container web on vm 3", "pull docker image nginx:latest",
+    "run command \"uptime\" on vm 101", "list available services",
+    "find a service for photo backups", "deploy nextcloud on vm 101",
+    "what is the status of service plex", "uninstall plex", "list my deployed services",
+    "check for updates", "apply all updates", "update nextcloud",
+    "schedule an update for plex at 3am", "show update history for plex",
+    "explain the updates for plex", "create pool tank", "list datasets",
+    "take snapshot", "setup auto snapshot", "tell me a joke", "random gibberish text",
+]
+
+def reference_match(patterns, query):
+    """Try every raw pattern in order, as identify_intent did before compilation"""
+    for intent, intent_patterns in patterns.items():
+        for pattern in intent_patterns:
+            match = re.search(pattern, query, re.IGNORECASE)
+            if match:
+                return intent, list(match.groups()) if match.groups() else []
+    return None
+
+def time_per_query(func, queries, rounds):
+    """Return per-query latencies in microseconds (median over rounds)"""
+    latencies = []
+    for query in queries:
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            func(query)
+            samples.append((time.perf_counter() - start) * 1e6)
+        latencies.append(statistics.median(samples))
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled intent matcher")
+    parser.add_argument("--rounds", type=int, default=200, help="Timing rounds per query")
+    parser.add_argument("--verbose", action="store_true", help="Print latency for every query")
+    args = parser.parse_args()
+
+    identifier = IntentIdentifier()
+    patterns = identifier.patterns
+    matcher = identifier.matcher
+
+    mismatches = [q for q in SAMPLE_QUERIES if matcher.match(q) != reference_match(patterns, q)]
+    if mismatches:
+        print("Compiled matcher disagrees with the reference on:")
+        for query in mismatches:
+            print(f"  {query!r}")
+        return 1
+
+    reference = time_per_query(lambda q: reference_match(patterns, q), SAMPLE_QUERIES, args.rounds)
+    compiled = time_per_query(matcher.match, SAMPLE_QUERIES, args.rounds)
+
+    if args.verbose:
+        print(f"{'query':<50} {'raw us':>10} {'compiled us':>12}")
+        for query, ref_us, comp_us in zip(SAMPLE_QUERIES, reference, compiled):
+            print(f"{query[:50]:<50} {ref_us:>10.1f} {comp_us:>12.1f}")
+
+    pattern_count = len(matcher.compiled)
+    print(f"{len(SAMPLE_QUERIES)} queries, {pattern_count} patterns, {args.rounds} rounds")
+    print(f"raw regex loop:   mean {statistics.mean(reference):8.1f} us  p95 {sorted(reference)[int(len(reference) * 0.95)]:8.1f} us")
+    print(f"compiled matcher: mean {statistics.mean(compiled):8.1f} us  p95 {sorted(compiled)[int(len(compiled) * 0.95)]:8.1f} us")
+    print(f"speedup: {statistics.mean(reference) / statistics.mean(compiled):.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
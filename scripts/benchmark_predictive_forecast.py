@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Forecasting benchmark for Proxmox NLI
+This script compares forecasting every VM through the per-VM LinearRegression
+path (_train_and_predict) against one batched forecast_batch call, and checks
+both produce the same predictions.
+"""
+import os
+import sys
+import time
+import argparse
+from unittest.mock import Mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from proxmox_nli.core.monitoring.predictive_analyzer import PredictiveAnalyzer
+
+def make_series(vms, hours, seed):
+    """Generate hourly CPU and memory series with trend, daily cycle and noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(hours)
+    series = {}
+    for vm in range(vms):
+        for metric in ('cpu', 'memory'):
+            base = rng.uniform(10, 60)
+            slope = rng.normal(0, 0.05)
+            daily = rng.uniform(0, 10) * np.sin(2 * np.pi * t / 24)
+            series[(str(100 + vm), metric)] = base + slope * t + daily + rng.normal(0, 2, hours)
+    return series
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched forecasting against the per-VM path")
+    parser.add_argument("--vms", type=int, default=500, help="Number of VMs to forecast")
+    parser.add_argument("--hours", type=int, default=168, help="Hours of history per series")
+    parser.add_argument("--ahead", type=int, default=24, help="Hours to forecast")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated data")
+    args = parser.parse_args()
+
+    series = make_series(args.vms, args.hours, args.seed)
+    analyzer = PredictiveAnalyzer(Mock())
+
+    start = time.perf_counter()
+    reference = {
+        key: analyzer._train_and_predict(f"{key[1]}_{key[0]}", values.reshape(-1, 1), args.ahead)
+        for key, values in series.items()
+    }
+    per_vm = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = analyzer.forecast_batch(series, args.ahead)
+    batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analyzer.forecast_batch(series, args.ahead)
+    cached = time.perf_counter() - start
+
+    worst = max(np.max(np.abs(np.array(batched[key]) - np.array(reference[key]))) for key in series)
+    if worst > 1e-6:
+        print(f"Batched forecasts differ from the per-VM path (max abs error {worst:.3g})")
+        return 1
+
+    print(f"{len(series)} series ({args.vms} VMs), {args.hours}h history, {args.ahead}h ahead")
+    print(f"per-VM LinearRegression: {per_vm * 1000:8.1f} ms")
+    print(f"batched fit:             {batch * 1000:8.1f} ms")
+    print(f"batched, cached:         {cached * 1000:8.1f} ms")
+    print(f"speedup: {per_vm / batch:.1f}x (max abs difference {worst:.2g})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -253,6 +253,25 @@ class ProxmoxNLI {
                 // Add command to history
                 await this.commands.addCommandToHistory(query);
                 
+                // Stream the response over the socket when it is connected
+                if (this.socket && this.socket.isConnected()) {
+                    const messageDiv = UI.addMessage('', 'system', this.chatBody);
+                    this.socket.streamQuery(query, {
+                        onToken: (token) => UI.appendToMessage(messageDiv, token, this.chatBody),
+                        onComplete: async (responseText) => {
+                            messageDiv.textContent = responseText;
+                            if (document.getElementById('enable-personality') && 
+                                document.getElementById('enable-personality').checked) {
+                                await this.voice.playTextToSpeech(responseText);
+                            }
+                        },
+                        onError: (error) => {
+                            messageDiv.textContent = 'Error: ' + error;
+                        }
+                    });
+                    return;
+                }
+                
                 // Send query to server
                 const response = await API.fetchWithAuth('/query', {
                     method: 'POST',
@@ -14,6 +14,7 @@ export default class SocketHandler {
         this.socket = io();
         this.callbacks = callbacks;
         this.pollingInterval = null;
+        this.pendingQueries = new Map();
         this.setupSocketHandlers();
     }
 
@@ -57,6 +58,29 @@ export default class SocketHandler {
             }
         });
 
+        this.socket.on('response_chunk', (data) => {
+            const handlers = this.pendingQueries.get(data.request_id);
+            if (handlers && handlers.onToken) {
+                handlers.onToken(data.token);
+            }
+        });
+
+        this.socket.on('response_complete', (data) => {
+            const handlers = this.pendingQueries.get(data.request_id);
+            this.pendingQueries.delete(data.request_id);
+            if (handlers && handlers.onComplete) {
+                handlers.onComplete(data.response);
+            }
+        });
+
+        this.socket.on('response_error', (data) => {
+            const handlers = this.pendingQueries.get(data.request_id);
+            this.pendingQueries.delete(data.request_id);
+            if (handlers && handlers.onError) {
+                handlers.onError(data.error);
+            }
+        });
+
         this.socket.on('network_diagram_update', (data) => {
             console.log('Received network diagram update:', data);
             if (this.callbacks.onNetworkDiagramUpdate) {
@@ -65,6 +89,32 @@ export default class SocketHandler {
         });
     }
 
+    /**
+     * Whether queries can be streamed over the socket
+     * @returns {boolean}
+     */
+    isConnected() {
+        return Boolean(this.socket && this.socket.connected);
+    }
+
+    /**
+     * Send a chat query and receive the response as it is generated
+     * @param {string} query - Natural language query
+     * @param {Object} handlers - Callback functions for the response
+     * @param {Function} handlers.onToken - Called with each streamed text fragment
+     * @param {Function} handlers.onComplete - Called with the full response
+     * @param {Function} handlers.onError - Called with an error message
+     */
+    streamQuery(query, handlers = {}) {
+        const requestId = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        this.pendingQueries.set(requestId, handlers);
+        this.socket.emit('query_stream', {
+            request_id: requestId,
+            query: query,
+            token: localStorage.getItem('token')
+        });
+    }
+
     /**
      * Start polling for updates if WebSocket fails
      */
@@ -7,6 +7,7 @@ export default class UI {
      * @param {string} text - Message text
      * @param {string} type - Message type ('user' or 'system')
      * @param {HTMLElement} chatBody - Chat body element
+     * @returns {HTMLElement} The message element
      */
     static addMessage(text, type, chatBody) {
         const messageDiv = document.createElement('div');
@@ -14,6 +15,18 @@ export default class UI {
         messageDiv.textContent = text;
         chatBody.appendChild(messageDiv);
         chatBody.scrollTop = chatBody.scrollHeight;
+        return messageDiv;
+    }
+
+    /**
+     * Append streamed text to an existing chat message
+     * @param {HTMLElement} messageDiv - Message element returned by addMessage
+     * @param {string} text - Text to append
+     * @param {HTMLElement} chatBody - Chat body element
+     */
+    static appendToMessage(messageDiv, text, chatBody) {
+        messageDiv.textContent += text;
+        chatBody.scrollTop = chatBody.scrollHeight;
     }
 
     /**
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from proxmox_nli.api.async_proxmox_api import AsyncProxmoxAPI, run_concurrently
+
+@pytest.fixture
+def api():
+    """Create a pre-authenticated AsyncProxmoxAPI instance"""
+    api = AsyncProxmoxAPI(
+        host="test.proxmox.local",
+        user="test_user",
+        password="test_pass",
+        max_concurrency=5
+    )
+    api.ticket = "test-ticket"
+    api.csrf_token = "test-token"
+    api.ticket_issued_at = 10 ** 9
+    return api
+
+class TestAsyncRequests:
+    def test_result_shape(self, api):
+        """Test that results match the synchronous {success, data} shape"""
+        async def fake_send(method, url, data, timeout):
+            return 200, {"data": [{"node": "pve1"}]}
+
+        with patch.object(api, "_send", side_effect=fake_send), \
+             patch.object(api, "ticket_expiring", return_value=False):
+            result = asyncio.run(api.api_request("GET", "nodes"))
+        assert result == {"success": True, "data": [{"node": "pve1"}]}
+
+    def test_invalid_method(self, api):
+        """Test invalid HTTP method"""
+        result = asyncio.run(api.api_request("INVALID", "nodes"))
+        assert result["success"] is False
+        assert "Unsupported method" in result["message"]
+
+    def test_gather_bounds_concurrency(self, api):
+        """Test that gather never exceeds max_concurrency requests in flight"""
+        in_flight = 0
+        peak = 0
+
+        async def fake_send(method, url, data, timeout):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return 200, {"data": url.rsplit('/', 3)[-3]}
+
+        requests = [("GET", f"nodes/pve1/qemu/{vmid}/status/current") for vmid in range(100, 150)]
+        with patch.object(api, "_send", side_effect=fake_send), \
+             patch.object(api, "ticket_expiring", return_value=False):
+            results = run_concurrently(api, requests)
+
+        assert peak == 5
+        assert [r["data"] for r in results] == [str(vmid) for vmid in range(100, 150)]
+
+    def test_retry_on_unauthorized(self, api):
+        """Test that a 401 triggers one re-authentication and retry"""
+        responses = iter([(401, "invalid ticket"), (200, {"data": "ok"})])
+
+        async def fake_send(method, url, data, timeout):
+            return next(responses)
+
+        async def fake_auth():
+            api.ticket = "new-ticket"
+            return True
+
+        with patch.object(api, "_send", side_effect=fake_send), \
+             patch.object(api, "authenticate", side_effect=fake_auth) as mock_auth:
+            result = asyncio.run(api.api_request("GET", "version"))
+        assert result == {"success": True, "data": "ok"}
+        assert mock_auth.call_count == 1
@@ -2,6 +2,7 @@ import pytest
 import requests
 from unittest.mock import Mock, patch
 from proxmox_nli.api.proxmox_api import ProxmoxAPI
+from proxmox_nli.api.response_cache import ResponseCache
 
 # Register the integration mark
 integration = pytest.mark.integration
@@ -34,7 +35,7 @@ def authenticated_api(api, mock_response):
             "CSRFPreventionToken": "test-token"
         }
     }
-    with patch("requests.post", return_value=mock_response):
+    with patch.object(requests.Session, "post", return_value=mock_response):
         api.authenticate()
     return api
 
@@ -48,7 +49,7 @@ class TestAuthentication:
             }
         }
         
-        with patch("requests.post", return_value=mock_response):
+        with patch.object(requests.Session, "post", return_value=mock_response):
             assert api.authenticate() is True
             assert api.ticket == "test-ticket"
             assert api.csrf_token == "test-token"
@@ -59,7 +60,7 @@ class TestAuthentication:
         failed_response.status_code = 401
         failed_response.text = "Authentication failed"
         
-        with patch("requests.post", return_value=failed_response):
+        with patch.object(requests.Session, "post", return_value=failed_response):
             assert api.authenticate() is False
             assert api.ticket is None
             assert api.csrf_token is None
@@ -67,7 +68,7 @@ class TestAuthentication:
 class TestAPIRequests:
     def test_get_request(self, authenticated_api, mock_response):
         """Test GET request"""
-        with patch("requests.get", return_value=mock_response):
+        with patch.object(requests.Session, "request", return_value=mock_response):
             result = authenticated_api.api_request("GET", "nodes")
             assert result["success"] is True
             assert "data" in result
@@ -75,15 +76,16 @@ class TestAPIRequests:
     def test_post_request(self, authenticated_api, mock_response):
         """Test POST request with data"""
         test_data = {"name": "test-vm", "memory": 1024}
-        with patch("requests.post", return_value=mock_response):
+        with patch.object(requests.Session, "request", return_value=mock_response) as mock_request:
             result = authenticated_api.api_request("POST", "nodes/node1/qemu", data=test_data)
+            assert mock_request.call_args.kwargs["data"] == test_data
             assert result["success"] is True
             assert "data" in result
 
     def test_request_without_auth(self, api):
         """Test request behavior when not authenticated"""
-        with patch("requests.get") as mock_get:
-            mock_get.return_value.status_code = 401
+        with patch.object(requests.Session, "post") as mock_post:
+            mock_post.return_value.status_code = 401
             result = api.api_request("GET", "nodes")
             assert result["success"] is False
             assert "Authentication failed" in result["message"]
@@ -96,11 +98,102 @@ class TestAPIRequests:
 
     def test_connection_error(self, authenticated_api):
         """Test handling of connection errors"""
-        with patch("requests.get", side_effect=requests.exceptions.ConnectionError):
+        with patch.object(requests.Session, "request", side_effect=requests.exceptions.ConnectionError):
             result = authenticated_api.api_request("GET", "nodes")
             assert result["success"] is False
             assert "message" in result
 
+    def test_default_timeout_applied(self, authenticated_api, mock_response):
+        """Test that every request carries a timeout"""
+        with patch.object(requests.Session, "request", return_value=mock_response) as mock_request:
+            authenticated_api.api_request("GET", "nodes")
+            assert mock_request.call_args.kwargs["timeout"] == authenticated_api.timeout
+            authenticated_api.api_request("GET", "cluster/tasks", timeout=5)
+            assert mock_request.call_args.kwargs["timeout"] == 5
+
+class TestResponseCache:
+    def test_repeated_get_served_from_cache(self, authenticated_api, mock_response):
+        """Test that repeated GETs within the TTL hit the network once"""
+        with patch.object(requests.Session, "request", return_value=mock_response) as mock_request:
+            first = authenticated_api.api_request("GET", "cluster/resources")
+            second = authenticated_api.api_request("GET", "cluster/resources")
+            assert first == second
+            assert mock_request.call_count == 1
+        stats = authenticated_api.cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_mutation_invalidates_related_entries(self, authenticated_api, mock_response):
+        """Test that a VM action drops the VM's cached status and cluster aggregates"""
+        with patch.object(requests.Session, "request", return_value=mock_response) as mock_request:
+            authenticated_api.api_request("GET", "nodes/pve1/qemu/101/status/current")
+            authenticated_api.api_request("GET", "cluster/resources")
+            authenticated_api.api_request("GET", "storage")
+            authenticated_api.api_request("POST", "nodes/pve1/qemu/101/status/start")
+            authenticated_api.api_request("GET", "nodes/pve1/qemu/101/status/current")
+            authenticated_api.api_request("GET", "cluster/resources")
+            authenticated_api.api_request("GET", "storage")
+            assert mock_request.call_count == 6
+
+    def test_uncached_endpoints_bypass_cache(self, authenticated_api, mock_response):
+        """Test that endpoints without a TTL rule always hit the API"""
+        with patch.object(requests.Session, "request", return_value=mock_response) as mock_request:
+            authenticated_api.api_request("GET", "cluster/tasks")
+            authenticated_api.api_request("GET", "cluster/tasks")
+            assert mock_request.call_count == 2
+
+    def test_lru_eviction(self):
+        """Test that the cache evicts the least recently used entry"""
+        cache = ResponseCache(max_entries=2, ttl_rules=[(r".*", 60)])
+        cache.set("a", None, {"success": True, "data": 1})
+        cache.set("b", None, {"success": True, "data": 2})
+        cache.get("a")
+        cache.set("c", None, {"success": True, "data": 3})
+        assert cache.get("b") is None
+        assert cache.get("a")["data"] == 1
+        assert cache.stats()["evictions"] == 1
+
+class TestSessionLifecycle:
+    def test_connection_pool_size(self):
+        """Test that the session adapter uses the configured pool size"""
+        api = ProxmoxAPI("test.proxmox.local", "test_user", "test_pass", pool_size=32)
+        adapter = api.session.get_adapter("https://test.proxmox.local:8006")
+        assert adapter._pool_maxsize == 32
+
+    def test_ticket_renewed_before_expiry(self, authenticated_api, mock_response):
+        """Test that an expiring ticket is renewed before the request"""
+        authenticated_api.ticket_issued_at -= authenticated_api.ticket_lifetime
+        renew_response = Mock()
+        renew_response.status_code = 200
+        renew_response.json.return_value = {
+            "data": {"ticket": "new-ticket", "CSRFPreventionToken": "new-token"}
+        }
+        with patch.object(requests.Session, "post", return_value=renew_response) as mock_post, \
+             patch.object(requests.Session, "request", return_value=mock_response):
+            result = authenticated_api.api_request("GET", "nodes")
+            assert result["success"] is True
+            assert mock_post.call_count == 1
+            assert authenticated_api.ticket == "new-ticket"
+
+    def test_retry_on_unauthorized(self, authenticated_api, mock_response):
+        """Test that a 401 triggers one re-authentication and retry"""
+        unauthorized = Mock()
+        unauthorized.status_code = 401
+        unauthorized.text = "permission denied - invalid PVE ticket"
+        renew_response = Mock()
+        renew_response.status_code = 200
+        renew_response.json.return_value = {
+            "data": {"ticket": "new-ticket", "CSRFPreventionToken": "new-token"}
+        }
+        with patch.object(requests.Session, "post", return_value=renew_response) as mock_post, \
+             patch.object(requests.Session, "request", side_effect=[unauthorized, mock_response]) as mock_request:
+            result = authenticated_api.api_request("GET", "nodes")
+            assert result["success"] is True
+            assert mock_post.call_count == 1
+            assert mock_request.call_count == 2
+            headers = mock_request.call_args.kwargs["headers"]
+            assert headers["Cookie"] == "PVEAuthCookie=new-ticket"
+
 @integration
 class TestLiveAPI:
     """Integration tests for live Proxmox API - only run when configured"""
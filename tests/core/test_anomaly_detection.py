@@ -0,0 +1,112 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from proxmox_nli.core.monitoring.anomaly_detection import (
+    EWMADetector, OnlineAnomalyEngine, RollingQuantileDetector
+)
+from proxmox_nli.core.monitoring.predictive_maintenance import PredictiveMaintenance
+
+
+class TestDetectors(unittest.TestCase):
+    def test_ewma_flags_spike_after_warmup(self):
+        """Test that a spike scores far above the threshold once warmed up"""
+        detector = EWMADetector(alpha=0.1, threshold=4.0, warmup=20)
+        rng = np.random.default_rng(1)
+        for value in 50 + rng.normal(0, 1, 200):
+            detector.update(float(value))
+        score = detector.update(80.0)
+        self.assertTrue(detector.is_anomalous(score))
+        self.assertFalse(detector.is_anomalous(detector.update(50.5)))
+
+    def test_rolling_quantile_window(self):
+        """Test that the band follows the sliding window"""
+        detector = RollingQuantileDetector(window=50, low=0.05, high=0.95, warmup=10, margin=0)
+        for value in range(100):
+            detector.update(float(value % 10))
+        self.assertEqual(len(detector._sorted), 50)
+        self.assertEqual(detector.update(25.0), (0.0, 9.0))
+        self.assertIsNone(detector.update(5.0))
+
+    def test_rolling_quantile_quiet_on_stationary_series(self):
+        """Test that new highs and lows of stationary data are not reported, but outliers are"""
+        detector = RollingQuantileDetector()
+        rng = np.random.default_rng(4)
+        alerts = [detector.update(float(value)) for value in 50 + rng.normal(0, 1, 5000)]
+        self.assertEqual(sum(band is not None for band in alerts), 0)
+        self.assertIsNotNone(detector.update(60.0))
+
+
+class TestOnlineAnomalyEngine(unittest.TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.callback = MagicMock()
+        self.engine = OnlineAnomalyEngine(warmup=20, refit_min_samples=50, executor=self.executor,
+                                          on_anomaly=self.callback)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def cycle(self, cpu, timestamp):
+        return [{'type': 'node_cpu', 'node': 'pve1', 'value': cpu, 'collector': 'node_stats',
+                 'timestamp': timestamp}]
+
+    def test_collector_cycles_raise_alert_on_deviation(self):
+        """Test that a deviation in the live feed is reported on the same cycle"""
+        rng = np.random.default_rng(2)
+        for i, cpu in enumerate(0.3 + rng.normal(0, 0.01, 250)):
+            self.engine.observe_metrics(self.cycle(float(cpu), i))
+        self.callback.reset_mock()
+
+        anomalies = self.engine.observe_metrics(self.cycle(0.95, 250))
+
+        detectors = {a['detector'] for a in anomalies}
+        self.assertIn('ewma', detectors)
+        self.assertIn('quantile', detectors)
+        self.assertEqual(anomalies[0]['labels'], {'node': 'pve1'})
+        self.assertEqual(self.callback.call_count, len(anomalies))
+
+    def test_cumulative_counters_are_rates(self):
+        """Test that ever-growing traffic counters do not trigger anomalies"""
+        for i in range(200):
+            anomalies = self.engine.observe_metrics([{'type': 'vm_network', 'vm_id': 101, 'node': 'pve1',
+                                                      'in': 1000 * i, 'out': 250 * i, 'timestamp': 10 * i}])
+            self.assertEqual(anomalies, [])
+        self.assertEqual(self.callback.call_count, 0)
+        self.assertEqual(self.engine.stats()['series'], 2)
+
+    def test_online_detection_leaves_shared_collection_running(self):
+        """Test that stopping PredictiveMaintenance keeps collection running for its other owners"""
+        maintenance = PredictiveMaintenance(MagicMock())
+        collector = maintenance.system_health.metrics_collector
+        collector.collect_and_store = MagicMock(return_value={"success": False})
+
+        maintenance._start_online_detection()
+        maintenance._stop_online_detection()
+        self.assertFalse(collector.collection_active)
+
+        collector.start_collection()  # Another owner
+        maintenance._start_online_detection()
+        maintenance._stop_online_detection()
+        self.assertTrue(collector.collection_active)
+        collector.stop_collection()
+        self.assertFalse(collector.collection_active)
+
+    def test_isolation_forest_refit_in_background(self):
+        """Test that a model is fitted through the executor and scores new vectors"""
+        rng = np.random.default_rng(3)
+        for i in range(60):
+            self.engine.observe_metrics([{'type': 'vm_memory', 'vm_id': 101, 'node': 'pve1',
+                                          'value': 500 + rng.normal(0, 5), 'total': 1024, 'timestamp': i}])
+        self.engine.refit_models(wait=True)
+        self.assertEqual(self.engine.stats()['models'], 1)
+
+        anomalies = self.engine.observe_metrics([{'type': 'vm_memory', 'vm_id': 101, 'node': 'pve1',
+                                                  'value': 5000, 'total': 1024, 'timestamp': 61}])
+        self.assertIn('isolation_forest', {a['detector'] for a in anomalies})
+
+
+if __name__ == '__main__':
+    unittest.main()
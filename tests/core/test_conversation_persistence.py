@@ -0,0 +1,101 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from proxmox_nli.core.conversation_persistence import ConversationPersistence
+from proxmox_nli.core.sqlite_pool import close_all_managers
+
+
+class TestConversationWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "conversations.db")
+        self.persistence = ConversationPersistence(self.db_path, write_batch_size=1000, write_flush_interval=60)
+        self.conversation_id = self.persistence.start_conversation("user1", "session1")
+
+    def tearDown(self):
+        close_all_managers()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def count_messages_on_disk(self):
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM conversation_messages").fetchone()[0]
+
+    def test_messages_and_topics_are_buffered(self):
+        """Test that adding messages does not write to the database immediately"""
+        first = self.persistence.add_message(self.conversation_id, "user", "start vm 101", "start_vm", {"vm_name": "web"})
+        second = self.persistence.add_message(self.conversation_id, "system", "VM 101 started")
+
+        self.assertGreater(self.persistence._db.pending_writes(), 0)
+        self.assertEqual(self.count_messages_on_disk(), 0)
+        self.assertIsNone(first.value)
+
+        self.persistence.flush()
+        self.assertEqual(self.count_messages_on_disk(), 2)
+        self.assertEqual(int(second), int(first) + 1)
+
+    def test_message_ids_are_unique_across_processes(self):
+        """Test that rows inserted by another connection do not collide with message ids"""
+        first = self.persistence.add_message(self.conversation_id, "user", "list vms", "list_vms", {})
+        with sqlite3.connect(self.db_path) as conn:
+            other = conn.execute("INSERT INTO conversation_messages (conversation_id, message_type, content, timestamp) "
+                                 "VALUES (?, 'user', 'from another process', '')", (self.conversation_id,)).lastrowid
+        second = self.persistence.add_message(self.conversation_id, "user", "list vms", "list_vms", {})
+
+        self.persistence.flush()
+        self.assertEqual(self.count_messages_on_disk(), 3)
+        self.assertEqual(len({other, int(first), int(second)}), 3)
+        with sqlite3.connect(self.db_path) as conn:
+            stored = [row[0] for row in conn.execute("SELECT id FROM conversation_messages WHERE content = 'list vms'")]
+        self.assertEqual(sorted(stored), sorted([int(first), int(second)]))
+
+    def test_write_settings_are_per_instance(self):
+        """Test that an instance's flush interval does not change other users of the database"""
+        eager = ConversationPersistence(self.db_path, write_batch_size=1000, write_flush_interval=0.05)
+        self.assertIs(eager._db, self.persistence._db)
+        self.assertEqual(self.persistence._db.flush_interval, 1.0)
+
+        eager.update_conversation_topic(self.conversation_id, "backups")
+        time.sleep(0.5)
+        self.assertEqual(self.persistence._db.pending_writes(), 0)
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT topic FROM conversations").fetchone()[0], "backups")
+
+    def test_reads_see_pending_writes(self):
+        """Test that reads return buffered messages and topics"""
+        message_id = self.persistence.add_message(self.conversation_id, "user", "start vm 101", "start_vm", {"vm_name": "web"})
+        self.persistence.update_conversation_topic(self.conversation_id, "start vm")
+
+        conversation = self.persistence.get_conversation(self.conversation_id)
+
+        self.assertEqual([m["id"] for m in conversation["messages"]], [message_id])
+        self.assertEqual(conversation["topic"], "start vm")
+        self.assertEqual(set(conversation["topics"]), {"start vm", "vm name", "web"})
+        self.assertEqual(self.persistence.get_topic_history("user1"), {"start vm": 1, "vm name": 1, "web": 1})
+
+    def test_batch_written_in_one_flush(self):
+        """Test that buffered writes are applied together"""
+        for i in range(5):
+            self.persistence.add_message(self.conversation_id, "user", f"status of vm {i}", "vm_status", {})
+
+        self.assertGreater(self.persistence.flush(), 5)
+        self.assertEqual(self.count_messages_on_disk(), 5)
+        self.assertEqual(self.persistence._db.stats()["flushes"], 1)
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM conversation_topic_mapping").fetchone()[0], 1)
+
+    def test_close_flushes_buffer(self):
+        """Test that closing persists buffered writes and leaves the shared connections open"""
+        other = ConversationPersistence(self.db_path)
+        self.persistence.add_message(self.conversation_id, "user", "list vms", "list_vms", {})
+        self.persistence.close()
+        self.assertEqual(self.count_messages_on_disk(), 1)
+
+        other.add_message(self.conversation_id, "user", "list containers", "list_containers", {})
+        self.assertEqual(len(other.get_conversation(self.conversation_id)["messages"]), 2)
+
+if __name__ == "__main__":
+    unittest.main()
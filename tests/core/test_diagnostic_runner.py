@@ -0,0 +1,90 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from proxmox_nli.core.diagnostic_runner import DiagnosticRunner
+from proxmox_nli.core.troubleshooting.performance_analyzer import PerformanceAnalyzer
+
+
+class TestDiagnosticRunner(unittest.TestCase):
+    def setUp(self):
+        self.runner = DiagnosticRunner(max_workers=4)
+
+    def tearDown(self):
+        self.runner.shutdown()
+
+    def test_probes_run_concurrently_with_timings(self):
+        """Test that probes overlap and each reports its own wall time"""
+        start = time.perf_counter()
+        results = self.runner.run_probes({
+            'slow': lambda: time.sleep(0.3) or 'slow',
+            'fast': lambda: 'fast',
+            'other': lambda: time.sleep(0.3) or 'other'
+        })
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.55)
+        self.assertEqual(results['slow']['result'], 'slow')
+        self.assertGreaterEqual(results['slow']['duration'], 0.25)
+        self.assertLess(results['fast']['duration'], 0.2)
+
+    def test_probe_timeout_and_failure(self):
+        """Test that a hung probe is reported without holding up the others"""
+        release = threading.Event()
+        results = self.runner.run_probes({
+            'hung': release.wait,
+            'broken': lambda: 1 / 0,
+            'ok': lambda: 42
+        }, timeout=0.2)
+        release.set()
+
+        self.assertTrue(results['hung']['timed_out'])
+        self.assertFalse(results['hung']['success'])
+        self.assertIn('division', results['broken']['error'])
+        self.assertEqual(results['ok']['result'], 42)
+
+    def test_commands_deduplicated_within_session(self):
+        """Test that identical commands from concurrent probes run once per session"""
+        with patch.object(self.runner, '_execute', side_effect=lambda cmd, timeout: time.sleep(0.1) or cmd) as execute:
+            results = self.runner.run_probes({
+                'a': lambda: self.runner.run_command('df -h'),
+                'b': lambda: self.runner.run_command('df -h'),
+            })
+            self.assertEqual(execute.call_count, 1)
+            self.assertEqual(results['b']['result'], 'df -h')
+
+            # Outside a session every call runs
+            self.runner.run_command('df -h')
+            self.runner.run_command('df -h')
+            self.assertEqual(execute.call_count, 3)
+
+    def test_nested_probes_do_not_starve(self):
+        """Test that probes running probes complete when the outer level fills the pool"""
+        runner = DiagnosticRunner(max_workers=1)
+        inner = lambda: runner.run_probes({'x': lambda: 1, 'y': lambda: 2})
+        results = runner.run_probes({'outer': inner}, timeout=2)
+        runner.shutdown()
+        self.assertEqual(results['outer']['result']['y']['result'], 2)
+
+
+class TestPerformanceAnalyzerRunner(unittest.TestCase):
+    def test_analyze_all_reports_timings(self):
+        """Test that the per-resource analyses report their wall time"""
+        runner = DiagnosticRunner()
+        analyzer = PerformanceAnalyzer(MagicMock(), runner=runner)
+        for resource in ('cpu', 'memory', 'disk', 'network'):
+            setattr(analyzer, f'analyze_{resource}_performance',
+                    MagicMock(return_value={'success': True, 'bottleneck': resource == 'disk',
+                                            'recommendations': [f'fix {resource}']}))
+
+        results = analyzer.analyze_all_performance('pve1')
+        runner.shutdown()
+
+        self.assertEqual(set(results['timings']), {'cpu', 'memory', 'disk', 'network'})
+        self.assertEqual(results['bottlenecks'], ['Disk'])
+        self.assertEqual(results['recommendations'], ['fix disk'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import threading
+import time
+import unittest
+
+from proxmox_nli.core.events.event_dispatcher import EventDispatcher
+
+
+class TestEventDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher = EventDispatcher(async_dispatch=True, queue_size=10, max_history=5)
+        self.release = threading.Event()
+        self.received = []
+
+    def tearDown(self):
+        self.release.set()
+        self.dispatcher.shutdown(timeout=1)
+
+    def blocked(self, data):
+        self.release.wait(5)
+        self.received.append(data)
+
+    def test_slow_subscriber_does_not_block_publisher(self):
+        """Test that publishing returns while an asynchronous subscriber is busy"""
+        fast = []
+        self.dispatcher.subscribe("vm_event", self.blocked)
+        self.dispatcher.subscribe("vm_event", fast.append, async_dispatch=False)
+
+        start = time.perf_counter()
+        for i in range(5):
+            self.dispatcher.publish("vm_event", {"vmid": i})
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertEqual(len(fast), 5)
+
+        self.release.set()
+        self.assertTrue(self.dispatcher.flush(timeout=2))
+        self.assertEqual([event["vmid"] for event in self.received], list(range(5)))
+        stats = self.dispatcher.get_subscriber_stats()["TestEventDispatcher.blocked"]
+        self.assertEqual(stats["delivered"], 5)
+        self.assertGreater(stats["max_lag"], 0)
+
+    def test_overflow_policies(self):
+        """Test drop_oldest and drop_newest once a queue is full"""
+        kept_first = []
+
+        def blocked_newest(data):
+            self.release.wait(5)
+            kept_first.append(data)
+
+        self.dispatcher.subscribe("backup_event", self.blocked, queue_size=3)
+        self.dispatcher.subscribe("backup_event", blocked_newest, overflow="drop_newest", queue_size=3)
+        self.dispatcher.publish("backup_event", {"n": 0})
+        time.sleep(0.05)  # The workers pick up event 0 and block
+        for i in range(1, 7):
+            self.dispatcher.publish("backup_event", {"n": i})
+
+        self.release.set()
+        self.assertTrue(self.dispatcher.flush(timeout=2))
+        self.assertEqual([event["n"] for event in self.received], [0, 4, 5, 6])
+        self.assertEqual([event["n"] for event in kept_first], [0, 1, 2, 3])
+        stats = self.dispatcher.get_subscriber_stats()
+        self.assertEqual(stats["TestEventDispatcher.blocked"]["dropped"], 3)
+        self.assertEqual(stats["TestEventDispatcher.test_overflow_policies.<locals>.blocked_newest"]["dropped"], 3)
+
+    def test_coalesce_keeps_latest_sample_per_key(self):
+        """Test that queued metrics are replaced by newer samples of the same source"""
+        self.dispatcher.subscribe("resource_metric", self.blocked, overflow="coalesce", coalesce_key="source")
+        self.dispatcher.publish("resource_metric", {"source": "warmup", "value": 0})
+        time.sleep(0.05)
+        for value in range(1, 4):
+            self.dispatcher.publish("resource_metric", {"source": "node1", "value": value})
+            self.dispatcher.publish("resource_metric", {"source": "node2", "value": value * 10})
+
+        self.release.set()
+        self.assertTrue(self.dispatcher.flush(timeout=2))
+        self.assertEqual([(e["source"], e["value"]) for e in self.received],
+                         [("warmup", 0), ("node1", 3), ("node2", 30)])
+        self.assertEqual(self.dispatcher.get_subscriber_stats()["TestEventDispatcher.blocked"]["coalesced"], 4)
+
+        with self.assertRaises(ValueError):
+            self.dispatcher.subscribe("resource_metric", print, overflow="coalesce")
+
+    def test_unsubscribe_and_history(self):
+        """Test that unsubscribing stops delivery and history is a bounded ring"""
+        self.dispatcher.subscribe("system_event", self.received.append)
+        for i in range(8):
+            self.dispatcher.publish("system_event", {"n": i})
+        self.assertTrue(self.dispatcher.flush(timeout=2))
+        self.assertEqual(len(self.received), 8)
+        self.assertEqual([event["data"]["n"] for event in self.dispatcher.get_event_history()], [3, 4, 5, 6, 7])
+
+        self.dispatcher.unsubscribe("system_event", self.received.append)
+        self.assertEqual(self.dispatcher.get_subscriber_stats(), {})
+        self.dispatcher.publish("system_event", {"n": 8})
+        self.assertEqual(len(self.received), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from proxmox_nli.core.automation.job_queue import JobQueue, JobStatus
+from proxmox_nli.core.sqlite_pool import close_all_managers
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queues = []
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        for queue in self.queues:
+            queue.stop()
+        close_all_managers()
+        self.tmp.cleanup()
+
+    def create_queue(self, **kwargs):
+        kwargs.setdefault("retry_backoff", 0.05)
+        kwargs.setdefault("scale_interval", 0.05)
+        kwargs.setdefault("poll_interval", 0.05)
+        queue = JobQueue(storage_path=self.tmp.name, **kwargs)
+        queue.register_handler("record", self.record)
+        self.queues.append(queue)
+        return queue
+
+    def record(self, label, delay=0.0):
+        time.sleep(delay)
+        with self.lock:
+            self.calls.append(label)
+
+    def wait_for(self, queue, job_id, timeout=5.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = queue.get_job(job_id)
+            if job["status"] in ("COMPLETED", "FAILED", "CANCELLED"):
+                return job
+            time.sleep(0.02)
+        self.fail(f"Job {job_id} did not finish: {queue.get_job(job_id)}")
+
+    def test_jobs_survive_restart(self):
+        """Test that named jobs run after a restart and in-memory callables are reported lost"""
+        before = self.create_queue()
+        durable = before.submit("record", args=("backup",))
+        local = before.submit(lambda: None, name="closure")
+
+        after = self.create_queue()
+        after.start()
+        self.assertEqual(self.wait_for(after, durable)["status"], "COMPLETED")
+        lost = after.get_job(local)
+        self.assertEqual(lost["status"], "FAILED")
+        self.assertIn("lost", lost["error"])
+        self.assertEqual(self.calls, ["backup"])
+
+    def test_retry_with_backoff(self):
+        """Test that failed attempts are retried until the job succeeds"""
+        attempts = []
+
+        def flaky():
+            attempts.append(time.monotonic())
+            if len(attempts) < 3:
+                raise RuntimeError("storage busy")
+
+        queue = self.create_queue()
+        delays = []
+        store_fail = queue.store.fail
+
+        def recording_fail(job_id, token, error, retry_at=None):
+            if retry_at is not None:
+                delays.append(retry_at - time.time())
+            return store_fail(job_id, token, error, retry_at=retry_at)
+
+        queue.store.fail = recording_fail
+        queue.start()
+        with patch("proxmox_nli.core.automation.job_queue.random.uniform", return_value=1.0):
+            job = self.wait_for(queue, queue.submit(flaky, max_retries=2))
+        self.assertEqual(job["status"], "COMPLETED")
+        self.assertEqual(job["attempts"], 3)
+        # The retry delay doubles with every attempt
+        self.assertEqual(len(delays), 2)
+        self.assertAlmostEqual(delays[0], 0.05, delta=0.01)
+        self.assertAlmostEqual(delays[1], 0.10, delta=0.01)
+
+        failing = self.wait_for(queue, queue.submit(lambda: 1 / 0, max_retries=1))
+        self.assertEqual(failing["status"], "FAILED")
+        self.assertEqual(failing["attempts"], 2)
+
+    def test_expired_lease_is_reclaimed(self):
+        """Test that a job held by a dead worker becomes visible again"""
+        queue = self.create_queue(lease_seconds=0.2)
+        job_id = queue.submit("record", args=("deploy",))
+        self.assertIsNotNone(queue.store.claim("crashed-worker", 0.2))
+
+        queue.start()
+        job = self.wait_for(queue, job_id)
+        self.assertEqual(job["status"], "COMPLETED")
+        self.assertEqual(job["attempts"], 2)
+
+    def test_timeout(self):
+        """Test that a job exceeding its timeout fails and its late result is discarded"""
+        queue = self.create_queue()
+        queue.start()
+        job = self.wait_for(queue, queue.submit("record", args=("slow", 0.5), timeout=0.1, max_retries=0))
+        self.assertEqual(job["status"], "FAILED")
+        self.assertEqual(job["error"], "Job timed out")
+
+    def test_timed_out_job_is_not_rerun(self):
+        """Test that a timed-out job is never run again while its call is still going"""
+        running = []
+        peak = []
+
+        def slow():
+            with self.lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.4)
+            with self.lock:
+                running.pop()
+
+        queue = self.create_queue(max_workers=4)
+        queue.start()
+        job = self.wait_for(queue, queue.submit(slow, timeout=0.1, max_retries=2))
+        time.sleep(0.6)
+        self.assertEqual(job["status"], "FAILED")
+        self.assertEqual(queue.get_job(job["id"])["attempts"], 1)
+        self.assertEqual(peak, [1])
+
+    def test_workers_scale_with_backlog(self):
+        """Test that a burst adds workers and the extra workers retire when idle"""
+        queue = self.create_queue(num_workers=1, max_workers=4, idle_timeout=0.2)
+        queue.start()
+        start = time.perf_counter()
+        job_ids = [queue.submit("record", args=(f"vm-{i}", 0.2)) for i in range(8)]
+        peak = 0
+        for job_id in job_ids:
+            self.assertEqual(self.wait_for(queue, job_id)["status"], "COMPLETED")
+            peak = max(peak, queue.stats()["workers"])
+        self.assertLess(time.perf_counter() - start, 1.2)
+        self.assertEqual(peak, 4)
+
+        deadline = time.time() + 3
+        while queue.stats()["workers"] > 1 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(queue.stats()["workers"], 1)
+
+    def test_listing_and_cancel(self):
+        """Test that pending jobs can be cancelled and listed by status"""
+        queue = self.create_queue()
+        job_id = queue.submit("record", args=("later",))
+        self.assertTrue(queue.cancel_job(job_id))
+        self.assertFalse(queue.cancel_job(job_id))
+        cancelled = queue.list_jobs(JobStatus.CANCELLED)
+        self.assertEqual([job["id"] for job in cancelled], [job_id])
+        self.assertEqual(queue.clear_history(), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "jobs.db")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+import json
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from proxmox_nli.core.troubleshooting.log_analyzer import LogAnalyzer
+from proxmox_nli.core.troubleshooting.log_stream import JournalReader, LogClassifier, LogStats, TopMessages
+
+
+class TestLogClassifier(unittest.TestCase):
+    def setUp(self):
+        self.classifier = LogClassifier({
+            'disk': [r'no space left on device', r'i/o error'],
+            'network': [r'connection refused', r'timeout']
+        })
+
+    def test_category_precedence_follows_pattern_order(self):
+        """Test that the first category in order wins, not the leftmost match"""
+        self.assertEqual(self.classifier.category('timeout writing: I/O error'), 'disk')
+        self.assertEqual(self.classifier.category('Connection refused by peer'), 'network')
+        self.assertIsNone(self.classifier.category('all good'))
+
+    def test_severity(self):
+        """Test that priority wins over text and errors win over warnings"""
+        self.assertEqual(self.classifier.severity('warning: write failed'), 'error')
+        self.assertEqual(self.classifier.severity('WARN low battery'), 'warning')
+        self.assertIsNone(self.classifier.severity('started session'))
+        self.assertEqual(self.classifier.severity('started session', priority=2), 'error')
+        self.assertIsNone(self.classifier.severity('error text at info level', priority=6))
+
+
+class TestLogStats(unittest.TestCase):
+    def test_memory_is_bounded(self):
+        """Test that counts are exact while samples stay bounded"""
+        classifier = LogClassifier({'network': [r'timeout']})
+        stats = LogStats(classifier, sample_size=5, top_size=3)
+        for i in range(1000):
+            stats.add(f'error: request {i} timeout to 10.0.0.{i % 7}', priority=3, source='pveproxy')
+
+        self.assertEqual(stats.counts['error'], 1000)
+        self.assertEqual(stats.category_counts, {'network': 1000})
+        self.assertEqual(len(stats.errors()), 5)
+        self.assertEqual(stats.errors()[0], 'error: request 999 timeout to 10.0.0.5')
+        self.assertEqual(stats.source_counts, {'pveproxy': 1000})
+        # Numbers are normalized away, so every line is the same message
+        self.assertEqual(stats.top_messages()['network'][0]['count'], 1000)
+
+    def test_top_messages_keeps_heavy_hitters(self):
+        """Test that frequent messages survive a stream of rare ones"""
+        top = TopMessages(capacity=3)
+        for i in range(200):
+            top.add('disk full')
+            top.add(f'rare message {chr(97 + i % 26)}{chr(97 + i // 26)}')
+        self.assertEqual(top.top(1)[0]['message'], 'disk full')
+
+
+class TestJournalStreaming(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        entries = [
+            {'MESSAGE': 'pve-firewall: connection refused', 'PRIORITY': '3', 'SYSLOG_IDENTIFIER': 'pve-firewall'},
+            {'MESSAGE': 'kernel: out of memory', 'PRIORITY': '2', 'SYSLOG_IDENTIFIER': 'kernel'},
+            {'MESSAGE': [119, 97, 114, 110], 'PRIORITY': '4', 'SYSLOG_IDENTIFIER': 'sshd'},
+        ]
+        data = os.path.join(self.tmp.name, 'journal.json')
+        with open(data, 'w') as f:
+            f.write('\n'.join(json.dumps(e) for e in entries) + '\nnot json\n')
+        self.journalctl = os.path.join(self.tmp.name, 'journalctl')
+        with open(self.journalctl, 'w') as f:
+            f.write(f'#!/bin/sh\ncat {data}\n')
+        os.chmod(self.journalctl, os.stat(self.journalctl).st_mode | stat.S_IEXEC)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build_command(self):
+        """Test that relative periods are passed the way journalctl expects"""
+        command = JournalReader().build_command('2h', 'err', identifiers=['pve'])
+        self.assertEqual(command, ['journalctl', '-o', 'json', '--no-pager', '-p', 'err',
+                                   '--since', '-2h', '-t', 'pve'])
+
+    def test_analyze_system_logs_streams_one_process(self):
+        """Test that system log analysis reads the journal stream into bounded results"""
+        analyzer = LogAnalyzer(MagicMock(), data_dir=self.tmp.name)
+        analyzer.journal_reader = JournalReader(self.journalctl)
+
+        results = analyzer.analyze_system_logs({'time_period': '1h', 'unit': 'pveproxy.service'})
+
+        self.assertTrue(results['success'])
+        self.assertEqual(results['error_count'], 2)
+        self.assertEqual(results['warning_count'], 1)
+        self.assertEqual(results['warnings'], ['warn'])
+        self.assertEqual(results['errors'][0], 'kernel: out of memory')
+        self.assertEqual(results['category_counts'], {'memory': 1, 'network': 1})
+        self.assertEqual(results['lines_read'], 3)
+        self.assertIn('Found 2 errors', results['summary'])
+
+
+class TestIncrementalAnalysis(unittest.TestCase):
+    """Runs LogAnalyzer against a fake journalctl that honours --after-cursor, --since and --until"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data = os.path.join(self.tmp.name, 'journal.json')
+        self.calls = os.path.join(self.tmp.name, 'calls')
+        self.journalctl = os.path.join(self.tmp.name, 'journalctl')
+        with open(self.journalctl, 'w') as f:
+            f.write(f'''#!{sys.executable}
+import json
+import sys
+args = sys.argv[1:]
+with open({self.calls!r}, 'a') as calls:
+    calls.write(' '.join(args) + '\\n')
+def option(name, default):
+    return args[args.index(name) + 1] if name in args else default
+cursor = option('--after-cursor', None)
+since = float(option('--since', '@0')[1:])
+until = float(option('--until', '@inf')[1:])
+for line in open({self.data!r}):
+    if cursor is None:
+        if since <= json.loads(line)['__REALTIME_TIMESTAMP'] / 1e6 <= until:
+            sys.stdout.write(line)
+    elif '"__CURSOR": "' + cursor + '"' in line:
+        cursor = None
+''')
+        os.chmod(self.journalctl, os.stat(self.journalctl).st_mode | stat.S_IEXEC)
+        self.count = 0
+        self.analyzer = LogAnalyzer(MagicMock(), data_dir=self.tmp.name)
+        self.analyzer.journal_reader = JournalReader(self.journalctl)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_entries(self, messages, age=0):
+        with open(self.data, 'a') as f:
+            for message, priority, unit in messages:
+                self.count += 1
+                f.write(json.dumps({
+                    'MESSAGE': message, 'PRIORITY': str(priority), '_SYSTEMD_UNIT': unit,
+                    '__CURSOR': f'c{self.count}',
+                    '__REALTIME_TIMESTAMP': int((time.time() - age) * 1_000_000)
+                }) + '\n')
+
+    def test_repeated_analysis_reads_only_new_lines(self):
+        """Test that the cursor is persisted and counts accumulate in the index"""
+        self.write_entries([('disk full on /var', 3, 'pvedaemon.service'),
+                            ('connection refused', 4, 'pveproxy.service')])
+        first = self.analyzer.analyze_system_logs({'time_period': '24h'})
+        self.assertEqual(first['lines_read'], 2)
+        self.assertEqual(first['error_count'], 1)
+
+        self.write_entries([('out of memory', 3, 'qemu.service')])
+        restarted = LogAnalyzer(MagicMock(), data_dir=self.tmp.name)
+        restarted.journal_reader = JournalReader(self.journalctl)
+        second = restarted.analyze_system_logs({'time_period': '24h'})
+
+        self.assertEqual(second['lines_read'], 1)
+        self.assertEqual(second['error_count'], 2)
+        self.assertEqual(second['warning_count'], 1)
+        self.assertEqual(second['errors'][0], 'out of memory')
+        self.assertEqual(second['category_counts'], {'disk': 1, 'network': 1, 'memory': 1})
+        with open(self.calls) as f:
+            self.assertIn('--after-cursor c2', f.read().splitlines()[-1])
+
+    def test_history_is_an_index_query(self):
+        """Test that the week's issues are answered from the index by category and unit"""
+        self.write_entries([('i/o error on sda', 3, 'zfs.service')] * 3, age=3 * 86400)
+        self.write_entries([('i/o error on sdb', 3, 'zfs.service'),
+                            ('auth failed for root', 4, 'sshd.service')])
+
+        week = self.analyzer.analyze_logs('history', {'time_period': '7d'})
+        self.assertTrue(week['success'])
+        self.assertEqual(week['error_count'], 4)
+        disk = [issue for issue in week['issues'] if issue['category'] == 'disk']
+        self.assertEqual(disk[0]['unit'], 'zfs.service')
+        self.assertEqual(disk[0]['count'], 4)
+        self.assertEqual(disk[0]['sample'], 'i/o error on sdb')
+
+        today = self.analyzer.query_issue_history({'time_period': '24h', 'severity': 'error'})
+        self.assertEqual(today['error_count'], 1)
+        self.assertEqual(today['warning_count'], 0)
+
+    def test_longer_window_backfills_the_index(self):
+        """Test that a week's history after a day's analysis includes the older issues once"""
+        self.write_entries([('i/o error on sda', 3, 'zfs.service')] * 3, age=3 * 86400)
+        self.write_entries([('i/o error on sdb', 3, 'zfs.service')])
+
+        today = self.analyzer.analyze_system_logs({'time_period': '24h'})
+        self.assertEqual(today['error_count'], 1)
+
+        for _ in range(2):
+            week = self.analyzer.query_issue_history({'time_period': '7d'})
+            self.assertEqual(week['error_count'], 4)
+        self.assertEqual(self.analyzer.analyze_system_logs({'time_period': '24h'})['error_count'], 1)
+
+    def test_concurrent_updates_count_lines_once(self):
+        """Test that analyses running at the same time do not index the same lines twice"""
+        self.write_entries([('disk full on /var', 3, 'pvedaemon.service')] * 5)
+        threads = [threading.Thread(target=self.analyzer.analyze_system_logs, args=({'time_period': '24h'},))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.analyzer.analyze_system_logs({'time_period': '24h'})['error_count'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+from unittest.mock import MagicMock
+
+from proxmox_nli.core.monitoring.cluster_snapshot import ClusterSnapshot
+from proxmox_nli.core.monitoring.metrics_collector import MetricsCollector
+from proxmox_nli.core.monitoring.resource_monitor import ResourceMonitor
+
+
+def make_api(resources, extra=None):
+    """Create a mock API that answers from a fixed set of endpoints"""
+    responses = {
+        'cluster/resources': {"success": True, "data": resources},
+        'storage': {"success": True, "data": []},
+    }
+    responses.update(extra or {})
+
+    def api_request(method, endpoint, data=None):
+        if endpoint in responses:
+            return responses[endpoint]
+        if endpoint.endswith('/netstat'):
+            return {"success": True, "data": []}
+        return {"success": False, "message": f"unexpected endpoint {endpoint}"}
+
+    api = MagicMock()
+    api.api_request.side_effect = api_request
+    return api
+
+
+class TestClusterSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.resources = [
+            {"type": "node", "node": "pve1", "cpu": 0.2, "mem": 4096, "maxmem": 8192},
+            {"type": "qemu", "vmid": 101, "node": "pve1", "cpu": 0.5, "mem": 1024, "maxmem": 2048,
+             "disk": 0, "maxdisk": 10, "netin": 5, "netout": 6, "status": "running"},
+            {"type": "lxc", "vmid": 200, "node": "pve1", "cpu": 0.1, "mem": 256, "maxmem": 512,
+             "status": "running"},
+            {"type": "storage", "storage": "local", "node": "pve1", "disk": 1, "maxdisk": 2},
+        ]
+
+    def test_single_bulk_request(self):
+        """Test that repeated accessors reuse one cluster/resources call"""
+        api = make_api(self.resources)
+        snapshot = ClusterSnapshot(api)
+        self.assertEqual(len(snapshot.vms()), 2)
+        self.assertEqual(len(snapshot.nodes()), 1)
+        self.assertEqual(len(snapshot.storages()), 1)
+        self.assertEqual(api.api_request.call_count, 1)
+
+    def test_status_fallback_only_when_fields_missing(self):
+        """Test that per-VM status is only requested when the bulk entry lacks fields"""
+        resources = self.resources + [{"type": "qemu", "vmid": 102, "node": "pve1", "status": "running"}]
+        api = make_api(resources, {
+            'nodes/pve1/qemu/102/status/current': {"success": True, "data": {"cpu": 0.3, "mem": 512}}
+        })
+        snapshot = ClusterSnapshot(api)
+        statuses = {vm['vmid']: snapshot.vm_status(vm) for vm in snapshot.vms()}
+        self.assertEqual(statuses[102]['cpu'], 0.3)
+        self.assertEqual(statuses[101]['cpu'], 0.5)
+        self.assertEqual(snapshot.api_calls, 2)
+
+    def test_node_list_fallback(self):
+        """Test that the node list falls back to the nodes endpoint"""
+        api = make_api([], {'nodes': {"success": True, "data": [{"node": "pve1"}]}})
+        snapshot = ClusterSnapshot(api)
+        self.assertEqual([n['node'] for n in snapshot.nodes()], ['pve1'])
+
+
+class TestMetricsCollector(unittest.TestCase):
+    def test_collection_cycle_avoids_per_vm_calls(self):
+        """Test that a full cycle issues no per-VM status requests"""
+        resources = [{"type": "node", "node": f"pve{n}", "cpu": 0.1, "mem": 1, "maxmem": 2} for n in range(3)]
+        resources += [
+            {"type": "qemu", "vmid": 100 + i, "node": f"pve{i % 3}", "cpu": 0.1, "mem": 1, "maxmem": 2}
+            for i in range(50)
+        ]
+        api = make_api(resources)
+        collector = MetricsCollector(api)
+
+        result = collector.collect_all_metrics()
+
+        self.assertTrue(result["success"])
+        endpoints = [call.args[1] for call in api.api_request.call_args_list]
+        self.assertEqual(endpoints.count('cluster/resources'), 1)
+        self.assertFalse(any('/status' in endpoint for endpoint in endpoints))
+        self.assertNotIn('nodes', endpoints)
+        vm_cpu = [m for m in result["metrics"] if m["type"] == "vm_cpu"]
+        node_cpu = [m for m in result["metrics"] if m["type"] == "node_cpu"]
+        self.assertEqual(len(vm_cpu), 50)
+        self.assertEqual(len(node_cpu), 3)
+
+
+
+class TestSharedCollection(unittest.TestCase):
+    def setUp(self):
+        self.collector = MetricsCollector(MagicMock())
+        self.collector.collect_and_store = MagicMock(return_value={"success": False})
+
+    def test_collection_stops_with_last_owner(self):
+        """Test that starting is idempotent and only the last owner's stop halts collection"""
+        self.assertTrue(self.collector.start_collection(interval=60)["success"])
+        self.assertTrue(self.collector.start_collection()["success"])
+        thread = self.collector.collection_thread
+
+        self.assertTrue(self.collector.stop_collection()["success"])
+        self.assertTrue(self.collector.collection_active)
+        self.assertTrue(thread.is_alive())
+
+        self.assertTrue(self.collector.stop_collection()["success"])
+        self.assertFalse(self.collector.collection_active)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(self.collector.stop_collection()["success"])
+
+    def test_resource_monitor_shares_running_collection(self):
+        """Test that ResourceMonitor starts on a running collector and leaves it to the other owner"""
+        self.collector.start_collection(interval=60)
+        monitor = ResourceMonitor(MagicMock(), metrics_collector=self.collector)
+        self.assertTrue(monitor.start_monitoring(interval=60)["success"])
+        monitor.stop_monitoring()
+        self.assertTrue(self.collector.collection_active)
+        self.collector.stop_collection()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import time
+import unittest
+
+from proxmox_nli.core.sqlite_pool import SQLiteConnectionManager
+
+from proxmox_nli.utils.query_profiler import (
+    PROFILE_HEADER, STAGE_LATENCY, current_trace, profiling_requested, set_intent, stage,
+    timed_stage, trace_query
+)
+
+
+def stage_count(stage_name, intent):
+    """Number of observations of a stage histogram series"""
+    for metric in STAGE_LATENCY.collect():
+        for sample in metric.samples:
+            if (sample.name.endswith('_count') and sample.labels.get('stage') == stage_name
+                    and sample.labels.get('intent') == intent):
+                return sample.value
+    return 0
+
+
+@timed_stage('test_api')
+def slow_call():
+    time.sleep(0.01)
+
+
+class TestQueryProfiler(unittest.TestCase):
+    def test_stages_are_labelled_with_the_resolved_intent(self):
+        """Test that stage timings are buffered until the intent is known"""
+        before = stage_count('test_command', 'test_intent')
+        with trace_query() as trace:
+            with stage('test_command'):
+                slow_call()
+                slow_call()
+            set_intent('test_intent')
+            self.assertEqual(stage_count('test_command', 'test_intent'), before)
+
+        self.assertIsNone(current_trace())
+        self.assertEqual(stage_count('test_command', 'test_intent'), before + 1)
+        summary = trace.summary()
+        self.assertEqual(summary['intent'], 'test_intent')
+        self.assertEqual(list(summary['stages']), ['test_command', 'test_api'])
+        self.assertEqual(summary['stages']['test_api']['calls'], 2)
+        self.assertGreaterEqual(summary['duration'], 0.02)
+        self.assertNotIn('profile', summary)
+
+    def test_stage_outside_a_query(self):
+        """Test that stages without an active trace are observed immediately"""
+        before = stage_count('test_background', 'none')
+        with stage('test_background'):
+            pass
+        self.assertEqual(stage_count('test_background', 'none'), before + 1)
+
+    def test_sqlite_writes_are_a_stage(self):
+        """Test that request-path writes join the query and background flushes use intent 'none'"""
+        manager = SQLiteConnectionManager(':memory:', flush_interval=0.01)
+        self.addCleanup(manager.close)
+        with manager.connection() as conn:
+            conn.execute('CREATE TABLE items (name TEXT)')
+
+        with trace_query() as trace:
+            with manager.write_connection() as conn:
+                conn.execute("INSERT INTO items VALUES ('sync')")
+            set_intent('test_write')
+        self.assertEqual(trace.summary()['stages']['sqlite_write']['calls'], 1)
+
+        before = stage_count('sqlite_write', 'none')
+        manager.execute_write("INSERT INTO items VALUES ('queued')")
+        deadline = time.time() + 2
+        while manager.pending_writes() and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        self.assertEqual(stage_count('sqlite_write', 'none'), before + 1)
+
+    def test_nested_trace_reuses_outer_and_profiles(self):
+        """Test that the outermost trace owns the profile and inner traces share it"""
+        with trace_query('web', profile=True) as outer:
+            with trace_query() as inner:
+                self.assertIs(inner, outer)
+                slow_call()
+        self.assertIn('slow_call', outer.summary()['profile'])
+
+    def test_profiling_requested(self):
+        """Test that only truthy header values enable profiling"""
+        self.assertTrue(profiling_requested({PROFILE_HEADER: 'true'}))
+        self.assertFalse(profiling_requested({PROFILE_HEADER: '0'}))
+        self.assertFalse(profiling_requested(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from proxmox_nli.core.conversation_persistence import ConversationPersistence
+from proxmox_nli.core.sqlite_pool import SQLiteConnectionManager
+
+
+class TestSQLiteConnectionManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        self.manager = SQLiteConnectionManager(self.db_path, batch_size=1000, flush_interval=60)
+        with self.manager.connection() as conn:
+            conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_connection_reused_per_thread(self):
+        """Test that a thread gets the same configured connection on every call"""
+        with self.manager.connection() as first:
+            pass
+        with self.manager.connection() as second:
+            journal_mode = second.execute("PRAGMA journal_mode").fetchone()[0]
+            synchronous = second.execute("PRAGMA synchronous").fetchone()[0]
+        self.assertIs(first, second)
+        self.assertEqual(journal_mode, "wal")
+        self.assertEqual(synchronous, 1)  # NORMAL
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.manager._thread_connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], first)
+        self.assertEqual(self.manager.stats()["connections_opened"], 2)
+
+    def test_memory_database_is_shared_across_threads(self):
+        """Test that ':memory:' is one database for every thread, not one per connection"""
+        manager = SQLiteConnectionManager(":memory:")
+        self.addCleanup(manager.close)
+        with manager.connection() as conn:
+            conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+
+        def insert():
+            with manager.connection() as conn:
+                conn.execute("INSERT INTO items (name) VALUES ('from thread')")
+            manager.execute_write("INSERT INTO items (name) VALUES ('queued')")
+
+        thread = threading.Thread(target=insert)
+        thread.start()
+        thread.join()
+        manager.flush()
+        with manager.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 2)
+        self.assertEqual(manager.stats()["connections_opened"], 1)
+
+    def test_rollback_and_row_factory_reset(self):
+        """Test that errors roll back and row_factory does not leak between calls"""
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.manager.connection() as conn:
+                conn.row_factory = sqlite3.Row
+                conn.execute("INSERT INTO items (id, name) VALUES (1, 'a')")
+                conn.execute("INSERT INTO items (id, name) VALUES (1, 'b')")
+        with self.manager.connection() as conn:
+            self.assertIsNone(conn.row_factory)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 0)
+
+    def test_nested_blocks_share_outer_transaction(self):
+        """Test that a nested block does not commit the outer transaction early"""
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.manager.connection() as outer:
+                outer.execute("INSERT INTO items (id, name) VALUES (1, 'outer')")
+                with self.manager.connection() as inner:
+                    inner.execute("INSERT INTO items (id, name) VALUES (2, 'inner')")
+                outer.execute("INSERT INTO items (id, name) VALUES (1, 'duplicate')")
+        with self.manager.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 0)
+
+        with self.manager.connection() as outer:
+            with self.manager.connection() as inner:
+                inner.execute("INSERT INTO items (name) VALUES ('committed')")
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 1)
+
+    def test_queued_writes_flushed_in_one_batch(self):
+        """Test that queued writes are applied together on flush"""
+        for i in range(10):
+            self.manager.execute_write("INSERT INTO items (name) VALUES (?)", (f"item-{i}",))
+        self.assertEqual(self.manager.pending_writes(), 10)
+
+        self.assertEqual(self.manager.flush(), 10)
+        with self.manager.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 10)
+        stats = self.manager.stats()
+        self.assertEqual(stats["flushes"], 1)
+        self.assertEqual(stats["pending_writes"], 0)
+
+    def test_write_flush_interval_overrides_manager_default(self):
+        """Test that a write with a short flush interval is not held for the manager's interval"""
+        self.manager.execute_write("INSERT INTO items (name) VALUES (?)", ("slow",))
+        self.manager.execute_write("INSERT INTO items (name) VALUES (?)", ("fast",), flush_interval=0.05)
+        time.sleep(0.5)
+        self.assertEqual(self.manager.pending_writes(), 0)
+        self.assertEqual(self.manager.flush_interval, 60)
+
+    def test_close_flushes_pending_writes(self):
+        """Test that closing the manager persists queued writes"""
+        self.manager.execute_write("INSERT INTO items (name) VALUES (?)", ("last",))
+        self.manager.close()
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT name FROM items").fetchone()[0], "last")
+
+    def test_closed_manager_rejects_writes(self):
+        """Test that a write to a closed manager fails instead of never being flushed"""
+        self.manager.close()
+        with self.assertRaises(RuntimeError):
+            self.manager.execute_write("INSERT INTO items (name) VALUES (?)", ("late",))
+        self.assertEqual(self.manager.pending_writes(), 0)
+
+
+class TestPersistenceUsesSharedConnection(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.persistence = ConversationPersistence(os.path.join(self.tmp_dir, "conversations.db"))
+
+    def tearDown(self):
+        self.persistence._db.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_conversation_round_trip(self):
+        """Test that a conversation is stored and read back over one connection"""
+        conversation_id = self.persistence.start_conversation("user1", "session1")
+        self.persistence.add_message(conversation_id, "user", "start vm 101", "start_vm", {"vm_name": "101"})
+
+        conversation = self.persistence.get_active_conversation("user1", "session1")
+
+        self.assertEqual(conversation["id"], conversation_id)
+        self.assertEqual(conversation["messages"][0]["entities"], {"vm_name": "101"})
+        self.assertIn("start vm", conversation["topics"])
+        self.assertEqual(self.persistence._db.stats()["connections_opened"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
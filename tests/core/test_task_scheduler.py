@@ -0,0 +1,130 @@
+import threading
+import time
+import unittest
+from datetime import datetime
+
+from proxmox_nli.core.automation.cron import CronExpression
+from proxmox_nli.core.automation.task_scheduler import TaskScheduler
+
+
+class TestCronExpression(unittest.TestCase):
+    def next_after(self, expression, moment):
+        return CronExpression(expression).next_after(moment)
+
+    def test_next_after(self):
+        """Test next fire times across field boundaries"""
+        start = datetime(2024, 1, 31, 23, 59, 30)
+        self.assertEqual(self.next_after("*/15 * * * *", start), datetime(2024, 2, 1, 0, 0))
+        self.assertEqual(self.next_after("30 2 * * mon-fri", start), datetime(2024, 2, 1, 2, 30))
+        self.assertEqual(self.next_after("0 0 29 feb *", start), datetime(2024, 2, 29, 0, 0))
+        self.assertEqual(self.next_after("@monthly", datetime(2024, 12, 15)), datetime(2025, 1, 1, 0, 0))
+        # Sunday as 7; both day fields restricted means either may match
+        self.assertEqual(self.next_after("0 12 * * 7", start), datetime(2024, 2, 4, 12, 0))
+        self.assertEqual(self.next_after("0 0 15 * sun", start), datetime(2024, 2, 4, 0, 0))
+
+    def test_invalid_expressions(self):
+        """Test that malformed or impossible expressions raise ValueError"""
+        for expression in ("* * * *", "61 * * * *", "*/0 * * * *", "5-1 * * * *", "0 0 * foo *"):
+            with self.assertRaises(ValueError):
+                CronExpression(expression)
+        with self.assertRaises(ValueError):
+            self.next_after("0 0 31 feb *", datetime(2024, 1, 1))
+
+
+class TestTaskScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = TaskScheduler(max_workers=4)
+        self.scheduler.start()
+        self.runs = {}
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def record(self, name, delay=0.0):
+        with self.lock:
+            self.runs.setdefault(name, []).append(time.time())
+        time.sleep(delay)
+
+    def add_interval_task(self, task_id, seconds, delay=0.0, first_run=None):
+        """Schedule a sub-minute interval task directly for speed"""
+        self.assertTrue(self.scheduler.schedule_task(task_id, self.record, 1, task_id, delay))
+        with self.scheduler.lock:
+            task = self.scheduler.tasks[task_id]
+            task.interval = seconds
+            task.generation += 1
+            self.scheduler._push(task, first_run if first_run is not None else time.time() + seconds)
+        return task
+
+    def test_interval_fires_on_time_without_drift(self):
+        """Test that firings follow the schedule even when a task body takes time"""
+        start = time.time()
+        self.add_interval_task("tick", 0.1, delay=0.03)
+        time.sleep(0.55)
+        fired = self.runs["tick"]
+        self.assertGreaterEqual(len(fired), 4)
+        for index, moment in enumerate(fired[:4], start=1):
+            self.assertLess(abs(moment - (start + 0.1 * index)), 0.05)
+
+    def test_slow_task_does_not_delay_others(self):
+        """Test that a long running task does not hold up other due tasks"""
+        self.add_interval_task("slow", 0.05, delay=1.0)
+        self.add_interval_task("fast", 0.1)
+        time.sleep(0.45)
+        self.assertEqual(len(self.runs["slow"]), 1)
+        self.assertGreaterEqual(len(self.runs["fast"]), 3)
+        self.assertGreater(self.scheduler.get_task("slow")["running"], 0)
+
+    def test_overlapping_runs_are_skipped(self):
+        """Test that max_instances limits concurrent runs of one task"""
+        self.add_interval_task("backup", 0.05, delay=0.3)
+        time.sleep(0.25)
+        self.assertEqual(len(self.runs["backup"]), 1)
+        self.assertEqual(self.scheduler.get_task("backup")["running"], 1)
+
+        self.scheduler.configure_task("backup", max_instances=3)
+        time.sleep(0.15)
+        self.assertGreaterEqual(len(self.runs["backup"]), 3)
+
+    def test_misfire_policies(self):
+        """Test run_once, skip and catch_up handling of missed firings"""
+        overdue = time.time() - 5.5
+        for task_id, policy in (("once", "run_once"), ("skip", "skip"), ("catch", "catch_up")):
+            self.add_interval_task(task_id, 1.0)
+            self.assertTrue(self.scheduler.configure_task(task_id, max_instances=5, misfire_policy=policy,
+                                                          misfire_grace=0.05))
+            with self.scheduler.lock:
+                task = self.scheduler.tasks[task_id]
+                task.generation += 1
+                self.scheduler._push(task, overdue)
+        time.sleep(0.05)
+
+        self.assertEqual(len(self.runs["once"]), 1)
+        self.assertNotIn("skip", self.runs)
+        self.assertEqual(len(self.runs["catch"]), 6)
+        self.assertEqual(self.scheduler.get_task("skip")["misfires"], 1)
+        self.assertFalse(self.scheduler.configure_task("once", misfire_policy="later"))
+
+    def test_cron_and_at_time_scheduling(self):
+        """Test that cron and daily tasks get their next run and can be cancelled"""
+        self.assertTrue(self.scheduler.schedule_cron("report", self.record, "30 4 * * *", "report"))
+        self.assertFalse(self.scheduler.schedule_cron("broken", self.record, "every day"))
+        self.assertTrue(self.scheduler.schedule_at_time("cleanup", self.record, "23:15", "cleanup"))
+        self.assertTrue(self.scheduler.schedule_task("archive", self.record, "monthly", "archive"))
+
+        report = self.scheduler.get_task("report")
+        self.assertEqual(report["cron"], "30 4 * * *")
+        self.assertTrue(report["next_run"].endswith("04:30:00"))
+        self.assertEqual(self.scheduler.get_task("cleanup")["at_time"], "23:15:00")
+        self.assertTrue(self.scheduler.get_task("archive")["next_run"].endswith("-01T00:00:00"))
+
+        # Rescheduling an existing ID replaces it
+        self.assertTrue(self.scheduler.schedule_task("report", self.record, "hourly", "report"))
+        self.assertEqual(self.scheduler.get_task("report")["unit"], "hours")
+        self.assertEqual(len(self.scheduler.list_tasks()), 3)
+        self.assertTrue(self.scheduler.cancel_task("report"))
+        self.assertFalse(self.scheduler.cancel_task("report"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from proxmox_nli.core.monitoring.metrics_collector import MetricsCollector
+from proxmox_nli.core.monitoring.predictive_analyzer import PredictiveAnalyzer
+from proxmox_nli.core.monitoring.resource_monitor import ResourceMonitor
+from proxmox_nli.core.monitoring.timeseries_store import RingBuffer, TimeSeriesStore
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_wraps_and_keeps_order(self):
+        """Test that the oldest samples are overwritten and reads stay chronological"""
+        buffer = RingBuffer(['value'], capacity=4)
+        for ts in range(6):
+            buffer.append(ts, [ts * 10])
+        timestamps, values = buffer.ordered()
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(timestamps.tolist(), [2, 3, 4, 5])
+        self.assertEqual(values[:, 0].tolist(), [20, 30, 40, 50])
+        self.assertEqual(buffer.last()[0], 5)
+
+    def test_range(self):
+        """Test inclusive range queries across the wrap point"""
+        buffer = RingBuffer(['value'], capacity=5)
+        for ts in range(8):
+            buffer.append(ts, [ts])
+        timestamps, _ = buffer.range(4, 6)
+        self.assertEqual(timestamps.tolist(), [4, 5, 6])
+
+
+class TestTimeSeriesStore(unittest.TestCase):
+    def setUp(self):
+        self.store = TimeSeriesStore(capacity=100)
+
+    def test_append_metrics_and_latest(self):
+        """Test that collector dicts are split into series and rebuilt by latest()"""
+        self.store.append_metrics([
+            {'type': 'vm_memory', 'vm_id': 101, 'node': 'pve1', 'value': 1, 'total': 4,
+             'collector': 'vm_stats', 'timestamp': 100},
+            {'type': 'network', 'node': 'pve1', 'interface': 'eth0', 'in': 5, 'out': 6, 'timestamp': 100},
+        ])
+        self.store.append_metrics([
+            {'type': 'vm_memory', 'vm_id': 101, 'node': 'pve1', 'value': 2, 'total': 4, 'timestamp': 160},
+        ])
+        self.assertEqual(sorted(self.store.series()), [('network', 'pve1/eth0'), ('vm_memory', '101')])
+        latest = self.store.latest(since=160)
+        self.assertEqual(latest, [{'type': 'vm_memory', 'vm_id': 101, 'node': 'pve1',
+                                   'total': 4.0, 'value': 2.0, 'timestamp': 160}])
+        self.assertEqual(len(self.store.latest()), 2)
+
+    def test_downsample(self):
+        """Test bucketed aggregation of a series"""
+        for ts in range(0, 7200, 60):
+            self.store.append('vm_cpu', '101', ts, {'value': 1.0 if ts < 3600 else 3.0})
+        hourly = self.store.downsample('vm_cpu', '101', 3600)
+        self.assertEqual(hourly['timestamp'].tolist(), [0, 3600])
+        self.assertEqual(hourly['value'].tolist(), [1.0, 3.0])
+        peaks = self.store.downsample('vm_cpu', '101', 7200, agg='max')
+        self.assertEqual(peaks['value'].tolist(), [3.0])
+        with self.assertRaises(ValueError):
+            self.store.downsample('vm_cpu', '101', 60, agg='median')
+
+    def test_memory_is_bounded(self):
+        """Test that a series never grows past its capacity"""
+        for ts in range(1000):
+            self.store.append('node_cpu', 'pve1', ts, {'value': ts})
+        stats = self.store.stats()
+        self.assertEqual(stats['samples'], 100)
+        self.assertEqual(stats['samples_appended'], 1000)
+        self.assertEqual(self.store.query_range('node_cpu', 'pve1')['timestamp'][0], 900)
+
+
+class TestStoreReaders(unittest.TestCase):
+    def test_resource_summary_reads_store(self):
+        """Test that the resource summary is built from stored metrics without API calls"""
+        api = MagicMock()
+        collector = MetricsCollector(api)
+        collector._buffer_metrics([
+            {'type': 'node_cpu', 'node': 'pve1', 'value': 0.5, 'timestamp': 10},
+            {'type': 'storage', 'storage': 'local', 'used': 1, 'total': 2, 'timestamp': 10},
+        ])
+        monitor = ResourceMonitor(api, metrics_collector=collector)
+        result = monitor.get_resource_summary()
+        self.assertTrue(result['success'])
+        self.assertEqual(result['summary']['nodes']['pve1']['cpu'], 0.5)
+        self.assertEqual(result['summary']['storage']['local'], {'used': 1.0, 'total': 2.0})
+        api.api_request.assert_not_called()
+
+    def test_monitor_skips_unchanged_and_stale_cycles(self):
+        """Test that the monitor analyzes each fresh collection cycle only once"""
+        api = MagicMock()
+        collector = MetricsCollector(api)
+        monitor = ResourceMonitor(api, metrics_collector=collector)
+        monitor._analyze_current_state = MagicMock()
+        now = time.time()
+
+        collector._buffer_metrics([{'type': 'node_cpu', 'node': 'pve1', 'value': 0.95, 'timestamp': now}])
+        self.assertTrue(monitor._analyze_latest_metrics())
+        self.assertFalse(monitor._analyze_latest_metrics())
+
+        collector._buffer_metrics([{'type': 'node_cpu', 'node': 'pve1', 'value': 0.95,
+                                    'timestamp': now - 2 * collector.collection_interval}])
+        self.assertFalse(monitor._analyze_latest_metrics())
+        self.assertEqual(monitor._analyze_current_state.call_count, 1)
+        api.api_request.assert_not_called()
+
+    def test_predictions_use_store_history(self):
+        """Test that predictions use stored history instead of the resource analyzer"""
+        store = TimeSeriesStore()
+        now = time.time()
+        for hour in range(48):
+            ts = now - (48 - hour) * 3600
+            store.append('vm_cpu', '100', ts, {'value': 0.2 + hour * 0.01})
+            store.append('vm_memory', '100', ts, {'value': 512, 'total': 1024})
+        resource_analyzer = MagicMock()
+        analyzer = PredictiveAnalyzer(resource_analyzer, store=store)
+
+        result = analyzer.predict_resource_needs('100')
+
+        self.assertTrue(result['success'])
+        resource_analyzer.analyze_vm_resources.assert_not_called()
+        self.assertEqual(result['predictions']['cpu']['trend'], 'increasing')
+        self.assertTrue(np.allclose(result['predictions']['memory']['next_24h'], 50.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import unittest
+
+from aiohttp import web
+
+from proxmox_nli.core.events.webhook_delivery import WebhookDeliveryService, sign_payload, OPEN
+from proxmox_nli.core.events.webhook_handler import WebhookHandler
+from proxmox_nli.core.sqlite_pool import close_all_managers
+
+
+class Receiver:
+    """HTTP endpoint on a background loop that records webhook requests"""
+
+    def __init__(self):
+        self.requests = []
+        self.status = 200
+        self.delay = 0.0
+        self.active = 0
+        self.max_active = 0
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(started,), daemon=True)
+        self.thread.start()
+        started.wait(5)
+
+    def _run(self, started):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_post("/hook", self.handle)
+        self.runner = web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/hook"
+        started.set()
+        self.loop.run_forever()
+
+    async def handle(self, request):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        body = await request.read()
+        await asyncio.sleep(self.delay)
+        self.requests.append((dict(request.headers), body))
+        self.active -= 1
+        return web.Response(status=self.status)
+
+    def events(self):
+        received = []
+        for _, body in self.requests:
+            payload = json.loads(body)
+            received.extend(payload["events"] if "events" in payload else [payload])
+        return received
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+
+class TestWebhookDelivery(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.receiver = Receiver()
+        self.webhooks = {1: {"id": 1, "url": self.receiver.url, "secret": "s3cret", "enabled": True}}
+        self.services = []
+
+    def tearDown(self):
+        for service in self.services:
+            service.stop()
+        self.receiver.close()
+        close_all_managers()
+        self.tmp.cleanup()
+
+    def create_service(self, **kwargs):
+        kwargs.setdefault("batch_window", 0.05)
+        kwargs.setdefault("retry_backoff", 0.05)
+        service = WebhookDeliveryService(self.webhooks.get, storage_path=self.tmp.name, **kwargs)
+        self.services.append(service)
+        return service
+
+    def wait_until(self, condition, timeout=5.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if condition():
+                return
+            time.sleep(0.02)
+        self.fail("Condition not met in time")
+
+    def test_burst_is_batched(self):
+        """Test that an event storm goes out in a few signed requests"""
+        self.webhooks[1]["batch"] = True
+        service = self.create_service(max_batch=40)
+        for i in range(100):
+            service.enqueue([1], {"type": "vm_event", "n": i})
+        self.wait_until(lambda: service.outbox.counts()["DELIVERED"] == 100)
+
+        self.assertLessEqual(len(self.receiver.requests), 5)
+        self.assertEqual(sorted(event["n"] for event in self.receiver.events()), list(range(100)))
+        self.assertLessEqual(self.receiver.max_active, service.max_concurrency)
+        headers, body = self.receiver.requests[0]
+        self.assertEqual(headers["X-Webhook-Signature"], sign_payload(body, "s3cret"))
+
+    def test_webhooks_are_not_batched_by_default(self):
+        """Test that webhooks without the batch option get one event per request"""
+        service = self.create_service(max_batch=40)
+        for i in range(3):
+            service.enqueue([1], {"type": "vm_event", "n": i})
+        self.wait_until(lambda: service.outbox.counts()["DELIVERED"] == 3)
+
+        self.assertEqual(len(self.receiver.requests), 3)
+        self.assertTrue(all("events" not in json.loads(body) for _, body in self.receiver.requests))
+
+    def test_failures_retry_and_open_circuit(self):
+        """Test that failing deliveries are retried, then given up, and the circuit opens"""
+        self.receiver.status = 500
+        service = self.create_service(max_batch=1, max_concurrency=1, max_retries=2, failure_threshold=3,
+                                      reset_timeout=30)
+        for i in range(5):
+            service.enqueue([1], {"type": "backup_event", "n": i})
+        self.wait_until(lambda: service.stats()["endpoints"].get(1, {}).get("circuit") == OPEN)
+        time.sleep(0.3)
+
+        # No requests while the circuit is open; the rest stays queued for later
+        self.assertEqual(len(self.receiver.requests), 3)
+        counts = service.outbox.counts()
+        self.assertEqual(counts["DELIVERED"], 0)
+        self.assertEqual(counts["PENDING"] + counts["DEAD"], 5)
+        self.assertGreaterEqual(counts["PENDING"], 2)
+
+    def test_outbox_survives_restart(self):
+        """Test that queued and in-flight deliveries are sent by the next service"""
+        before = self.create_service()
+        before.outbox.add([1], {"type": "system_event", "n": 1})
+        before.outbox.add([1], {"type": "system_event", "n": 2})
+        self.assertEqual(len(before.outbox.claim(1, 1)), 1)  # Left in flight by a crash
+
+        after = self.create_service()
+        after.start()
+        self.wait_until(lambda: after.outbox.counts()["DELIVERED"] == 2)
+        self.assertEqual(sorted(event["n"] for event in self.receiver.events()), [1, 2])
+
+    def test_handler_delivers_from_plain_thread(self):
+        """Test that WebhookHandler.handle_event works without a running event loop"""
+        handler = WebhookHandler(storage_path=self.tmp.name)
+        self.services.append(handler.delivery)
+        handler.config["webhooks"] = [{"id": 7, "url": self.receiver.url, "events": ["vm_event"],
+                                       "enabled": True, "batch": False}]
+        handler.config["enabled"] = True
+
+        thread = threading.Thread(target=lambda: [handler.handle_event({"type": "vm_event", "n": i})
+                                                  for i in range(3)])
+        thread.start()
+        thread.join()
+        handler.handle_event({"type": "other"})
+        self.wait_until(lambda: len(handler.get_webhook_history()) == 3)
+
+        self.assertEqual(len(self.receiver.requests), 3)
+        self.assertTrue(all(entry["success"] for entry in handler.get_webhook_history()))
+        self.assertEqual(handler.get_delivery_stats()["outbox"]["DELIVERED"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
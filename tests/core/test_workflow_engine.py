@@ -0,0 +1,121 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from proxmox_nli.core.automation.task_executor import TaskExecutor
+from proxmox_nli.core.automation.workflow_engine import resolve_dependencies
+from proxmox_nli.core.automation.workflow_manager import WorkflowManager
+
+
+def python_step(name, function, depends_on=None, **kwargs):
+    step = {"name": name, "type": "python", "params": {"function": function, "kwargs": kwargs}}
+    if depends_on is not None:
+        step["depends_on"] = depends_on
+    return step
+
+
+class TestWorkflowEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.calls = []
+        self.lock = threading.Lock()
+        self.manager = self.create_manager()
+
+    def tearDown(self):
+        self.manager.engine.shutdown()
+        self.tmp.cleanup()
+
+    def create_manager(self, **functions):
+        functions.setdefault("work", self.work)
+        return WorkflowManager(self.tmp.name, task_executor=TaskExecutor(), max_workers=4,
+                               functions=functions)
+
+    def work(self, label, delay=0.0):
+        with self.lock:
+            self.calls.append(label)
+        time.sleep(delay)
+        return label
+
+    def run_workflow(self, steps):
+        workflow = self.manager.define_workflow("test", steps=steps)
+        started = self.manager.execute_workflow(workflow["id"])
+        self.assertTrue(started["success"], started.get("message"))
+        return self.manager.wait_for_execution(started["execution_id"], timeout=10)
+
+    def test_independent_steps_run_in_parallel(self):
+        """Test that a diamond finishes in critical-path time"""
+        start = time.perf_counter()
+        execution = self.run_workflow([
+            python_step("fetch", "work", [], label="fetch", delay=0.2),
+            python_step("disk", "work", ["fetch"], label="disk", delay=0.3),
+            python_step("net", "work", ["fetch"], label="net", delay=0.3),
+            python_step("boot", "work", ["disk", "net"], label="boot", delay=0.2),
+        ])
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(execution["status"], "completed")
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(self.calls[0], "fetch")
+        self.assertEqual(self.calls[-1], "boot")
+        self.assertEqual(execution["results"]["boot"]["result"], "boot")
+        self.assertFalse(os.listdir(os.path.join(self.tmp.name, "executions")))
+
+    def test_failure_skips_dependents(self):
+        """Test that a failed step fails the workflow and its dependents never start"""
+        execution = self.run_workflow([
+            {"name": "check", "type": "shell", "params": {"command": "exit 3"}},
+            python_step("deploy", "work", label="deploy"),
+        ])
+        self.assertEqual(execution["status"], "failed")
+        self.assertEqual([s["status"] for s in execution["steps"]], ["failed", "skipped"])
+        self.assertEqual(execution["steps"][0]["result"]["exit_code"], 3)
+        self.assertEqual(self.calls, [])
+
+    def test_step_timeout(self):
+        """Test that a step exceeding its timeout fails"""
+        execution = self.run_workflow([
+            {"name": "hang", "type": "shell", "params": {"command": "sleep 5"}, "timeout": 0.2},
+        ])
+        self.assertEqual(execution["status"], "failed")
+        self.assertIn("timed out", execution["steps"][0]["result"]["message"])
+
+    def test_invalid_dependencies_are_rejected(self):
+        """Test that cycles and unknown references are reported before anything runs"""
+        with self.assertRaises(ValueError):
+            resolve_dependencies([{"name": "a", "depends_on": ["b"]}, {"name": "b", "depends_on": ["a"]}])
+        workflow = self.manager.define_workflow("bad", steps=[python_step("a", "work", ["missing"])])
+        result = self.manager.execute_workflow(workflow["id"])
+        self.assertFalse(result["success"])
+        self.assertIn("unknown step", result["message"])
+
+    def test_restart_resumes_from_checkpoint(self):
+        """Test that completed steps are not repeated after a restart"""
+        release = threading.Event()
+        self.manager.register_function("block", lambda: release.wait(10))
+        workflow = self.manager.define_workflow("resume", steps=[
+            python_step("first", "work", label="first"),
+            python_step("second", "block"),
+            python_step("third", "work", label="third"),
+        ])
+        execution_id = self.manager.execute_workflow(workflow["id"])["execution_id"]
+        deadline = time.time() + 5
+        while self.manager.get_execution_status(execution_id)["steps"][1]["status"] != "running":
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.01)
+
+        # A second manager on the same storage stands in for the restarted process
+        restarted = self.create_manager(block=lambda: "unblocked")
+        execution = restarted.wait_for_execution(execution_id, timeout=10)
+        release.set()
+        self.manager.wait_for_execution(execution_id, timeout=10)
+        restarted.engine.shutdown()
+
+        self.assertEqual(execution["status"], "completed")
+        self.assertEqual(execution["results"]["second"]["result"], "unblocked")
+        self.assertEqual(self.calls.count("first"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
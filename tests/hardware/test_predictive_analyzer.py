@@ -134,5 +134,46 @@ class TestPredictiveAnalyzer(unittest.TestCase):
         peak_time = self.analyzer._find_peak_time(data)
         self.assertEqual(peak_time, 2)
         
+    def test_forecast_batch_matches_per_vm_path(self):
+        """Test that the batched forecast matches the per-VM LinearRegression path."""
+        rng = np.random.default_rng(0)
+        series = {
+            ('100', 'cpu'): 20 + 0.5 * np.arange(48) + rng.normal(0, 1, 48),
+            ('101', 'cpu'): 60 - 0.2 * np.arange(30) + rng.normal(0, 1, 30),
+        }
+        forecasts = self.analyzer.forecast_batch(series, hours_ahead=12)
+        for key, values in series.items():
+            expected = self.analyzer._train_and_predict('check', values.reshape(-1, 1), 12)
+            np.testing.assert_allclose(forecasts[key], expected, rtol=1e-6)
+            
+    def test_forecast_batch_caches_until_data_changes(self):
+        """Test that fitted coefficients are reused until a series gets new data."""
+        values = list(np.linspace(10, 40, 48))
+        self.analyzer.forecast_batch({('100', 'cpu'): values})
+        self.analyzer.forecast_batch({('100', 'cpu'): values})
+        self.assertEqual(self.analyzer.forecast_fits, 1)
+        self.assertEqual(self.analyzer.forecast_cache_hits, 1)
+        self.analyzer.forecast_batch({('100', 'cpu'): values + [45.0]})
+        self.assertEqual(self.analyzer.forecast_fits, 2)
+        
+    def test_forecast_batch_seasonality(self):
+        """Test that the seasonal term follows a daily cycle."""
+        hours = np.arange(72)
+        values = 50 + 10 * np.sin(2 * np.pi * hours / 24)
+        forecast = self.analyzer.forecast_batch({'vm': values}, hours_ahead=24, seasonal_period=24)['vm']
+        np.testing.assert_allclose(forecast, 50 + 10 * np.sin(2 * np.pi * np.arange(72, 96) / 24), atol=1e-6)
+        
+    def test_predict_cluster_needs(self):
+        """Test cluster-wide predictions built from per-VM history."""
+        history = {
+            'success': True,
+            'metrics': {'cpu': {'values': [20.0, 25.0, 30.0, 35.0, 40.0] * 5}}
+        }
+        with patch.object(self.resource_analyzer, 'analyze_vm_resources', return_value=history):
+            result = self.analyzer.predict_cluster_needs(['100', '101'])
+        self.assertTrue(result['success'])
+        self.assertEqual(sorted(result['vms']), ['100', '101'])
+        self.assertEqual(len(result['vms']['100']['predictions']['cpu']['next_24h']), 24)
+        
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,70 @@
+import re
+import pytest
+
+from proxmox_nli.nlu.intent_identification import IntentIdentifier
+from proxmox_nli.nlu.intent_matcher import CompiledIntentMatcher
+
+SAMPLE_QUERIES = [
+    "list vms", "show all virtual machines", "get vms", "start vm 101", "boot vm-web01",
+    "power on vm 200", "turn on vm db", "stop vm 101", "shutdown vm-123", "turn off vm 7",
+    "restart vm 101", "reboot web", "status of vm 101", "how is vm 101 doing",
+    "create a new vm called test-vm with 2GB RAM and 2 CPUs", "new vm named foo",
+    "delete vm 105", "remove virtual machine 9", "list containers", "show lxc",
+    "show cluster status", "how is the cluster doing", "get status of node pve1",
+    "show storage info", "what about the storage", "list docker containers on vm 101",
+    "start docker container nginx on vm 101", "stop docker container web",
+    "show logs for docker container web on vm 3", "list docker images",
+    "pull docker image nginx:latest on vm 2", "run command \"uptime\" on vm 101",
+    "execute 'df -h'", "list available services", "what can I install",
+    "find a service for photo backups", "I want to install nextcloud", "help me setup plex",
+    "deploy nextcloud on vm 101", "install jellyfin", "what is the status of service plex",
+    "stop service plex", "uninstall plex", "list my deployed services",
+    "check for updates", "are there any updates for nextcloud", "list available updates",
+    "apply all updates", "update nextcloud", "upgrade all services",
+    "configure update settings", "show update status", "make an update plan for plex",
+    "schedule an update for plex at 3am", "show scheduled updates", "analyze updates",
+    "show update history for plex", "explain the updates for plex", "help", "what can you do",
+    "create pool tank", "list pools", "create dataset tank/media", "list datasets",
+    "set properties compression=lz4", "take snapshot", "setup auto snapshot",
+    "Please START VM 101 now", "could you SHOW CLUSTER STATUS", "random gibberish text",
+    "", "vm", "tell me a joke", "whats up with node pve2", "ſtart vm 101", "Kelvin Keep",
+]
+
+
+def reference_match(patterns, query):
+    """Original uncompiled first-match loop"""
+    for intent, intent_patterns in patterns.items():
+        for pattern in intent_patterns:
+            match = re.search(pattern, query, re.IGNORECASE)
+            if match:
+                return intent, list(match.groups()) if match.groups() else []
+    return None
+
+
+@pytest.fixture(scope="module")
+def identifier():
+    return IntentIdentifier()
+
+
+class TestCompiledIntentMatcher:
+    @pytest.mark.parametrize("query", SAMPLE_QUERIES)
+    def test_matches_reference(self, identifier, query):
+        """Test that the compiled matcher returns the same intent and args as the raw loop"""
+        assert identifier.matcher.match(query) == reference_match(identifier.patterns, query)
+
+    def test_prefilter_skips_unrelated_patterns(self, identifier):
+        """Test that only patterns whose leading keyword occurs are tried"""
+        candidates = identifier.matcher.candidates("list vms")
+        assert 0 < len(candidates) < len(identifier.matcher.compiled) / 2
+
+    def test_leading_literals(self):
+        """Test extraction of the literals a pattern must start with"""
+        matcher = CompiledIntentMatcher({})
+        assert matcher._leading_literals(r'(?:start|boot|power\s+on)\s+vm') == {'start', 'boot', 'power'}
+        assert matcher._leading_literals(r'list\s+pools') == {'list'}
+        assert matcher._leading_literals(r'(?:vm)?\s+x') is None
+
+    def test_identify_intent_uses_matcher(self, identifier):
+        """Test that identify_intent returns pattern matches without tokenizing"""
+        query = "start vm-123"
+        assert identifier.identify_intent(query) == reference_match(identifier.patterns, query)
@@ -146,4 +146,84 @@ class TestEndToEnd:
         intent, args, entities = nlu_engine.process_query(query)
         assert intent == "help"  # Should default to help intent
         assert isinstance(args, list)
-        assert isinstance(entities, dict)
\ No newline at end of file
+        assert isinstance(entities, dict)
+
+
+class TestQueryCache:
+    @pytest.fixture
+    def cached_engine(self):
+        """NLU engine whose Ollama client is a mock and is consulted for every query"""
+        engine = NLU_Engine(use_ollama=False, pattern_confidence_threshold=1.1)
+        engine.use_ollama = True
+        engine.ollama_client = Mock()
+        engine.ollama_client.get_intent_and_entities.return_value = ("list_vms", [], {})
+        return engine
+
+    def test_repeated_query_skips_llm(self, cached_engine):
+        """Test that a repeated query is answered from the cache"""
+        first = cached_engine.process_query("list vms")
+        second = cached_engine.process_query("List VMs")
+        assert first == second
+        assert cached_engine.ollama_client.get_intent_and_entities.call_count == 1
+        stats = cached_engine.get_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["saved_llm_ms"] >= 0
+
+    def test_contextual_query_keyed_on_context(self, cached_engine):
+        """Test that a query referring to context misses when the current VM changes"""
+        cached_engine.ollama_client.get_intent_and_entities.return_value = ("stop_vm", [], {})
+        cached_engine.context_manager.update_context("start_vm", {"vm_name": "vm-100"})
+        cached_engine.process_query("stop it")
+        cached_engine.context_manager.update_context("start_vm", {"vm_name": "vm-200"})
+        intent, args, entities = cached_engine.process_query("stop it")
+        assert cached_engine.ollama_client.get_intent_and_entities.call_count == 2
+        assert entities["vm_name"] == "vm-200"
+
+    def test_unknown_intent_not_cached(self, cached_engine):
+        """Test that unrecognized LLM results are not cached"""
+        cached_engine.ollama_client.get_intent_and_entities.return_value = ("unknown", [], {})
+        cached_engine.process_query("tell me a joke")
+        cached_engine.process_query("tell me a joke")
+        assert cached_engine.ollama_client.get_intent_and_entities.call_count == 2
+        assert cached_engine.get_cache_stats()["entries"] == 0
+
+class TestTieredPipeline:
+    @pytest.fixture
+    def tiered_engine(self):
+        """NLU engine with a mock Ollama client behind the pattern tier"""
+        engine = NLU_Engine(use_ollama=False)
+        engine.use_ollama = True
+        engine.ollama_client = Mock()
+        engine.ollama_client.get_intent_and_entities.return_value = ("cluster_status", [], {})
+        return engine
+
+    def test_pattern_confidence(self, nlu_engine):
+        """Test that exact pattern matches score above keyword fallbacks"""
+        identifier = nlu_engine.intent_identifier
+        intent, args, confidence = identifier.identify_intent_with_confidence("start vm-101")
+        assert intent == "start_vm"
+        assert confidence == pytest.approx(1.0)
+        _, _, partial = identifier.identify_intent_with_confidence("please could you start vm-101 for me now")
+        assert partial < confidence
+
+    def test_confident_pattern_skips_llm(self, tiered_engine):
+        """Test that an unambiguous command never reaches the LLM"""
+        intent, args, entities = tiered_engine.process_query("start vm 101")
+        assert intent == "start_vm"
+        tiered_engine.ollama_client.get_intent_and_entities.assert_not_called()
+
+    def test_low_confidence_consults_llm(self, tiered_engine):
+        """Test that the LLM is called when the pattern tier is below the threshold"""
+        tiered_engine.pattern_confidence_threshold = 1.1
+        intent, args, entities = tiered_engine.process_query("start vm 101")
+        assert intent == "cluster_status"
+        tiered_engine.ollama_client.get_intent_and_entities.assert_called_once()
+
+    def test_llm_failure_falls_back_to_pattern(self, tiered_engine):
+        """Test that the pattern result is used when the LLM fails"""
+        tiered_engine.pattern_confidence_threshold = 1.1
+        tiered_engine.ollama_client.get_intent_and_entities.side_effect = Exception("Ollama error")
+        intent, args, entities = tiered_engine.process_query("start vm 101")
+        assert intent == "start_vm"
@@ -0,0 +1,58 @@
+"""
+Test for streaming responses from the Ollama client
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+import json
+import sys
+import os
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from proxmox_nli.nlu.ollama_client import OllamaClient
+from proxmox_nli.core.response_generator import ResponseGenerator
+
+def make_stream_response(chunks, status_code=200):
+    """Build a mock streaming /api/generate response"""
+    response = MagicMock()
+    response.status_code = status_code
+    response.iter_lines.return_value = [json.dumps(chunk).encode() for chunk in chunks]
+    response.__enter__.return_value = response
+    return response
+
+@pytest.fixture
+def client():
+    with patch.object(OllamaClient, '_verify_connection'):
+        return OllamaClient(model_name="llama3", base_url="http://ollama:11434")
+
+class TestOllamaStreaming:
+    @patch('proxmox_nli.nlu.ollama_client.requests.post')
+    def test_stream_yields_tokens(self, mock_post, client):
+        mock_post.return_value = make_stream_response([
+            {"response": "VM 101 ", "done": False},
+            {"response": "is running.", "done": False},
+            {"response": "", "done": True},
+        ])
+
+        tokens = list(client.stream_enhance_response("status of vm 101", "vm_status", {"success": True}))
+
+        assert tokens == ["VM 101 ", "is running."]
+        request_body = mock_post.call_args[1]['json']
+        assert request_body['stream'] is True
+        assert mock_post.call_args[1]['stream'] is True
+
+    @patch('proxmox_nli.nlu.ollama_client.requests.post')
+    def test_stream_error_yields_nothing(self, mock_post, client):
+        mock_post.return_value = make_stream_response([], status_code=500)
+        assert list(client.stream_enhance_response("list vms", "list_vms", {"success": True})) == []
+
+    @patch('proxmox_nli.nlu.ollama_client.requests.post')
+    def test_response_generator_falls_back_without_tokens(self, mock_post, client):
+        mock_post.side_effect = Exception("connection refused")
+        generator = ResponseGenerator()
+        generator.use_huggingface = False
+        generator.set_ollama_client(client)
+
+        chunks = list(generator.generate_response_stream("start vm 101", "start_vm", {"vm_id": 101}))
+
+        assert chunks == ["VM 101 started successfully."]
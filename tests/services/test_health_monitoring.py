@@ -0,0 +1,108 @@
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from proxmox_nli.services.health_monitoring import ServiceHealthMonitor
+
+
+class FakeDockerDeployer:
+    """Answers the batched per-VM health command like a VM running the given containers"""
+
+    def __init__(self, containers, delay=0.0):
+        self.containers = containers
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def run_command(self, vm_id, command):
+        with self.lock:
+            self.calls.append((vm_id, command))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+
+        lines = [f"{name}|{status}" for name, (status, _) in self.containers[vm_id].items()]
+        lines.append(ServiceHealthMonitor.STATS_MARKER)
+        lines += [f"{name},{cpu},512MiB / 1GiB,1kB / 2kB,0B / 0B"
+                  for name, (status, cpu) in self.containers[vm_id].items() if status.startswith('Up')]
+        for name in self.containers[vm_id]:
+            lines += [f"{ServiceHealthMonitor.LOGS_MARKER}{name}>>>", f"log line of {name}"]
+        return {"success": True, "output": "\n".join(lines)}
+
+
+class TestConcurrentHealthChecks(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = MagicMock()
+        self.manager.catalog.get_service.return_value = {'name': 'svc', 'deployment': {'method': 'docker'}}
+        self.manager.docker_deployer = FakeDockerDeployer({
+            '101': {'web': ('Up 2 hours', '95.5%'), 'db': ('Up 2 hours', '3.0%')},
+            '102': {'cache': ('Exited (1) 5 minutes ago', None)},
+            '103': {'queue': ('Up 1 minute', '1.0%')},
+        }, delay=0.2)
+        services = [('web', '101'), ('db', '101'), ('cache', '102'), ('queue', '103'), ('missing', '103')]
+        self.manager.list_deployed_services.return_value = {
+            'success': True,
+            'services': [{'service_id': s, 'vm_id': vm, 'name': s} for s, vm in services]
+        }
+        self.monitor = ServiceHealthMonitor(self.manager, max_workers=4, data_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.monitor.stop_monitoring()
+        self.tmp.cleanup()
+
+    def test_one_exec_per_vm_concurrently(self):
+        """Test that each VM gets a single batched exec and VMs are checked in parallel"""
+        start = time.perf_counter()
+        self.assertTrue(self.monitor.check_services_health())
+        elapsed = time.perf_counter() - start
+
+        deployer = self.manager.docker_deployer
+        self.assertEqual(sorted(vm for vm, _ in deployer.calls), ['101', '102', '103'])
+        self.assertEqual(deployer.max_active, 3)
+        self.assertLess(elapsed, 0.5)
+        self.manager.get_service_status.assert_not_called()
+
+    def test_results_match_per_service_checks(self):
+        """Test that statuses, metrics, logs and issues are attributed to the right service"""
+        self.monitor.check_services_health()
+
+        web = self.monitor.get_service_health('web')['checks'][-1]
+        self.assertEqual(web['status'], 'Up 2 hours')
+        self.assertEqual(web['metrics']['cpu_usage'], '95.5%')
+        self.assertEqual(web['metrics']['recent_logs'], 'log line of web')
+        self.assertTrue(any('High CPU' in i['description'] for i in self.monitor.health_data['web']['issues']))
+
+        cache = self.monitor.get_service_health('cache')['checks'][-1]
+        self.assertEqual(cache['status'], 'Exited (1) 5 minutes ago')
+        self.assertNotIn('cpu_usage', cache['metrics'])
+
+        missing = self.monitor.get_service_health('missing')['checks'][-1]
+        self.assertEqual(missing['status'], 'Not running')
+        self.assertEqual(self.monitor.health_data['missing']['issues'][0]['type'], 'status')
+
+    def test_latency_metrics(self):
+        """Test that per-check latencies are recorded"""
+        self.monitor.check_services_health()
+        metrics = self.monitor.get_check_metrics()
+        self.assertEqual(metrics['vm']['count'], 3)
+        self.assertEqual(metrics['service']['count'], 5)
+        self.assertGreaterEqual(metrics['latest']['vm:101'], 0.2)
+        self.assertGreaterEqual(self.monitor.health_data['db']['checks'][-1]['latency'], 0.2)
+
+    def test_spread_staggers_vm_checks(self):
+        """Test that a spread delays the per-VM checks by a random offset"""
+        start = time.perf_counter()
+        self.monitor.check_services_health(spread=0.3)
+        self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertEqual(len(self.manager.docker_deployer.calls), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
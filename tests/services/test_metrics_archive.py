@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from proxmox_nli.services.metrics_archive import MetricsArchive, close_all_archives
+from proxmox_nli.services.metrics_dashboard import ServiceMetricsDashboard
+
+
+class TestMetricsArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = MetricsArchive(self.tmp.name)
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmp.cleanup()
+
+    def test_raw_query_and_rollups(self):
+        """Test raw range reads and minute rollups including the open bucket"""
+        base = 1_700_000_040.0  # minute aligned
+        for i in range(180):
+            self.archive.append('svc/cpu_percent', float(i % 60), base + i)
+
+        raw = self.archive.query('svc/cpu_percent', base + 10, base + 19, resolution='raw')
+        self.assertEqual(raw['value'].tolist(), [float(v) for v in range(10, 20)])
+
+        minutes = self.archive.query('svc/cpu_percent', base, base + 180, resolution='1m')
+        self.assertEqual(minutes['timestamp'].tolist(), [base, base + 60, base + 120])
+        self.assertEqual(minutes['count'].tolist(), [60, 60, 60])
+        self.assertEqual(minutes['mean'].tolist(), [29.5, 29.5, 29.5])
+        self.assertEqual(minutes['max'].tolist(), [59, 59, 59])
+        self.assertEqual(self.archive.query('unknown', base, base + 180), {})
+
+    def test_reopen_merges_rollups(self):
+        """Test that data survives a restart and split buckets are merged"""
+        base = 1_700_000_040.0
+        self.archive.append('svc/memory_percent', 10, base)
+        self.archive.close()
+
+        reopened = MetricsArchive(self.tmp.name)
+        reopened.append('svc/memory_percent', 30, base + 5)
+        minutes = reopened.query('svc/memory_percent', base, base + 60, resolution='1m')
+        self.assertEqual(minutes['count'].tolist(), [2])
+        self.assertEqual(minutes['mean'].tolist(), [20.0])
+        self.assertEqual(reopened.series_names('svc/'), ['svc/memory_percent'])
+        reopened.close()
+
+    def test_open_rollups_flushed_at_exit(self):
+        """Test that the current hour and day rollups survive a restart without close()"""
+        base = 1_700_000_000.0 - 1_700_000_000.0 % 86400
+        for i in range(10):
+            self.archive.append('svc/cpu_percent', float(i), base + 60 * i)
+        close_all_archives()  # Registered with atexit
+
+        reopened = MetricsArchive(self.tmp.name)
+        hourly = reopened.query('svc/cpu_percent', base, base + 3600, resolution='1h')
+        daily = reopened.query('svc/cpu_percent', base, base + 86400, resolution='1d')
+        self.assertEqual(hourly['count'].tolist(), [10])
+        self.assertEqual(daily['mean'].tolist(), [4.5])
+        reopened.close()
+
+    def test_retention_drops_whole_segments(self):
+        """Test that compaction deletes expired raw segments only"""
+        base = 1_700_000_000.0 - 1_700_000_000.0 % 3600
+        self.archive.append('svc/cpu_percent', 1, base)
+        self.archive.append('svc/cpu_percent', 2, base + 3 * 86400)
+        raw_dir = os.path.join(self.tmp.name, 'raw')
+        self.assertEqual(len(os.listdir(raw_dir)), 1)
+        remaining = self.archive.query('svc/cpu_percent', base, base + 3 * 86400, resolution='raw')
+        self.assertEqual(remaining['value'].tolist(), [2.0])
+        daily = self.archive.query('svc/cpu_percent', base - 86400, base + 3 * 86400, resolution='1d')
+        self.assertEqual(daily['count'].sum(), 2)
+
+
+class TestDashboardArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_updates_do_not_rewrite_history(self):
+        """Test that samples go to the archive and trends are read back from it"""
+        dashboard = ServiceMetricsDashboard(MagicMock(), data_dir=self.tmp.name)
+        dashboard.service_manager.catalog.get_service.return_value = {'name': 'Web'}
+        dashboard.update_metrics('web', {'cpu_percent': 10.0, 'memory_unit': 'MB'})
+        dashboard.update_metrics('web', {'cpu_percent': 40.0})
+
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'metrics_history.json')))
+        result = dashboard.get_service_dashboard('web')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['dashboard']['trends']['cpu_percent']['max'], 40.0)
+        dashboard.save_metrics_history()
+        dashboard.archive.close()
+
+        restarted = ServiceMetricsDashboard(MagicMock(), data_dir=self.tmp.name)
+        recent = restarted.metrics_history['web']['recent_metrics']
+        self.assertEqual([m['cpu_percent'] for m in recent], [10.0, 40.0])
+        restarted.archive.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from proxmox_nli.services.health_monitoring import ServiceHealthMonitor
+from proxmox_nli.services.state_journal import StateJournal
+
+
+class TestStateJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open(self, **kwargs):
+        journal = StateJournal(self.tmp.name, 'state', **kwargs)
+        self.addCleanup(journal.close)
+        return journal
+
+    def test_deltas_replay_after_restart(self):
+        """Test that set, append with limit and delete survive a restart"""
+        journal = self.open()
+        state = journal.state()
+        state['svc'] = {'checks': []}
+        journal.set(['svc'], state['svc'])
+        for i in range(5):
+            journal.append(['svc', 'checks'], {'n': i}, limit=3)
+        journal.set(['other'], 1)
+        journal.delete(['other'])
+        journal.close()
+
+        reopened = self.open()
+        self.assertEqual(reopened.state(), {'svc': {'checks': [{'n': 2}, {'n': 3}, {'n': 4}]}})
+
+    def test_compaction_and_torn_write(self):
+        """Test that compaction folds the journal into a snapshot and a torn tail is ignored"""
+        journal = self.open(compact_bytes=200)
+        for i in range(20):
+            journal.set(['counter'], i)
+            journal.flush()
+        self.assertGreater(journal.stats()['compactions'], 0)
+        self.assertLess(journal.stats()['journal_bytes'], 200)
+        journal.close()
+        with open(journal.journal_path, 'a') as f:
+            f.write('{"s": 99, "o": "set", "p": ["coun')
+
+        reopened = self.open()
+        self.assertEqual(reopened.state(), {'counter': 19})
+
+    def test_deltas_after_torn_write_survive(self):
+        """Test that deltas recorded after restarting on a torn journal are kept"""
+        journal = self.open()
+        journal.set(['a'], 1)
+        journal.close()
+        with open(journal.journal_path, 'a') as f:
+            f.write('{"s":2,"o":"set","p":["b"],"v"')
+
+        restarted = self.open()
+        restarted.set(['c'], 3)
+        restarted.close()
+        reloaded = self.open()
+        self.assertEqual(reloaded.state(), {'a': 1, 'c': 3})
+
+        reloaded.compact()
+        self.assertEqual(self.open().state(), {'a': 1, 'c': 3})
+
+    def test_legacy_file_imported(self):
+        """Test that a full-state JSON file from the old persistence seeds the state"""
+        legacy = os.path.join(self.tmp.name, 'legacy.json')
+        with open(legacy, 'w') as f:
+            json.dump({'svc': {'name': 'web'}}, f)
+        journal = self.open(legacy_file=legacy)
+        journal.start_loading()
+        journal.set(['svc', 'vm_id'], '101')
+        journal.compact()
+
+        reopened = self.open(legacy_file=legacy)
+        self.assertEqual(reopened.state(), {'svc': {'name': 'web', 'vm_id': '101'}})
+
+
+class TestHealthMonitorPersistence(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_health_data_restored_from_journal(self):
+        """Test that check results are journaled and reloaded without a full rewrite"""
+        manager = MagicMock()
+        manager.catalog.get_service.return_value = {'name': 'svc', 'deployment': {'method': 'docker'}}
+        manager.list_deployed_services.return_value = {
+            'success': True, 'services': [{'service_id': 'web', 'vm_id': '101', 'name': 'web'}]
+        }
+        manager.docker_deployer.run_command.return_value = {'success': False, 'error': 'agent down'}
+
+        monitor = ServiceHealthMonitor(manager, data_dir=self.tmp.name)
+        for _ in range(3):
+            monitor.check_services_health()
+        monitor.stop_monitoring()
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'health_data.json')))
+
+        restarted = ServiceHealthMonitor(manager, data_dir=self.tmp.name)
+        web = restarted.get_service_health('web')
+        self.assertEqual(len(web['checks']), 3)
+        self.assertEqual(len(web['issues']), 3)
+        self.assertEqual(web['issues'], monitor.health_data['web']['issues'])
+        self.assertEqual(web['last_uptime'], monitor.health_data['web']['last_uptime'])
+        restarted.stop_monitoring()
+
+
+if __name__ == '__main__':
+    unittest.main()